@@ -44,9 +44,14 @@ class Config:
     # ChromaDB Configuration
     CHROMADB_HOST = os.environ.get('CHROMADB_HOST') or 'localhost'
     CHROMADB_PORT = int(os.environ.get('CHROMADB_PORT') or 8000)
+    VECTOR_STORE = os.environ.get('VECTOR_STORE') or 'chromadb'  # chromadb (server) or local (embedded)
+    VECTOR_STORE_DIR = os.environ.get('VECTOR_STORE_DIR')  # local store directory (default: BOOKS_DIR/processed/vectors)
+    VECTOR_STORE_EMBEDDING_URL = os.environ.get('VECTOR_STORE_EMBEDDING_URL')  # OpenAI-compatible embeddings for the local store
+    VECTOR_STORE_EMBEDDING_MODEL = os.environ.get('VECTOR_STORE_EMBEDDING_MODEL') or 'nomic-embed-text-v1.5'
     
     # Rule Books Configuration
     BOOKS_DIR = os.environ.get('BOOKS_DIR') or 'books'
+    PDF_EXTRACTOR = os.environ.get('PDF_EXTRACTOR') or 'auto'  # auto, pypdfium2, pdfminer, pdfplumber
     
     # GPU Monitoring Configuration
     GPU_THRESHOLD_HIGH = int(os.environ.get('GPU_THRESHOLD_HIGH') or 80)
@@ -58,6 +63,21 @@ class Config:
     LOG_FILE = os.environ.get('LOG_FILE') or '/app/logs/backend.log'
     LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     
+    # Request tracing (see services/tracing.py)
+    TRACING_ENABLED = os.environ.get('TRACING_ENABLED', 'true').lower() == 'true'
+    TRACE_HEADERS = os.environ.get('TRACE_HEADERS', 'false').lower() == 'true'
+    TRACE_SLOW_REQUEST_MS = int(os.environ.get('TRACE_SLOW_REQUEST_MS') or 5000)
+    TRACING_OTEL = os.environ.get('TRACING_OTEL', 'false').lower() == 'true'
+    
+    # Prometheus metrics at GET /metrics (see services/metrics.py)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    
+    # SQL accounting and slow-query log (see services/sql_stats.py)
+    SQL_STATS_ENABLED = os.environ.get('SQL_STATS_ENABLED', 'true').lower() == 'true'
+    SQL_SLOW_QUERY_MS = float(os.environ.get('SQL_SLOW_QUERY_MS') or 200)
+    SQL_EXPLAIN_SLOW = os.environ.get('SQL_EXPLAIN_SLOW', 'true').lower() == 'true'
+    SQL_REPEATED_QUERY_WARN = int(os.environ.get('SQL_REPEATED_QUERY_WARN') or 25)
+    
     @classmethod
     def setup_logging(cls):
         """Setup comprehensive logging configuration"""
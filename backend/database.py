@@ -12,6 +12,8 @@ from typing import Optional, Dict, Any
 from datetime import datetime
 import os
 
+from services.tracing import trace_connection
+
 logger = logging.getLogger(__name__)
 
 def get_db():
@@ -32,7 +34,7 @@ def get_db():
         )
         # Use RealDictCursor for dict-like rows (similar to SQLite's Row)
         conn.cursor_factory = psycopg2.extras.RealDictCursor
-        return conn
+        return trace_connection(conn)
     else:
         # SQLite connection (fallback)
         db_path = Config.DATABASE
@@ -46,7 +48,7 @@ def get_db():
         # CRITICAL: Enable foreign key constraints for CASCADE deletes
         conn.execute("PRAGMA foreign_keys = ON")
         
-        return conn
+        return trace_connection(conn)
 
 
 def _pg_table_exists(cursor, table: str) -> bool:
@@ -699,6 +701,18 @@ def migrate_db():
             from services.ai_runtime_settings import ensure_app_settings_table
 
             ensure_app_settings_table(cursor)
+            from services.dice_stats import ensure_dice_stats_table
+
+            ensure_dice_stats_table(cursor)
+            from services.campaign_stats import ensure_campaign_stats
+
+            ensure_campaign_stats(cursor)
+            from services.read_state import ensure_read_state_indexes
+
+            ensure_read_state_indexes(cursor)
+            from services.deletion_jobs import ensure_deletion_jobs_table
+
+            ensure_deletion_jobs_table(cursor)
             conn.commit()
         except Exception as e:
             logger.error(f"PostgreSQL schema ensure failed: {e}")
@@ -1062,6 +1076,12 @@ def migrate_db():
         from services.ai_runtime_settings import ensure_app_settings_table
 
         ensure_app_settings_table(cursor)
+        from services.dice_stats import ensure_dice_stats_table
+
+        ensure_dice_stats_table(cursor)
+        from services.deletion_jobs import ensure_deletion_jobs_table
+
+        ensure_deletion_jobs_table(cursor)
         conn.commit()
         conn.close()
         logger.info("✅ Database migration completed")
@@ -17,6 +17,7 @@ from config import Config
 from database import init_db, get_db
 from services.gpu_monitor import GPUMonitorService
 from services.llm_service import LLMService
+from services import tracing, metrics, sql_stats, dice_odds, deletion_jobs
 from routes import auth, users, campaigns, characters, ai, rule_books, admin, locations, dice, messages
 
 # Configure logging
@@ -35,6 +36,9 @@ def create_app(config_class=Config):
     # Initialize extensions
     CORS(app)
     JWTManager(app)
+    tracing.init_app(app)
+    metrics.init_app(app)
+    sql_stats.init_app(app)
     
     # Initialize database
     with app.app_context():
@@ -42,6 +46,12 @@ def create_app(config_class=Config):
         from database import migrate_db
         migrate_db()
     
+    # Exact dice odds tables (roll preview, AI difficulty selection)
+    dice_odds.warm_table()
+    
+    # Location / campaign deletions interrupted by a restart
+    deletion_jobs.resume_pending()
+    
     # Initialize LLM service
     with app.app_context():
         from services.llm_service import initialize_llm_service
@@ -28,6 +28,8 @@ from database import (
     ensure_campaigns_listing_columns,
     ensure_campaigns_staff_pause_columns,
 )
+from services import campaign_acl
+from services.playing_character import effective_playing_characters
 from services.moderation_audit import log_moderation_action, moderation_entry_kind
 from routes.auth import load_invites, save_invites
 from services.play_suspension import ALLOWED_REASON_CODES
@@ -187,6 +189,7 @@ def update_user(user_id):
         
         cursor.execute(query, params)
         db.commit()
+        campaign_acl.invalidate_user(user_id)
         
         # Log the action
         log_moderation_action(user_id, admin_id, 'edit_profile', {
@@ -273,6 +276,7 @@ def ban_user(user_id):
         """, (ban_type, ban_until.isoformat() if ban_until else None, ban_reason, admin_id, datetime.now(), user_id))
         
         db.commit()
+        campaign_acl.invalidate_user(user_id)
         
         # Log the action
         log_moderation_action(user_id, admin_id, 'ban', {
@@ -307,6 +311,7 @@ def unban_user(user_id):
         """, (user_id,))
         
         db.commit()
+        campaign_acl.invalidate_user(user_id)
         
         # Log the action
         log_moderation_action(user_id, admin_id, 'unban', {})
@@ -855,8 +860,11 @@ def admin_get_user_debug(user_id):
             """,
             (user_id,),
         )
+        member_rows = cursor.fetchall()
+        playing = effective_playing_characters(cursor, user_id, backfill=False)
         memberships = []
-        for row in cursor.fetchall():
+        for row in member_rows:
+            ch = playing.get(row['campaign_id']) or {}
             memberships.append({
                 'campaign_id': row['campaign_id'],
                 'campaign_name': row['campaign_name'],
@@ -864,6 +872,8 @@ def admin_get_user_debug(user_id):
                 'joined_at': row['joined_at'],
                 'member_role': row.get('member_role'),
                 'is_owner': str(row.get('created_by')) == str(user_id),
+                'playing_character_id': ch.get('id'),
+                'playing_character_name': ch.get('name'),
             })
 
         cursor.execute(
@@ -1072,17 +1082,22 @@ def admin_user_campaign_memberships_list(user_id):
             """,
             (user_id,),
         )
+        member_rows = cursor.fetchall() or []
+        playing = effective_playing_characters(cursor, user_id, backfill=False)
         seen = set()
         out = []
-        for row in cursor.fetchall() or []:
+        for row in member_rows:
             cid = row['id']
             seen.add(cid)
+            ch = playing.get(cid) or {}
             out.append({
                 'id': cid,
                 'name': _row_get(row, 'name', ''),
                 'game_system': _row_get(row, 'game_system', '') or '',
                 'member_role': _row_get(row, 'member_role', 'player') or 'player',
                 'via': 'campaign_players',
+                'playing_character_id': ch.get('id'),
+                'playing_character_name': ch.get('name'),
             })
 
         cursor.execute(
@@ -1101,12 +1116,15 @@ def admin_user_campaign_memberships_list(user_id):
             cid = row['id']
             if cid in seen:
                 continue
+            ch = playing.get(cid) or {}
             out.append({
                 'id': cid,
                 'name': _row_get(row, 'name', ''),
                 'game_system': _row_get(row, 'game_system', '') or '',
                 'member_role': 'owner',
                 'via': 'created_by_only',
+                'playing_character_id': ch.get('id'),
+                'playing_character_name': ch.get('name'),
             })
 
         cursor.close()
@@ -1174,6 +1192,7 @@ def admin_user_campaign_membership(user_id, campaign_id):
             'campaign_id': campaign_id,
         })
         db.commit()
+        campaign_acl.invalidate(user_id, campaign_id)
         cursor.close()
         db.close()
         return jsonify({
@@ -1287,6 +1306,8 @@ def delete_user_account_preserve_chats(user_id):
     db = get_db()
     try:
         ok, err, stats = delete_player_account_preserving_chats(db, user_id, admin_id)
+        # Campaign ownership moved to the archive user, so every cached entry may be stale
+        campaign_acl.clear()
         if not ok:
             return jsonify({'error': err or 'Delete failed'}), 400
         return jsonify({
@@ -1299,3 +1320,44 @@ def delete_user_account_preserve_chats(user_id):
     finally:
         db.close()
 
+
+
+@bp.route('/tracing/latency', methods=['GET'])
+@require_admin()
+def get_tracing_latency():
+    """Per-endpoint latency histograms (total and db/vector/embedding/llm/queue ms) since process start."""
+    from services.tracing import latency_histograms, TRACING_ENABLED
+
+    return jsonify({
+        'enabled': TRACING_ENABLED,
+        'endpoints': latency_histograms(),
+    }), 200
+
+
+@bp.route('/db/queries', methods=['GET'])
+@require_admin()
+def get_db_query_stats():
+    """Top SQL statement fingerprints (?limit=20&sort=total_ms|count|max_ms|mean_ms|max_per_request&endpoint=)."""
+    from services import sql_stats
+
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 500)
+    sort = request.args.get('sort', 'total_ms')
+    if sort not in sql_stats.SORT_KEYS:
+        return jsonify({'error': f"sort must be one of {', '.join(sql_stats.SORT_KEYS)}"}), 400
+    return jsonify({
+        'enabled': sql_stats.SQL_STATS_ENABLED,
+        'slow_query_ms': sql_stats.SQL_SLOW_QUERY_MS,
+        'since': datetime.fromtimestamp(sql_stats.STATS.since).isoformat(),
+        'queries': sql_stats.top_queries(limit, sort, request.args.get('endpoint') or None),
+        'endpoints': sql_stats.endpoint_summary(),
+    }), 200
+
+
+@bp.route('/db/queries', methods=['DELETE'])
+@require_admin()
+def reset_db_query_stats():
+    """Clear the SQL accounting counters."""
+    from services import sql_stats
+
+    sql_stats.reset()
+    return jsonify({'message': 'SQL statistics reset'}), 200
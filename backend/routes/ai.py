@@ -13,6 +13,7 @@ from datetime import datetime
 from database import get_db
 from services.gpu_monitor import gpu_monitor_service
 from services.llm_service import get_llm_service
+from services import metrics
 from services.health_check import get_health_check_service, require_llm, require_ai_services
 from services.ai_slash_commands import (
     parse_ai_slash_line,
@@ -234,6 +235,7 @@ def ai_chat():
                 message, campaign_id, location_id, current_user_id
             )
             if ooc_text is None:
+                metrics.AI_CHAT_RESPONSES.labels('ooc_silent').inc()
                 return jsonify({
                     'response': None,
                     'ooc_no_reply': True,
@@ -247,6 +249,7 @@ def ai_chat():
                 campaign_id, 'conversation', message, ooc_text,
                 {**context, 'ooc_moderation': True}
             )
+            metrics.AI_CHAT_RESPONSES.labels('ooc_moderation').inc()
             return jsonify({
                 'response': ooc_text,
                 'ooc_no_reply': False,
@@ -276,6 +279,7 @@ def ai_chat():
         if campaign_id:
             store_ai_memory(campaign_id, 'conversation', message, response, context)
         
+        metrics.AI_CHAT_RESPONSES.labels(response_type).inc()
         return jsonify({
             'response': response,
             'response_type': response_type,
@@ -1549,13 +1553,13 @@ def get_character_context(user_id: int, campaign_id: int) -> dict:
     """Get character context for AI responses"""
     try:
         import json
-        from services.playing_character import effective_playing_character_id
+        from services.playing_character import effective_playing_characters
 
         db = get_db()
         cursor = db.cursor()
 
-        eid = effective_playing_character_id(cursor, user_id, campaign_id)
-        if eid is None:
+        playing = effective_playing_characters(cursor, user_id, [campaign_id]).get(int(campaign_id))
+        if playing is None:
             return {
                 'has_character': False,
                 'formatted': 'No character found for this campaign.'
@@ -1572,7 +1576,7 @@ def get_character_context(user_id: int, campaign_id: int) -> dict:
             FROM characters c
             JOIN campaigns cam ON c.campaign_id = cam.id
             WHERE c.id = %s AND c.user_id = %s AND c.campaign_id = %s
-        """, (eid, user_id, campaign_id))
+        """, (playing['id'], user_id, campaign_id))
         
         character = cursor.fetchone()
         if not character:
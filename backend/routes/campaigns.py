@@ -24,10 +24,11 @@ from database import (
     ensure_users_self_switch_playing_character_column,
     ensure_campaign_players_active_character_id_column,
 )
+from services import campaign_acl, campaign_stats, deletion_jobs
 from services.moderation_audit import log_moderation_action_cursor
 from services.play_suspension import suspended_json
 from services.playing_character import (
-    effective_playing_character_id,
+    effective_playing_characters,
     is_campaign_storyteller_or_staff,
 )
 
@@ -37,58 +38,6 @@ logger = logging.getLogger(__name__)
 campaigns_bp = Blueprint('campaigns', __name__, url_prefix='/api/campaigns')
 
 
-def _fetch_ooc_lobby_location_ids(cursor, campaign_id: int) -> list:
-    """
-    IDs of the Out of Character Lobby for this campaign (never counted as story locations
-    or story messages). psycopg2 treats bare % in SQL as special — do not use LIKE ...% in
-    one big string; resolve ids with explicit queries instead.
-    """
-    ids = []
-    seen = set()
-
-    def _add(rows):
-        for row in rows:
-            lid = row['id']
-            if lid not in seen:
-                seen.add(lid)
-                ids.append(lid)
-
-    # Primary: type column (quoted — "type" is awkward for some parsers) + known names
-    cursor.execute(
-        """
-        SELECT l.id FROM locations l
-        WHERE l.campaign_id = %s
-          AND (
-            LOWER(TRIM(COALESCE(CAST(l."type" AS TEXT), ''))) = 'ooc'
-            OR LOWER(TRIM(COALESCE(l.name, ''))) IN (
-                'out of character lobby',
-                'ooc lobby',
-                'ooc chat',
-                '💬 ooc chat',
-                'out of character'
-            )
-          )
-        """,
-        (campaign_id,),
-    )
-    _add(cursor.fetchall())
-
-    # Secondary: names starting with "out of character" (wildcard via CHR/CHAR — no literal %)
-    db = os.getenv('DATABASE_TYPE', 'sqlite').lower()
-    pct_fn = "CHR(37)" if db == "postgresql" else "CHAR(37)"
-    cursor.execute(
-        f"""
-        SELECT l.id FROM locations l
-        WHERE l.campaign_id = %s
-          AND LOWER(TRIM(COALESCE(l.name, ''))) LIKE 'out of character' || {pct_fn}
-        """,
-        (campaign_id,),
-    )
-    _add(cursor.fetchall())
-
-    return ids
-
-
 def get_rag_service():
     """Get RAG service instance"""
     config = current_app.config
@@ -161,6 +110,7 @@ def create_campaign():
             logger.warning("campaign_players insert for creator: %s", ins_e)
 
         conn.commit()
+        campaign_acl.invalidate_campaign(campaign_id)
         
         # Auto-create OOC room for the campaign
         try:
@@ -261,6 +211,7 @@ def get_campaigns():
                       SELECT campaign_id FROM campaign_players WHERE user_id = %s
                     )
                   )
+                  AND c.status IS DISTINCT FROM 'deleting'
                 ORDER BY c.created_at DESC
                 """,
                 (user_id, user_id, aid, user_id, user_id, user_id),
@@ -276,9 +227,10 @@ def get_campaigns():
                 LEFT JOIN campaign_players cp ON cp.campaign_id = c.id AND cp.user_id = %s
                 LEFT JOIN characters ch_my ON ch_my.id = cp.active_character_id
                     AND ch_my.user_id = %s AND ch_my.campaign_id = c.id
-                WHERE c.created_by = %s OR c.id IN (
+                WHERE (c.created_by = %s OR c.id IN (
                     SELECT campaign_id FROM campaign_players WHERE user_id = %s
-                )
+                ))
+                  AND c.status IS DISTINCT FROM 'deleting'
                 ORDER BY c.created_at DESC
             """, (user_id, user_id, user_id, user_id))
         
@@ -308,26 +260,20 @@ def get_campaigns():
 
         # Dashboard card: show a character whenever the user has any PC in the
         # chronicle, not only when campaign_players.active_character_id is set.
-        for c in campaigns:
-            name = (c.get("my_playing_character_name") or "").strip()
-            if name:
-                continue
-            eid = effective_playing_character_id(cursor, user_id, c["id"])
-            if eid is None:
-                continue
-            cursor.execute(
-                """
-                SELECT id, name, portrait_url FROM characters
-                WHERE id = %s AND user_id = %s AND campaign_id = %s
-                """,
-                (eid, user_id, c["id"]),
-            )
-            ch = cursor.fetchone()
-            if not ch:
-                continue
-            c["my_playing_character_id"] = ch["id"]
-            c["my_playing_character_name"] = ch.get("name")
-            c["my_playing_character_portrait_url"] = ch.get("portrait_url")
+        unresolved = {
+            c["id"] for c in campaigns
+            if not (c.get("my_playing_character_name") or "").strip()
+        }
+        if unresolved:
+            playing = effective_playing_characters(cursor, user_id, unresolved)
+            for c in campaigns:
+                ch = playing.get(c["id"]) if c["id"] in unresolved else None
+                if not ch:
+                    continue
+                c["my_playing_character_id"] = ch["id"]
+                c["my_playing_character_name"] = ch.get("name")
+                c["my_playing_character_portrait_url"] = ch.get("portrait_url")
+            conn.commit()
 
         cursor.close()
         conn.close()
@@ -525,6 +471,7 @@ def join_campaign(campaign_id):
             )
 
         conn.commit()
+        campaign_acl.invalidate(user_id, campaign_id)
         cursor.close()
         conn.close()
         return jsonify({"message": "Joined campaign", "campaign_id": campaign_id}), 200
@@ -655,130 +602,34 @@ def get_or_update_campaign(campaign_id):
 @campaigns_bp.route('/<int:campaign_id>/stats', methods=['GET'])
 @jwt_required()
 def get_campaign_stats(campaign_id):
-    """Get campaign statistics counts for settings UI"""
+    """Get campaign statistics counts for settings UI (materialised counters, see services/campaign_stats.py)"""
     try:
         user_id = get_jwt_identity()
         conn = get_db()
         cursor = conn.cursor()
+        try:
+            # Creator / roster member, or site admin
+            access = campaign_acl.get_campaign_access(cursor, user_id, campaign_id)
+            if not access.campaign_exists:
+                return jsonify({'error': 'Campaign not found'}), 404
+            if not access.can_view:
+                return jsonify({'error': 'Unauthorized'}), 403
 
-        # Verify user has access to campaign (creator/admin/member)
-        cursor.execute("""
-            SELECT c.created_by, u.role
-            FROM campaigns c
-            JOIN users u ON u.id = %s
-            WHERE c.id = %s
-        """, (user_id, campaign_id))
-        access_row = cursor.fetchone()
-        if not access_row:
+            stats = campaign_stats.get_campaign_stats(cursor, campaign_id)
+            conn.commit()
+            if stats is None:
+                return jsonify({'error': 'Campaign not found'}), 404
+        finally:
             cursor.close()
             conn.close()
-            return jsonify({'error': 'Campaign not found'}), 404
-
-        is_admin = access_row.get('role') == 'admin'
-        is_creator = str(access_row.get('created_by')) == str(user_id)
-
-        if not is_admin and not is_creator:
-            cursor.execute("""
-                SELECT 1
-                FROM campaign_players
-                WHERE campaign_id = %s AND user_id = %s
-                LIMIT 1
-            """, (campaign_id, user_id))
-            if not cursor.fetchone():
-                cursor.close()
-                conn.close()
-                return jsonify({'error': 'Unauthorized'}), 403
-
-        cursor.execute("""
-            SELECT COUNT(DISTINCT u.id) AS count
-            FROM (
-                SELECT created_by AS user_id FROM campaigns WHERE id = %s
-                UNION
-                SELECT user_id FROM campaign_players WHERE campaign_id = %s
-            ) p
-            JOIN users u ON u.id = p.user_id
-            WHERE u.is_active = TRUE
-        """, (campaign_id, campaign_id))
-        active_players = int(cursor.fetchone()['count'])
-
-        cursor.execute("""
-            SELECT COUNT(*) AS count
-            FROM characters
-            WHERE campaign_id = %s AND is_active = TRUE
-        """, (campaign_id,))
-        characters = int(cursor.fetchone()['count'])
-
-        ooc_ids = _fetch_ooc_lobby_location_ids(cursor, campaign_id)
-        if ooc_ids:
-            logger.info(
-                "Campaign %s stats: excluding OOC lobby location_id(s) from story counts: %s",
-                campaign_id,
-                ooc_ids,
-            )
-        else:
-            logger.warning(
-                "Campaign %s stats: no OOC lobby row matched (type=ooc / known names). "
-                "Story location and message totals may include the lobby — check locations.name/type.",
-                campaign_id,
-            )
-
-        # Story locations only — OOC lobby is not a playable "location" in this total
-        if ooc_ids:
-            ph = ",".join(["%s"] * len(ooc_ids))
-            cursor.execute(
-                f"""
-                SELECT COUNT(*) AS count
-                FROM locations l
-                WHERE l.campaign_id = %s AND l.is_active = TRUE
-                  AND l.id NOT IN ({ph})
-                """,
-                (campaign_id, *ooc_ids),
-            )
-        else:
-            cursor.execute(
-                """
-                SELECT COUNT(*) AS count
-                FROM locations l
-                WHERE l.campaign_id = %s AND l.is_active = TRUE
-                """,
-                (campaign_id,),
-            )
-        locations = int(cursor.fetchone()['count'])
-
-        # Story messages: not in OOC lobby; also drop rows explicitly tagged message_type ooc
-        if ooc_ids:
-            ph = ",".join(["%s"] * len(ooc_ids))
-            cursor.execute(
-                f"""
-                SELECT COUNT(*) AS count
-                FROM messages m
-                WHERE m.campaign_id = %s
-                  AND COALESCE(LOWER(TRIM(m.message_type)), '') <> 'ooc'
-                  AND m.location_id NOT IN ({ph})
-                """,
-                (campaign_id, *ooc_ids),
-            )
-        else:
-            cursor.execute(
-                """
-                SELECT COUNT(*) AS count
-                FROM messages m
-                WHERE m.campaign_id = %s
-                  AND COALESCE(LOWER(TRIM(m.message_type)), '') <> 'ooc'
-                """,
-                (campaign_id,),
-            )
-        messages = int(cursor.fetchone()['count'])
-
-        cursor.close()
-        conn.close()
 
         return jsonify({
             'campaign_id': campaign_id,
-            'active_players': active_players,
-            'characters': characters,
-            'locations': locations,
-            'messages': messages
+            'active_players': stats['active_players'],
+            'characters': stats['characters'],
+            'locations': stats['locations'],
+            'messages': stats['story_messages'],
+            'ooc_messages': stats['ooc_messages'],
         }), 200
 
     except Exception as e:
@@ -878,6 +729,7 @@ def update_campaign(campaign_id):
             query = f"UPDATE campaigns SET {', '.join(updates)} WHERE id = %s"
             cursor.execute(query, params)
             conn.commit()
+            campaign_acl.invalidate_campaign(campaign_id)
         
         return jsonify({'message': 'Campaign updated successfully'}), 200
         
@@ -886,7 +738,7 @@ def update_campaign(campaign_id):
         return jsonify({'error': 'Failed to update campaign'}), 500
 
 def delete_campaign(campaign_id):
-    """Delete campaign with full AI memory cleanup"""
+    """Delete campaign: hidden at once, AI memory and rows removed by a background job"""
     try:
         user_id = get_jwt_identity()
         
@@ -895,7 +747,7 @@ def delete_campaign(campaign_id):
         
         # Check if user is admin or campaign creator
         cursor.execute("""
-            SELECT created_by, name FROM campaigns WHERE id = %s
+            SELECT created_by, name, status FROM campaigns WHERE id = %s
         """, (campaign_id,))
         
         row = cursor.fetchone()
@@ -916,6 +768,36 @@ def delete_campaign(campaign_id):
         ):
             return jsonify({'error': 'Unauthorized'}), 403
         
+        if row.get('status') == 'deleting':
+            # Repeating the DELETE restarts a cleanup job that failed
+            job_id = deletion_jobs.retry_failed(cursor, 'campaign', campaign_id)
+            if job_id is None:
+                return jsonify({'error': 'Campaign is already being deleted'}), 409
+            conn.commit()
+            deletion_jobs.start(job_id)
+            logger.info(f"🔁 Campaign {campaign_id} ({campaign_name}) cleanup job {job_id} re-queued")
+            return jsonify({
+                'message': 'Campaign deletion restarted; its data is being removed',
+                'campaign_id': campaign_id,
+                'job_id': job_id,
+            }), 202
+        
+        # Hide the chronicle now; AI memory, messages and finally the campaign row
+        # (CASCADE: locations, characters, ...) are removed by a background job.
+        # Check and update in one statement: of two concurrent DELETEs only one
+        # gets the row and queues a job.
+        cursor.execute(
+            """
+            UPDATE campaigns SET is_active = FALSE, status = 'deleting'
+            WHERE id = %s AND status IS DISTINCT FROM 'deleting'
+            RETURNING id
+            """,
+            (campaign_id,),
+        )
+        if cursor.fetchone() is None:
+            conn.rollback()
+            return jsonify({'error': 'Campaign is already being deleted'}), 409
+        
         # Count what will be deleted for audit
         cursor.execute("SELECT COUNT(*) FROM locations WHERE campaign_id = %s", (campaign_id,))
         location_count = cursor.fetchone()['count']
@@ -927,26 +809,6 @@ def delete_campaign(campaign_id):
         logger.info(f"   • {location_count} locations")
         logger.info(f"   • {message_count} messages")
         
-        # CLEAN UP AI MEMORY - Remove all message embeddings for this campaign from ChromaDB
-        try:
-            rag_service = get_rag_service()
-            
-            if message_count > 0 and hasattr(rag_service, 'client'):
-                try:
-                    collection = rag_service.client.get_or_create_collection(name='message_memory')
-                    # Get all message IDs for this campaign
-                    cursor.execute("SELECT id FROM messages WHERE campaign_id = %s", (campaign_id,))
-                    message_ids = [row['id'] for row in cursor.fetchall()]
-                    
-                    if message_ids:
-                        embedding_ids = [f"msg_{msg_id}_{campaign_id}" for msg_id in message_ids]
-                        collection.delete(ids=embedding_ids)
-                        logger.info(f"✅ Purged {len(embedding_ids)} message embeddings from AI memory")
-                except Exception as e:
-                    logger.warning(f"⚠️ ChromaDB cleanup failed (non-critical): {e}")
-        except Exception as e:
-            logger.warning(f"⚠️ ChromaDB cleanup error: {e}")
-        
         try:
             actor_id = int(user_id)
             creator_id = int(campaign_creator)
@@ -965,26 +827,23 @@ def delete_campaign(campaign_id):
         except Exception as e:
             logger.warning("Moderation log insert failed (campaign delete continues): %s", e)
 
-        # SQLite's ON DELETE CASCADE will handle related records
-        # (locations, characters, messages, dice_rolls, etc.)
-        cursor.execute("DELETE FROM campaigns WHERE id = %s", (campaign_id,))
+        job_id = deletion_jobs.create_job(cursor, 'campaign', campaign_id, None, user_id)
         conn.commit()
+        campaign_acl.invalidate_campaign(campaign_id)
+        deletion_jobs.start(job_id)
         
-        logger.info(f"✅ Campaign {campaign_id} ({campaign_name}) fully deleted:")
-        logger.info(f"   • SQL data removed (CASCADE)")
-        logger.info(f"   • ChromaDB embeddings purged")
-        logger.info(f"   • AI memory cleaned - no orphaned data")
+        logger.info(f"✅ Campaign {campaign_id} ({campaign_name}) hidden, cleanup job {job_id} queued")
         
         return jsonify({
-            'message': 'Campaign deleted successfully',
+            'message': 'Campaign deleted; its data is being removed',
             'campaign_id': campaign_id,
+            'job_id': job_id,
             'audit': {
                 'campaign_name': campaign_name,
                 'locations_removed': location_count,
                 'messages_removed': message_count,
-                'ai_memory_cleaned': True
             }
-        }), 200
+        }), 202
         
     except Exception as e:
         logger.error(f"❌ Error deleting campaign: {e}")
@@ -992,6 +851,47 @@ def delete_campaign(campaign_id):
         traceback.print_exc()
         return jsonify({'error': 'Failed to delete campaign'}), 500
 
+@campaigns_bp.route('/<int:campaign_id>/deletion-jobs/<int:job_id>', methods=['GET'])
+@jwt_required()
+def get_deletion_job(campaign_id, job_id):
+    """Progress of a location / campaign deletion (requester, storyteller or staff)"""
+    try:
+        user_id = get_jwt_identity()
+        conn = get_db()
+        cursor = conn.cursor()
+        job = deletion_jobs.get_job(cursor, job_id)
+        if not job or job['campaign_id'] != campaign_id:
+            cursor.close()
+            conn.close()
+            return jsonify({'error': 'Deletion job not found'}), 404
+        # The campaign row is gone once a campaign job finishes, so only the
+        # requester and site staff can rely on seeing it to the end.
+        allowed = str(job.get('requested_by')) == str(user_id)
+        if not allowed:
+            access = campaign_acl.get_campaign_access(cursor, user_id, campaign_id)
+            allowed = access.is_site_staff or access.is_storyteller
+        cursor.close()
+        conn.close()
+        if not allowed:
+            return jsonify({'error': 'Unauthorized'}), 403
+        return jsonify({
+            'id': job['id'],
+            'kind': job['kind'],
+            'campaign_id': job['campaign_id'],
+            'location_id': job['location_id'],
+            'status': job['status'],
+            'phase': job['phase'],
+            'progress': job['progress'],
+            'error': job['error'],
+            'created_at': job['created_at'],
+            'started_at': job['started_at'],
+            'finished_at': job['finished_at'],
+        }), 200
+    except Exception as e:
+        logger.error(f"Error fetching deletion job: {e}")
+        return jsonify({'error': 'Failed to fetch deletion job'}), 500
+
+
 @campaigns_bp.route('/<int:campaign_id>/world', methods=['POST'])
 @jwt_required()
 def update_world_data(campaign_id):
@@ -1274,6 +1174,7 @@ def detach_from_campaign(campaign_id):
         (target_user_id, campaign_id, target_user_id),
     )
     conn.commit()
+    campaign_acl.invalidate_user(target_user_id)
     cursor.close()
     conn.close()
     return jsonify(
@@ -1376,6 +1277,7 @@ def put_my_playing_character(campaign_id):
         (character_id, campaign_id, user_id),
     )
     conn.commit()
+    campaign_acl.invalidate(user_id, campaign_id)
     cursor.close()
     conn.close()
     return jsonify(
@@ -1450,6 +1352,7 @@ def put_player_playing_character(campaign_id, target_user_id):
         (character_id, campaign_id, target_user_id),
     )
     conn.commit()
+    campaign_acl.invalidate(target_user_id, campaign_id)
     cursor.close()
     conn.close()
     return jsonify(
@@ -1515,6 +1418,7 @@ def post_campaign_add_member(campaign_id):
             (campaign_id, new_member_id, now),
         )
     conn.commit()
+    campaign_acl.invalidate(new_member_id, campaign_id)
     cursor.close()
     conn.close()
     return jsonify(
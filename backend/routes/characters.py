@@ -22,6 +22,7 @@ from database import (
     ensure_users_allow_multi_campaign_play_column,
     ensure_campaign_players_active_character_id_column,
 )
+from services import campaign_acl
 
 # Stored as TEXT (URLs or data URLs); cap size to protect the DB.
 MAX_PORTRAIT_URL_LEN = 524288
@@ -381,6 +382,7 @@ def create_character():
             (character_id, campaign_id, current_user_id),
         )
         db.commit()
+        campaign_acl.invalidate(current_user_id, campaign_id)
 
         logger.info(
             "Character '%s' created by user %s in campaign %s",
@@ -696,6 +698,7 @@ def update_character(character_id):
             cursor.execute(query, params)
             
             db.commit()
+            campaign_acl.invalidate_user(character['user_id'])
             
             logger.info(f"Character {character_id} updated by user {current_user_id}")
         
@@ -743,6 +746,7 @@ def delete_character(character_id):
         )
         cursor.execute("DELETE FROM characters WHERE id = %s", (character_id,))
         db.commit()
+        campaign_acl.invalidate_user(character['user_id'])
         
         logger.info(f"Character {character_id} ({character['name']}) deleted by user {current_user_id}")
         
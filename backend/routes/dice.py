@@ -7,6 +7,10 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from database import get_db
 from services.dice_service import dice_service
+from services.dice_odds import DIFFICULTIES, MAX_POOL, pool_odds
+from services.dice_batch import roll_pools
+from services import dice_stats
+from services.campaign_acl import get_campaign_access
 import logging
 import json
 
@@ -27,38 +31,12 @@ def _json_field(value, default):
 
 
 def _user_can_access_campaign(cursor, user_id: int, campaign_id: int) -> bool:
-    cursor.execute("SELECT role FROM users WHERE id = %s", (user_id,))
-    u = cursor.fetchone()
-    if u and u.get("role") == "admin":
-        cursor.execute(
-            """
-            SELECT 1 FROM campaigns c
-            WHERE c.id = %s AND c.is_active = TRUE
-            """,
-            (campaign_id,),
-        )
-        return cursor.fetchone() is not None
-    cursor.execute(
-        """
-        SELECT 1 FROM campaigns c
-        WHERE c.id = %s AND c.is_active = TRUE
-          AND (
-            c.created_by = %s
-            OR EXISTS (
-                SELECT 1 FROM campaign_players cp
-                WHERE cp.campaign_id = c.id AND cp.user_id = %s
-            )
-          )
-        """,
-        (campaign_id, user_id, user_id),
-    )
-    return cursor.fetchone() is not None
+    """Active campaign; creator / roster member, or site admin. Cached per (user, campaign)."""
+    return get_campaign_access(cursor, user_id, campaign_id).can_view_active
 
 
 def _character_ok_for_user_campaign(cursor, character_id: int, user_id: int, campaign_id: int) -> bool:
-    cursor.execute("SELECT role FROM users WHERE id = %s", (user_id,))
-    u = cursor.fetchone()
-    if u and u.get("role") == "admin":
+    if get_campaign_access(cursor, user_id, campaign_id).is_site_admin:
         cursor.execute(
             """
             SELECT 1 FROM characters
@@ -191,6 +169,7 @@ def manual_roll(campaign_id):
         
         result = cursor.fetchone()
         roll_id = result['id']
+        dice_stats.record_rolls(cursor, campaign_id, [(location_id, character_id, roll_result)])
         conn.commit()
         
         # Get character name if provided
@@ -222,6 +201,80 @@ def manual_roll(campaign_id):
         return jsonify({'error': 'Failed to process roll'}), 500
 
 
+@dice_bp.route('/campaigns/<int:campaign_id>/roll/odds', methods=['GET'])
+@jwt_required()
+def roll_odds(campaign_id):
+    """
+    Exact odds for a roll before it is made (roll UI preview)
+
+    Query params:
+        pool_size: int or pool_expression: str - as for a manual roll
+        difficulty: int (default 6)
+        specialty: 1/true (optional)
+        location_id: int (optional) - applies this room's /ai dice-diff leniency
+    """
+    try:
+        user_id = int(get_jwt_identity())
+        args = request.args
+
+        pool_expression = (args.get('pool_expression') or '').strip()
+        try:
+            if pool_expression:
+                from services.wod_dice import parse_pool_expression
+
+                pool_size = parse_pool_expression(pool_expression)
+            else:
+                pool_size = int(args.get('pool_size', 0))
+            difficulty = int(args.get('difficulty', 6))
+            location_id = args.get('location_id', type=int)
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': str(e) or 'Invalid pool or difficulty'}), 400
+        specialty = (args.get('specialty') or '').strip().lower() in ('1', 'true', 'yes')
+
+        conn = get_db()
+        cursor = conn.cursor()
+        try:
+            if not _user_can_access_campaign(cursor, user_id, campaign_id):
+                return jsonify({'error': 'Campaign not found or access denied'}), 403
+            leniency_floor = None
+            if location_id is not None:
+                cursor.execute(
+                    """
+                    SELECT dice_leniency_floor FROM locations
+                    WHERE id = %s AND campaign_id = %s AND is_active = TRUE
+                    """,
+                    (location_id, campaign_id),
+                )
+                loc_row = cursor.fetchone()
+                if not loc_row:
+                    return jsonify({'error': 'Location not found in this campaign'}), 400
+                leniency_floor = loc_row.get('dice_leniency_floor')
+        finally:
+            cursor.close()
+            conn.close()
+
+        try:
+            odds = pool_odds(pool_size, difficulty, specialty, leniency_floor)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        by_difficulty = []
+        for tn in DIFFICULTIES:
+            row = pool_odds(pool_size, tn, specialty, leniency_floor)
+            by_difficulty.append({
+                'difficulty': tn,
+                'success': round(row.success, 6),
+                'botch': round(row.botch, 6),
+                'expected_successes': round(row.expected_successes, 6),
+            })
+
+        return jsonify({'odds': odds.to_dict(), 'by_difficulty': by_difficulty}), 200
+
+    except Exception as e:
+        logger.exception("Error computing roll odds: %s", e)
+        return jsonify({'error': 'Failed to compute odds'}), 500
+
+
 @dice_bp.route('/campaigns/<int:campaign_id>/roll/contested', methods=['POST'])
 @jwt_required()
 def contested_roll(campaign_id):
@@ -246,6 +299,9 @@ def contested_roll(campaign_id):
         
         if not attacker_pool or not defender_pool:
             return jsonify({'error': 'Both attacker_pool and defender_pool required'}), 400
+        attacker_pool, defender_pool = int(attacker_pool), int(defender_pool)
+        if max(attacker_pool, defender_pool) > MAX_POOL:
+            return jsonify({'error': f'Pools must be at most {MAX_POOL} dice'}), 400
         
         difficulty = data.get('difficulty', 6)
         action_description = data.get('action_description', 'Contested roll')
@@ -289,6 +345,10 @@ def contested_roll(campaign_id):
             result['defender_roll']['is_botch'],
             result['defender_roll']['is_critical']
         ))
+        dice_stats.record_rolls(cursor, campaign_id, [
+            (location_id, data.get('attacker_character_id'), result['attacker_roll']),
+            (location_id, data.get('defender_character_id'), result['defender_roll']),
+        ])
         
         conn.commit()
         
@@ -334,8 +394,14 @@ def ai_roll(campaign_id):
         location_id = data.get('location_id')
         description = data.get('description', f'AI {action_type} roll')
         
+        if not isinstance(context, dict):
+            return jsonify({'error': 'context must be an object'}), 400
+        
         # AI determines appropriate dice pool
-        pool_size, difficulty = dice_service.ai_determine_pool(action_type, context)
+        try:
+            pool_size, difficulty = dice_service.ai_determine_pool(action_type, context)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         # Roll
         roll_result = dice_service.roll_d10_pool(pool_size, difficulty)
@@ -358,6 +424,7 @@ def ai_roll(campaign_id):
         
         result = cursor.fetchone()
         roll_id = result['id']
+        dice_stats.record_rolls(cursor, campaign_id, [(location_id, None, roll_result)])
         conn.commit()
         
         logger.info(f"AI roll ({action_type}) in campaign {campaign_id}: {roll_result['successes']} successes")
@@ -367,7 +434,8 @@ def ai_roll(campaign_id):
             'roll_result': roll_result,
             'pool_size': pool_size,
             'difficulty': difficulty,
-            'action_type': action_type
+            'action_type': action_type,
+            'odds': pool_odds(pool_size, difficulty).to_dict()
         }), 200
         
     except Exception as e:
@@ -375,6 +443,184 @@ def ai_roll(campaign_id):
         return jsonify({'error': 'Failed to process AI roll'}), 500
 
 
+MAX_BATCH_ENTRIES = 100
+MAX_EXTENDED_ROLLS = 20
+
+
+def _entry_pool(entry, key='pool_size'):
+    """Pool from ``key`` or ``pool_expression`` (simple/extended entries); ValueError if out of range"""
+    expression = (entry.get('pool_expression') or '').strip() if key == 'pool_size' else ''
+    if expression:
+        from services.wod_dice import parse_pool_expression
+
+        return parse_pool_expression(expression)
+    pool = int(entry.get(key) or 0)
+    if pool < 1 or pool > MAX_POOL:
+        raise ValueError(f'{key} must be between 1 and {MAX_POOL}')
+    return pool
+
+
+@dice_bp.route('/campaigns/<int:campaign_id>/roll/batch', methods=['POST'])
+@jwt_required()
+def batch_roll(campaign_id):
+    """
+    Many rolls in one request (large combats, downtime): one dice draw, one insert, one chat message
+
+    Body:
+        rolls: list (1–100) of entries, each one of
+            {pool_size | pool_expression, difficulty, specialty, character_id, action_description}
+            {type: 'contested', attacker_pool, defender_pool, difficulty,
+             attacker_character_id, defender_character_id, action_description}
+            {type: 'extended', pool_size | pool_expression, difficulty, target_successes,
+             max_rolls (≤ 20), character_id, action_description}
+        location_id: int (optional) - applies this room's /ai dice-diff leniency to every roll
+        action_description: str (optional) - default for entries without one
+    """
+    try:
+        user_id = int(get_jwt_identity())
+        data = request.get_json() or {}
+        entries = data.get('rolls')
+        if not isinstance(entries, list) or not entries:
+            return jsonify({'error': 'rolls must be a non-empty list'}), 400
+        if len(entries) > MAX_BATCH_ENTRIES:
+            return jsonify({'error': f'At most {MAX_BATCH_ENTRIES} rolls per batch'}), 400
+        default_description = (data.get('action_description') or 'Dice roll').strip() or 'Dice roll'
+
+        # Validate every entry and lay out its pools in one flat list
+        plans = []
+        pools, difficulties, specialties = [], [], []
+        character_ids = set()
+        try:
+            for index, entry in enumerate(entries, start=1):
+                if not isinstance(entry, dict):
+                    raise ValueError('each roll must be an object')
+                kind = (entry.get('type') or 'simple').strip().lower()
+                difficulty = int(entry.get('difficulty', 6))
+                if difficulty < 2 or difficulty > 10:
+                    raise ValueError('difficulty must be between 2 and 10')
+                specialty = bool(entry.get('specialty', False))
+                description = (entry.get('action_description') or '').strip() or default_description
+                if kind == 'simple':
+                    entry_pools = [_entry_pool(entry)]
+                    characters = [entry.get('character_id')]
+                elif kind == 'contested':
+                    entry_pools = [_entry_pool(entry, 'attacker_pool'), _entry_pool(entry, 'defender_pool')]
+                    characters = [entry.get('attacker_character_id'), entry.get('defender_character_id')]
+                elif kind == 'extended':
+                    target = int(entry.get('target_successes') or 0)
+                    max_rolls = int(entry.get('max_rolls') or 10)
+                    if target < 1:
+                        raise ValueError('target_successes must be at least 1')
+                    if max_rolls < 1 or max_rolls > MAX_EXTENDED_ROLLS:
+                        raise ValueError(f'max_rolls must be between 1 and {MAX_EXTENDED_ROLLS}')
+                    entry_pools = [_entry_pool(entry)] * max_rolls
+                    characters = [entry.get('character_id')]
+                else:
+                    raise ValueError(f"unknown type {kind!r} (simple, contested, extended)")
+                characters = [int(c) if c is not None else None for c in characters]
+                character_ids.update(c for c in characters if c is not None)
+                plans.append({
+                    'kind': kind,
+                    'start': len(pools),
+                    'count': len(entry_pools),
+                    'difficulty': difficulty,
+                    'specialty': specialty,
+                    'description': description,
+                    'characters': characters,
+                    'target': entry.get('target_successes'),
+                })
+                pools.extend(entry_pools)
+                difficulties.extend([difficulty] * len(entry_pools))
+                specialties.extend([specialty] * len(entry_pools))
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': f'Roll {index}: {e}'}), 400
+
+        conn = get_db()
+        cursor = conn.cursor()
+        try:
+            if not _user_can_access_campaign(cursor, user_id, campaign_id):
+                return jsonify({'error': 'Campaign not found or access denied'}), 403
+            for character_id in character_ids:
+                if not _character_ok_for_user_campaign(cursor, character_id, user_id, campaign_id):
+                    return jsonify({'error': f'Character {character_id} not found or not yours in this campaign'}), 400
+
+            location_id = data.get('location_id')
+            leniency_floor = None
+            if location_id is not None:
+                location_id = int(location_id)
+                cursor.execute(
+                    """
+                    SELECT dice_leniency_floor FROM locations
+                    WHERE id = %s AND campaign_id = %s AND is_active = TRUE
+                    """,
+                    (location_id, campaign_id),
+                )
+                loc_row = cursor.fetchone()
+                if not loc_row:
+                    return jsonify({'error': 'Location not found in this campaign'}), 400
+                leniency_floor = loc_row.get('dice_leniency_floor')
+
+            rolled = roll_pools(pools, difficulties, specialties, leniency_floor)
+
+            results, rows, recorded = [], [], []
+            for plan in plans:
+                entry_rolls = rolled[plan['start']:plan['start'] + plan['count']]
+                if plan['kind'] == 'simple':
+                    result = entry_rolls[0]
+                    kept = [('manual', plan['characters'][0], result)]
+                elif plan['kind'] == 'contested':
+                    result = dice_service.contested_outcome(*entry_rolls)
+                    kept = [
+                        ('contested_attacker', plan['characters'][0], result['attacker_roll']),
+                        ('contested_defender', plan['characters'][1], result['defender_roll']),
+                    ]
+                else:
+                    result = dice_service.extended_outcome(entry_rolls, int(plan['target']))
+                    kept = [('extended', plan['characters'][0], roll) for roll in result['rolls']]
+                results.append({'type': plan['kind'], 'action_description': plan['description'], **result})
+                for roll_type, character_id, roll in kept:
+                    recorded.append((location_id, character_id, roll))
+                    rows.append((
+                        campaign_id, location_id, user_id, character_id,
+                        roll_type, plan['description'], len(roll['results']), roll['difficulty'],
+                        json.dumps(roll['results']), roll['successes'],
+                        roll['is_botch'], roll['is_critical'],
+                        json.dumps({
+                            'batch': True,
+                            'specialty': roll['specialty'],
+                            'leniency_floor': roll.get('leniency_floor'),
+                        }),
+                    ))
+
+            placeholders = ', '.join(['(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)'] * len(rows))
+            cursor.execute(f"""
+                INSERT INTO dice_rolls (
+                    campaign_id, location_id, user_id, character_id,
+                    roll_type, action_description, dice_pool, difficulty,
+                    results, successes, is_botch, is_critical, modifiers
+                ) VALUES {placeholders}
+                RETURNING id
+            """, [value for row in rows for value in row])
+            roll_ids = [row['id'] for row in cursor.fetchall()]
+            dice_stats.record_rolls(cursor, campaign_id, recorded)
+            conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+
+        logger.info(f"Batch roll by user {user_id} in campaign {campaign_id}: {len(plans)} entries, {len(rows)} rolls")
+
+        return jsonify({
+            'roll_ids': roll_ids,
+            'results': results,
+            'chat_message': dice_service.format_batch_for_chat(results),
+        }), 200
+
+    except Exception as e:
+        logger.exception("Error processing batch roll: %s", e)
+        return jsonify({'error': 'Failed to process batch roll'}), 500
+
+
 @dice_bp.route('/campaigns/<int:campaign_id>/rolls', methods=['GET'])
 @jwt_required()
 def get_roll_history(campaign_id):
@@ -458,6 +704,58 @@ def get_roll_history(campaign_id):
         return jsonify({'error': 'Failed to fetch roll history'}), 500
 
 
+@dice_bp.route('/campaigns/<int:campaign_id>/roll/stats', methods=['GET'])
+@jwt_required()
+def get_roll_stats(campaign_id):
+    """
+    Aggregated dice statistics from the dice_roll_stats rollups (no roll-log scan).
+
+    Storyteller / site staff see everything; other members only their own characters.
+
+    Query params:
+        location_id: int (optional)
+        character_id: int (optional; required for players)
+        difficulty: int (optional)
+        group_by: difficulty | character | location (optional)
+    """
+    try:
+        user_id = int(get_jwt_identity())
+        location_id = request.args.get('location_id', type=int)
+        character_id = request.args.get('character_id', type=int)
+        difficulty = request.args.get('difficulty', type=int)
+        group_by = (request.args.get('group_by') or '').strip().lower() or None
+
+        conn = get_db()
+        cursor = conn.cursor()
+        try:
+            access = get_campaign_access(cursor, user_id, campaign_id)
+            if not access.can_view_active:
+                return jsonify({'error': 'Campaign not found or access denied'}), 403
+            if not access.is_storyteller_or_staff:
+                if character_id is None or group_by == 'character':
+                    return jsonify({'error': 'character_id of one of your characters is required'}), 403
+                if not _character_ok_for_user_campaign(cursor, character_id, user_id, campaign_id):
+                    return jsonify({'error': 'Character not found or not yours in this campaign'}), 403
+            try:
+                stats = dice_stats.get_stats(
+                    cursor, campaign_id,
+                    location_id=location_id,
+                    character_id=character_id,
+                    difficulty=difficulty,
+                    group_by=group_by,
+                )
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            return jsonify(stats), 200
+        finally:
+            cursor.close()
+            conn.close()
+
+    except Exception as e:
+        logger.exception("Error fetching roll stats: %s", e)
+        return jsonify({'error': 'Failed to fetch roll stats'}), 500
+
+
 @dice_bp.route('/campaigns/<int:campaign_id>/roll/templates', methods=['GET'])
 @jwt_required()
 def get_roll_templates(campaign_id):
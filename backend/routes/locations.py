@@ -18,6 +18,7 @@ from services.location_access import (
 from services.location_naming_context import build_enriched_suggestion_prompt
 from services.location_suggestion_parse import parse_location_suggestions
 from services.health_check import require_llm
+from services import deletion_jobs
 import logging
 import os
 from datetime import datetime
@@ -519,7 +520,7 @@ def update_location(location_id):
 @locations_bp.route('/campaigns/<int:campaign_id>/locations/<int:location_id>', methods=['DELETE'])
 @jwt_required()
 def delete_location(campaign_id, location_id):
-    """Delete location with AI memory cleanup and audit trail"""
+    """Delete location: audit trail and soft delete now, messages / AI memory in a background job"""
     try:
         user_id = get_jwt_identity()
         
@@ -539,18 +540,20 @@ def delete_location(campaign_id, location_id):
         if not row:
             return jsonify({'error': 'Location not found or already deleted'}), 404
         
-        location_type, location_name, location_desc, campaign_id, campaign_creator, user_role = row
+        location_type = row['type']
+        location_name = row['name']
+        location_desc = row['description']
         
         # Can't delete OOC room
         if location_type == 'ooc':
             return jsonify({'error': 'Cannot delete OOC room'}), 400
         
-        if campaign_creator != user_id and user_role != 'admin':
+        if str(row['created_by']) != str(user_id) and row['role'] != 'admin':
             return jsonify({'error': 'Unauthorized'}), 403
         
         # Count messages that will be affected
-        cursor.execute("SELECT COUNT(*) FROM messages WHERE location_id = %s", (location_id,))
-        message_count = cursor.fetchone()[0]
+        cursor.execute("SELECT COUNT(*) AS count FROM messages WHERE location_id = %s", (location_id,))
+        message_count = cursor.fetchone()['count']
         
         logger.info(f"🗑️ Deleting location {location_id} ({location_name}) - {message_count} messages will be removed")
         
@@ -561,63 +564,32 @@ def delete_location(campaign_id, location_id):
             VALUES (%s, %s, %s, %s, %s, %s, %s)
         """, (location_id, campaign_id, location_name, location_type, location_desc, user_id, message_count))
         
-        # 2. CLEAN UP AI MEMORY - Remove message embeddings from ChromaDB
-        try:
-            from services.rag_service import get_rag_service
-            rag_service = get_rag_service()
-            
-            # Get all message IDs for this location
-            cursor.execute("SELECT id FROM messages WHERE location_id = %s", (location_id,))
-            message_ids = [row['id'] for row in cursor.fetchall()]
-            
-            if message_ids and hasattr(rag_service, 'client'):
-                try:
-                    collection = rag_service.client.get_or_create_collection(name='message_memory')
-                    # Delete embeddings for these messages
-                    embedding_ids = [f"msg_{msg_id}_{campaign_id}" for msg_id in message_ids]
-                    if embedding_ids:
-                        collection.delete(ids=embedding_ids)
-                        logger.info(f"✅ Purged {len(embedding_ids)} message embeddings from AI memory (ChromaDB)")
-                except Exception as e:
-                    logger.warning(f"⚠️ Could not purge ChromaDB embeddings: {e}")
-            else:
-                logger.info(f"ℹ️ No messages to purge from ChromaDB")
-                
-        except Exception as e:
-            logger.warning(f"⚠️ ChromaDB cleanup failed (non-critical): {e}")
-        
-        # 3. SOFT DELETE LOCATION (marks as inactive, keeps for audit trail)
+        # 2. SOFT DELETE LOCATION (marks as inactive, keeps for audit trail)
         cursor.execute("""
-            SELECT id FROM locations 
-            WHERE campaign_id = %s AND type = 'ooc' AND is_active = TRUE
-        """, (campaign_id,))
-        ooc_row = cursor.fetchone()
-        
-        if ooc_row:
-            cursor.execute("""
-                UPDATE character_locations 
-                SET exited_at = %s, exit_reason = 'Location deleted by admin'
-                WHERE location_id = %s AND exited_at IS NULL
-            """, (datetime.utcnow().isoformat(), location_id))
+            UPDATE locations SET is_active = FALSE WHERE id = %s AND campaign_id = %s
+        """, (location_id, campaign_id))
+        cursor.execute("""
+            UPDATE character_locations 
+            SET exited_at = %s, exit_reason = 'Location deleted by admin'
+            WHERE location_id = %s AND exited_at IS NULL
+        """, (datetime.utcnow().isoformat(), location_id))
         
+        # 3. QUEUE CLEANUP - message embeddings (ChromaDB) and messages, in batches
+        job_id = deletion_jobs.create_job(cursor, 'location', campaign_id, location_id, user_id)
         conn.commit()
+        deletion_jobs.start(job_id)
         
-        logger.info(f"✅ Location {location_id} ({location_name}) deleted successfully:")
-        logger.info(f"   • Soft-deleted from active locations")
-        logger.info(f"   • {message_count} messages CASCADE deleted from SQL")
-        logger.info(f"   • Message embeddings purged from ChromaDB")
-        logger.info(f"   • Audit log created (deleted by user {user_id})")
-        logger.info(f"   • AI memory cleaned - no conflicts will occur")
+        logger.info(f"✅ Location {location_id} ({location_name}) deleted, cleanup job {job_id} queued")
         
         return jsonify({
-            'message': 'Location deleted successfully',
+            'message': 'Location deleted; messages and AI memory are being removed',
+            'job_id': job_id,
             'audit': {
                 'location_name': location_name,
                 'messages_removed': message_count,
                 'deleted_by': user_id,
-                'ai_memory_cleaned': True
             }
-        }), 200
+        }), 202
         
     except Exception as e:
         logger.error(f"❌ Error deleting location: {e}")
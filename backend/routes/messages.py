@@ -21,13 +21,18 @@ from services.location_access import (
     closed_location_error_response,
     user_can_bypass_closed_location,
 )
-from services.playing_character import effective_playing_character_id
+from services.campaign_acl import get_campaign_access, get_playing_character_id
+from services import metrics, read_state
 from datetime import datetime
 from services.message_time_format import format_message_time
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Label values for the chat message counters (anything else is counted as "other")
+_METRIC_MESSAGE_TYPES = frozenset(('ic', 'ooc', 'system', 'action'))
+_METRIC_ROLES = frozenset(('user', 'assistant'))
+
 messages_bp = Blueprint('messages', __name__)
 
 
@@ -39,22 +44,8 @@ def _int_jwt_user_id(raw) -> Optional[int]:
 
 
 def _campaign_accessible_to_viewer(cursor, campaign_id: int, user_id: int) -> bool:
-    """Creator / roster member, or site admin (any active campaign)."""
-    cursor.execute("SELECT role FROM users WHERE id = %s", (user_id,))
-    u = cursor.fetchone()
-    if u and u.get("role") == "admin":
-        cursor.execute("SELECT id FROM campaigns WHERE id = %s", (campaign_id,))
-        return cursor.fetchone() is not None
-    cursor.execute(
-        """
-        SELECT id FROM campaigns
-        WHERE id = %s AND (created_by = %s OR id IN (
-            SELECT campaign_id FROM campaign_players WHERE user_id = %s
-        ))
-        """,
-        (campaign_id, user_id, user_id),
-    )
-    return cursor.fetchone() is not None
+    """Creator / roster member, or site admin (any campaign). Cached per (user, campaign)."""
+    return get_campaign_access(cursor, user_id, campaign_id).can_view
 
 
 def _staff_kind_from_row(row) -> Optional[str]:
@@ -174,16 +165,8 @@ def get_messages(campaign_id, location_id):
         # Hidden dice markers/final messages are only visible to:
         # - site admins/helpers
         # - campaign creator ("storyteller")
-        cursor.execute("SELECT role FROM users WHERE id = %s", (user_id,))
-        urow = cursor.fetchone() or {}
-        user_role = (urow.get('role') or '').strip().lower()
-
-        cursor.execute("SELECT created_by FROM campaigns WHERE id = %s", (campaign_id,))
-        crow = cursor.fetchone() or {}
-        campaign_creator_id = crow.get('created_by')
-        allow_hidden_dice = user_role in ('admin', 'helper') or (
-            campaign_creator_id is not None and str(campaign_creator_id) == str(user_id)
-        )
+        access = get_campaign_access(cursor, user_id, campaign_id)
+        allow_hidden_dice = access.is_site_staff or access.is_storyteller
         
         base_select = """
             SELECT 
@@ -240,6 +223,8 @@ def get_messages(campaign_id, location_id):
                 continue
             messages.append(_message_dict_from_row(row))
         
+        poll_mode = 'since' if since_id is not None and since_id > 0 else 'recent' if recent else 'page'
+        metrics.MESSAGES_SERVED.labels(poll_mode).inc(len(messages))
         return jsonify(messages), 200
         
     except Exception as e:
@@ -288,9 +273,7 @@ def get_location_read_state(campaign_id, location_id):
                 loc_row.get("game_system"),
             )
 
-        cursor.execute("SELECT role FROM users WHERE id = %s", (user_id,))
-        viewer = cursor.fetchone() or {}
-        is_site_admin = viewer.get("role") == "admin"
+        is_site_admin = get_campaign_access(cursor, user_id, campaign_id).is_site_admin
         if is_site_admin:
             cursor.execute("""
                 SELECT id FROM characters
@@ -311,8 +294,10 @@ def get_location_read_state(campaign_id, location_id):
             WHERE character_id = %s AND location_id = %s
         """, (character_id, location_id))
         rs = cursor.fetchone() or {}
-        last_read_message_id = rs.get('last_read_message_id')
-        last_read_at = rs.get('last_read_at')
+        last_read_message_id, last_read_at = read_state.merge_marker(
+            (rs.get('last_read_message_id'), rs.get('last_read_at')),
+            read_state.markers.pending(character_id, location_id),
+        )
 
         # Find first unread message
         if last_read_message_id:
@@ -322,7 +307,7 @@ def get_location_read_state(campaign_id, location_id):
                 WHERE campaign_id = %s
                   AND location_id = %s
                   AND id > %s
-                  AND COALESCE(ai_message_kind, '') NOT LIKE 'dice_animation%'
+                  AND COALESCE(ai_message_kind, '') NOT LIKE 'dice_animation%%'
                 ORDER BY id ASC
                 LIMIT 1
             """, (campaign_id, location_id, last_read_message_id))
@@ -332,7 +317,7 @@ def get_location_read_state(campaign_id, location_id):
                 FROM messages
                 WHERE campaign_id = %s
                   AND location_id = %s
-                  AND COALESCE(ai_message_kind, '') NOT LIKE 'dice_animation%'
+                  AND COALESCE(ai_message_kind, '') NOT LIKE 'dice_animation%%'
                 ORDER BY id ASC
                 LIMIT 1
             """, (campaign_id, location_id))
@@ -353,6 +338,68 @@ def get_location_read_state(campaign_id, location_id):
         return jsonify({'error': 'Failed to fetch read state'}), 500
 
 
+@messages_bp.route('/campaigns/<int:campaign_id>/read-state', methods=['GET'])
+@jwt_required()
+def get_campaign_read_state(campaign_id):
+    """Unread summary for every room of the campaign (one query for the sidebar).
+
+    Query params:
+    - character_id: reading character (default: the viewer's playing character).
+    """
+    try:
+        user_id = _int_jwt_user_id(get_jwt_identity())
+        if user_id is None:
+            return jsonify({'error': 'Invalid session'}), 401
+
+        conn = get_db()
+        cursor = conn.cursor()
+        _ensure_location_reads_table(cursor)
+        ensure_locations_player_access_columns(cursor)
+        conn.commit()
+
+        access = get_campaign_access(cursor, user_id, campaign_id)
+        if not access.can_view:
+            return jsonify({'error': 'Unauthorized or campaign not found'}), 403
+
+        character_id = request.args.get('character_id', type=int)
+        if not character_id:
+            character_id = get_playing_character_id(cursor, user_id, campaign_id)
+            conn.commit()
+        if not character_id:
+            return jsonify({'error': 'character_id is required'}), 400
+
+        if access.is_site_admin:
+            cursor.execute("""
+                SELECT id FROM characters
+                WHERE id = %s AND campaign_id = %s AND is_active = TRUE
+            """, (character_id, campaign_id))
+        else:
+            cursor.execute("""
+                SELECT id FROM characters
+                WHERE id = %s AND user_id = %s AND campaign_id = %s AND is_active = TRUE
+            """, (character_id, user_id, campaign_id))
+        if not cursor.fetchone():
+            return jsonify({'error': 'Character not found'}), 404
+
+        locations = read_state.unread_summary(
+            cursor,
+            campaign_id,
+            character_id,
+            include_closed=access.can_bypass_closed_location,
+            pending=read_state.markers.pending_for(character_id),
+        )
+        return jsonify({
+            'campaign_id': campaign_id,
+            'character_id': character_id,
+            'unread_count_cap': read_state.UNREAD_COUNT_CAP,
+            'locations': locations,
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Error fetching campaign read state: {e}")
+        return jsonify({'error': 'Failed to fetch read state'}), 500
+
+
 @messages_bp.route('/campaigns/<int:campaign_id>/locations/<int:location_id>/read-state', methods=['POST'])
 @jwt_required()
 def set_location_read_state(campaign_id, location_id):
@@ -375,9 +422,7 @@ def set_location_read_state(campaign_id, location_id):
         if not _campaign_accessible_to_viewer(cursor, campaign_id, user_id):
             return jsonify({'error': 'Unauthorized or campaign not found'}), 403
 
-        cursor.execute("SELECT role FROM users WHERE id = %s", (user_id,))
-        viewer = cursor.fetchone() or {}
-        is_site_admin = viewer.get("role") == "admin"
+        is_site_admin = get_campaign_access(cursor, user_id, campaign_id).is_site_admin
         if is_site_admin:
             cursor.execute("""
                 SELECT id FROM characters
@@ -401,17 +446,12 @@ def set_location_read_state(campaign_id, location_id):
         if not msg:
             return jsonify({'error': 'Message not found'}), 404
 
-        now = datetime.now()
-        cursor.execute("""
-            INSERT INTO location_reads (character_id, location_id, last_read_message_id, last_read_at, updated_at)
-            VALUES (%s, %s, %s, %s, %s)
-            ON CONFLICT (character_id, location_id)
-            DO UPDATE SET
-                last_read_message_id = EXCLUDED.last_read_message_id,
-                last_read_at = EXCLUDED.last_read_at,
-                updated_at = EXCLUDED.updated_at
-        """, (character_id, location_id, last_read_message_id, msg['created_at'], now))
-        conn.commit()
+        # Buffered and flushed in batches; markers never move backwards
+        if read_state.markers.enabled:
+            read_state.markers.record(character_id, location_id, msg['id'], msg['created_at'])
+        else:
+            read_state.write_markers(cursor, [(character_id, location_id, msg['id'], msg['created_at'])])
+            conn.commit()
 
         # Return updated state
         cursor.execute("""
@@ -419,7 +459,12 @@ def set_location_read_state(campaign_id, location_id):
             FROM location_reads
             WHERE character_id = %s AND location_id = %s
         """, (character_id, location_id))
-        rs = cursor.fetchone() or {}
+        stored = cursor.fetchone() or {}
+        marker = read_state.merge_marker(
+            (stored.get('last_read_message_id'), stored.get('last_read_at')),
+            read_state.markers.pending(character_id, location_id),
+        )
+        rs = {'last_read_message_id': marker[0], 'last_read_at': marker[1]}
 
         # First unread after update
         cursor.execute("""
@@ -428,7 +473,7 @@ def set_location_read_state(campaign_id, location_id):
             WHERE campaign_id = %s
               AND location_id = %s
               AND id > %s
-              AND COALESCE(ai_message_kind, '') NOT LIKE 'dice_animation%'
+              AND COALESCE(ai_message_kind, '') NOT LIKE 'dice_animation%%'
             ORDER BY id ASC
             LIMIT 1
         """, (campaign_id, location_id, rs.get('last_read_message_id') or 0))
@@ -579,17 +624,8 @@ def save_message(campaign_id, location_id):
             if speak_as not in ('character', 'player', 'staff'):
                 speak_as = 'character'
 
-            cursor.execute("SELECT created_by FROM campaigns WHERE id = %s", (campaign_id,))
-            cr = cursor.fetchone() or {}
-            campaign_created_by = cr.get('created_by')
-            cursor.execute("SELECT role FROM users WHERE id = %s", (user_id,))
-            ur = cursor.fetchone() or {}
-            site_role = (ur.get('role') or '').lower()
-            is_campaign_st = (
-                campaign_created_by is not None
-                and str(campaign_created_by) == str(user_id)
-            )
-            can_staff_voice = site_role in ('admin', 'helper') or is_campaign_st
+            access = get_campaign_access(cursor, user_id, campaign_id)
+            can_staff_voice = access.is_site_staff or access.is_storyteller
 
             if speak_as == 'staff':
                 if not can_staff_voice:
@@ -607,7 +643,7 @@ def save_message(campaign_id, location_id):
                 speaker_mode = 'player'
             else:
                 speaker_mode = 'character'
-                active_cid = effective_playing_character_id(
+                active_cid = get_playing_character_id(
                     cursor, int(user_id), int(campaign_id)
                 )
 
@@ -694,6 +730,10 @@ def save_message(campaign_id, location_id):
         result = cursor.fetchone()
         message_id = result['id']
         conn.commit()
+        metrics.CHAT_MESSAGES.labels(
+            message_type if message_type in _METRIC_MESSAGE_TYPES else 'other',
+            role if role in _METRIC_ROLES else 'other',
+        ).inc()
         
         # Store message embedding in ChromaDB for semantic search
         try:
@@ -8,7 +8,6 @@ import logging
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from pathlib import Path
-import json
 
 logger = logging.getLogger(__name__)
 
@@ -229,19 +228,17 @@ def get_rule_books_status():
         # Check processed books
         processed_books = []
         for book_id in processor.rule_books.keys():
-            processed_file = processor.processed_dir / f"{book_id}_processed.json"
-            if processed_file.exists():
-                with open(processed_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    processed_books.append({
-                        'book_id': book_id,
-                        'book_name': data.get('book_name', 'Unknown'),
-                        'system': data.get('system', ''),
-                        'processed_at': data.get('processed_at', ''),
-                        'total_chunks': data.get('total_chunks', 0),
-                        'total_pages': data.get('total_pages', 0),
-                        'total_words': data.get('total_words', 0)
-                    })
+            data = processor.load_processed(book_id)
+            if data:
+                processed_books.append({
+                    'book_id': book_id,
+                    'book_name': data.get('book_name', 'Unknown'),
+                    'system': data.get('system', ''),
+                    'processed_at': data.get('processed_at', ''),
+                    'total_chunks': data.get('total_chunks', 0),
+                    'total_pages': data.get('total_pages', 0),
+                    'total_words': data.get('total_words', 0)
+                })
         
         return jsonify({
             'success': True,
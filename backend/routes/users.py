@@ -20,6 +20,7 @@ from database import (
     ensure_users_restrict_self_join_new_chronicles_column,
     ensure_campaign_players_active_character_id_column,
 )
+from services import campaign_acl
 from services.play_suspension import suspended_json
 from services.gpu_monitor import gpu_monitor_service
 
@@ -318,6 +319,7 @@ def put_current_user_me():
                         (sync_ac, srow["campaign_id"], user_id),
                     )
         db.commit()
+        campaign_acl.invalidate_user(user_id)
     except Exception as e:
         logger.error(f"PUT /users/me error: {e}")
         if "db" in locals():
@@ -544,6 +546,7 @@ def update_user(user_id):
             cursor.execute(query, params)
             
             db.commit()
+            campaign_acl.invalidate_user(user_id)
             
             logger.info(f"User {user_id} updated by user {current_user_id}")
         
@@ -590,6 +593,7 @@ def delete_user(user_id):
                       (datetime.utcnow(), user_id))
         
         db.commit()
+        campaign_acl.invalidate_user(user_id)
         
         logger.info(f"User {user_id} ({target_user['username']}) deactivated by admin {current_user_id}")
         
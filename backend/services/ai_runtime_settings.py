@@ -1,18 +1,44 @@
 """
 Key/value app settings stored in PostgreSQL or SQLite (app_settings table).
 Used for admin-configurable LM Studio model override and global AI master system prompt.
+
+Reads are served from an in-process snapshot of the whole table. Every write bumps
+the ``__settings_version__`` row in the same transaction; other workers compare that
+one row against their snapshot at most every APP_SETTINGS_POLL_SECONDS and reload
+when it changed, so generations read the master prompt / model override from memory.
 """
 
 from __future__ import annotations
 
 import logging
 import os
-from typing import Any, Optional
+import threading
+import time
+from typing import Any, Dict, Optional
 
 from database import get_db
+from services import metrics
 
 logger = logging.getLogger(__name__)
 
+SETTINGS_VERSION_KEY = "__settings_version__"
+SETTINGS_POLL_SECONDS = float(os.environ.get("APP_SETTINGS_POLL_SECONDS") or 2)
+
+
+class _SettingsSnapshot:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values: Optional[Dict[str, Optional[str]]] = None
+        self.version: Optional[str] = None
+        self.checked_at = 0.0
+
+
+_snapshot = _SettingsSnapshot()
+
+
+def _placeholder() -> str:
+    return "%s" if os.getenv("DATABASE_TYPE", "sqlite").lower() == "postgresql" else "?"
+
 
 def ensure_app_settings_table(cursor) -> None:
     db_type = os.getenv("DATABASE_TYPE", "sqlite").lower()
@@ -47,18 +73,100 @@ def _row_value(row: Any) -> Optional[str]:
     return None if row[0] is None else str(row[0])
 
 
+def _row_pair(row: Any) -> tuple:
+    if isinstance(row, dict):
+        key, value = row.get("key"), row.get("value")
+    else:
+        key, value = row[0], row[1]
+    return str(key), None if value is None else str(value)
+
+
+def _load_settings(cursor) -> tuple:
+    """(values without the version row, version)"""
+    cursor.execute("SELECT key, value FROM app_settings")
+    values = dict(_row_pair(row) for row in cursor.fetchall())
+    version = values.pop(SETTINGS_VERSION_KEY, None)
+    return values, version
+
+
+def _read_version(cursor) -> Optional[str]:
+    cursor.execute(f"SELECT value FROM app_settings WHERE key = {_placeholder()}", (SETTINGS_VERSION_KEY,))
+    return _row_value(cursor.fetchone())
+
+
+def _current_settings() -> Dict[str, Optional[str]]:
+    """Snapshot of all settings, revalidated against the version row when it is older than the poll interval"""
+    snap = _snapshot
+    values = snap.values
+    if values is not None and time.monotonic() - snap.checked_at < SETTINGS_POLL_SECONDS:
+        metrics.cache_lookup("app_settings", True)
+        return values
+    with snap.lock:
+        # Another thread may have refreshed while we waited
+        if snap.values is not None and time.monotonic() - snap.checked_at < SETTINGS_POLL_SECONDS:
+            metrics.cache_lookup("app_settings", True)
+            return snap.values
+        try:
+            conn = get_db()
+            try:
+                cursor = conn.cursor()
+                if snap.values is not None and _read_version(cursor) == snap.version:
+                    snap.checked_at = time.monotonic()
+                    metrics.cache_lookup("app_settings", True)
+                    return snap.values
+                values, version = _load_settings(cursor)
+            finally:
+                conn.close()
+        except Exception as e:
+            if snap.values is None:
+                raise
+            # Keep serving the last snapshot; retry after the next poll interval
+            logger.warning("Could not refresh app settings, using cached values: %s", e)
+            snap.checked_at = time.monotonic()
+            return snap.values
+        snap.values, snap.version, snap.checked_at = values, version, time.monotonic()
+        metrics.cache_lookup("app_settings", False)
+        return values
+
+
+def invalidate_app_settings_cache() -> None:
+    """Drop the snapshot so the next read reloads app_settings."""
+    with _snapshot.lock:
+        _snapshot.values = None
+        _snapshot.version = None
+        _snapshot.checked_at = 0.0
+
+
+def _bump_settings_version(cursor, db_type: str) -> None:
+    if db_type == "postgresql":
+        cursor.execute(
+            """
+            INSERT INTO app_settings (key, value, updated_at)
+            VALUES (%s, '1', CURRENT_TIMESTAMP)
+            ON CONFLICT (key) DO UPDATE SET
+                value = (COALESCE(NULLIF(app_settings.value, ''), '0')::bigint + 1)::text,
+                updated_at = CURRENT_TIMESTAMP
+            """,
+            (SETTINGS_VERSION_KEY,),
+        )
+    else:
+        cursor.execute(
+            """
+            INSERT INTO app_settings (key, value, updated_at)
+            VALUES (?, '1', datetime('now'))
+            ON CONFLICT(key) DO UPDATE SET
+                value = CAST(CAST(COALESCE(app_settings.value, '0') AS INTEGER) + 1 AS TEXT),
+                updated_at = datetime('now')
+            """,
+            (SETTINGS_VERSION_KEY,),
+        )
+
+
 def get_app_setting(key: str, default: Optional[str] = None) -> Optional[str]:
-    conn = get_db()
-    try:
-        cursor = conn.cursor()
-        ph = "%s" if os.getenv("DATABASE_TYPE", "sqlite").lower() == "postgresql" else "?"
-        cursor.execute(f"SELECT value FROM app_settings WHERE key = {ph}", (key,))
-        row = cursor.fetchone()
-        if not row:
-            return default
-        return _row_value(row)
-    finally:
-        conn.close()
+    values = _current_settings()
+    if key not in values:
+        return default
+    return values[key]
 
 
 def set_app_setting(key: str, value: Optional[str]) -> None:
@@ -92,9 +200,11 @@ def set_app_setting(key: str, value: Optional[str]) -> None:
                 """,
                 (key, value),
             )
+        _bump_settings_version(cursor, db_type)
         conn.commit()
     finally:
         conn.close()
+    invalidate_app_settings_cache()
 
 
 def delete_app_setting(key: str) -> None:
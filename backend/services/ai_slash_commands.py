@@ -531,6 +531,19 @@ def execute_clean_command(
     )
 
 
+def _dice_diff_preview(floor: int, pool: int = 5, difficulty: int = 6) -> str:
+    """Exact odds of a typical roll with and without the floor (markdown)"""
+    from services.dice_odds import pool_odds
+
+    normal = pool_odds(pool, difficulty)
+    lenient = pool_odds(pool, difficulty, leniency_floor=floor)
+    return (
+        f"_Odds for **{pool}** dice at difficulty **{difficulty}**: success "
+        f"**{lenient.success:.0%}** (normally {normal.success:.0%}), botch "
+        f"**{lenient.botch:.0%}** (normally {normal.botch:.0%})._"
+    )
+
+
 def execute_dice_diff_command(
     payload: str,
     user_id: int,
@@ -600,7 +613,8 @@ def execute_dice_diff_command(
             display = (
                 f"**`/ai dice-diff {v}`**\n\n"
                 f"**This room** now uses leniency floor **{v}**: no **1**s; with multiple dice, "
-                f"**at least one** die is **≥ {v}**. Clear with **`/ai dice-diff restore`**."
+                f"**at least one** die is **≥ {v}**. Clear with **`/ai dice-diff restore`**.\n\n"
+                f"{_dice_diff_preview(v)}"
             )
         return {
             "ok": True,
@@ -0,0 +1,219 @@
+"""
+Per-process cache of (user, campaign) authorization facts for hot permission checks.
+
+One query loads the viewer's site role, the campaign's creator/active flag and the
+roster row; ``CampaignAccess`` answers the checks the message, dice, read-state and
+AI routes repeat on every poll (can view, storyteller or staff, may enter closed
+rooms). The effective playing character is cached alongside on first use.
+
+Entries live for ACL_CACHE_TTL_SECONDS; routes that change membership, roles,
+campaign ownership/state or a user's characters call ``invalidate_user`` /
+``invalidate_campaign`` so this worker sees the change at once (other workers
+within the TTL).
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from services import metrics
+
+ACL_CACHE_TTL_SECONDS = float(os.environ.get("ACL_CACHE_TTL_SECONDS") or 15)
+MAX_ENTRIES = 10000
+
+_SITE_STAFF_ROLES = ("admin", "helper")
+
+
+@dataclass(frozen=True)
+class CampaignAccess:
+    """What one user may do in one campaign (snapshot)"""
+
+    user_id: int
+    campaign_id: int
+    user_role: str
+    campaign_exists: bool
+    campaign_active: bool
+    created_by: Optional[int]
+    is_member: bool
+    member_role: Optional[str] = None
+
+    @property
+    def is_site_admin(self) -> bool:
+        return self.user_role == "admin"
+
+    @property
+    def is_site_staff(self) -> bool:
+        return self.user_role in _SITE_STAFF_ROLES
+
+    @property
+    def is_storyteller(self) -> bool:
+        """Campaign creator"""
+        return self.created_by is not None and str(self.created_by) == str(self.user_id)
+
+    @property
+    def is_storyteller_or_staff(self) -> bool:
+        return self.campaign_exists and (self.is_site_staff or self.is_storyteller)
+
+    @property
+    def can_view(self) -> bool:
+        """Creator / roster member, or site admin (any campaign)"""
+        if not self.campaign_exists:
+            return False
+        return self.is_site_admin or self.is_storyteller or self.is_member
+
+    @property
+    def can_view_active(self) -> bool:
+        return self.can_view and self.campaign_active
+
+    @property
+    def can_bypass_closed_location(self) -> bool:
+        """Site admin, helper, or campaign creator may enter/read closed rooms"""
+        return self.is_site_staff or self.is_storyteller
+
+
+def _truthy(value: Any) -> bool:
+    """SQL boolean (PostgreSQL bool or SQLite 0/1); NULL is false like ``is_active = TRUE``"""
+    if value is None:
+        return False
+    if isinstance(value, (int, float)):
+        return value != 0
+    return bool(value)
+
+
+def load_campaign_access(cursor, user_id: int, campaign_id: int) -> CampaignAccess:
+    """Read the access facts for (user, campaign) with one statement (uncached)"""
+    cursor.execute(
+        """
+        SELECT
+            (SELECT role FROM users WHERE id = %s) AS user_role,
+            c.id AS campaign_id,
+            c.created_by,
+            c.is_active AS campaign_active,
+            cp.user_id AS member_user_id,
+            cp.role AS member_role
+        FROM (SELECT 1 AS one) AS one_row
+        LEFT JOIN campaigns c ON c.id = %s
+        LEFT JOIN campaign_players cp ON cp.campaign_id = c.id AND cp.user_id = %s
+        """,
+        (user_id, campaign_id, user_id),
+    )
+    row = cursor.fetchone() or {}
+    return CampaignAccess(
+        user_id=int(user_id),
+        campaign_id=int(campaign_id),
+        user_role=(row.get("user_role") or "").strip().lower(),
+        campaign_exists=row.get("campaign_id") is not None,
+        campaign_active=_truthy(row.get("campaign_active")),
+        created_by=row.get("created_by"),
+        is_member=row.get("member_user_id") is not None,
+        member_role=row.get("member_role"),
+    )
+
+
+class _AccessCache:
+    """LRU of (user_id, campaign_id) -> (expires_at, value), one per kind of fact"""
+
+    def __init__(self, name: str, max_entries: int = MAX_ENTRIES):
+        self.name = name
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[int, int], Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[int, int]) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                metrics.cache_lookup(self.name, True)
+                return True, entry[1]
+        metrics.cache_lookup(self.name, False)
+        return False, None
+
+    def put(self, key: Tuple[int, int], value: Any):
+        if ACL_CACHE_TTL_SECONDS <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ACL_CACHE_TTL_SECONDS, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, user_id: Optional[int] = None, campaign_id: Optional[int] = None):
+        with self._lock:
+            if user_id is None and campaign_id is None:
+                self._entries.clear()
+                return
+            stale = [
+                key for key in self._entries
+                if (user_id is None or key[0] == int(user_id))
+                and (campaign_id is None or key[1] == int(campaign_id))
+            ]
+            for key in stale:
+                del self._entries[key]
+
+
+_access_cache = _AccessCache("campaign_acl")
+_playing_character_cache = _AccessCache("playing_character")
+
+
+def get_campaign_access(cursor, user_id: Any, campaign_id: Any) -> CampaignAccess:
+    """Cached ``CampaignAccess`` for (user, campaign); ``cursor`` is only used on a miss"""
+    key = (int(user_id), int(campaign_id))
+    hit, access = _access_cache.get(key)
+    if hit:
+        return access
+    access = load_campaign_access(cursor, key[0], key[1])
+    _access_cache.put(key, access)
+    return access
+
+
+def get_playing_character_id(cursor, user_id: Any, campaign_id: Any) -> Optional[int]:
+    """Cached ``effective_playing_character_id`` (may write the roster default on a miss)"""
+    from services.playing_character import effective_playing_character_id
+
+    key = (int(user_id), int(campaign_id))
+    hit, character_id = _playing_character_cache.get(key)
+    if hit:
+        return character_id
+    character_id = effective_playing_character_id(cursor, key[0], key[1])
+    _playing_character_cache.put(key, character_id)
+    return character_id
+
+
+def invalidate(user_id: Any, campaign_id: Any) -> None:
+    _access_cache.discard(user_id, campaign_id)
+    _playing_character_cache.discard(user_id, campaign_id)
+
+
+def invalidate_user(user_id: Any) -> None:
+    """Role, membership or characters of a user changed"""
+    _access_cache.discard(user_id=user_id)
+    _playing_character_cache.discard(user_id=user_id)
+
+
+def invalidate_campaign(campaign_id: Any) -> None:
+    """Campaign created/deleted, ownership, roster or active state changed"""
+    _access_cache.discard(campaign_id=campaign_id)
+    _playing_character_cache.discard(campaign_id=campaign_id)
+
+
+def clear() -> None:
+    _access_cache.discard()
+    _playing_character_cache.discard()
+
+
+def cache_stats() -> Dict[str, int]:
+    return {"campaign_acl": len(_access_cache._entries), "playing_character": len(_playing_character_cache._entries)}
+
+
+metrics.gauge_callback(
+    "shadowrealms_acl_cache_entries",
+    "Cached (user, campaign) authorization entries",
+    lambda: [((name,), size) for name, size in cache_stats().items()],
+    ("cache",),
+)
@@ -0,0 +1,358 @@
+"""
+Materialised per-campaign counters for the settings page (PostgreSQL).
+
+``campaign_stats`` holds one row per campaign: story / OOC messages, story
+locations, active characters and active players. Triggers keep it current in
+the writing transaction:
+
+- messages: per statement, the inserted / deleted / moved rows are counted
+  from the transition tables and applied as one delta per campaign (the
+  table that is too large to count per request; chunked deletes stay cheap);
+- locations, characters, campaign_players, campaigns.created_by, users.is_active:
+  recount that counter for the affected campaign (small indexed counts).
+
+Deleting a location, or renaming / retyping it into or out of the OOC lobby,
+reclassifies existing messages, so the row is flagged ``dirty`` and the next read
+recounts it; migrate_db adds dirty rows for campaigns that predate the table.
+``reconcile`` recounts everything and reports drift
+(scripts/reconcile_campaign_stats.py, run from cron).
+
+OOC lobby = location type ``ooc`` or a lobby name ("Out of Character Lobby",
+"OOC chat", anything starting with "out of character", ...); OOC message =
+``message_type`` ooc or posted in a lobby. Story locations / messages are the rest.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = ("story_messages", "ooc_messages", "locations", "characters", "active_players")
+
+# No literal percent signs: psycopg2 would treat them as placeholders (CHR(37) is '%')
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS campaign_stats (
+    campaign_id INTEGER PRIMARY KEY REFERENCES campaigns(id) ON DELETE CASCADE,
+    story_messages BIGINT NOT NULL DEFAULT 0,
+    ooc_messages BIGINT NOT NULL DEFAULT 0,
+    locations INTEGER NOT NULL DEFAULT 0,
+    characters INTEGER NOT NULL DEFAULT 0,
+    active_players INTEGER NOT NULL DEFAULT 0,
+    dirty BOOLEAN NOT NULL DEFAULT FALSE,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    reconciled_at TIMESTAMP
+);
+
+CREATE OR REPLACE FUNCTION sr_location_is_ooc(loc_type TEXT, loc_name TEXT) RETURNS BOOLEAN
+LANGUAGE SQL IMMUTABLE AS $$
+    SELECT LOWER(TRIM(COALESCE(loc_type, ''))) = 'ooc'
+        OR LOWER(TRIM(COALESCE(loc_name, ''))) IN (
+            'out of character lobby', 'ooc lobby', 'ooc chat', '💬 ooc chat', 'out of character'
+        )
+        OR LOWER(TRIM(COALESCE(loc_name, ''))) LIKE 'out of character' || CHR(37)
+$$;
+
+CREATE OR REPLACE FUNCTION sr_message_is_ooc(msg_type TEXT, loc_id INTEGER) RETURNS BOOLEAN
+LANGUAGE SQL STABLE AS $$
+    SELECT LOWER(TRIM(COALESCE(msg_type, ''))) = 'ooc'
+        OR EXISTS (
+            SELECT 1 FROM locations l
+            WHERE l.id = loc_id AND sr_location_is_ooc(CAST(l."type" AS TEXT), l.name)
+        )
+$$;
+
+CREATE OR REPLACE FUNCTION sr_campaign_stats_recount(cid INTEGER, what TEXT) RETURNS VOID
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF cid IS NULL THEN
+        RETURN;
+    END IF;
+    IF what IN ('locations', 'all') THEN
+        UPDATE campaign_stats SET locations = (
+            SELECT COUNT(*) FROM locations l
+            WHERE l.campaign_id = cid AND l.is_active = TRUE
+              AND NOT sr_location_is_ooc(CAST(l."type" AS TEXT), l.name)
+        ), updated_at = CURRENT_TIMESTAMP WHERE campaign_id = cid;
+    END IF;
+    IF what IN ('characters', 'all') THEN
+        UPDATE campaign_stats SET characters = (
+            SELECT COUNT(*) FROM characters WHERE campaign_id = cid AND is_active = TRUE
+        ), updated_at = CURRENT_TIMESTAMP WHERE campaign_id = cid;
+    END IF;
+    IF what IN ('players', 'all') THEN
+        UPDATE campaign_stats SET active_players = (
+            SELECT COUNT(DISTINCT u.id)
+            FROM (
+                SELECT created_by AS user_id FROM campaigns WHERE id = cid
+                UNION
+                SELECT user_id FROM campaign_players WHERE campaign_id = cid
+            ) p
+            JOIN users u ON u.id = p.user_id
+            WHERE u.is_active = TRUE
+        ), updated_at = CURRENT_TIMESTAMP WHERE campaign_id = cid;
+    END IF;
+    IF what IN ('messages', 'all') THEN
+        UPDATE campaign_stats s SET
+            story_messages = t.story, ooc_messages = t.ooc, dirty = FALSE,
+            updated_at = CURRENT_TIMESTAMP
+        FROM (
+            SELECT COUNT(*) FILTER (WHERE NOT m.is_ooc) AS story, COUNT(*) FILTER (WHERE m.is_ooc) AS ooc
+            FROM (
+                SELECT LOWER(TRIM(COALESCE(m.message_type, ''))) = 'ooc'
+                       OR COALESCE(sr_location_is_ooc(CAST(l."type" AS TEXT), l.name), FALSE) AS is_ooc
+                FROM messages m
+                LEFT JOIN locations l ON l.id = m.location_id
+                WHERE m.campaign_id = cid
+            ) m
+        ) t
+        WHERE s.campaign_id = cid;
+    END IF;
+END
+$$;
+
+-- Statement level: one counter UPDATE per campaign touched, however many rows
+-- the statement wrote (a chunked delete of 1000 messages is one write, not 1000)
+CREATE OR REPLACE FUNCTION sr_campaign_stats_messages() RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE campaign_stats s SET
+            story_messages = s.story_messages + d.story, ooc_messages = s.ooc_messages + d.ooc,
+            updated_at = CURRENT_TIMESTAMP
+        FROM (
+            SELECT c.campaign_id, COUNT(*) FILTER (WHERE NOT c.is_ooc) AS story,
+                   COUNT(*) FILTER (WHERE c.is_ooc) AS ooc
+            FROM (
+                SELECT n.campaign_id, sr_message_is_ooc(n.message_type, n.location_id) AS is_ooc
+                FROM new_rows n
+            ) c
+            GROUP BY c.campaign_id
+        ) d
+        WHERE s.campaign_id = d.campaign_id;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE campaign_stats s SET
+            story_messages = s.story_messages - d.story, ooc_messages = s.ooc_messages - d.ooc,
+            updated_at = CURRENT_TIMESTAMP
+        FROM (
+            SELECT c.campaign_id, COUNT(*) FILTER (WHERE NOT c.is_ooc) AS story,
+                   COUNT(*) FILTER (WHERE c.is_ooc) AS ooc
+            FROM (
+                SELECT o.campaign_id, sr_message_is_ooc(o.message_type, o.location_id) AS is_ooc
+                FROM old_rows o
+            ) c
+            GROUP BY c.campaign_id
+        ) d
+        WHERE s.campaign_id = d.campaign_id;
+    ELSE
+        -- Only rows that changed campaign, location or type; text edits are skipped
+        UPDATE campaign_stats s SET
+            story_messages = s.story_messages + d.story, ooc_messages = s.ooc_messages + d.ooc,
+            updated_at = CURRENT_TIMESTAMP
+        FROM (
+            SELECT c.campaign_id, SUM(CASE WHEN c.is_ooc THEN 0 ELSE c.sign END) AS story,
+                   SUM(CASE WHEN c.is_ooc THEN c.sign ELSE 0 END) AS ooc
+            FROM (
+                SELECT x.campaign_id, x.sign, sr_message_is_ooc(x.message_type, x.location_id) AS is_ooc
+                FROM old_rows o
+                JOIN new_rows n ON n.id = o.id
+                CROSS JOIN LATERAL (VALUES
+                    (o.campaign_id, o.location_id, o.message_type, -1),
+                    (n.campaign_id, n.location_id, n.message_type, 1)
+                ) x(campaign_id, location_id, message_type, sign)
+                WHERE (o.campaign_id, o.location_id, o.message_type)
+                      IS DISTINCT FROM (n.campaign_id, n.location_id, n.message_type)
+            ) c
+            GROUP BY c.campaign_id
+        ) d
+        WHERE s.campaign_id = d.campaign_id AND (d.story <> 0 OR d.ooc <> 0);
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION sr_campaign_stats_locations() RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'DELETE'
+       OR (TG_OP = 'UPDATE' AND (
+            OLD.campaign_id IS DISTINCT FROM NEW.campaign_id
+            OR sr_location_is_ooc(CAST(OLD."type" AS TEXT), OLD.name)
+               <> sr_location_is_ooc(CAST(NEW."type" AS TEXT), NEW.name)))
+    THEN
+        UPDATE campaign_stats SET dirty = TRUE WHERE campaign_id = OLD.campaign_id;
+    END IF;
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        PERFORM sr_campaign_stats_recount(OLD.campaign_id, 'locations');
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM sr_campaign_stats_recount(NEW.campaign_id, 'locations');
+    END IF;
+    IF TG_OP = 'UPDATE' AND OLD.campaign_id IS DISTINCT FROM NEW.campaign_id THEN
+        UPDATE campaign_stats SET dirty = TRUE WHERE campaign_id = NEW.campaign_id;
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION sr_campaign_stats_members() RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+DECLARE
+    what TEXT := CASE WHEN TG_TABLE_NAME = 'characters' THEN 'characters' ELSE 'players' END;
+BEGIN
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        PERFORM sr_campaign_stats_recount(OLD.campaign_id, what);
+    END IF;
+    IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND OLD.campaign_id IS DISTINCT FROM NEW.campaign_id) THEN
+        PERFORM sr_campaign_stats_recount(NEW.campaign_id, what);
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION sr_campaign_stats_campaigns() RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO campaign_stats (campaign_id) VALUES (NEW.id) ON CONFLICT (campaign_id) DO NOTHING;
+        PERFORM sr_campaign_stats_recount(NEW.id, 'all');
+    ELSE
+        PERFORM sr_campaign_stats_recount(NEW.id, 'players');
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION sr_campaign_stats_users() RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM sr_campaign_stats_recount(c.id, 'players')
+    FROM campaigns c
+    WHERE c.created_by = NEW.id
+       OR c.id IN (SELECT campaign_id FROM campaign_players WHERE user_id = NEW.id);
+    RETURN NULL;
+END
+$$;
+
+-- Transition tables need one trigger per event and allow no column list
+DROP TRIGGER IF EXISTS campaign_stats_messages ON messages;
+DROP TRIGGER IF EXISTS campaign_stats_messages_insert ON messages;
+CREATE TRIGGER campaign_stats_messages_insert
+    AFTER INSERT ON messages REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sr_campaign_stats_messages();
+DROP TRIGGER IF EXISTS campaign_stats_messages_delete ON messages;
+CREATE TRIGGER campaign_stats_messages_delete
+    AFTER DELETE ON messages REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sr_campaign_stats_messages();
+DROP TRIGGER IF EXISTS campaign_stats_messages_update ON messages;
+CREATE TRIGGER campaign_stats_messages_update
+    AFTER UPDATE ON messages REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sr_campaign_stats_messages();
+
+DROP TRIGGER IF EXISTS campaign_stats_locations ON locations;
+CREATE TRIGGER campaign_stats_locations
+    AFTER INSERT OR DELETE OR UPDATE OF campaign_id, is_active, name, "type" ON locations
+    FOR EACH ROW EXECUTE FUNCTION sr_campaign_stats_locations();
+
+DROP TRIGGER IF EXISTS campaign_stats_characters ON characters;
+CREATE TRIGGER campaign_stats_characters
+    AFTER INSERT OR DELETE OR UPDATE OF campaign_id, is_active ON characters
+    FOR EACH ROW EXECUTE FUNCTION sr_campaign_stats_members();
+
+DROP TRIGGER IF EXISTS campaign_stats_players ON campaign_players;
+CREATE TRIGGER campaign_stats_players
+    AFTER INSERT OR DELETE OR UPDATE OF campaign_id, user_id ON campaign_players
+    FOR EACH ROW EXECUTE FUNCTION sr_campaign_stats_members();
+
+DROP TRIGGER IF EXISTS campaign_stats_campaigns ON campaigns;
+CREATE TRIGGER campaign_stats_campaigns
+    AFTER INSERT OR UPDATE OF created_by ON campaigns
+    FOR EACH ROW EXECUTE FUNCTION sr_campaign_stats_campaigns();
+
+DROP TRIGGER IF EXISTS campaign_stats_users ON users;
+CREATE TRIGGER campaign_stats_users
+    AFTER UPDATE OF is_active ON users
+    FOR EACH ROW EXECUTE FUNCTION sr_campaign_stats_users();
+"""
+
+
+def ensure_campaign_stats(cursor) -> None:
+    """Table, functions and triggers (idempotent; PostgreSQL only); new campaigns are counted on first read"""
+    cursor.execute(_SCHEMA)
+    cursor.execute(
+        """
+        INSERT INTO campaign_stats (campaign_id, dirty)
+        SELECT id, TRUE FROM campaigns
+        ON CONFLICT (campaign_id) DO NOTHING
+        """
+    )
+
+
+def _snapshot(cursor, campaign_id: Optional[int]) -> Dict[int, Dict[str, int]]:
+    if campaign_id is None:
+        cursor.execute(f"SELECT campaign_id, {', '.join(COUNTERS)} FROM campaign_stats")
+    else:
+        cursor.execute(
+            f"SELECT campaign_id, {', '.join(COUNTERS)} FROM campaign_stats WHERE campaign_id = %s",
+            (campaign_id,),
+        )
+    return {int(row["campaign_id"]): {name: int(row[name]) for name in COUNTERS} for row in cursor.fetchall()}
+
+
+def reconcile(cursor, campaign_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Recount from the source tables (all campaigns or one); caller commits
+
+    Returns one entry per campaign whose stored counters had drifted (new rows included).
+    """
+    before = _snapshot(cursor, campaign_id)
+    scope, params = ("WHERE id = %s", (campaign_id,)) if campaign_id is not None else ("", ())
+    cursor.execute(
+        f"""
+        INSERT INTO campaign_stats (campaign_id)
+        SELECT id FROM campaigns {scope}
+        ON CONFLICT (campaign_id) DO NOTHING
+        """,
+        params,
+    )
+    cursor.execute(
+        f"SELECT sr_campaign_stats_recount(id, 'all') FROM campaigns {scope}",
+        params,
+    )
+    if campaign_id is None:
+        cursor.execute("UPDATE campaign_stats SET reconciled_at = CURRENT_TIMESTAMP")
+    else:
+        cursor.execute(
+            "UPDATE campaign_stats SET reconciled_at = CURRENT_TIMESTAMP WHERE campaign_id = %s",
+            (campaign_id,),
+        )
+    after = _snapshot(cursor, campaign_id)
+
+    drift = []
+    for cid, counters in sorted(after.items()):
+        old = before.get(cid)
+        if old != counters:
+            drift.append({"campaign_id": cid, "before": old, "after": counters})
+    if drift:
+        logger.warning("campaign_stats reconciled %s campaign(s) with drift: %s", len(drift), drift[:5])
+    return drift
+
+
+def get_campaign_stats(cursor, campaign_id: int) -> Optional[Dict[str, int]]:
+    """Counters by primary key; recounts first if the row is missing or flagged dirty (None: no campaign)"""
+    cursor.execute(
+        f"SELECT {', '.join(COUNTERS)}, dirty FROM campaign_stats WHERE campaign_id = %s",
+        (campaign_id,),
+    )
+    row = cursor.fetchone()
+    if row is None or row["dirty"]:
+        reconcile(cursor, campaign_id)
+        cursor.execute(
+            f"SELECT {', '.join(COUNTERS)}, dirty FROM campaign_stats WHERE campaign_id = %s",
+            (campaign_id,),
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return None
+    return {name: int(row[name]) for name in COUNTERS}
@@ -0,0 +1,337 @@
+"""
+Background deletion of locations and campaigns.
+
+The DELETE routes only do what the user must see at once (audit entry, room /
+chronicle hidden, characters moved out) and queue a row in ``deletion_jobs``;
+the heavy part runs here on a worker thread:
+
+1. ``vectors``: message embeddings are purged from Chroma by metadata filter
+   (``where={"location_id": ...}`` / ``{"campaign_id": ...}``), fetching and
+   deleting at most VECTOR_BATCH_SIZE ids per call instead of one huge id list.
+2. ``sql``: messages (and, for a campaign, dice rolls) are deleted in chunks of
+   DELETION_JOB_BATCH_SIZE rows, each chunk its own short transaction; the
+   campaign row itself goes last, when the cascade has little left to do.
+
+Progress is written after every batch (``GET .../deletion-jobs/<id>``). Every
+step is idempotent, so a job interrupted by a restart is picked up again by
+``resume_pending`` once its heartbeat is older than STALE_JOB_SECONDS. A job
+that failed stays failed until the DELETE is repeated (``retry_failed``).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+JOB_BATCH_SIZE = int(os.environ.get("DELETION_JOB_BATCH_SIZE") or 1000)
+VECTOR_BATCH_SIZE = 500
+STALE_JOB_SECONDS = 600
+MESSAGE_COLLECTION = "message_memory"
+
+KINDS = ("location", "campaign")
+
+
+def _db_type() -> str:
+    return os.getenv("DATABASE_TYPE", "sqlite").lower()
+
+
+def _placeholder() -> str:
+    return "%s" if _db_type() == "postgresql" else "?"
+
+
+def _table_exists(cursor, table: str) -> bool:
+    if _db_type() == "postgresql":
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL AS present", (table,))
+        return bool(dict(cursor.fetchone())["present"])
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+    return cursor.fetchone() is not None
+
+
+def ensure_deletion_jobs_table(cursor) -> None:
+    if _db_type() == "postgresql":
+        id_column = "id SERIAL PRIMARY KEY"
+    else:
+        id_column = "id INTEGER PRIMARY KEY AUTOINCREMENT"
+    cursor.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS deletion_jobs (
+            {id_column},
+            kind VARCHAR(20) NOT NULL,
+            campaign_id INTEGER NOT NULL,
+            location_id INTEGER,
+            requested_by INTEGER,
+            status VARCHAR(20) NOT NULL DEFAULT 'queued',
+            phase VARCHAR(20),
+            progress TEXT,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            heartbeat_at TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+        """
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_deletion_jobs_status ON deletion_jobs (status, heartbeat_at)"
+    )
+
+
+def create_job(cursor, kind: str, campaign_id: int, location_id: Optional[int], requested_by: Any) -> int:
+    """Queue a job (the caller commits, then calls ``start``)"""
+    if kind not in KINDS:
+        raise ValueError(f"kind must be one of {', '.join(KINDS)}")
+    p = _placeholder()
+    params = (kind, campaign_id, location_id, requested_by, json.dumps({}))
+    sql = (
+        "INSERT INTO deletion_jobs (kind, campaign_id, location_id, requested_by, progress) "
+        f"VALUES ({p}, {p}, {p}, {p}, {p})"
+    )
+    if _db_type() == "postgresql":
+        cursor.execute(sql + " RETURNING id", params)
+        return int(cursor.fetchone()["id"])
+    cursor.execute(sql, params)
+    return int(cursor.lastrowid)
+
+
+def retry_failed(cursor, kind: str, campaign_id: int) -> Optional[int]:
+    """
+    Re-queue the latest job of this kind for the campaign if it failed (the caller
+    commits, then calls ``start``); returns its id, None if it is not failed
+
+    Steps are idempotent, so the job simply runs again from its first phase. Only
+    one of several concurrent retries gets the row back to ``queued``.
+    """
+    p = _placeholder()
+    cursor.execute(
+        f"SELECT MAX(id) AS id FROM deletion_jobs WHERE kind = {p} AND campaign_id = {p}",
+        (kind, campaign_id),
+    )
+    row = cursor.fetchone()
+    job_id = dict(row)["id"] if row else None
+    if job_id is None:
+        return None
+    cursor.execute(
+        f"""
+        UPDATE deletion_jobs
+        SET status = 'queued', error = NULL, finished_at = NULL, heartbeat_at = NULL
+        WHERE id = {p} AND status = 'failed'
+        """,
+        (job_id,),
+    )
+    return int(job_id) if (cursor.rowcount or 0) == 1 else None
+
+
+def _job_dict(row: Any) -> Dict[str, Any]:
+    job = dict(row)
+    try:
+        job["progress"] = json.loads(job.get("progress") or "{}")
+    except (TypeError, ValueError):
+        job["progress"] = {}
+    return job
+
+
+def get_job(cursor, job_id: int) -> Optional[Dict[str, Any]]:
+    cursor.execute(f"SELECT * FROM deletion_jobs WHERE id = {_placeholder()}", (job_id,))
+    row = cursor.fetchone()
+    return _job_dict(row) if row else None
+
+
+def purge_vectors(collection, where: Dict[str, Any], batch_size: int = VECTOR_BATCH_SIZE,
+                  on_batch: Optional[Callable[[int], None]] = None) -> int:
+    """Delete every vector matching ``where``, ``batch_size`` ids per round trip; returns count"""
+    purged = 0
+    previous: Optional[List[str]] = None
+    while True:
+        ids = list(collection.get(where=where, limit=batch_size, include=[]).get("ids") or [])
+        if not ids:
+            return purged
+        if ids == previous:
+            raise RuntimeError(f"vector delete made no progress ({len(ids)} ids still match {where})")
+        collection.delete(ids=ids)
+        purged += len(ids)
+        previous = ids
+        if on_batch:
+            on_batch(purged)
+
+
+def _message_collection():
+    from services.rag_service import get_rag_service
+
+    rag_service = get_rag_service()
+    return rag_service.client.get_or_create_collection(name=MESSAGE_COLLECTION)
+
+
+class _JobRun:
+    """One claimed job: phases, chunked deletes and progress writes on its own connection"""
+
+    def __init__(self, conn, job: Dict[str, Any], collection_factory: Callable[[], Any]):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.job = job
+        self.progress: Dict[str, Any] = dict(job.get("progress") or {})
+        self.collection_factory = collection_factory
+        self.phase = job.get("phase")
+
+    def save(self, phase: Optional[str] = None, status: Optional[str] = None, error: Optional[str] = None):
+        p = _placeholder()
+        sets = [f"progress = {p}", "heartbeat_at = CURRENT_TIMESTAMP"]
+        params: List[Any] = [json.dumps(self.progress, sort_keys=True)]
+        if phase is not None:
+            self.phase = phase
+            sets.append(f"phase = {p}")
+            params.append(phase)
+        if status is not None:
+            sets.append(f"status = {p}")
+            params.append(status)
+            if status in ("done", "failed"):
+                sets.append("finished_at = CURRENT_TIMESTAMP")
+        if error is not None:
+            sets.append(f"error = {p}")
+            params.append(error[:2000])
+        self.cursor.execute(f"UPDATE deletion_jobs SET {', '.join(sets)} WHERE id = {p}", (*params, self.job["id"]))
+        self.conn.commit()
+
+    def delete_in_chunks(self, table: str, column: str, value: int, counter: str, batch_size: int) -> None:
+        if not _table_exists(self.cursor, table):
+            return
+        p = _placeholder()
+        while True:
+            self.cursor.execute(
+                f"""
+                DELETE FROM {table} WHERE id IN (
+                    SELECT id FROM {table} WHERE {column} = {p} ORDER BY id LIMIT {p}
+                )
+                """,
+                (value, batch_size),
+            )
+            deleted = self.cursor.rowcount or 0
+            self.conn.commit()
+            if deleted <= 0:
+                return
+            self.progress[counter] = self.progress.get(counter, 0) + deleted
+            self.save()
+
+    def purge(self) -> None:
+        self.save(phase="vectors")
+        if self.job["kind"] == "location":
+            where = {"$and": [{"campaign_id": self.job["campaign_id"]}, {"location_id": self.job["location_id"]}]}
+        else:
+            where = {"campaign_id": self.job["campaign_id"]}
+        try:
+            collection = self.collection_factory()
+        except Exception as e:
+            # AI memory is optional (no vector store configured / reachable)
+            logger.warning(f"deletion job {self.job['id']}: vector store unavailable, skipping purge: {e}")
+            self.progress["vectors_skipped"] = str(e)[:200]
+            return
+
+        def on_batch(purged: int):
+            self.progress["vectors_purged"] = purged
+            self.save()
+
+        self.progress["vectors_purged"] = purge_vectors(collection, where, on_batch=on_batch)
+
+    def run(self, batch_size: int) -> None:
+        self.purge()
+        self.save(phase="sql")
+        if self.job["kind"] == "location":
+            location_id = self.job["location_id"]
+            self.delete_in_chunks("messages", "location_id", location_id, "messages_deleted", batch_size)
+            self.delete_in_chunks("location_reads", "location_id", location_id, "read_markers_deleted", batch_size)
+        else:
+            campaign_id = self.job["campaign_id"]
+            self.delete_in_chunks("messages", "campaign_id", campaign_id, "messages_deleted", batch_size)
+            self.delete_in_chunks("dice_rolls", "campaign_id", campaign_id, "dice_rolls_deleted", batch_size)
+            self.cursor.execute(f"DELETE FROM campaigns WHERE id = {_placeholder()}", (campaign_id,))
+            self.conn.commit()
+            from services import campaign_acl
+
+            campaign_acl.invalidate_campaign(campaign_id)
+        self.save(phase="finished", status="done")
+
+
+def _claim(cursor, job_id: int) -> bool:
+    p = _placeholder()
+    if _db_type() == "postgresql":
+        stale = f"heartbeat_at < CURRENT_TIMESTAMP - ({p} * INTERVAL '1 second')"
+    else:
+        stale = f"heartbeat_at < datetime('now', '-' || {p} || ' seconds')"
+    cursor.execute(
+        f"""
+        UPDATE deletion_jobs
+        SET status = 'running',
+            started_at = COALESCE(started_at, CURRENT_TIMESTAMP),
+            heartbeat_at = CURRENT_TIMESTAMP
+        WHERE id = {p}
+          AND (status = 'queued' OR (status = 'running' AND (heartbeat_at IS NULL OR {stale})))
+        """,
+        (job_id, STALE_JOB_SECONDS),
+    )
+    return (cursor.rowcount or 0) == 1
+
+
+def run_job(job_id: int, conn=None, collection_factory: Callable[[], Any] = _message_collection,
+            batch_size: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Claim and run one job to completion; returns the final job row (None if not claimable)"""
+    own = conn is None
+    if own:
+        from database import get_db
+
+        conn = get_db()
+    try:
+        cursor = conn.cursor()
+        claimed = _claim(cursor, job_id)
+        conn.commit()
+        if not claimed:
+            return None
+        run = _JobRun(conn, get_job(cursor, job_id), collection_factory)
+        try:
+            run.run(batch_size or JOB_BATCH_SIZE)
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"deletion job {job_id} failed in phase {run.phase}: {e}")
+            run.save(status="failed", error=str(e))
+        return get_job(cursor, job_id)
+    finally:
+        if own:
+            conn.close()
+
+
+def start(job_id: int) -> threading.Thread:
+    """Run a committed job on a daemon thread"""
+    thread = threading.Thread(target=_run_logged, args=(job_id,), name=f"deletion-job-{job_id}", daemon=True)
+    thread.start()
+    return thread
+
+
+def _run_logged(job_id: int) -> None:
+    try:
+        job = run_job(job_id)
+        if job:
+            logger.info(f"deletion job {job_id} ({job['kind']}) {job['status']}: {job['progress']}")
+    except Exception as e:
+        logger.error(f"deletion job {job_id} could not run: {e}")
+
+
+def resume_pending() -> List[int]:
+    """Start queued jobs and running ones whose worker stopped (startup); returns job ids"""
+    from database import get_db
+
+    conn = get_db()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM deletion_jobs WHERE status IN ('queued', 'running') ORDER BY id")
+        job_ids = [int(dict(row)["id"]) for row in cursor.fetchall()]
+    except Exception as e:
+        logger.warning(f"deletion jobs not resumed: {e}")
+        return []
+    finally:
+        conn.close()
+    for job_id in job_ids:
+        start(job_id)
+    return job_ids
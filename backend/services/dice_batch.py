@@ -0,0 +1,105 @@
+"""
+Vectorised Storyteller d10 rolls: every die of N pools in one NumPy draw.
+
+``roll_pools`` returns one dict per pool shaped like ``DiceService.roll_d10_pool``
+(results, successes, is_botch, is_critical, ones_count, message, ...), scored
+with array operations over a (rolls x largest pool) matrix. Room leniency
+(``/ai dice-diff``) is honoured per roll: no 1s, and one die — at a random
+position, as ``wod_dice._lenient_d10_pool`` shuffles — is drawn from [floor, 10].
+
+Pass a seeded ``numpy.random.Generator`` for reproducible rolls (tests).
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from services.dice_odds import MAX_POOL, normalize_leniency_floor
+
+IntOrSequence = Union[int, Sequence[int]]
+
+
+def _per_roll(value: Any, count: int, name: str) -> List[Any]:
+    if isinstance(value, (list, tuple, np.ndarray)):
+        if len(value) != count:
+            raise ValueError(f"{name} needs one value per pool ({count}), got {len(value)}")
+        return list(value)
+    return [value] * count
+
+
+def roll_pools(
+    pools: Sequence[int],
+    difficulty: IntOrSequence = 6,
+    specialty: Union[bool, Sequence[bool]] = False,
+    leniency_floor: Any = None,
+    rng: Optional[np.random.Generator] = None,
+) -> List[Dict]:
+    """
+    Roll many pools at once
+
+    Args:
+        pools: Dice per roll (0–50; 0 gives an empty "No dice to roll" result)
+        difficulty: One target number for all rolls or one per roll (invalid -> 6)
+        specialty: 10s count as 2 successes (all rolls or per roll)
+        leniency_floor: Room floor 2–10 for all rolls or per roll (None / invalid = off)
+        rng: NumPy generator (default: fresh OS-seeded generator)
+
+    Returns:
+        List of roll dicts in the order of ``pools``
+    """
+    from services.dice_service import DiceService
+
+    count = len(pools)
+    if count == 0:
+        return []
+    pool_arr = np.asarray(pools, dtype=np.int64)
+    if pool_arr.min() < 0 or pool_arr.max() > MAX_POOL:
+        raise ValueError(f"pool sizes must be between 0 and {MAX_POOL}")
+    difficulties = [int(d) if 2 <= int(d) <= 10 else 6 for d in _per_roll(difficulty, count, "difficulty")]
+    diff_arr = np.asarray(difficulties, dtype=np.int64)
+    spec_arr = np.asarray([bool(s) for s in _per_roll(specialty, count, "specialty")])
+    floors = [normalize_leniency_floor(f) for f in _per_roll(leniency_floor, count, "leniency_floor")]
+
+    rng = rng if rng is not None else np.random.default_rng()
+    width = max(1, int(pool_arr.max()))
+    active = np.arange(width)[None, :] < pool_arr[:, None]
+
+    # Lowest face per die: 1 normally; lenient rows use 2, and floor for one random die
+    low = np.ones((count, width), dtype=np.int64)
+    lenient = np.array([f is not None and p > 0 for f, p in zip(floors, pools)])
+    if lenient.any():
+        rows = np.flatnonzero(lenient)
+        low[rows] = 2
+        low[rows, rng.integers(0, pool_arr[rows])] = [floors[r] for r in rows]
+    dice = rng.integers(low, 11)
+    dice[~active] = 0
+
+    ones = (dice == 1).sum(axis=1)
+    hits = ((dice >= diff_arr[:, None]) & active).sum(axis=1)
+    doubles = ((dice == 10) & spec_arr[:, None]).sum(axis=1)
+    successes = hits + doubles - ones
+    botches = (successes < 0) | ((successes == 0) & (ones > 0))
+    criticals = successes >= 5
+
+    results = []
+    for i in range(count):
+        net = int(successes[i])
+        is_botch = bool(botches[i])
+        is_critical = bool(criticals[i])
+        results.append({
+            'results': dice[i, :pool_arr[i]].tolist(),
+            'successes': max(0, net),
+            'is_botch': is_botch,
+            'is_critical': is_critical,
+            'difficulty': difficulties[i],
+            'specialty': bool(spec_arr[i]),
+            'ones_count': int(ones[i]),
+            'message': (
+                DiceService.outcome_message(net, is_botch, is_critical)
+                if pool_arr[i] > 0 else 'No dice to roll'
+            ),
+            'leniency_floor': floors[i] if lenient[i] else None,
+        })
+    return results
@@ -0,0 +1,221 @@
+"""
+Exact odds for Storyteller d10 pools (no simulation).
+
+Same rules as ``DiceService.roll_d10_pool`` / ``wod_dice.roll_storyteller_pool``:
+each die scores -1 (a 1), 0, +1 (>= difficulty) or +2 (a 10 on a specialty roll);
+net successes are max(0, total) and a botch is a total <= 0 with at least one 1.
+Room leniency (``/ai dice-diff``) removes 1s: one die is uniform in [floor, 10] and
+the rest in [2, 10].
+
+The distribution of the total is built by convolving one die at a time over exact
+integer outcome counts, so one sweep yields every pool size 1..MAX_POOL for a given
+(difficulty, specialty, leniency floor). Sweeps are memoised as compact float
+arrays; ``warm_table`` fills the non-lenient ones at startup.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+from array import array
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+MAX_POOL = 50
+DIFFICULTIES = tuple(range(2, 11))
+CRITICAL_SUCCESSES = 5
+
+_OFFSET = MAX_POOL  # index of total 0 (lowest total is -MAX_POOL)
+_WIDTH = 3 * MAX_POOL + 1  # totals -MAX_POOL .. 2 * MAX_POOL
+
+_tables: Dict[Tuple[int, bool, Optional[int]], Tuple[array, ...]] = {}
+_tables_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class PoolOdds:
+    """Outcome probabilities of one roll; ``successes[k - 1]`` is P(exactly k net successes)"""
+
+    pool: int
+    difficulty: int
+    specialty: bool
+    leniency_floor: Optional[int]
+    botch: float
+    failure: float
+    successes: Tuple[float, ...]
+
+    @property
+    def success(self) -> float:
+        """P(at least one net success)"""
+        return self.at_least(1)
+
+    @property
+    def critical(self) -> float:
+        return self.at_least(CRITICAL_SUCCESSES)
+
+    @property
+    def expected_successes(self) -> float:
+        return sum(k * p for k, p in enumerate(self.successes, start=1))
+
+    def at_least(self, successes: int) -> float:
+        if successes <= 0:
+            return 1.0
+        if successes == 1:
+            return max(0.0, 1.0 - self.botch - self.failure)
+        return min(1.0, math.fsum(self.successes[successes - 1:]))
+
+    def to_dict(self, digits: int = 6) -> Dict[str, Any]:
+        return {
+            'pool': self.pool,
+            'difficulty': self.difficulty,
+            'specialty': self.specialty,
+            'leniency_floor': self.leniency_floor,
+            'botch': round(self.botch, digits),
+            'failure': round(self.failure, digits),
+            'success': round(self.success, digits),
+            'critical': round(self.critical, digits),
+            'expected_successes': round(self.expected_successes, digits),
+            'distribution': [round(p, digits) for p in self.successes],
+            'at_least': [round(self.at_least(k), digits) for k in range(1, len(self.successes) + 1)],
+        }
+
+
+def normalize_leniency_floor(leniency_floor: Any) -> Optional[int]:
+    """2–10 or None, the way the roll functions treat an invalid floor (ignored)"""
+    if leniency_floor is None:
+        return None
+    try:
+        value = int(leniency_floor)
+    except (TypeError, ValueError):
+        return None
+    return value if 2 <= value <= 10 else None
+
+
+def _die_scores(difficulty: int, specialty: bool, low: int) -> List[Tuple[int, int]]:
+    """(score, number of faces) for a die uniform in [low, 10]"""
+    counts: Dict[int, int] = {}
+    for face in range(low, 11):
+        if face == 1:
+            score = -1
+        elif face >= difficulty:
+            score = 2 if specialty and face == 10 else 1
+        else:
+            score = 0
+        counts[score] = counts.get(score, 0) + 1
+    return sorted(counts.items())
+
+
+def _add_die(counts: List[int], scores: List[Tuple[int, int]]) -> List[int]:
+    out = [0] * _WIDTH
+    for index, ways in enumerate(counts):
+        if not ways:
+            continue
+        for score, faces in scores:
+            out[index + score] += ways * faces
+    return out
+
+
+def _pack(counts: List[int], denominator: int, blank_ways: int) -> array:
+    """[botch, failure, P(net=1), P(net=2), ...] with trailing zeros trimmed"""
+    non_positive = sum(counts[:_OFFSET + 1])
+    row = array('d', [(non_positive - blank_ways) / denominator, blank_ways / denominator])
+    row.extend(ways / denominator for ways in counts[_OFFSET + 1:])
+    while len(row) > 2 and row[-1] == 0.0:
+        row.pop()
+    return row
+
+
+def _sweep(difficulty: int, specialty: bool, leniency_floor: Optional[int]) -> Tuple[array, ...]:
+    """Packed rows for pool 0..MAX_POOL, exact integer counts until packed"""
+    if leniency_floor is None:
+        first = rest = _die_scores(difficulty, specialty, 1)
+        first_sides = rest_sides = 10
+    else:
+        first = _die_scores(difficulty, specialty, leniency_floor)
+        rest = _die_scores(difficulty, specialty, 2)
+        first_sides, rest_sides = 11 - leniency_floor, 9
+    first_blank = max(0, min(difficulty, 11) - max(2, leniency_floor or 2))
+    rest_blank = difficulty - 2
+
+    counts = [0] * _WIDTH
+    counts[_OFFSET] = 1
+    rows = [array('d', [0.0, 1.0])]
+    denominator, blank_ways = 1, 1
+    for pool in range(1, MAX_POOL + 1):
+        scores, sides, blank = (first, first_sides, first_blank) if pool == 1 else (rest, rest_sides, rest_blank)
+        counts = _add_die(counts, scores)
+        denominator *= sides
+        blank_ways *= blank
+        rows.append(_pack(counts, denominator, blank_ways))
+    return tuple(rows)
+
+
+def _table(difficulty: int, specialty: bool, leniency_floor: Optional[int]) -> Tuple[array, ...]:
+    key = (difficulty, specialty, leniency_floor)
+    rows = _tables.get(key)
+    if rows is None:
+        rows = _sweep(difficulty, specialty, leniency_floor)
+        with _tables_lock:
+            rows = _tables.setdefault(key, rows)
+    return rows
+
+
+def pool_odds(
+    pool: int,
+    difficulty: int = 6,
+    specialty: bool = False,
+    leniency_floor: Any = None,
+) -> PoolOdds:
+    """Exact outcome probabilities; raises ValueError outside pool 1–50 / difficulty 2–10"""
+    pool = int(pool)
+    difficulty = int(difficulty)
+    if pool < 1 or pool > MAX_POOL:
+        raise ValueError(f"pool must be between 1 and {MAX_POOL}")
+    if difficulty < 2 or difficulty > 10:
+        raise ValueError("difficulty must be between 2 and 10")
+    floor = normalize_leniency_floor(leniency_floor)
+    row = _table(difficulty, bool(specialty), floor)[pool]
+    return PoolOdds(
+        pool=pool,
+        difficulty=difficulty,
+        specialty=bool(specialty),
+        leniency_floor=floor,
+        botch=max(0.0, row[0]),
+        failure=row[1],
+        successes=tuple(row[2:]),
+    )
+
+
+def difficulty_for_chance(
+    pool: int,
+    chance: float,
+    min_successes: int = 1,
+    specialty: bool = False,
+    leniency_floor: Any = None,
+) -> int:
+    """Hardest difficulty at which the pool still reaches ``min_successes`` with ``chance`` (else 2)"""
+    for difficulty in reversed(DIFFICULTIES):
+        if pool_odds(pool, difficulty, specialty, leniency_floor).at_least(min_successes) >= chance:
+            return difficulty
+    return DIFFICULTIES[0]
+
+
+def pool_for_chance(
+    difficulty: int,
+    chance: float,
+    min_successes: int = 1,
+    specialty: bool = False,
+    leniency_floor: Any = None,
+) -> int:
+    """Smallest pool reaching ``min_successes`` with ``chance`` at this difficulty (else MAX_POOL)"""
+    for pool in range(1, MAX_POOL + 1):
+        if pool_odds(pool, difficulty, specialty, leniency_floor).at_least(min_successes) >= chance:
+            return pool
+    return MAX_POOL
+
+
+def warm_table() -> None:
+    """Build every non-lenient sweep (9 difficulties x specialty) up front"""
+    for difficulty in DIFFICULTIES:
+        for specialty in (False, True):
+            _table(difficulty, specialty, None)
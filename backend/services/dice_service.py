@@ -9,9 +9,15 @@ from typing import List, Dict, Tuple
 from datetime import datetime
 import logging
 
+from services.dice_odds import difficulty_for_chance
+
 logger = logging.getLogger(__name__)
 
 
+# Difficulty of AI event rolls by probability label (context.target_chance overrides it)
+EVENT_DIFFICULTIES = {'unlikely': 8, 'moderate': 6, 'likely': 4}
+
+
 class DiceService:
     """Service for handling World of Darkness dice rolls"""
     
@@ -82,17 +88,7 @@ class DiceService:
         is_botch = (successes < 0 or (successes == 0 and ones_count > 0))
         is_critical = successes >= 5  # 5+ successes is exceptional
         
-        # Generate message
-        if is_botch:
-            message = "💀 **BOTCH!** Critical failure!"
-        elif successes == 0:
-            message = "❌ **Failure** - No successes"
-        elif is_critical:
-            message = f"🌟 **CRITICAL SUCCESS!** {successes} successes!"
-        elif successes == 1:
-            message = f"✅ Success ({successes} success)"
-        else:
-            message = f"✅ Success ({successes} successes)"
+        message = DiceService.outcome_message(successes, is_botch, is_critical)
         
         return {
             'results': results,
@@ -106,6 +102,19 @@ class DiceService:
             'leniency_floor': lf_applied,
         }
     
+    @staticmethod
+    def outcome_message(successes: int, is_botch: bool, is_critical: bool) -> str:
+        """Chat line for a scored roll (successes before clamping at 0)"""
+        if is_botch:
+            return "💀 **BOTCH!** Critical failure!"
+        if successes == 0:
+            return "❌ **Failure** - No successes"
+        if is_critical:
+            return f"🌟 **CRITICAL SUCCESS!** {successes} successes!"
+        if successes == 1:
+            return f"✅ Success ({successes} success)"
+        return f"✅ Success ({successes} successes)"
+    
     @staticmethod
     def roll_contested(attacker_pool: int, defender_pool: int, 
                       difficulty: int = 6) -> Dict:
@@ -120,9 +129,16 @@ class DiceService:
         Returns:
             Dict with both rolls and winner determination
         """
-        attacker_roll = DiceService.roll_d10_pool(attacker_pool, difficulty)
-        defender_roll = DiceService.roll_d10_pool(defender_pool, difficulty)
-        
+        from services.dice_batch import roll_pools
+
+        attacker_roll, defender_roll = roll_pools(
+            [max(0, attacker_pool), max(0, defender_pool)], difficulty
+        )
+        return DiceService.contested_outcome(attacker_roll, defender_roll)
+    
+    @staticmethod
+    def contested_outcome(attacker_roll: Dict, defender_roll: Dict) -> Dict:
+        """Compare two already-made rolls (see roll_contested)"""
         # Determine winner
         attacker_success = attacker_roll['successes']
         defender_success = defender_roll['successes']
@@ -171,11 +187,25 @@ class DiceService:
         Returns:
             Dict with all rolls and whether target was reached
         """
+        from services.dice_batch import roll_pools
+
+        return DiceService.extended_outcome(
+            roll_pools([max(0, pool_size)] * max_rolls, difficulty), target_successes
+        )
+    
+    @staticmethod
+    def extended_outcome(all_rolls: List[Dict], target_successes: int) -> Dict:
+        """
+        Walk pre-rolled attempts of an extended action until it succeeds, botches or runs out
+        
+        Rolls after the deciding one are discarded, so drawing all attempts up front
+        (one vectorised draw) gives the same odds as rolling one at a time.
+        """
+        max_rolls = len(all_rolls)
         rolls = []
         total_successes = 0
         
-        for roll_num in range(1, max_rolls + 1):
-            roll_result = DiceService.roll_d10_pool(pool_size, difficulty)
+        for roll_num, roll_result in enumerate(all_rolls, start=1):
             rolls.append(roll_result)
             
             if roll_result['is_botch']:
@@ -239,10 +269,15 @@ class DiceService:
         
         Args:
             action_type: Type of action ('npc_attack', 'weather', 'event', etc.)
-            context: Dict with relevant context (npc_power_level, difficulty_level, etc.)
+            context: Dict with relevant context (npc_power_level, difficulty_level, etc.);
+                target_chance (0 < chance <= 1) and optional min_successes (>= 1) pick the
+                difficulty from exact odds
         
         Returns:
             Tuple of (pool_size, difficulty)
+        
+        Raises:
+            ValueError: target_chance / min_successes out of range or not numbers
         """
         # Base values
         pool_size = 5
@@ -283,10 +318,7 @@ class DiceService:
         elif action_type == 'event':
             # Random event occurrence
             probability = context.get('probability', 'moderate')
-            if probability == 'unlikely':
-                difficulty = 8
-            elif probability == 'likely':
-                difficulty = 4
+            difficulty = EVENT_DIFFICULTIES.get(probability, 6)
             pool_size = random.randint(4, 8)
         
         elif action_type == 'mystery':
@@ -302,6 +334,21 @@ class DiceService:
                 difficulty = 9
                 pool_size = random.randint(6, 10)
         
+        # Explicit odds win over the heuristics above (exact, see services.dice_odds)
+        target_chance = context.get('target_chance')
+        if target_chance is not None:
+            min_successes = context.get('min_successes')
+            try:
+                chance = float(target_chance)
+                min_successes = 1 if min_successes is None else int(min_successes)
+            except (TypeError, ValueError):
+                raise ValueError('target_chance must be a number and min_successes an integer')
+            if not 0 < chance <= 1:
+                raise ValueError('target_chance must be greater than 0 and at most 1')
+            if min_successes < 1:
+                raise ValueError('min_successes must be at least 1')
+            difficulty = difficulty_for_chance(pool_size, chance, min_successes)
+        
         return (pool_size, difficulty)
     
     @staticmethod
@@ -331,19 +378,7 @@ class DiceService:
                 f"\n_Leniency floor **{lf}** (no 1s; with 2+ dice, one die ≥ {lf})._\n"
             )
         
-        # Format dice results with color coding
-        dice_display = []
-        for die in roll_data['results']:
-            if die == 1:
-                dice_display.append(f"[💀{die}]")  # Botch
-            elif die == 10:
-                dice_display.append(f"[⭐{die}]")  # Perfect
-            elif die >= roll_data['difficulty']:
-                dice_display.append(f"[✓{die}]")  # Success
-            else:
-                dice_display.append(f"[{die}]")  # Failure
-        
-        dice_str = " ".join(dice_display)
+        dice_str = DiceService.format_dice(roll_data['results'], roll_data['difficulty'])
         
         result = [
             header + leniency_line,
@@ -353,6 +388,49 @@ class DiceService:
         ]
         
         return "\n".join(result)
+    
+    @staticmethod
+    def format_dice(results: List[int], difficulty: int) -> str:
+        """Dice results with color coding"""
+        dice_display = []
+        for die in results:
+            if die == 1:
+                dice_display.append(f"[💀{die}]")  # Botch
+            elif die == 10:
+                dice_display.append(f"[⭐{die}]")  # Perfect
+            elif die >= difficulty:
+                dice_display.append(f"[✓{die}]")  # Success
+            else:
+                dice_display.append(f"[{die}]")  # Failure
+        return " ".join(dice_display)
+    
+    @staticmethod
+    def format_batch_for_chat(results: List[Dict]) -> str:
+        """
+        One chat message for a batch of rolls (see routes/dice.batch_roll)
+        
+        Args:
+            results: Entries with 'type' (simple, contested, extended), 'action_description'
+                and the roll / contested_outcome / extended_outcome fields
+        """
+        lines = [f"🎲 **Batch roll** ({len(results)} roll{'s' if len(results) != 1 else ''})"]
+        for entry in results:
+            label = f"**{entry['action_description']}**"
+            if entry['type'] == 'contested':
+                attacker, defender = entry['attacker_roll'], entry['defender_roll']
+                lines.append(
+                    f"- ⚔️ {label} — {len(attacker['results'])} vs {len(defender['results'])} dice "
+                    f"@ {attacker['difficulty']}: {attacker['successes']} vs {defender['successes']} · "
+                    f"{entry['message']}"
+                )
+            elif entry['type'] == 'extended':
+                lines.append(f"- ⏳ {label} — {entry['message']}")
+            else:
+                lines.append(
+                    f"- {label} — {len(entry['results'])} dice @ {entry['difficulty']}: "
+                    f"{DiceService.format_dice(entry['results'], entry['difficulty'])} · {entry['message']}"
+                )
+        return "\n".join(lines)
 
 
 # Singleton instance
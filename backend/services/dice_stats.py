@@ -0,0 +1,258 @@
+"""
+Incremental dice statistics (rollups of ``dice_rolls``).
+
+Every roll route calls ``record_rolls`` in the same transaction as its
+``INSERT INTO dice_rolls``; it adds to one ``dice_roll_stats`` row per
+(campaign, location, character, difficulty): roll/dice counts, success sum,
+botches, criticals, failures, a histogram of faces and the expected successes
+from ``services.dice_odds`` (so "luck" is actual minus expected). Reads sum a
+handful of rollup rows instead of scanning the roll log.
+
+Missing location / character are stored as 0 so the grain can be a primary key.
+``rebuild`` re-derives the rollups from ``dice_rolls`` (history before this
+table existed, or after rolls were deleted by hand); see
+scripts/rebuild_dice_stats.py.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from services.dice_odds import MAX_POOL, pool_odds
+
+logger = logging.getLogger(__name__)
+
+_FACES = tuple(range(1, 11))
+_COUNTERS = (
+    "rolls", "dice", "successes", "botches", "criticals", "failures", "expected_successes",
+) + tuple(f"face_{face}" for face in _FACES)
+GROUP_COLUMNS = {"difficulty": "difficulty", "character": "character_id", "location": "location_id"}
+
+
+def _db_type() -> str:
+    return os.getenv("DATABASE_TYPE", "sqlite").lower()
+
+
+def _placeholder() -> str:
+    return "%s" if _db_type() == "postgresql" else "?"
+
+
+def ensure_dice_stats_table(cursor) -> None:
+    counters = ",\n".join(
+        f"                {name} {'DOUBLE PRECISION' if name == 'expected_successes' else 'BIGINT'} NOT NULL DEFAULT 0"
+        for name in _COUNTERS
+    )
+    if _db_type() == "postgresql":
+        campaign = "campaign_id INTEGER NOT NULL REFERENCES campaigns(id) ON DELETE CASCADE"
+    else:
+        campaign = "campaign_id INTEGER NOT NULL"
+    cursor.execute(
+        f"""
+            CREATE TABLE IF NOT EXISTS dice_roll_stats (
+                {campaign},
+                location_id INTEGER NOT NULL DEFAULT 0,
+                character_id INTEGER NOT NULL DEFAULT 0,
+                difficulty INTEGER NOT NULL,
+{counters},
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (campaign_id, location_id, character_id, difficulty)
+            )
+        """
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_dice_roll_stats_character "
+        "ON dice_roll_stats (campaign_id, character_id)"
+    )
+
+
+def _expected_successes(pool: int, difficulty: int, specialty: bool, leniency_floor: Any) -> float:
+    if pool < 1 or pool > MAX_POOL or difficulty < 2 or difficulty > 10:
+        return 0.0
+    return pool_odds(pool, difficulty, specialty, leniency_floor).expected_successes
+
+
+def _add_roll(totals: Dict[Tuple[int, int, int, int], List[float]], key, dice: List[int],
+              successes: int, is_botch: bool, is_critical: bool, expected: float) -> None:
+    row = totals.setdefault(key, [0] * len(_COUNTERS))
+    row[0] += 1
+    row[1] += len(dice)
+    row[2] += successes
+    row[3] += 1 if is_botch else 0
+    row[4] += 1 if is_critical else 0
+    row[5] += 1 if not is_botch and successes == 0 else 0
+    row[6] += expected
+    for die in dice:
+        if 1 <= die <= 10:
+            row[6 + die] += 1
+
+
+def _write(cursor, campaign_totals: Dict[Tuple[int, int, int, int], List[float]]) -> None:
+    if not campaign_totals:
+        return
+    p = _placeholder()
+    columns = ", ".join(_COUNTERS)
+    updates = ", ".join(f"{name} = dice_roll_stats.{name} + excluded.{name}" for name in _COUNTERS)
+    cursor.executemany(
+        f"""
+        INSERT INTO dice_roll_stats (campaign_id, location_id, character_id, difficulty, {columns}, updated_at)
+        VALUES ({", ".join([p] * (4 + len(_COUNTERS)))}, CURRENT_TIMESTAMP)
+        ON CONFLICT (campaign_id, location_id, character_id, difficulty) DO UPDATE SET
+            {updates}, updated_at = CURRENT_TIMESTAMP
+        """,
+        [key + tuple(values) for key, values in sorted(campaign_totals.items())],
+    )
+
+
+def record_rolls(cursor, campaign_id: int, rolls: Iterable[Tuple[Optional[int], Optional[int], Dict]]) -> None:
+    """
+    Add rolls to the rollups (call next to the dice_rolls INSERT, same transaction)
+
+    Args:
+        rolls: (location_id, character_id, roll dict from DiceService / dice_batch) triples
+    """
+    totals: Dict[Tuple[int, int, int, int], List[float]] = {}
+    for location_id, character_id, roll in rolls:
+        dice = list(roll.get("results") or [])
+        difficulty = int(roll["difficulty"])
+        key = (int(campaign_id), int(location_id or 0), int(character_id or 0), difficulty)
+        expected = _expected_successes(len(dice), difficulty, bool(roll.get("specialty")), roll.get("leniency_floor"))
+        _add_roll(totals, key, dice, int(roll["successes"]), bool(roll["is_botch"]),
+                  bool(roll["is_critical"]), expected)
+    _write(cursor, totals)
+
+
+def _json_value(value: Any, default: Any) -> Any:
+    if value is None or value == "":
+        return default
+    if isinstance(value, (dict, list)):
+        return value
+    try:
+        return json.loads(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def rebuild(conn, campaign_id: Optional[int] = None, batch_size: int = 2000) -> int:
+    """
+    Recompute rollups from dice_rolls (one campaign or all) and commit; returns rolls counted
+
+    Rolls are counted and their rollups replaced in one transaction that first
+    blocks rollup writers (PostgreSQL: SHARE ROW EXCLUSIVE on dice_roll_stats;
+    SQLite: BEGIN IMMEDIATE). A roll recorded concurrently therefore either
+    committed before the snapshot (counted here) or waits and adds its delta
+    to the rebuilt row afterwards, never both or neither.
+    """
+    p = _placeholder()
+    where, params = ("WHERE campaign_id = " + p, (campaign_id,)) if campaign_id is not None else ("", ())
+    cursor = conn.cursor()
+    try:
+        if _db_type() == "postgresql":
+            cursor.execute("LOCK TABLE dice_roll_stats IN SHARE ROW EXCLUSIVE MODE")
+        elif not getattr(conn, "in_transaction", True):
+            cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute(
+            f"""
+            SELECT campaign_id, location_id, character_id, difficulty, results,
+                   successes, is_botch, is_critical, modifiers
+            FROM dice_rolls {where}
+            """,
+            params,
+        )
+        totals: Dict[Tuple[int, int, int, int], List[float]] = {}
+        counted = 0
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            for row in batch:
+                row = dict(row) if not isinstance(row, dict) else row
+                dice = [int(d) for d in _json_value(row["results"], []) if isinstance(d, (int, float))]
+                modifiers = _json_value(row.get("modifiers"), {})
+                modifiers = modifiers if isinstance(modifiers, dict) else {}
+                difficulty = int(row["difficulty"])
+                key = (int(row["campaign_id"]), int(row["location_id"] or 0),
+                       int(row["character_id"] or 0), difficulty)
+                expected = _expected_successes(len(dice), difficulty, bool(modifiers.get("specialty")),
+                                               modifiers.get("leniency_floor"))
+                _add_roll(totals, key, dice, int(row["successes"]), bool(row["is_botch"]),
+                          bool(row["is_critical"]), expected)
+                counted += 1
+
+        cursor.execute(f"DELETE FROM dice_roll_stats {where}", params)
+        _write(cursor, totals)
+        conn.commit()
+        logger.info("dice_roll_stats rebuilt from %s rolls (%s rollup rows)", counted, len(totals))
+        return counted
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def _summary(values: Dict[str, Any]) -> Dict[str, Any]:
+    rolls = int(values.get("rolls") or 0)
+    successes = int(values.get("successes") or 0)
+    botches = int(values.get("botches") or 0)
+    failures = int(values.get("failures") or 0)
+    expected = float(values.get("expected_successes") or 0.0)
+    return {
+        "rolls": rolls,
+        "dice": int(values.get("dice") or 0),
+        "successes": successes,
+        "botches": botches,
+        "criticals": int(values.get("criticals") or 0),
+        "failures": failures,
+        "average_successes": round(successes / rolls, 3) if rolls else 0.0,
+        "success_rate": round((rolls - botches - failures) / rolls, 4) if rolls else 0.0,
+        "botch_rate": round(botches / rolls, 4) if rolls else 0.0,
+        "expected_successes": round(expected, 3),
+        "luck": round(successes - expected, 3),
+        "faces": {str(face): int(values.get(f"face_{face}") or 0) for face in _FACES},
+    }
+
+
+def get_stats(
+    cursor,
+    campaign_id: int,
+    location_id: Optional[int] = None,
+    character_id: Optional[int] = None,
+    difficulty: Optional[int] = None,
+    group_by: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Aggregates for a campaign, optionally narrowed to a location / character / difficulty
+
+    ``group_by`` (difficulty, character, location) adds one summary per group.
+    """
+    if group_by is not None and group_by not in GROUP_COLUMNS:
+        raise ValueError(f"group_by must be one of {', '.join(sorted(GROUP_COLUMNS))}")
+    p = _placeholder()
+    clauses, params = [f"campaign_id = {p}"], [campaign_id]
+    for column, value in (("location_id", location_id), ("character_id", character_id), ("difficulty", difficulty)):
+        if value is not None:
+            clauses.append(f"{column} = {p}")
+            params.append(int(value))
+    sums = ", ".join(f"SUM({name}) AS {name}" for name in _COUNTERS)
+    group_column = GROUP_COLUMNS.get(group_by) if group_by else None
+    select_group = f"{group_column} AS group_key, " if group_column else ""
+    group_clause = f"GROUP BY {group_column} ORDER BY {group_column}" if group_column else ""
+    cursor.execute(
+        f"SELECT {select_group}{sums} FROM dice_roll_stats WHERE {' AND '.join(clauses)} {group_clause}",
+        tuple(params),
+    )
+    rows = [dict(row) for row in cursor.fetchall()]
+
+    if not group_column:
+        return {"totals": _summary(rows[0] if rows else {})}
+    totals: Dict[str, Any] = {name: 0 for name in _COUNTERS}
+    groups = []
+    for row in rows:
+        for name in _COUNTERS:
+            totals[name] += row.get(name) or 0
+        key = row["group_key"]
+        groups.append({group_by: (key or None) if group_by != "difficulty" else key, **_summary(row)})
+    return {"totals": _summary(totals), "group_by": group_by, "groups": groups}
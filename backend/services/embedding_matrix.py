@@ -0,0 +1,179 @@
+"""
+Compact, pre-normalised embedding matrix with vectorised top-k search.
+
+Rows are L2-normalised once when the matrix is built, so cosine similarity is a
+plain dot product, and stored contiguously as:
+
+    float32   4 bytes/dim (reference)
+    float16   2 bytes/dim (default; cosine error ~1e-3)
+    int8      1 byte/dim plus one float32 scale per row (symmetric, max-abs)
+
+Scoring walks the matrix in blocks of ``BLOCK_ROWS`` rows: each block is widened
+to float32 (it stays in cache) and scored against every query with one BLAS
+matrix product, then ``argpartition`` keeps each block's top k and merges it
+into the running best k, so top-k never materialises the full score matrix.
+``blocked_top_k`` is that merge on its own, for any block scorer: the embedded
+vector store (services/vector_store.py) runs its filtered queries through it.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Callable, Iterator, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+DTYPES = ("float32", "float16", "int8")
+DEFAULT_DTYPE = "float16"
+# Rows widened to float32 per matrix product (~1.5 MB at 384 dims)
+BLOCK_ROWS = 1024
+
+ArrayLike = Union[np.ndarray, Sequence[Sequence[float]]]
+
+
+def normalize_rows(vectors: ArrayLike) -> np.ndarray:
+    """float32 copy of ``vectors`` with unit-length rows (zero rows stay zero)"""
+    matrix = np.array(vectors, dtype=np.float32, ndmin=2)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def cosine_similarity(a: ArrayLike, b: ArrayLike) -> float:
+    """Cosine similarity of two vectors (0.0 when either is all zeros)"""
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    denominator = float(np.linalg.norm(a) * np.linalg.norm(b))
+    return float(np.dot(a, b)) / denominator if denominator else 0.0
+
+
+class EmbeddingMatrix:
+    """Unit-length embedding rows stored as float32, float16 or int8 with per-row scales"""
+
+    def __init__(self, data: np.ndarray, scales: Optional[np.ndarray] = None):
+        if data.ndim != 2:
+            raise ValueError("embedding matrix must be 2-D")
+        if str(data.dtype) not in DTYPES:
+            raise ValueError(f"unsupported embedding dtype {data.dtype}; expected one of {DTYPES}")
+        if (data.dtype == np.int8) != (scales is not None):
+            raise ValueError("int8 matrices need per-row scales (and only int8 does)")
+        self.data = data
+        self.scales = scales
+
+    @classmethod
+    def from_vectors(cls, vectors: ArrayLike, dtype: str = DEFAULT_DTYPE,
+                     normalized: bool = False) -> "EmbeddingMatrix":
+        """Build from raw vectors; rows are normalised unless ``normalized`` says they already are"""
+        if dtype not in DTYPES:
+            raise ValueError(f"unsupported embedding dtype {dtype!r}; expected one of {DTYPES}")
+        matrix = np.array(vectors, dtype=np.float32, ndmin=2) if normalized else normalize_rows(vectors)
+        if dtype != "int8":
+            return cls(np.ascontiguousarray(matrix, dtype=dtype))
+        peak = np.abs(matrix).max(axis=1) if matrix.size else np.zeros(len(matrix), dtype=np.float32)
+        scales = np.where(peak > 0, peak / 127.0, 1.0).astype(np.float32)
+        data = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+        return cls(data, scales)
+
+    @classmethod
+    def load(cls, path: Path, mmap: bool = True) -> "EmbeddingMatrix":
+        """Load a matrix written by ``save`` (``.npy``, plus ``.scales.npy`` for int8)"""
+        path = Path(path)
+        data = np.load(path, mmap_mode="r" if mmap else None)
+        scales_path = path.with_name(path.name[:-len(".npy")] + ".scales.npy")
+        scales = np.load(scales_path) if data.dtype == np.int8 else None
+        return cls(data, scales)
+
+    def save(self, path: Path) -> Path:
+        path = Path(path)
+        np.save(path, self.data)
+        if self.scales is not None:
+            np.save(path.with_name(path.name[:-len(".npy")] + ".scales.npy"), self.scales)
+        return path
+
+    def __len__(self) -> int:
+        return int(self.data.shape[0])
+
+    @property
+    def dim(self) -> int:
+        return int(self.data.shape[1])
+
+    @property
+    def dtype(self) -> str:
+        return str(self.data.dtype)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.data.nbytes + (self.scales.nbytes if self.scales is not None else 0))
+
+    def block(self, start: int, stop: int) -> np.ndarray:
+        """Rows ``start:stop`` as float32 (a view when stored as float32)"""
+        rows = self.data[start:stop]
+        if self.scales is not None:
+            return rows.astype(np.float32) * self.scales[start:stop, None]
+        return np.asarray(rows, dtype=np.float32)
+
+    def vectors(self, rows: Optional[Sequence[int]] = None) -> np.ndarray:
+        """Dequantised float32 rows (all rows, or the given indices) for handing to a vector store"""
+        if rows is None:
+            return self.block(0, len(self))
+        rows = np.asarray(rows, dtype=np.int64)
+        selected = np.asarray(self.data[rows], dtype=np.float32)
+        if self.scales is not None:
+            selected *= self.scales[rows, None]
+        return selected
+
+    def iter_blocks(self, block_rows: int = BLOCK_ROWS) -> Iterator[Tuple[int, np.ndarray]]:
+        for start in range(0, len(self), block_rows):
+            yield start, self.block(start, start + block_rows)
+
+    def scores(self, queries: ArrayLike, block_rows: int = BLOCK_ROWS) -> np.ndarray:
+        """Cosine similarity of each query against every row: shape (n_queries, n_rows)"""
+        q = normalize_rows(queries)
+        out = np.empty((len(q), len(self)), dtype=np.float32)
+        for start, block in self.iter_blocks(block_rows):
+            np.matmul(q, block.T, out=out[:, start:start + len(block)])
+        return out
+
+    def top_k(self, queries: ArrayLike, k: int = 5,
+              block_rows: int = BLOCK_ROWS) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Best ``k`` rows per query by cosine similarity.
+
+        Returns (indices, scores), each (n_queries, min(k, n_rows)), best first.
+        A single query vector may be passed as a 1-D array.
+        """
+        q = normalize_rows(queries)
+        return blocked_top_k(lambda start, stop: q @ self.block(start, stop).T, len(q), len(self), k, block_rows)
+
+
+def blocked_top_k(score_block: Callable[[int, int], np.ndarray], n_queries: int, n_rows: int, k: int,
+                  block_rows: int = BLOCK_ROWS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Best ``k`` of ``n_rows`` per query, scoring ``block_rows`` rows at a time.
+
+    ``score_block(start, stop)`` returns the (n_queries, stop - start) scores of
+    those rows, higher is better. Returns (indices, scores), each
+    (n_queries, min(k, n_rows)), best first, equal scores by row index.
+    """
+    k = min(k, n_rows)
+    if k <= 0:
+        empty = np.zeros((n_queries, 0))
+        return empty.astype(np.int64), empty.astype(np.float32)
+    # Running best k per query; each block only contributes its own top k
+    best_indices = np.empty((n_queries, 0), dtype=np.int64)
+    best_scores = np.empty((n_queries, 0), dtype=np.float32)
+    for start in range(0, n_rows, block_rows):
+        block_scores = np.asarray(score_block(start, min(start + block_rows, n_rows)), dtype=np.float32)
+        if block_scores.shape[1] > k:
+            local = np.argpartition(-block_scores, k - 1, axis=1)[:, :k]
+            block_scores = np.take_along_axis(block_scores, local, axis=1)
+        else:
+            local = np.broadcast_to(np.arange(block_scores.shape[1]), block_scores.shape)
+        best_indices = np.concatenate([best_indices, local + start], axis=1)
+        best_scores = np.concatenate([best_scores, block_scores], axis=1)
+        if best_scores.shape[1] > k:
+            keep = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+            best_indices = np.take_along_axis(best_indices, keep, axis=1)
+            best_scores = np.take_along_axis(best_scores, keep, axis=1)
+    order = np.lexsort((best_indices, -best_scores))
+    return np.take_along_axis(best_indices, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
@@ -10,7 +10,11 @@ import logging
 import requests
 from typing import Dict, Any, List, Optional
 from datetime import datetime
-import numpy as np
+
+from services.embedding_matrix import cosine_similarity
+from services.text_chunker import TextChunker
+from services import metrics
+from services.tracing import span
 
 logger = logging.getLogger(__name__)
 
@@ -34,7 +38,9 @@ class EmbeddingService:
                 "input": text
             }
             
-            response = requests.post(url, json=payload, timeout=30)
+            metrics.EMBEDDED_TEXTS.labels('lm_studio').inc()
+            with span('embedding.lm_studio', 'embedding', model=self.embedding_model):
+                response = requests.post(url, json=payload, timeout=30)
             if response.status_code == 200:
                 data = response.json()
                 if 'data' in data and len(data['data']) > 0:
@@ -116,55 +122,16 @@ class EmbeddingService:
         return embeddings
     
     def calculate_similarity(self, embedding1: List[float], embedding2: List[float]) -> float:
-        """Calculate cosine similarity between two embeddings"""
+        """Calculate cosine similarity between two embeddings (lists or numpy arrays)"""
         try:
-            # Convert to numpy arrays
-            vec1 = np.array(embedding1)
-            vec2 = np.array(embedding2)
-            
-            # Calculate cosine similarity
-            dot_product = np.dot(vec1, vec2)
-            norm1 = np.linalg.norm(vec1)
-            norm2 = np.linalg.norm(vec2)
-            
-            if norm1 == 0 or norm2 == 0:
-                return 0.0
-            
-            similarity = dot_product / (norm1 * norm2)
-            return float(similarity)
-            
+            return cosine_similarity(embedding1, embedding2)
         except Exception as e:
             logger.error(f"Error calculating similarity: {e}")
             return 0.0
     
     def chunk_text(self, text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
-        """Split text into overlapping chunks for better retrieval"""
-        if len(text) <= chunk_size:
-            return [text]
-        
-        chunks = []
-        start = 0
-        
-        while start < len(text):
-            end = start + chunk_size
-            
-            # Try to break at sentence boundary
-            if end < len(text):
-                # Look for sentence endings
-                for i in range(end, max(start + chunk_size - 100, start), -1):
-                    if text[i] in '.!?':
-                        end = i + 1
-                        break
-            
-            chunk = text[start:end].strip()
-            if chunk:
-                chunks.append(chunk)
-            
-            start = end - overlap
-            if start >= len(text):
-                break
-        
-        return chunks
+        """Split text into overlapping chunks for better retrieval (see services/text_chunker.py)"""
+        return TextChunker(chunk_size, overlap).chunk_text(text)
     
     def get_system_status(self) -> Dict[str, Any]:
         """Get embedding service status"""
@@ -125,7 +125,11 @@ class HealthCheckService:
         
         lm_studio_ok, lm_studio_msg = self.check_lm_studio(lm_studio_url)
         ollama_ok, ollama_msg = self.check_ollama(ollama_url)
-        chromadb_ok, chromadb_msg = self.check_chromadb(chromadb_host, chromadb_port)
+        if os.getenv('VECTOR_STORE', 'chromadb').lower() == 'local':
+            # Embedded store (services/vector_store.py): nothing to reach over the network
+            chromadb_ok, chromadb_msg = True, "Embedded vector store (VECTOR_STORE=local)"
+        else:
+            chromadb_ok, chromadb_msg = self.check_chromadb(chromadb_host, chromadb_port)
         
         # At least one LLM provider must be available
         llm_available = lm_studio_ok or ollama_ok
@@ -14,6 +14,7 @@ from datetime import datetime
 from .lm_studio_model import get_effective_lm_studio_model_id, resolve_lm_studio_model_id
 from .smart_model_router import SmartModelRouter, create_smart_model_router
 from .rag_service import RAGService, create_rag_service
+from .tracing import llm_span, record_llm_response
 
 logger = logging.getLogger(__name__)
 
@@ -130,15 +131,17 @@ class LMStudioProvider(LLMProvider):
             hdrs = {'Content-Type': 'application/json'}
             if (self.api_key or '').strip():
                 hdrs['Authorization'] = f'Bearer {self.api_key.strip()}'
-            response = requests.post(
-                f"{self.base_url}/v1/chat/completions",
-                json=payload,
-                timeout=self.timeout,
-                headers=hdrs,
-            )
+            with llm_span('lm_studio', payload['model']):
+                response = requests.post(
+                    f"{self.base_url}/v1/chat/completions",
+                    json=payload,
+                    timeout=self.timeout,
+                    headers=hdrs,
+                )
+                result = response.json() if response.status_code == 200 else None
+                record_llm_response(result, 'lm_studio')
             
-            if response.status_code == 200:
-                result = response.json()
+            if result is not None:
                 return result['choices'][0]['message']['content']
             else:
                 logger.error(f"LM Studio API error: {response.status_code} - {response.text}")
@@ -207,14 +210,16 @@ class OllamaProvider(LLMProvider):
                 payload['prompt'] = f"Campaign Context: {context['campaign_context']}\n\nUser: {prompt}"
             
             # Make request to Ollama
-            response = requests.post(
-                f"{self.base_url}/api/generate",
-                json=payload,
-                timeout=self.timeout
-            )
+            with llm_span('ollama', self.model):
+                response = requests.post(
+                    f"{self.base_url}/api/generate",
+                    json=payload,
+                    timeout=self.timeout
+                )
+                result = response.json() if response.status_code == 200 else None
+                record_llm_response(result, 'ollama')
             
-            if response.status_code == 200:
-                result = response.json()
+            if result is not None:
                 return result.get('response', 'No response generated')
             else:
                 logger.error(f"Ollama API error: {response.status_code} - {response.text}")
@@ -16,6 +16,8 @@ from typing import Any, Dict, Optional
 
 import requests
 
+from services import metrics
+
 logger = logging.getLogger(__name__)
 
 _CACHE_ID: Optional[str] = None
@@ -130,7 +132,9 @@ def resolve_lm_studio_model_id(
 
     base = _normalize_base(base_url)
     now = time.time()
-    if _CACHE_ID and (now - _CACHE_TS) < _CACHE_TTL_SEC:
+    cache_hit = bool(_CACHE_ID and (now - _CACHE_TS) < _CACHE_TTL_SEC)
+    metrics.cache_lookup('lm_studio_model', cache_hit)
+    if cache_hit:
         return _CACHE_ID
 
     # 1) Native API: which LLM(s) have loaded_instances, then match OpenAI /v1/models order
@@ -190,6 +194,7 @@ def invalidate_lm_studio_model_cache() -> None:
 def get_effective_lm_studio_model_id(config: Dict[str, Any]) -> str:
     """
     Model id for each inference request: admin DB override (if set) else env + auto resolution.
+    The override comes from the in-memory app_settings snapshot, so this is DB-free per call.
     """
     from services.ai_runtime_settings import get_app_setting
 
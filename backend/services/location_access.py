@@ -6,6 +6,8 @@ from typing import Any, Optional, Tuple
 
 from flask import jsonify
 
+from services.campaign_acl import get_campaign_access
+
 
 def user_can_bypass_closed_location(
     cursor,
@@ -13,15 +15,7 @@ def user_can_bypass_closed_location(
     campaign_id: int,
 ) -> bool:
     """Site admin, helper, or campaign creator may enter/read closed rooms."""
-    cursor.execute("SELECT role FROM users WHERE id = %s", (user_id,))
-    urow = cursor.fetchone() or {}
-    role = (urow.get("role") or "").strip().lower()
-    if role in ("admin", "helper"):
-        return True
-    cursor.execute("SELECT created_by FROM campaigns WHERE id = %s", (campaign_id,))
-    crow = cursor.fetchone() or {}
-    cb = crow.get("created_by")
-    return cb is not None and str(cb) == str(user_id)
+    return get_campaign_access(cursor, user_id, campaign_id).can_bypass_closed_location
 
 
 def get_location_open_state(cursor, location_id: int, campaign_id: int):
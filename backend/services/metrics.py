@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+ShadowRealms AI - Metrics Registry
+Counters, gauges and histograms exposed in Prometheus text format at ``/metrics``.
+
+Metrics are process-local and cheap to update from hot paths: each labelled
+child owns one of ``LOCK_STRIPES`` locks chosen by its label values, so
+concurrent requests touching different children rarely contend, and label
+lookup is a plain dict read after the first use.
+
+    REQUESTS = counter('shadowrealms_things_total', 'Things done', ('kind',))
+    REQUESTS.labels('fast').inc()
+
+    LATENCY = histogram('shadowrealms_thing_seconds', 'Thing latency')
+    with LATENCY.time():
+        ...
+
+``gauge_callback`` registers a gauge evaluated at scrape time (queue lengths,
+cache sizes).  ``init_app`` adds the ``/metrics`` route and the in-flight
+request gauge; per-endpoint request latency comes from ``services.tracing``.
+"""
+
+import bisect
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+LOCK_STRIPES = 16
+# Default latency buckets in seconds (5 ms .. 60 s)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if value == -math.inf:
+        return '-Inf'
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _CounterChild:
+    __slots__ = ('_lock', 'value')
+
+    def __init__(self, lock: threading.Lock):
+        self._lock = lock
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        if amount < 0:
+            raise ValueError('counters can only increase')
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild:
+    __slots__ = ('_lock', 'value')
+
+    def __init__(self, lock: threading.Lock):
+        self._lock = lock
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        with self._lock:
+            self.value = float(value)
+
+    @contextmanager
+    def track_inprogress(self):
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+
+class _HistogramChild:
+    __slots__ = ('_lock', '_bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, lock: threading.Lock, bounds: Tuple[float, ...]):
+        self._lock = lock
+        self._bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self._bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def snapshot(self) -> Tuple[List[Tuple[float, int]], float, int]:
+        """(cumulative [(upper bound, count)], sum, count) read consistently"""
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        cumulative, running = [], 0
+        for bound, n in zip(self._bounds + (math.inf,), counts):
+            running += n
+            cumulative.append((bound, running))
+        return cumulative, total, count
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._create_lock = threading.Lock()
+        self._default = None if self.labelnames else self.labels()
+
+    def _make_child(self, lock: threading.Lock):
+        raise NotImplementedError
+
+    def labels(self, *values, **kwargs):
+        """Child for the given label values (positional, or by label name)"""
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f'{self.name} expects labels {self.labelnames}, got {key}')
+            with self._create_lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._children[key] = self._make_child(self._locks[hash(key) % LOCK_STRIPES])
+        return child
+
+    def children(self) -> List[Tuple[Tuple[str, ...], object]]:
+        return list(self._children.items())
+
+    def clear(self):
+        """Drop all labelled children (tests / admin reset)"""
+        with self._create_lock:
+            self._children.clear()
+
+    def _require_default(self):
+        if self._default is None:
+            raise ValueError(f'{self.name} has labels {self.labelnames}; use .labels(...)')
+        return self._default
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        """(sample name, formatted labels, value)"""
+        for key, child in self.children():
+            yield self.name, _format_labels(self.labelnames, key), child.value
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {_escape(self.documentation)}', f'# TYPE {self.name} {self.kind}']
+        lines.extend(f'{name}{labels} {_format_value(value)}' for name, labels, value in self.samples())
+        return lines
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _make_child(self, lock):
+        return _CounterChild(lock)
+
+    def inc(self, amount: float = 1.0):
+        self._require_default().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def _make_child(self, lock):
+        return _GaugeChild(lock)
+
+    def inc(self, amount: float = 1.0):
+        self._require_default().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._require_default().dec(amount)
+
+    def set(self, value: float):
+        self._require_default().set(value)
+
+    def track_inprogress(self):
+        return self._require_default().track_inprogress()
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(float(b) for b in buckets if b != math.inf))
+        super().__init__(name, documentation, labelnames)
+
+    def _make_child(self, lock):
+        return _HistogramChild(lock, self.buckets)
+
+    def observe(self, value: float):
+        self._require_default().observe(value)
+
+    def time(self):
+        return self._require_default().time()
+
+    def samples(self):
+        for key, child in self.children():
+            cumulative, total, count = child.snapshot()
+            for bound, running in cumulative:
+                yield (f'{self.name}_bucket',
+                       _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"'), running)
+            labels = _format_labels(self.labelnames, key)
+            yield f'{self.name}_sum', labels, total
+            yield f'{self.name}_count', labels, count
+
+
+class CallbackGauge(_Metric):
+    """Gauge whose value(s) come from a function at scrape time"""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str,
+                 fn: Callable[[], Union[float, Iterable[Tuple[Sequence[str], float]]]],
+                 labelnames: Sequence[str] = ()):
+        self._fn = fn
+        super().__init__(name, documentation, labelnames)
+
+    def _make_child(self, lock):
+        return _GaugeChild(lock)
+
+    def samples(self):
+        try:
+            result = self._fn()
+        except Exception:
+            return
+        if not self.labelnames:
+            yield self.name, '', float(result)
+            return
+        for values, value in result:
+            yield self.name, _format_labels(self.labelnames, [str(v) for v in values]), float(value)
+
+
+class Registry:
+    """Named metrics; ``counter``/``gauge``/``histogram`` return the existing metric on re-registration"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f'metric {name} already registered as {metric.kind}')
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def gauge_callback(self, name: str, documentation: str, fn, labelnames: Sequence[str] = ()) -> CallbackGauge:
+        with self._lock:
+            metric = self._metrics[name] = CallbackGauge(name, documentation, fn, labelnames)
+            return metric
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def unregister(self, name: str):
+        with self._lock:
+            self._metrics.pop(name, None)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+gauge_callback = REGISTRY.gauge_callback
+
+
+# --- backend metrics ------------------------------------------------------------
+
+PROCESS_START_TIME = gauge('shadowrealms_process_start_time_seconds', 'Backend process start time (unix seconds)')
+PROCESS_START_TIME.set(time.time())
+
+HTTP_REQUESTS = counter('shadowrealms_http_requests_total', 'HTTP requests by endpoint and status',
+                        ('endpoint', 'status'))
+HTTP_IN_FLIGHT = gauge('shadowrealms_http_requests_in_flight', 'Requests currently being handled')
+REQUEST_LATENCY = histogram('shadowrealms_request_duration_seconds',
+                            'Request latency by endpoint; category is total or the traced share '
+                            '(db, vector, embedding, llm, llm_prefill, llm_generation, queue)',
+                            ('endpoint', 'category'))
+OPERATION_LATENCY = histogram('shadowrealms_operation_duration_seconds',
+                              'Latency of traced operations (SQL, vector, embedding and LLM calls)',
+                              ('category', 'operation'))
+
+DB_CONNECTIONS_OPENED = counter('shadowrealms_db_connections_opened_total', 'Database connections opened')
+DB_CONNECTIONS_OPEN = gauge('shadowrealms_db_connections_open', 'Database connections currently open')
+SLOW_QUERIES = counter('shadowrealms_db_slow_queries_total', 'SQL statements slower than SQL_SLOW_QUERY_MS')
+
+LLM_REQUESTS = counter('shadowrealms_llm_requests_total', 'LLM generation requests', ('provider', 'outcome'))
+LLM_IN_FLIGHT = gauge('shadowrealms_llm_requests_in_flight', 'LLM generations waiting on the model server')
+LLM_TOKENS = counter('shadowrealms_llm_tokens_total', 'LLM tokens reported by the model server',
+                     ('provider', 'kind'))
+
+EMBEDDED_TEXTS = counter('shadowrealms_embedding_texts_total', 'Texts embedded', ('source',))
+
+CACHE_REQUESTS = counter('shadowrealms_cache_requests_total', 'Cache lookups by cache and result',
+                         ('cache', 'result'))
+
+CHAT_MESSAGES = counter('shadowrealms_chat_messages_total', 'Chat messages saved', ('message_type', 'role'))
+MESSAGES_SERVED = counter('shadowrealms_chat_messages_served_total', 'Chat messages returned to clients',
+                          ('mode',))
+AI_CHAT_RESPONSES = counter('shadowrealms_ai_chat_responses_total', 'AI chat responses by response type',
+                            ('response_type',))
+
+
+def cache_lookup(cache: str, hit: bool):
+    CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def init_app(app):
+    """Add ``GET /metrics`` and the in-flight / per-status request counters"""
+    from flask import Response, g, request
+
+    if not app.config.get('METRICS_ENABLED', os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'):
+        return
+
+    @app.before_request
+    def _count_in_flight():
+        HTTP_IN_FLIGHT.inc()
+        g._metrics_in_flight = True
+
+    @app.after_request
+    def _count_response(response):
+        rule = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_REQUESTS.labels(f'{request.method} {rule}', str(response.status_code)).inc()
+        return response
+
+    @app.teardown_request
+    def _leave_in_flight(exc):
+        if g.pop('_metrics_in_flight', False):
+            HTTP_IN_FLIGHT.dec()
+
+    @app.route('/metrics')
+    def metrics_endpoint():
+        return Response(REGISTRY.render(), mimetype=None, content_type=CONTENT_TYPE)
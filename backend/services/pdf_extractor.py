@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Pluggable PDF text extraction.
+
+Backends (all imported lazily, so importing this module costs nothing):
+
+    pypdfium2   PDFium text layer; native code and by far the fastest
+    pdfminer    pdfminer.six layout analysis; pure Python but skips pdfplumber's
+                per-character object model
+    pdfplumber  layout-aware word clustering; slowest, best on tables and
+                multi-column pages
+
+``auto`` (the default) extracts every page with the fastest installed backend and
+re-extracts only the pages whose text looks broken or layout-sensitive with
+pdfplumber, in one pass over the file.  The backend can be pinned with the
+``PDF_EXTRACTOR`` environment variable.
+
+``parity_report`` compares two backends on a real book (per-page text similarity
+and chunk boundaries); run it from the backend directory with:
+
+    python -m services.pdf_extractor parity book.pdf [--candidate auto] [--pages 50]
+"""
+
+import difflib
+import importlib.util
+import os
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_EXTRACTOR = 'auto'
+FAST_BACKENDS = ('pypdfium2', 'pdfminer')
+
+# Page-text heuristics that send a page from the fast backend to pdfplumber
+MAX_BROKEN_CHAR_RATIO = 0.005
+MAX_MEAN_WORD_LENGTH = 12.0
+MAX_SHORT_LINE_RATIO = 0.4
+MIN_LINES_FOR_LAYOUT_CHECK = 20
+
+_CID_RE = re.compile(r'\(cid:\d+\)')
+_WORD_RE = re.compile(r'\w+')
+
+
+def page_range(first_page: int = 0, last_page: Optional[int] = None,
+               page_count: Optional[int] = None) -> range:
+    """0-based [first_page, last_page) clipped to the page count"""
+    end = last_page if last_page is not None else page_count
+    if last_page is not None and page_count is not None:
+        end = min(last_page, page_count)
+    return range(first_page, max(first_page, end or 0))
+
+
+def needs_layout(text: str) -> bool:
+    """
+    True when fast-backend page text should be re-extracted with pdfplumber:
+    undecodable glyphs, words run together (lost spacing) or a page made mostly
+    of tiny lines (table cells / columns split apart).  Empty pages are left
+    alone - they are image-only and no text backend will do better.
+    """
+    stripped = text.strip() if text else ''
+    if not stripped:
+        return False
+
+    broken = stripped.count('\ufffd') + len(_CID_RE.findall(stripped))
+    if broken / len(stripped) > MAX_BROKEN_CHAR_RATIO:
+        return True
+
+    words = _WORD_RE.findall(stripped)
+    if words and sum(len(w) for w in words) / len(words) > MAX_MEAN_WORD_LENGTH:
+        return True
+
+    lines = [line for line in stripped.splitlines() if line.strip()]
+    if len(lines) >= MIN_LINES_FOR_LAYOUT_CHECK:
+        short = sum(1 for line in lines if len(line.strip()) < 3)
+        if short / len(lines) > MAX_SHORT_LINE_RATIO:
+            return True
+
+    return False
+
+
+class PdfExtractor:
+    """Backend interface: page count plus raw page text for 0-based page indices"""
+
+    name = 'base'
+    # Top-level package the backend needs; probed without importing it
+    module: Optional[str] = None
+
+    @classmethod
+    def available(cls) -> bool:
+        return cls.module is not None and importlib.util.find_spec(cls.module) is not None
+
+    def page_count(self, pdf_path: Path) -> int:
+        raise NotImplementedError
+
+    def iter_pages(self, pdf_path: Path, pages: Optional[Iterable[int]] = None) -> Iterator[Tuple[int, str]]:
+        """Yield (page_index, raw_text) in ascending page order; None means every page"""
+        raise NotImplementedError
+
+    def extract_pages(self, pdf_path: Path, first_page: int = 0,
+                      last_page: Optional[int] = None) -> List[Tuple[int, str]]:
+        """Raw text for pages [first_page, last_page)"""
+        if first_page == 0 and last_page is None:
+            return list(self.iter_pages(pdf_path))
+        count = self.page_count(pdf_path) if last_page is None else None
+        return list(self.iter_pages(pdf_path, page_range(first_page, last_page, count)))
+
+
+class PypdfiumExtractor(PdfExtractor):
+    name = 'pypdfium2'
+    module = 'pypdfium2'
+
+    def page_count(self, pdf_path: Path) -> int:
+        import pypdfium2 as pdfium
+        pdf = pdfium.PdfDocument(str(pdf_path))
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+
+    def iter_pages(self, pdf_path: Path, pages: Optional[Iterable[int]] = None) -> Iterator[Tuple[int, str]]:
+        import pypdfium2 as pdfium
+        pdf = pdfium.PdfDocument(str(pdf_path))
+        try:
+            count = len(pdf)
+            indices = range(count) if pages is None else sorted(i for i in set(pages) if 0 <= i < count)
+            for i in indices:
+                page = pdf[i]
+                try:
+                    textpage = page.get_textpage()
+                    text = textpage.get_text_range()
+                    textpage.close()
+                except Exception:
+                    # Skip unreadable pages but keep the rest of the book
+                    text = ''
+                finally:
+                    page.close()
+                yield i, text
+        finally:
+            pdf.close()
+
+
+class PdfminerExtractor(PdfExtractor):
+    name = 'pdfminer'
+    module = 'pdfminer'
+
+    def page_count(self, pdf_path: Path) -> int:
+        from pdfminer.pdfpage import PDFPage
+        with open(pdf_path, 'rb') as f:
+            return sum(1 for _ in PDFPage.get_pages(f))
+
+    def iter_pages(self, pdf_path: Path, pages: Optional[Iterable[int]] = None) -> Iterator[Tuple[int, str]]:
+        from pdfminer.high_level import extract_pages
+        from pdfminer.layout import LAParams, LTTextContainer
+
+        wanted = None if pages is None else sorted(set(pages))
+        indices = iter(wanted) if wanted is not None else None
+        for n, layout in enumerate(extract_pages(str(pdf_path), page_numbers=wanted, laparams=LAParams())):
+            index = n if indices is None else next(indices)
+            yield index, ''.join(el.get_text() for el in layout if isinstance(el, LTTextContainer))
+
+
+class PdfplumberExtractor(PdfExtractor):
+    name = 'pdfplumber'
+    module = 'pdfplumber'
+
+    def __init__(self, **text_kwargs: Any):
+        # Passed to page.extract_text (e.g. x_tolerance=3, y_tolerance=3, layout=True)
+        self.text_kwargs = text_kwargs
+
+    def page_count(self, pdf_path: Path) -> int:
+        import pdfplumber
+        with pdfplumber.open(pdf_path) as pdf:
+            return len(pdf.pages)
+
+    def iter_pages(self, pdf_path: Path, pages: Optional[Iterable[int]] = None) -> Iterator[Tuple[int, str]]:
+        import pdfplumber
+        with pdfplumber.open(pdf_path) as pdf:
+            count = len(pdf.pages)
+            indices = range(count) if pages is None else sorted(i for i in set(pages) if 0 <= i < count)
+            for i in indices:
+                page = pdf.pages[i]
+                try:
+                    text = page.extract_text(**self.text_kwargs) or ''
+                except Exception:
+                    # Skip unreadable pages but keep the rest of the book
+                    text = ''
+                finally:
+                    # pdfplumber caches parsed objects on the page; drop them as we go
+                    close = getattr(page, 'close', None)
+                    if close:
+                        close()
+                yield i, text
+
+
+class AutoExtractor(PdfExtractor):
+    """Fast backend for every page, pdfplumber only for pages that ``needs_layout``"""
+
+    name = 'auto'
+
+    def __init__(self, fast: Optional[PdfExtractor] = None, fallback: Optional[PdfExtractor] = None,
+                 check: Callable[[str], bool] = needs_layout):
+        if fast is None:
+            fast_name = next((n for n in FAST_BACKENDS if EXTRACTORS[n].available()), None)
+            fast = EXTRACTORS[fast_name]() if fast_name else None
+        self.fast = fast
+        self.fallback = fallback if fallback is not None else PdfplumberExtractor()
+        self.check = check
+        # Pages re-extracted by the fallback since construction
+        self.fallback_pages = 0
+
+    @classmethod
+    def available(cls) -> bool:
+        return any(EXTRACTORS[n].available() for n in FAST_BACKENDS + ('pdfplumber',))
+
+    def page_count(self, pdf_path: Path) -> int:
+        return (self.fast or self.fallback).page_count(pdf_path)
+
+    def iter_pages(self, pdf_path: Path, pages: Optional[Iterable[int]] = None) -> Iterator[Tuple[int, str]]:
+        if self.fast is None:
+            yield from self.fallback.iter_pages(pdf_path, pages)
+            return
+
+        extracted = list(self.fast.iter_pages(pdf_path, pages))
+        redo = [i for i, text in extracted if self.check(text)]
+        if redo:
+            replaced = dict(self.fallback.iter_pages(pdf_path, redo))
+            self.fallback_pages += len(replaced)
+            extracted = [(i, replaced.get(i, text)) for i, text in extracted]
+        yield from extracted
+
+
+EXTRACTORS: Dict[str, type] = {
+    'pypdfium2': PypdfiumExtractor,
+    'pdfminer': PdfminerExtractor,
+    'pdfplumber': PdfplumberExtractor,
+    'auto': AutoExtractor,
+}
+
+
+def available_extractors() -> List[str]:
+    return [name for name, cls in EXTRACTORS.items() if cls.available()]
+
+
+def get_extractor(name: Optional[str] = None, **pdfplumber_kwargs: Any) -> PdfExtractor:
+    """
+    Build an extractor by name (default: ``PDF_EXTRACTOR`` env var, else 'auto').
+    ``pdfplumber_kwargs`` go to pdfplumber's extract_text wherever it is used.
+    """
+    name = (name or os.getenv('PDF_EXTRACTOR') or DEFAULT_EXTRACTOR).lower()
+    if name not in EXTRACTORS:
+        raise ValueError(f"Unknown PDF extractor '{name}' (choose from {', '.join(EXTRACTORS)})")
+    if name == 'pdfplumber':
+        return PdfplumberExtractor(**pdfplumber_kwargs)
+    if name == 'auto':
+        return AutoExtractor(fallback=PdfplumberExtractor(**pdfplumber_kwargs))
+    return EXTRACTORS[name]()
+
+
+def _normalise_words(text: str) -> List[str]:
+    return _WORD_RE.findall((text or '').lower())
+
+
+def _sentence_chunks(text: str, chunk_size: int = 1000) -> List[str]:
+    """Shared sentence packer (no overlap) used when parity_report is not given one"""
+    from services.text_chunker import TextChunker
+    return TextChunker(chunk_size, 0).chunk_text(text)
+
+
+def parity_report(pdf_path: Path, reference: PdfExtractor, candidate: PdfExtractor,
+                  pages: Optional[Sequence[int]] = None,
+                  chunker: Optional[Callable[[str], List[str]]] = None,
+                  threshold: float = 0.9) -> Dict[str, Any]:
+    """
+    Compare two extractors on one PDF.
+
+    Text similarity is a difflib ratio over lower-cased word sequences per page;
+    chunk-boundary agreement is the share of reference chunks (from ``chunker``,
+    applied per page) whose first five words also start a candidate chunk.
+    Pages below ``threshold`` similarity are listed (1-based) for inspection.
+    """
+    chunker = chunker or _sentence_chunks
+    timings = {}
+    texts = {}
+    for label, extractor in (('reference', reference), ('candidate', candidate)):
+        started = time.perf_counter()
+        texts[label] = dict(extractor.iter_pages(pdf_path, pages))
+        timings[label] = time.perf_counter() - started
+
+    similarities = []
+    divergent = []
+    ref_starts = cand_starts = matched_starts = 0
+    for index in sorted(set(texts['reference']) | set(texts['candidate'])):
+        ref_text = texts['reference'].get(index, '')
+        cand_text = texts['candidate'].get(index, '')
+        ratio = difflib.SequenceMatcher(
+            None, _normalise_words(ref_text), _normalise_words(cand_text), autojunk=False
+        ).ratio() if (ref_text.strip() or cand_text.strip()) else 1.0
+        similarities.append(ratio)
+        if ratio < threshold:
+            divergent.append({'page': index + 1, 'similarity': round(ratio, 3)})
+
+        ref_heads = {tuple(_normalise_words(c)[:5]) for c in chunker(ref_text)}
+        cand_heads = {tuple(_normalise_words(c)[:5]) for c in chunker(cand_text)}
+        ref_starts += len(ref_heads)
+        cand_starts += len(cand_heads)
+        matched_starts += len(ref_heads & cand_heads)
+
+    page_total = len(similarities)
+    return {
+        'pdf': str(pdf_path),
+        'reference': reference.name,
+        'candidate': candidate.name,
+        'pages': page_total,
+        'mean_similarity': sum(similarities) / page_total if page_total else 1.0,
+        'min_similarity': min(similarities) if similarities else 1.0,
+        'divergent_pages': divergent,
+        'chunks': {'reference': ref_starts, 'candidate': cand_starts},
+        'chunk_boundary_agreement': matched_starts / ref_starts if ref_starts else 1.0,
+        'seconds': timings,
+        'speedup': timings['reference'] / timings['candidate'] if timings['candidate'] else None,
+        'fallback_pages': getattr(candidate, 'fallback_pages', 0),
+    }
+
+
+def main() -> int:
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description='PDF extractor backends')
+    sub = parser.add_subparsers(dest='command')
+
+    sub.add_parser('list', help='Show installed extractor backends')
+
+    parity = sub.add_parser('parity', help='Compare two backends on PDFs (text + chunk boundaries)')
+    parity.add_argument('pdfs', nargs='+', help='PDF files to compare')
+    parity.add_argument('--reference', default='pdfplumber', choices=list(EXTRACTORS))
+    parity.add_argument('--candidate', default='auto', choices=list(EXTRACTORS))
+    parity.add_argument('--pages', type=int, default=None, help='Only compare the first N pages')
+    parity.add_argument('--threshold', type=float, default=0.9, help='Flag pages below this similarity')
+
+    args = parser.parse_args()
+    if args.command == 'list':
+        for name in EXTRACTORS:
+            print(f"{'✅' if EXTRACTORS[name].available() else '❌'} {name}")
+        return 0
+    if args.command != 'parity':
+        parser.print_help()
+        return 1
+
+    worst = 1.0
+    for pdf in map(Path, args.pdfs):
+        pages = range(args.pages) if args.pages else None
+        report = parity_report(pdf, get_extractor(args.reference), get_extractor(args.candidate),
+                               pages=pages, threshold=args.threshold)
+        worst = min(worst, report['mean_similarity'])
+        print(json.dumps(report, indent=2))
+    return 0 if worst >= args.threshold else 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,7 +5,9 @@ Per-campaign playing character resolution and storyteller checks.
 from __future__ import annotations
 
 import os
-from typing import Any, Optional
+from typing import Any, Dict, Iterable, Optional
+
+from services.campaign_acl import get_campaign_access
 
 
 def _is_active_char_sql(alias: str = "ch") -> str:
@@ -93,6 +95,98 @@ def effective_playing_character_id(
     return None
 
 
+def effective_playing_characters(
+    cursor: Any,
+    user_id: int,
+    campaign_ids: Optional[Iterable[int]] = None,
+    backfill: bool = True,
+) -> Dict[int, Dict[str, Any]]:
+    """
+    ``effective_playing_character_id`` for every campaign at once (one query).
+
+    Active characters of the user are ranked per campaign: the roster pick
+    (campaign_players.active_character_id), then users.active_character_id,
+    then the lowest id; a lone active character wins either way. Campaigns
+    where the user has no active character are absent from the result.
+
+    Args:
+        campaign_ids: Only these campaigns (default: all of the user's)
+        backfill: Store a lone character as the roster default, like the
+            single-campaign resolver does (one UPDATE for all campaigns)
+
+    Returns:
+        campaign_id -> {'id', 'name', 'portrait_url'}
+    """
+    ichar = _is_active_char_sql("ch")
+    params: list = [user_id]
+    only = ""
+    if campaign_ids is not None:
+        ids = sorted({int(cid) for cid in campaign_ids})
+        if not ids:
+            return {}
+        only = f"AND ch.campaign_id IN ({', '.join(['%s'] * len(ids))})"
+        params.extend(ids)
+
+    cursor.execute(
+        f"""
+        SELECT campaign_id, id, name, portrait_url, on_roster, roster_pick, active_count
+        FROM (
+            SELECT ch.campaign_id, ch.id, ch.name, ch.portrait_url,
+                   cp.user_id AS on_roster,
+                   cp.active_character_id AS roster_pick,
+                   COUNT(*) OVER (PARTITION BY ch.campaign_id) AS active_count,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY ch.campaign_id
+                       ORDER BY
+                           CASE WHEN ch.id = cp.active_character_id THEN 0 ELSE 1 END,
+                           CASE WHEN ch.id = u.active_character_id THEN 0 ELSE 1 END,
+                           ch.id
+                   ) AS pick
+            FROM characters ch
+            LEFT JOIN campaign_players cp
+                ON cp.campaign_id = ch.campaign_id AND cp.user_id = ch.user_id
+            LEFT JOIN users u ON u.id = ch.user_id
+            WHERE ch.user_id = %s AND {ichar} {only}
+        ) ranked
+        WHERE pick = 1
+        """,
+        tuple(params),
+    )
+    out: Dict[int, Dict[str, Any]] = {}
+    lone = []
+    for row in cursor.fetchall():
+        campaign_id = int(row["campaign_id"])
+        out[campaign_id] = {
+            "id": int(row["id"]),
+            "name": row.get("name"),
+            "portrait_url": row.get("portrait_url"),
+        }
+        if (
+            int(row["active_count"]) == 1
+            and row.get("on_roster") is not None
+            and row.get("roster_pick") is None
+        ):
+            lone.append(campaign_id)
+
+    if backfill and lone:
+        cursor.execute(
+            f"""
+            UPDATE campaign_players
+            SET active_character_id = (
+                SELECT MIN(ch.id) FROM characters ch
+                WHERE ch.user_id = campaign_players.user_id
+                  AND ch.campaign_id = campaign_players.campaign_id
+                  AND {ichar}
+                HAVING COUNT(*) = 1
+            )
+            WHERE user_id = %s AND active_character_id IS NULL
+              AND campaign_id IN ({', '.join(['%s'] * len(lone))})
+            """,
+            (user_id, *lone),
+        )
+    return out
+
+
 def is_site_staff_role(role: Optional[str]) -> bool:
     return role in ("admin", "helper")
 
@@ -100,16 +194,6 @@ def is_site_staff_role(role: Optional[str]) -> bool:
 def is_campaign_storyteller_or_staff(
     cursor: Any, user_id: int, campaign_id: int
 ) -> bool:
-    """Campaign creator or site admin/helper."""
-    cursor.execute("SELECT role FROM users WHERE id = %s", (user_id,))
-    ur = cursor.fetchone()
-    if not ur:
-        return False
-    role = ur.get("role")
-    if is_site_staff_role(role):
-        return True
-    cursor.execute("SELECT created_by FROM campaigns WHERE id = %s", (campaign_id,))
-    crow = cursor.fetchone()
-    if not crow or crow.get("created_by") is None:
-        return False
-    return str(crow["created_by"]) == str(user_id)
+    """Campaign creator or site admin/helper (cached per user and campaign)."""
+    access = get_campaign_access(cursor, user_id, campaign_id)
+    return access.is_site_staff or access.is_storyteller
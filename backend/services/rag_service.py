@@ -8,37 +8,103 @@ import os
 import json
 import logging
 import hashlib
+import threading
 import time
+from pathlib import Path
 from typing import Dict, Any, List, Optional
 from datetime import datetime
-import chromadb
-from chromadb.config import Settings
 import requests
 
+from services.rule_book_index import RuleBookIndex, reciprocal_rank_fusion
+from services.tracing import trace_collection
+
 logger = logging.getLogger(__name__)
 
+# How often (seconds) the lexical rule-book index is checked against its campaign scope.
+RULE_BOOK_INDEX_REFRESH_SECONDS = 300
+# Candidates pulled from each retriever before fusion, as a multiple of the requested chunks.
+HYBRID_CANDIDATE_FACTOR = 4
+# 'chromadb' (HTTP server) or 'local' (embedded store, see vector_store.py)
+VECTOR_STORE_BACKENDS = ('chromadb', 'local')
+
 class RAGService:
     """Retrieval-Augmented Generation service for campaign memory"""
     
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], client=None):
         self.config = config
         self.chroma_host = config.get('CHROMADB_HOST', 'localhost')
         self.chroma_port = config.get('CHROMADB_PORT', 8000)
+        self.vector_store = (config.get('VECTOR_STORE') or os.environ.get('VECTOR_STORE') or 'chromadb').lower()
+        if self.vector_store not in VECTOR_STORE_BACKENDS:
+            raise ValueError(f"Unknown VECTOR_STORE {self.vector_store!r}; expected one of {VECTOR_STORE_BACKENDS}")
+        
+        if client is not None:
+            self.client = client
+        elif self.vector_store == 'local':
+            from services.vector_store import LocalVectorClient, OpenAIEmbeddingFunction
+            store_dir = (
+                config.get('VECTOR_STORE_DIR')
+                or os.environ.get('VECTOR_STORE_DIR')
+                or os.path.join(config.get('BOOKS_DIR') or os.environ.get('BOOKS_DIR') or 'books', 'processed', 'vectors')
+            )
+            # Query/document embeddings: an OpenAI-compatible endpoint when configured,
+            # otherwise the same local model ChromaDB's client would use
+            embedding_url = config.get('VECTOR_STORE_EMBEDDING_URL') or os.environ.get('VECTOR_STORE_EMBEDDING_URL')
+            embedding_function = None
+            if embedding_url:
+                embedding_function = OpenAIEmbeddingFunction(
+                    embedding_url,
+                    config.get('VECTOR_STORE_EMBEDDING_MODEL') or os.environ.get('VECTOR_STORE_EMBEDDING_MODEL')
+                    or 'nomic-embed-text-v1.5'
+                )
+            self.client = LocalVectorClient(store_dir, embedding_function=embedding_function)
+            logger.info(f"✅ Using embedded vector store at {store_dir}")
+        else:
+            self.client = self._connect_chromadb()
+        
+        # Collection names for different types of memory
+        self.collections = {
+            'campaigns': 'campaign_memory',
+            'characters': 'character_memory', 
+            'world': 'world_memory',
+            'sessions': 'session_memory',
+            'rules': 'rules_memory',
+            'rule_books': 'rule_books'
+        }
+        
+        # Initialize collections
+        self._initialize_collections()
         
-        # Initialize ChromaDB client with retry logic
-        max_retries = 10
+        # BM25 index over the rule_books collection (one segment per campaign scope)
+        index_dir = (
+            config.get('RULE_BOOK_INDEX_DIR')
+            or os.environ.get('RULE_BOOK_INDEX_DIR')
+            or os.path.join(config.get('BOOKS_DIR') or os.environ.get('BOOKS_DIR') or 'books', 'processed', 'index')
+        )
+        self.rule_book_index = RuleBookIndex(Path(index_dir))
+        self._rule_book_index_checked: Dict[str, float] = {}
+        self._rule_book_index_building: set = set()
+        self._rule_book_index_lock = threading.Lock()
+        
+        logger.info(f"RAG Service initialized with {self.vector_store} vector store")
+    
+    def _connect_chromadb(self):
+        """Connect to the ChromaDB server, retrying while it starts up"""
+        import chromadb
+        
+        max_retries = max(1, int(self.config.get('CHROMADB_CONNECT_RETRIES') or 10))
         retry_delay = 2
         last_error = None
         
         for attempt in range(max_retries):
             try:
                 # Try to connect with minimal settings
-                self.client = chromadb.HttpClient(
+                client = chromadb.HttpClient(
                     host=self.chroma_host,
                     port=self.chroma_port
                 )
                 logger.info(f"✅ Connected to ChromaDB at {self.chroma_host}:{self.chroma_port}")
-                break
+                return client
             except Exception as e:
                 last_error = e
                 if attempt < max_retries - 1:
@@ -47,21 +113,6 @@ class RAGService:
                 else:
                     logger.error(f"Failed to connect to ChromaDB after {max_retries} attempts: {e}")
                     raise RuntimeError(f"Could not connect to ChromaDB at {self.chroma_host}:{self.chroma_port}") from last_error
-        
-        # Collection names for different types of memory
-        self.collections = {
-            'campaigns': 'campaign_memory',
-            'characters': 'character_memory', 
-            'world': 'world_memory',
-            'sessions': 'session_memory',
-            'rules': 'rules_memory',
-            'rule_books': 'rule_books'
-        }
-        
-        # Initialize collections
-        self._initialize_collections()
-        
-        logger.info("RAG Service initialized with ChromaDB")
     
     def _initialize_collections(self):
         """Initialize all required collections"""
@@ -81,7 +132,7 @@ class RAGService:
     def _get_collection(self, memory_type: str):
         """Get collection by memory type"""
         collection_name = self.collections.get(memory_type, 'campaign_memory')
-        return self.client.get_collection(collection_name)
+        return trace_collection(self.client.get_collection(collection_name))
     
     def _generate_id(self, content: str, context: Dict[str, Any]) -> str:
         """Generate unique ID for memory entry"""
@@ -325,48 +376,212 @@ class RAGService:
         
         return context
     
-    def get_rule_book_context(self, query: str, campaign_id: int, n_results: int = 5) -> List[Dict[str, Any]]:
+    def _rule_book_segment_name(self, campaign_id: int) -> str:
+        return f"chroma_rule_books_campaign_{campaign_id}"
+    
+    @staticmethod
+    def _rule_book_pages(collection, campaign_id: int, include: List[str], page_size: int = 1000):
+        """Yield get() pages of one campaign scope of the rule_books collection"""
+        offset = 0
+        while True:
+            page = collection.get(
+                where={"campaign_id": campaign_id},
+                include=include,
+                limit=page_size,
+                offset=offset
+            )
+            ids = page.get('ids') or []
+            if not ids:
+                return
+            yield page
+            offset += len(ids)
+            if len(ids) < page_size:
+                return
+    
+    @staticmethod
+    def _rule_book_scope_version(entries: List[tuple]) -> str:
+        """
+        Digest of (id, content marker) pairs for one scope. The marker is the chunk's
+        text_hash, else the book's processed_at, so re-imports that keep the ids
+        (positional chunk ids) still change the version.
+        """
+        digest = hashlib.sha1()
+        for doc_id, marker in sorted(entries):
+            digest.update(f"{doc_id}\0{marker}\n".encode('utf-8'))
+        return digest.hexdigest()
+    
+    @staticmethod
+    def _rule_book_marker(metadata: Optional[Dict[str, Any]]) -> str:
+        metadata = metadata or {}
+        return str(metadata.get('text_hash') or metadata.get('processed_at') or '')
+    
+    def _rule_book_scope_current(self, collection, campaign_id: int, page_size: int = 1000) -> str:
+        """Content version of one campaign scope as stored now (ids and metadata only)"""
+        entries = []
+        for page in self._rule_book_pages(collection, campaign_id, ['metadatas'], page_size):
+            metadatas = page.get('metadatas') or [None] * len(page['ids'])
+            entries.extend((doc_id, self._rule_book_marker(meta)) for doc_id, meta in zip(page['ids'], metadatas))
+        return self._rule_book_scope_version(entries)
+    
+    def _refresh_rule_book_index(self, campaign_id: int, page_size: int = 1000):
+        """Rebuild the BM25 segment for one campaign scope if its content version changed"""
+        name = self._rule_book_segment_name(campaign_id)
+        try:
+            collection = self._get_collection('rule_books')
+            meta = self.rule_book_index.segment_meta(name)
+            if meta is not None and \
+                    meta.get('scope_version') == self._rule_book_scope_current(collection, campaign_id, page_size):
+                return
+            docs = []
+            entries = []
+            for page in self._rule_book_pages(collection, campaign_id, ['documents', 'metadatas'], page_size):
+                ids = page['ids']
+                metadatas = page.get('metadatas') or [None] * len(ids)
+                docs.extend(zip(ids, page.get('documents') or [''] * len(ids)))
+                entries.extend((doc_id, self._rule_book_marker(meta)) for doc_id, meta in zip(ids, metadatas))
+            # The version of exactly what was indexed: a change racing the rebuild
+            # is picked up by the next check
+            count = self.rule_book_index.add_segment(
+                name,
+                ((doc_id, doc or '') for doc_id, doc in docs),
+                meta={
+                    'scope_count': len(entries),
+                    'scope_version': self._rule_book_scope_version(entries),
+                    'campaign_id': campaign_id
+                }
+            )
+            logger.info(f"Rebuilt rule book keyword index for campaign {campaign_id}: {count} chunks")
+        except Exception as e:
+            logger.error(f"Error refreshing rule book keyword index for campaign {campaign_id}: {e}")
+        finally:
+            with self._rule_book_index_lock:
+                self._rule_book_index_building.discard(name)
+    
+    def _ensure_rule_book_index(self, campaign_id: int) -> Optional[str]:
+        """
+        Return the BM25 segment name for this campaign scope if one is available.
+        At most every RULE_BOOK_INDEX_REFRESH_SECONDS a background check compares
+        the segment's scope version (ids plus content markers of this campaign's
+        chunks only) with the collection and rebuilds the segment when they differ,
+        so a query never waits for indexing (it falls back to vector-only instead).
+        """
+        name = self._rule_book_segment_name(campaign_id)
+        now = time.monotonic()
+        with self._rule_book_index_lock:
+            last = self._rule_book_index_checked.get(name)
+            due = last is None or now - last >= RULE_BOOK_INDEX_REFRESH_SECONDS
+            if due:
+                self._rule_book_index_checked[name] = now
+        
+        if due:
+            with self._rule_book_index_lock:
+                start = name not in self._rule_book_index_building
+                if start:
+                    self._rule_book_index_building.add(name)
+            if start:
+                threading.Thread(
+                    target=self._refresh_rule_book_index,
+                    args=(campaign_id,),
+                    name=f"rule-book-index-{campaign_id}",
+                    daemon=True
+                ).start()
+        
+        return name if self.rule_book_index.has_segment(name) else None
+    
+    def get_rule_book_context(self, query: str, campaign_id: int, n_results: int = 3,
+                              hybrid: bool = True) -> List[Dict[str, Any]]:
         """
-        Get relevant context from official rule books using semantic search.
+        Get relevant context from official rule books.
+        
+        Runs the Chroma vector query and a BM25 keyword search over the same
+        chunks, then merges both rankings with reciprocal-rank fusion so exact
+        rule terms ("Frenzy", "difficulty 8", discipline names) are not lost.
         
         Args:
             query: The query to search for
             campaign_id: Campaign ID to filter by
             n_results: Number of chunks to retrieve
+            hybrid: Set False for vector-only retrieval
             
         Returns:
             List of relevant rule book chunks with metadata
         """
         try:
             collection = self._get_collection('rule_books')
+            candidates = max(n_results * HYBRID_CANDIDATE_FACTOR, n_results) if hybrid else n_results
             
             # Query the rule books collection
             results = collection.query(
                 query_texts=[query],
-                n_results=n_results,
+                n_results=candidates,
                 where={"campaign_id": campaign_id},
                 include=['documents', 'metadatas', 'distances']
             )
             
-            rule_book_context = []
+            vector_hits: Dict[str, Dict[str, Any]] = {}
+            vector_ranking: List[str] = []
             if results['documents'] and results['documents'][0]:
+                ids = results['ids'][0] if results.get('ids') else [str(i) for i in range(len(results['documents'][0]))]
                 for i, doc in enumerate(results['documents'][0]):
-                    chunk = {
+                    distance = results['distances'][0][i] if results['distances'] else 0.0
+                    vector_hits[ids[i]] = {
                         'content': doc,
                         'metadata': results['metadatas'][0][i] if results['metadatas'] else {},
-                        'distance': results['distances'][0][i] if results['distances'] else 0.0,
-                        'relevance': 1 - (results['distances'][0][i] if results['distances'] else 0.0)
+                        'distance': distance,
+                        'relevance': 1 - distance
                     }
-                    rule_book_context.append(chunk)
+                    vector_ranking.append(ids[i])
+            
+            lexical_scores: Dict[str, float] = {}
+            lexical_ranking: List[str] = []
+            if hybrid:
+                try:
+                    segment = self._ensure_rule_book_index(campaign_id)
+                    if segment:
+                        for _, doc_id, score in self.rule_book_index.search(query, segments=[segment], limit=candidates):
+                            lexical_scores[doc_id] = score
+                            lexical_ranking.append(doc_id)
+                except Exception as e:
+                    logger.warning(f"Rule book keyword search unavailable, using vector only: {e}")
+            
+            fused = reciprocal_rank_fusion([vector_ranking, lexical_ranking])[:n_results]
+            
+            # Fetch chunks that only the keyword search found
+            missing = [doc_id for doc_id, _ in fused if doc_id not in vector_hits]
+            lexical_only: Dict[str, Dict[str, Any]] = {}
+            if missing:
+                got = collection.get(ids=missing, include=['documents', 'metadatas'])
+                top_lexical = max(lexical_scores.values()) if lexical_scores else 1.0
+                for i, doc_id in enumerate(got.get('ids') or []):
+                    lexical_only[doc_id] = {
+                        'content': got['documents'][i] if got.get('documents') else '',
+                        'metadata': got['metadatas'][i] if got.get('metadatas') else {},
+                        'distance': None,
+                        'relevance': lexical_scores.get(doc_id, 0.0) / top_lexical
+                    }
+            
+            rule_book_context = []
+            for doc_id, fusion_score in fused:
+                chunk = vector_hits.get(doc_id) or lexical_only.get(doc_id)
+                if not chunk:
+                    continue
+                in_vector = doc_id in vector_hits
+                in_lexical = doc_id in lexical_scores
+                chunk['fusion_score'] = fusion_score
+                chunk['retrieval'] = 'hybrid' if in_vector and in_lexical else ('vector' if in_vector else 'keyword')
+                rule_book_context.append(chunk)
             
-            logger.info(f"Retrieved {len(rule_book_context)} rule book chunks for query: {query[:50]}...")
+            logger.info(
+                f"Retrieved {len(rule_book_context)} rule book chunks for query: {query[:50]}... "
+                f"(vector {len(vector_ranking)}, keyword {len(lexical_ranking)} candidates)"
+            )
             return rule_book_context
             
         except Exception as e:
             logger.error(f"Error retrieving rule book context: {e}")
             return []
     
-    def augment_prompt(self, prompt: str, campaign_id: int, user_id: int = None, include_rule_books: bool = True, n_rule_book_chunks: int = 5) -> str:
+    def augment_prompt(self, prompt: str, campaign_id: int, user_id: int = None, include_rule_books: bool = True, n_rule_book_chunks: int = 3) -> str:
         """Augment prompt with relevant context from memory"""
         # Get campaign context
         context = self.get_campaign_context(campaign_id, prompt)
@@ -440,13 +655,14 @@ class RAGService:
     def get_system_status(self) -> Dict[str, Any]:
         """Get RAG system status"""
         status = {
+            'vector_store': self.vector_store,
             'chromadb_connected': False,
             'collections': {},
             'total_memories': 0
         }
         
         try:
-            # Test ChromaDB connection
+            # Test the vector store (ChromaDB server or embedded store)
             self.client.heartbeat()
             status['chromadb_connected'] = True
             
@@ -474,3 +690,46 @@ class RAGService:
 def create_rag_service(config: Dict[str, Any]) -> RAGService:
     """Create and initialize RAG service"""
     return RAGService(config)
+
+
+# Global RAG service instance (routes that only read/write memories share it)
+_rag_service = None
+_rag_service_lock = threading.Lock()
+# Last failed creation (monotonic time, error): request paths fail fast until it expires
+_rag_service_failure = None
+RAG_SERVICE_RETRY_SECONDS = 30
+
+def get_rag_service() -> RAGService:
+    """
+    Get or create the process-wide RAG service from the Flask app config
+
+    Request paths must not wait out ChromaDB's startup retries, so the service is
+    created with a single connection attempt; a failure is remembered and re-raised
+    without touching the lock or the network for RAG_SERVICE_RETRY_SECONDS.
+    """
+    global _rag_service, _rag_service_failure
+    if _rag_service is not None:
+        return _rag_service
+    failure = _rag_service_failure
+    if failure is not None and time.monotonic() - failure[0] < RAG_SERVICE_RETRY_SECONDS:
+        raise RuntimeError(f"RAG service unavailable (retrying in {RAG_SERVICE_RETRY_SECONDS}s): {failure[1]}")
+    with _rag_service_lock:
+        if _rag_service is not None:
+            return _rag_service
+        failure = _rag_service_failure
+        if failure is not None and time.monotonic() - failure[0] < RAG_SERVICE_RETRY_SECONDS:
+            raise RuntimeError(f"RAG service unavailable (retrying in {RAG_SERVICE_RETRY_SECONDS}s): {failure[1]}")
+        try:
+            from flask import current_app
+            config = dict(current_app.config)
+        except (ImportError, RuntimeError):
+            from config import Config
+            config = {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+        config['CHROMADB_CONNECT_RETRIES'] = 1
+        try:
+            _rag_service = create_rag_service(config)
+        except Exception as e:
+            _rag_service_failure = (time.monotonic(), e)
+            raise
+        _rag_service_failure = None
+    return _rag_service
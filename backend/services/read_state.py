@@ -0,0 +1,301 @@
+"""
+Per-character read markers (``location_reads``) summarised for a whole campaign.
+
+``unread_summary`` answers the chat sidebar in one statement: for every active
+room of the campaign it joins the character's read marker and, via two LATERAL
+lookups on the partial index ``idx_messages_location_visible``, the first
+unread message and a capped unread count. Dice animation placeholders are not
+counted, as in the per-location read-state route.
+
+Read progress reported by clients goes through ``markers`` (``ReadMarkerBuffer``):
+the latest marker per (character, location) is kept in memory, only ever moves
+forward, and is written every READ_STATE_FLUSH_SECONDS as one batched upsert per
+chunk (and at exit). The upsert itself refuses to move a stored marker backwards,
+so several workers flushing in any order stay monotonic. Until a flush, this
+worker's reads overlay the pending markers; other workers catch up within the
+flush interval.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+# Counting stops here; the client shows "999+"
+UNREAD_COUNT_CAP = 999
+READ_STATE_FLUSH_SECONDS = float(os.environ.get("READ_STATE_FLUSH_SECONDS") or 5)
+FLUSH_CHUNK = 500
+
+# (last_read_message_id, last_read_at)
+Marker = Tuple[int, Any]
+
+READ_MARKERS = metrics.counter(
+    "shadowrealms_read_markers_total",
+    "Read markers reported by clients and written to location_reads",
+    ("stage",),
+)
+
+_VISIBLE_SQL = "COALESCE(m.ai_message_kind, '') NOT LIKE 'dice_animation%%'"
+
+
+def ensure_read_state_indexes(cursor) -> None:
+    """(location_id, id) over countable messages, so unread lookups are index-only range scans"""
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_messages_location_visible
+        ON messages (location_id, id)
+        WHERE COALESCE(ai_message_kind, '') NOT LIKE 'dice_animation%'
+        """
+    )
+
+
+def unread_summary(
+    cursor,
+    campaign_id: int,
+    character_id: int,
+    include_closed: bool = False,
+    pending: Optional[Dict[int, Marker]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Read marker, first unread message and unread count per active room (PostgreSQL)
+
+    Args:
+        include_closed: Also list rooms closed to players (storyteller / staff)
+        pending: location_id -> marker not flushed yet (``markers.pending_for``)
+    """
+    closed = "" if include_closed else "AND l.is_open IS NOT FALSE"
+    pending = pending or {}
+    pending_ids = sorted(pending)
+    read_upto = "GREATEST(COALESCE(lr.last_read_message_id, 0), COALESCE(p.message_id, 0))"
+    cursor.execute(
+        f"""
+        SELECT l.id AS location_id,
+               l.is_open,
+               lr.last_read_message_id,
+               lr.last_read_at,
+               first_unread.id AS first_unread_message_id,
+               first_unread.created_at AS first_unread_at,
+               latest.id AS last_message_id,
+               unread.unread_count
+        FROM locations l
+        LEFT JOIN location_reads lr
+            ON lr.location_id = l.id AND lr.character_id = %s
+        LEFT JOIN UNNEST(%s::int[], %s::int[]) AS p(location_id, message_id)
+            ON p.location_id = l.id
+        LEFT JOIN LATERAL (
+            SELECT m.id, m.created_at FROM messages m
+            WHERE m.location_id = l.id AND m.campaign_id = l.campaign_id
+              AND m.id > {read_upto}
+              AND {_VISIBLE_SQL}
+            ORDER BY m.id ASC
+            LIMIT 1
+        ) first_unread ON TRUE
+        LEFT JOIN LATERAL (
+            SELECT m.id FROM messages m
+            WHERE m.location_id = l.id AND m.campaign_id = l.campaign_id
+              AND {_VISIBLE_SQL}
+            ORDER BY m.id DESC
+            LIMIT 1
+        ) latest ON TRUE
+        LEFT JOIN LATERAL (
+            SELECT COUNT(*) AS unread_count FROM (
+                SELECT 1 FROM messages m
+                WHERE m.location_id = l.id AND m.campaign_id = l.campaign_id
+                  AND m.id > {read_upto}
+                  AND {_VISIBLE_SQL}
+                LIMIT %s
+            ) capped
+        ) unread ON TRUE
+        WHERE l.campaign_id = %s AND l.is_active = TRUE {closed}
+        ORDER BY l.id
+        """,
+        (
+            character_id,
+            pending_ids,
+            [pending[lid][0] for lid in pending_ids],
+            UNREAD_COUNT_CAP + 1,
+            campaign_id,
+        ),
+    )
+    out = []
+    for row in cursor.fetchall():
+        count = int(row.get("unread_count") or 0)
+        last_read = merge_marker(
+            (row.get("last_read_message_id"), row.get("last_read_at")),
+            pending.get(row["location_id"]),
+        )
+        out.append({
+            "location_id": row["location_id"],
+            "is_open": row.get("is_open") is not False,
+            "last_read_message_id": last_read[0],
+            "last_read_at": last_read[1],
+            "first_unread_message_id": row.get("first_unread_message_id"),
+            "first_unread_at": row.get("first_unread_at"),
+            "last_message_id": row.get("last_message_id"),
+            "unread_count": min(count, UNREAD_COUNT_CAP),
+            "unread_count_capped": count > UNREAD_COUNT_CAP,
+        })
+    return out
+
+
+def merge_marker(stored: Optional[Marker], pending: Optional[Marker]) -> Marker:
+    """The further of a stored and a pending marker ((None, None) when neither)"""
+    if not pending or pending[0] is None:
+        return stored if stored else (None, None)
+    if not stored or stored[0] is None or pending[0] > stored[0]:
+        return pending
+    return stored
+
+
+def write_markers(cursor, rows: Iterable[Tuple[int, int, int, Any]]) -> int:
+    """
+    Upsert (character_id, location_id, message_id, read_at) rows in chunks
+
+    A stored marker is only replaced by a later message; rows whose character
+    or room was deleted meanwhile are skipped. Returns rows sent.
+    """
+    rows = list(rows)
+    now = datetime.now()
+    for start in range(0, len(rows), FLUSH_CHUNK):
+        chunk = rows[start:start + FLUSH_CHUNK]
+        values = ", ".join(["(%s, %s, %s, %s::timestamp)"] * len(chunk))
+        params = [value for row in chunk for value in row]
+        cursor.execute(
+            f"""
+            INSERT INTO location_reads (character_id, location_id, last_read_message_id, last_read_at, updated_at)
+            SELECT v.character_id, v.location_id, v.message_id, v.read_at, %s
+            FROM (VALUES {values}) AS v(character_id, location_id, message_id, read_at)
+            JOIN characters ch ON ch.id = v.character_id
+            JOIN locations l ON l.id = v.location_id
+            ON CONFLICT (character_id, location_id) DO UPDATE SET
+                last_read_message_id = EXCLUDED.last_read_message_id,
+                last_read_at = EXCLUDED.last_read_at,
+                updated_at = EXCLUDED.updated_at
+            WHERE location_reads.last_read_message_id IS NULL
+               OR location_reads.last_read_message_id < EXCLUDED.last_read_message_id
+            """,
+            [now] + params,
+        )
+    READ_MARKERS.labels("written").inc(len(rows))
+    return len(rows)
+
+
+class ReadMarkerBuffer:
+    """Latest unflushed read marker per (character_id, location_id), flushed in batches"""
+
+    def __init__(self, flush_seconds: float = READ_STATE_FLUSH_SECONDS):
+        self.flush_seconds = flush_seconds
+        self._dirty: Dict[Tuple[int, int], Marker] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._atexit_registered = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.flush_seconds > 0
+
+    def record(self, character_id: int, location_id: int, message_id: int, read_at: Any) -> Marker:
+        """Keep the marker unless an equal or later one is pending; returns the pending marker"""
+        key = (int(character_id), int(location_id))
+        READ_MARKERS.labels("reported").inc()
+        with self._lock:
+            marker = merge_marker(self._dirty.get(key), (int(message_id), read_at))
+            self._dirty[key] = marker
+        self._ensure_flusher()
+        return marker
+
+    def pending(self, character_id: int, location_id: int) -> Optional[Marker]:
+        with self._lock:
+            return self._dirty.get((int(character_id), int(location_id)))
+
+    def pending_for(self, character_id: int) -> Dict[int, Marker]:
+        """location_id -> pending marker for one character"""
+        character_id = int(character_id)
+        with self._lock:
+            return {lid: marker for (cid, lid), marker in self._dirty.items() if cid == character_id}
+
+    def __len__(self) -> int:
+        return len(self._dirty)
+
+    def flush(self, conn=None) -> int:
+        """Write every pending marker (own connection unless one is given); returns rows written"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._dirty = self._dirty, {}
+            if not batch:
+                return 0
+            own = conn is None
+            if own:
+                from database import get_db
+
+                conn = get_db()
+            try:
+                cursor = conn.cursor()
+                written = write_markers(
+                    cursor,
+                    [(cid, lid, marker[0], marker[1]) for (cid, lid), marker in sorted(batch.items())],
+                )
+                conn.commit()
+                return written
+            except Exception:
+                conn.rollback()
+                with self._lock:
+                    for key, marker in batch.items():
+                        self._dirty[key] = merge_marker(marker, self._dirty.get(key))
+                raise
+            finally:
+                if own:
+                    conn.close()
+
+    def _ensure_flusher(self) -> None:
+        # Lazily, per process: threads do not survive a pre-fork server's fork
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="read-state-flush", daemon=True)
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.stop)
+                self._atexit_registered = True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_seconds):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"read-state flush failed ({len(self)} markers kept for retry): {e}")
+
+    def stop(self) -> None:
+        """Stop the flusher and write what is left (atexit)"""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and thread is not threading.current_thread():
+            thread.join(timeout=self.flush_seconds + 5)
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"read-state flush at shutdown failed, {len(self)} markers lost: {e}")
+
+
+markers = ReadMarkerBuffer()
+
+metrics.gauge_callback(
+    "shadowrealms_read_markers_pending",
+    "Read markers waiting for the next location_reads flush",
+    lambda: len(markers),
+)
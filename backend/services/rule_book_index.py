@@ -0,0 +1,292 @@
+"""
+Persistent BM25 inverted index for rule-book chunks.
+
+One segment file per book (``<index_dir>/<segment>.bm25``) so that reprocessing a
+book only rewrites its own segment.  Names outside ``[A-Za-z0-9_.-]`` are
+sanitised and suffixed with ``~`` plus a hash of the raw name, which the header
+keeps, so two names never share a file.  A segment holds a small JSON header (doc keys,
+term dictionary with postings offsets) followed by packed ``uint32`` doc ids,
+``uint16`` term frequencies and ``uint32`` doc lengths.  Segments are memory-mapped
+once per process and shared by every ``RuleBookIndex`` pointing at the same
+directory, so a keyword lookup touches only the postings of the query terms.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+from array import array
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from services import metrics
+
+SEGMENT_SUFFIX = ".bm25"
+_MAGIC = b"SRBM25\x01\x00"
+_HEADER = struct.Struct("<8sI")
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_UNSAFE_NAME_RE = re.compile(r"[^A-Za-z0-9_.-]+")
+_TF_MAX = 0xFFFF
+
+_segment_cache: Dict[str, Tuple[Tuple[int, int, int], "_Segment"]] = {}
+_segment_cache_lock = threading.Lock()
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case alphanumeric terms; digits are kept so ``difficulty 8`` matches."""
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+class _Segment:
+    """Read-only view over one memory-mapped segment file."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, header_len = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"Not a BM25 segment: {path}")
+        start = _HEADER.size
+        header = json.loads(self._mm[start:start + header_len].decode("utf-8"))
+        self.doc_keys: List[str] = header["doc_keys"]
+        self.doc_count = len(self.doc_keys)
+        self.total_length = int(header["total_length"])
+        self.terms: Dict[str, List[int]] = header["terms"]
+        self.meta: Dict[str, Any] = header.get("meta") or {}
+        self.name: Optional[str] = header.get("name")
+
+        base = start + header_len
+        view = memoryview(self._mm)
+        ids_bytes = header["postings"] * 4
+        tfs_bytes = header["postings"] * 2
+        self._ids = view[base:base + ids_bytes].cast("I")
+        base += ids_bytes
+        self._tfs = view[base:base + tfs_bytes].cast("H")
+        base += tfs_bytes + (2 if header["postings"] % 2 else 0)
+        self.doc_lengths = view[base:base + self.doc_count * 4].cast("I")
+
+    def postings(self, term: str) -> Tuple[Sequence[int], Sequence[int]]:
+        entry = self.terms.get(term)
+        if not entry:
+            return (), ()
+        offset, df = entry
+        return self._ids[offset:offset + df], self._tfs[offset:offset + df]
+
+    def df(self, term: str) -> int:
+        entry = self.terms.get(term)
+        return entry[1] if entry else 0
+
+
+def _load_segment(path: Path) -> Optional[_Segment]:
+    """Return the cached segment for ``path``, re-mapping it if the file changed."""
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        with _segment_cache_lock:
+            _segment_cache.pop(str(path), None)
+        return None
+    stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+    key = str(path)
+    with _segment_cache_lock:
+        cached = _segment_cache.get(key)
+        metrics.cache_lookup('rule_book_segment', bool(cached and cached[0] == stamp))
+        if cached and cached[0] == stamp:
+            return cached[1]
+        segment = _Segment(path)
+        _segment_cache[key] = (stamp, segment)
+        return segment
+
+
+def write_segment(
+    path: Path,
+    docs: Iterable[Tuple[str, str]],
+    meta: Optional[Dict[str, Any]] = None,
+    name: Optional[str] = None,
+) -> int:
+    """
+    Build a segment from ``(doc_key, text)`` pairs and atomically replace ``path``.
+    ``meta`` is stored verbatim in the header (e.g. the source it was built from),
+    ``name`` is the segment name the file was written for.
+    Returns the number of documents written.
+    """
+    doc_keys: List[str] = []
+    doc_lengths = array("I")
+    postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+
+    for doc_id, (doc_key, text) in enumerate(docs):
+        terms = tokenize(text)
+        doc_keys.append(str(doc_key))
+        doc_lengths.append(len(terms))
+        for term, tf in Counter(terms).items():
+            postings[term].append((doc_id, min(tf, _TF_MAX)))
+
+    ids = array("I")
+    tfs = array("H")
+    term_table: Dict[str, List[int]] = {}
+    for term in sorted(postings):
+        plist = postings[term]
+        term_table[term] = [len(ids), len(plist)]
+        ids.extend(d for d, _ in plist)
+        tfs.extend(t for _, t in plist)
+
+    header = json.dumps(
+        {
+            "doc_keys": doc_keys,
+            "total_length": int(sum(doc_lengths)),
+            "postings": len(ids),
+            "terms": term_table,
+            "meta": meta or {},
+            "name": name,
+        },
+        separators=(",", ":"),
+        ensure_ascii=False,
+    ).encode("utf-8")
+    # Pad so the packed arrays start on a 4-byte boundary.
+    header += b" " * (-(_HEADER.size + len(header)) % 4)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, len(header)))
+        f.write(header)
+        f.write(ids.tobytes())
+        f.write(tfs.tobytes())
+        if len(tfs) % 2:
+            f.write(b"\x00\x00")
+        f.write(doc_lengths.tobytes())
+    os.replace(tmp, path)
+    return len(doc_keys)
+
+
+class RuleBookIndex:
+    """BM25 search across the per-book segments stored in one directory."""
+
+    def __init__(self, index_dir: Path):
+        self.index_dir = Path(index_dir)
+
+    def segment_path(self, name: str) -> Path:
+        name = str(name)
+        safe = _UNSAFE_NAME_RE.sub("_", name)
+        if safe != name:
+            safe += "~" + hashlib.sha1(name.encode("utf-8")).hexdigest()[:12]
+        return self.index_dir / f"{safe}{SEGMENT_SUFFIX}"
+
+    def has_segment(self, name: str) -> bool:
+        return self.segment_path(name).exists()
+
+    def segment_names(self) -> List[str]:
+        if not self.index_dir.exists():
+            return []
+        names = []
+        for path in self.index_dir.glob(f"*{SEGMENT_SUFFIX}"):
+            stem = path.name[: -len(SEGMENT_SUFFIX)]
+            if "~" in stem:
+                seg = _load_segment(path)
+                if seg is None or seg.name is None:
+                    continue
+                stem = seg.name
+            names.append(stem)
+        return sorted(names)
+
+    def add_segment(
+        self,
+        name: str,
+        docs: Iterable[Tuple[str, str]],
+        meta: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        """(Re)index one book; only that book's segment is rewritten."""
+        return write_segment(self.segment_path(name), docs, meta, name=str(name))
+
+    def segment_meta(self, name: str) -> Optional[Dict[str, Any]]:
+        seg = _load_segment(self.segment_path(name))
+        return None if seg is None else seg.meta
+
+    def remove_segment(self, name: str) -> None:
+        path = self.segment_path(name)
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        with _segment_cache_lock:
+            _segment_cache.pop(str(path), None)
+
+    def search(
+        self,
+        query: str,
+        segments: Optional[Iterable[str]] = None,
+        limit: int = 10,
+    ) -> List[Tuple[str, str, float]]:
+        """
+        Score ``query`` with BM25 over the given segments (all when None).
+        Collection statistics (N, avgdl, df) are global across the searched
+        segments.  Returns ``(segment, doc_key, score)`` best first.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or limit <= 0:
+            return []
+
+        names = list(segments) if segments is not None else self.segment_names()
+        loaded = []
+        for name in names:
+            seg = _load_segment(self.segment_path(name))
+            if seg is not None and seg.doc_count:
+                loaded.append((name, seg))
+        if not loaded:
+            return []
+
+        n_docs = sum(seg.doc_count for _, seg in loaded)
+        avgdl = (sum(seg.total_length for _, seg in loaded) / n_docs) or 1.0
+        idf = {}
+        for term in terms:
+            df = sum(seg.df(term) for _, seg in loaded)
+            if df:
+                idf[term] = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+        if not idf:
+            return []
+
+        k1, b = BM25_K1, BM25_B
+        hits: List[Tuple[float, str, str]] = []
+        for name, seg in loaded:
+            scores: Dict[int, float] = defaultdict(float)
+            lengths = seg.doc_lengths
+            for term, w in idf.items():
+                ids, tfs = seg.postings(term)
+                for doc_id, tf in zip(ids, tfs):
+                    norm = k1 * (1.0 - b + b * lengths[doc_id] / avgdl)
+                    scores[doc_id] += w * tf * (k1 + 1.0) / (tf + norm)
+            for doc_id, score in heapq.nlargest(limit, scores.items(), key=lambda kv: kv[1]):
+                hits.append((score, name, seg.doc_keys[doc_id]))
+
+        hits = heapq.nlargest(limit, hits, key=lambda h: h[0])
+        return [(name, key, score) for score, name, key in hits]
+
+
+RRF_K = 60
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[str]],
+    k: int = RRF_K,
+) -> List[Tuple[str, float]]:
+    """
+    Merge ranked id lists with reciprocal-rank fusion: ``sum(1 / (k + rank))``.
+    Ties keep the order in which ids were first seen.
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
@@ -7,15 +7,72 @@ Processes PDF rule books and integrates them with the RAG system for enhanced AI
 import logging
 import os
 import json
-import hashlib
 from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
-import pdfplumber
 import re
+import threading
+from collections import OrderedDict
 from datetime import datetime
 
+from services import metrics
+from services.pdf_extractor import get_extractor
+from services.rule_book_index import RuleBookIndex
+from services.text_chunker import TextChunker
+
 logger = logging.getLogger(__name__)
 
+# Parsed *_processed.jsonl payloads keyed by path, reloaded only when the file changes;
+# least recently used books are dropped beyond PROCESSED_CACHE_MAX_BOOKS.
+PROCESSED_CACHE_MAX_BOOKS = 8
+_processed_cache: "OrderedDict[str, Tuple[Tuple[int, int, int], Dict[str, Any]]]" = OrderedDict()
+_processed_cache_lock = threading.Lock()
+
+
+def _write_processed_file(processed_file: Path, result: Dict[str, Any]) -> None:
+    """
+    Compact JSONL: first line is the book summary, then one chunk per line
+    (same layout as books/book_store.py, minus the embedding sidecar).
+    """
+    tmp = processed_file.with_name(processed_file.name + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        header = {k: v for k, v in result.items() if k != 'chunks'}
+        f.write(json.dumps(header, ensure_ascii=False, separators=(',', ':')) + '\n')
+        for chunk in result.get('chunks', []):
+            f.write(json.dumps(chunk, ensure_ascii=False, separators=(',', ':')) + '\n')
+    os.replace(tmp, processed_file)
+
+
+def _read_processed_file(processed_file: Path) -> Dict[str, Any]:
+    with open(processed_file, 'r', encoding='utf-8') as f:
+        if processed_file.suffix == '.json':
+            return json.load(f)
+        data = json.loads(f.readline())
+        data['chunks'] = [json.loads(line) for line in f if line.strip()]
+        return data
+
+
+def _load_processed_file(processed_file: Path) -> Optional[Dict[str, Any]]:
+    try:
+        st = processed_file.stat()
+    except FileNotFoundError:
+        return None
+    stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+    key = str(processed_file)
+    with _processed_cache_lock:
+        cached = _processed_cache.get(key)
+        metrics.cache_lookup('processed_book', bool(cached and cached[0] == stamp))
+        if cached and cached[0] == stamp:
+            _processed_cache.move_to_end(key)
+            return cached[1]
+    data = _read_processed_file(processed_file)
+    with _processed_cache_lock:
+        _processed_cache[key] = (stamp, data)
+        _processed_cache.move_to_end(key)
+        while len(_processed_cache) > PROCESSED_CACHE_MAX_BOOKS:
+            _processed_cache.popitem(last=False)
+    return data
+
+
 class RuleBookProcessor:
     """Processes PDF rule books for RAG integration"""
     
@@ -24,6 +81,9 @@ class RuleBookProcessor:
         self.books_dir = Path(config.get('BOOKS_DIR', 'books'))
         self.processed_dir = self.books_dir / 'processed'
         self.processed_dir.mkdir(exist_ok=True)
+        self.index = RuleBookIndex(self.processed_dir / 'index')
+        # 'auto' = fast backend per page, pdfplumber only where layout matters
+        self.extractor = get_extractor(config.get('PDF_EXTRACTOR'))
         
         # Rule book metadata
         self.rule_books = {
@@ -109,31 +169,38 @@ class RuleBookProcessor:
         
         return sorted(found_books, key=lambda x: x['book_info']['priority'])
     
+    def processed_path(self, book_id: str) -> Path:
+        """Processed output for a book; falls back to the legacy pretty-printed .json"""
+        path = self.processed_dir / f"{book_id}_processed.jsonl"
+        legacy = self.processed_dir / f"{book_id}_processed.json"
+        return legacy if not path.exists() and legacy.exists() else path
+    
+    def load_processed(self, book_id: str) -> Optional[Dict[str, Any]]:
+        """Processed book (summary + chunks), cached until the file changes"""
+        return _load_processed_file(self.processed_path(book_id))
+    
     def extract_text_from_pdf(self, pdf_path: Path) -> List[Dict[str, Any]]:
         """Extract text from PDF with page and section information"""
         pages_data = []
         
         try:
-            with pdfplumber.open(pdf_path) as pdf:
-                for page_num, page in enumerate(pdf.pages):
-                    # Extract text
-                    text = page.extract_text()
-                    if not text or not text.strip():
-                        continue
-                    
-                    # Clean and process text
-                    cleaned_text = self._clean_text(text)
-                    
-                    # Extract page metadata
-                    page_info = {
-                        'page_number': page_num + 1,
-                        'text': cleaned_text,
-                        'word_count': len(cleaned_text.split()),
-                        'char_count': len(cleaned_text)
-                    }
-                    
-                    pages_data.append(page_info)
-                    
+            for page_index, text in self.extractor.iter_pages(pdf_path):
+                if not text or not text.strip():
+                    continue
+                
+                # Clean and process text
+                cleaned_text = self._clean_text(text)
+                
+                # Extract page metadata
+                page_info = {
+                    'page_number': page_index + 1,
+                    'text': cleaned_text,
+                    'word_count': len(cleaned_text.split()),
+                    'char_count': len(cleaned_text)
+                }
+                
+                pages_data.append(page_info)
+                
         except Exception as e:
             logger.error(f"Error extracting text from {pdf_path}: {e}")
             return []
@@ -154,62 +221,21 @@ class RuleBookProcessor:
         return text.strip()
     
     def chunk_text(self, pages_data: List[Dict[str, Any]], chunk_size: int = 1000, overlap: int = 200) -> List[Dict[str, Any]]:
-        """Chunk text into manageable pieces for RAG"""
-        chunks = []
-        
-        for page_data in pages_data:
-            text = page_data['text']
-            page_num = page_data['page_number']
-            
-            # Split into sentences first
-            sentences = re.split(r'[.!?]+', text)
-            sentences = [s.strip() for s in sentences if s.strip()]
-            
-            # Create chunks
-            current_chunk = ""
-            current_sentences = []
-            
-            for sentence in sentences:
-                if len(current_chunk + sentence) > chunk_size and current_chunk:
-                    # Save current chunk
-                    chunks.append({
-                        'text': current_chunk.strip(),
-                        'page_number': page_num,
-                        'sentence_count': len(current_sentences),
-                        'word_count': len(current_chunk.split()),
-                        'chunk_id': hashlib.md5(current_chunk.encode()).hexdigest()[:8]
-                    })
-                    
-                    # Start new chunk with overlap
-                    overlap_text = ' '.join(current_sentences[-2:]) if len(current_sentences) >= 2 else current_chunk[-overlap:]
-                    current_chunk = overlap_text + ' ' + sentence
-                    current_sentences = current_sentences[-2:] + [sentence]
-                else:
-                    current_chunk += ' ' + sentence if current_chunk else sentence
-                    current_sentences.append(sentence)
-            
-            # Add final chunk
-            if current_chunk.strip():
-                chunks.append({
-                    'text': current_chunk.strip(),
-                    'page_number': page_num,
-                    'sentence_count': len(current_sentences),
-                    'word_count': len(current_chunk.split()),
-                    'chunk_id': hashlib.md5(current_chunk.encode()).hexdigest()[:8]
-                })
-        
-        return chunks
+        """Chunk text into manageable pieces for RAG (shared chunker, one page at a time)"""
+        return TextChunker(chunk_size, overlap, chunk_id_length=8).chunk_pages(pages_data)
     
     def process_rule_book(self, book_id: str, file_path: Path) -> Dict[str, Any]:
         """Process a single rule book"""
         logger.info(f"Processing rule book: {book_id} from {file_path}")
         
         # Check if already processed
-        processed_file = self.processed_dir / f"{book_id}_processed.json"
+        processed_file = self.processed_path(book_id)
         if processed_file.exists():
             logger.info(f"Rule book {book_id} already processed, loading from cache")
-            with open(processed_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            result = _load_processed_file(processed_file)
+            if result and not self.index.has_segment(book_id):
+                self._index_book(book_id, result.get('chunks', []))
+            return result
         
         # Extract text
         pages_data = self.extract_text_from_pdf(file_path)
@@ -241,63 +267,59 @@ class RuleBookProcessor:
         }
         
         # Save processed data
-        with open(processed_file, 'w', encoding='utf-8') as f:
-            json.dump(result, f, indent=2, ensure_ascii=False)
+        _write_processed_file(self.processed_dir / f"{book_id}_processed.jsonl", result)
+        
+        self._index_book(book_id, chunks)
         
         logger.info(f"Successfully processed {book_id}: {len(chunks)} chunks from {len(pages_data)} pages")
         return result
     
+    def _index_book(self, book_id: str, chunks: List[Dict[str, Any]]) -> None:
+        """(Re)build the BM25 segment for one book; other books are untouched."""
+        try:
+            count = self.index.add_segment(
+                book_id, ((str(i), chunk.get('text', '')) for i, chunk in enumerate(chunks))
+            )
+            logger.info(f"Indexed {count} chunks of {book_id} for keyword search")
+        except Exception as e:
+            logger.error(f"Error indexing rule book {book_id}: {e}")
+    
     def get_rule_book_chunks(self, book_id: str) -> List[Dict[str, Any]]:
         """Get processed chunks for a rule book"""
-        processed_file = self.processed_dir / f"{book_id}_processed.json"
-        
-        if not processed_file.exists():
+        data = self.load_processed(book_id)
+        if data is None:
             logger.warning(f"Processed file not found for {book_id}")
             return []
-        
-        with open(processed_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return data.get('chunks', [])
+        return data.get('chunks', [])
     
     def search_rule_books(self, query: str, system: str = None, limit: int = 10) -> List[Dict[str, Any]]:
-        """Search through processed rule books"""
-        results = []
-        
+        """Keyword search through processed rule books (BM25 over the persistent index)"""
+        book_ids = []
         for book_id, book_info in self.rule_books.items():
             if system and book_info['system'] != system:
                 continue
-            
+            if not self.index.has_segment(book_id):
+                # Books processed before the index existed are indexed on first search.
+                if not self.processed_path(book_id).exists():
+                    continue
+                self._index_book(book_id, self.get_rule_book_chunks(book_id))
+            book_ids.append(book_id)
+        
+        results = []
+        for book_id, doc_key, score in self.index.search(query, segments=book_ids, limit=limit):
             chunks = self.get_rule_book_chunks(book_id)
-            if not chunks:
+            idx = int(doc_key)
+            if idx >= len(chunks):
                 continue
-            
-            # Simple text search (will be enhanced with vector search later)
-            query_lower = query.lower()
-            for chunk in chunks:
-                if query_lower in chunk['text'].lower():
-                    results.append({
-                        'book_id': book_id,
-                        'book_name': book_info['name'],
-                        'system': book_info['system'],
-                        'chunk': chunk,
-                        'relevance_score': self._calculate_relevance(query, chunk['text'])
-                    })
-        
-        # Sort by relevance and limit results
-        results.sort(key=lambda x: x['relevance_score'], reverse=True)
-        return results[:limit]
-    
-    def _calculate_relevance(self, query: str, text: str) -> float:
-        """Calculate simple relevance score"""
-        query_words = set(query.lower().split())
-        text_words = set(text.lower().split())
-        
-        if not query_words:
-            return 0.0
-        
-        # Calculate word overlap
-        overlap = len(query_words.intersection(text_words))
-        return overlap / len(query_words)
+            book_info = self.rule_books[book_id]
+            results.append({
+                'book_id': book_id,
+                'book_name': book_info['name'],
+                'system': book_info['system'],
+                'chunk': chunks[idx],
+                'relevance_score': score
+            })
+        return results
 
 class RuleBookRAGService:
     """Integrates rule books with ChromaDB RAG system"""
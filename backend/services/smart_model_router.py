@@ -14,6 +14,7 @@ from services.lm_studio_model import (
     get_effective_lm_studio_model_id,
     resolve_lm_studio_model_id,
 )
+from services.tracing import llm_span, record_llm_response
 import time
 from typing import Dict, Any, Optional, List
 from enum import Enum
@@ -237,11 +238,17 @@ class SmartModelRouter:
         
         # Get model configuration
         model_config = self.model_configs.get(model_name, {})
+        display_model = model_name
         
         # Generate response
         try:
+            # Resolve the LM Studio model id once per generation (admin override + loaded model)
+            if model_name == LM_STUDIO_ROUTE_KEY:
+                display_model = get_effective_lm_studio_model_id(self.config)
             if model_config['provider'] == ModelProvider.LM_STUDIO:
-                response = self._generate_lm_studio_response(model_name, prompt, context, config, model_config)
+                response = self._generate_lm_studio_response(
+                    model_name, prompt, context, config, model_config, model_id=display_model
+                )
             elif model_config['provider'] == ModelProvider.OLLAMA:
                 response = self._generate_ollama_response(model_name, prompt, context, config, model_config)
             else:
@@ -249,11 +256,6 @@ class SmartModelRouter:
             
             # Update last used time
             self.model_last_used[model_name] = time.time()
-            display_model = (
-                get_effective_lm_studio_model_id(self.config)
-                if model_name == LM_STUDIO_ROUTE_KEY
-                else model_name
-            )
             return {
                 'response': response,
                 'model_used': display_model,
@@ -265,20 +267,15 @@ class SmartModelRouter:
             
         except Exception as e:
             logger.error(f"Error generating response with {model_name}: {e}")
-            err_model = (
-                get_effective_lm_studio_model_id(self.config)
-                if model_name == LM_STUDIO_ROUTE_KEY
-                else model_name
-            )
             return {
                 'response': f'Error generating response: {str(e)}',
-                'model_used': err_model,
+                'model_used': display_model,
                 'task_type': task_type.value,
                 'error': str(e)
             }
     
-    def _generate_lm_studio_response(self, model_name: str, prompt: str, context: Dict[str, Any], config: Dict[str, Any], model_config: Dict[str, Any]) -> str:
-        """Generate response using LM Studio"""
+    def _generate_lm_studio_response(self, model_name: str, prompt: str, context: Dict[str, Any], config: Dict[str, Any], model_config: Dict[str, Any], model_id: Optional[str] = None) -> str:
+        """Generate response using LM Studio (``model_id`` as resolved by the caller, else resolved here)"""
         base_url = model_config['base_url']
         
         # Prepare messages
@@ -306,7 +303,7 @@ class SmartModelRouter:
         
         # Prepare payload (model id from admin + env + LM Studio loaded state)
         payload = {
-            'model': get_effective_lm_studio_model_id(self.config),
+            'model': model_id or get_effective_lm_studio_model_id(self.config),
             'messages': messages,
             'max_tokens': config.get('max_tokens', model_config.get('max_tokens', 1024)),
             'temperature': config.get('temperature', model_config.get('temperature', 0.7)),
@@ -317,15 +314,18 @@ class SmartModelRouter:
         ak = (self.config.get('LM_STUDIO_API_KEY') or '').strip()
         if ak:
             hdrs['Authorization'] = f'Bearer {ak}'
-        response = requests.post(
-            f"{base_url}/v1/chat/completions",
-            json=payload,
-            timeout=config.get('timeout', 30),
-            headers=hdrs,
-        )
+        with llm_span('lm_studio', payload['model']):
+            response = requests.post(
+                f"{base_url}/v1/chat/completions",
+                json=payload,
+                timeout=config.get('timeout', 30),
+                headers=hdrs,
+            )
+            result = response.json() if response.status_code == 200 else None
+            record_llm_response(result, 'lm_studio')
         
-        if response.status_code == 200:
-            return response.json()['choices'][0]['message']['content']
+        if result is not None:
+            return result['choices'][0]['message']['content']
         else:
             raise Exception(f"LM Studio API error: {response.status_code} - {response.text}")
     
@@ -354,15 +354,18 @@ class SmartModelRouter:
         }
         
         # Make request
-        response = requests.post(
-            f"{base_url}/api/generate",
-            json=payload,
-            timeout=config.get('timeout', 30),
-            headers={'Content-Type': 'application/json'}
-        )
+        with llm_span('ollama', model_name):
+            response = requests.post(
+                f"{base_url}/api/generate",
+                json=payload,
+                timeout=config.get('timeout', 30),
+                headers={'Content-Type': 'application/json'}
+            )
+            result = response.json() if response.status_code == 200 else None
+            record_llm_response(result, 'ollama')
         
-        if response.status_code == 200:
-            return response.json()['response']
+        if result is not None:
+            return result['response']
         else:
             raise Exception(f"Ollama API error: {response.status_code} - {response.text}")
     
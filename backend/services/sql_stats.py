@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+ShadowRealms AI - SQL Accounting
+Statement fingerprints, per-endpoint counts/timings and the slow-query log.
+
+Every statement run through a cursor from ``database.get_db()`` (the traced
+cursor in ``services.tracing``) is reduced to a *fingerprint* -- literals and
+placeholders become ``?`` and ``IN (?, ?, ?)`` lists collapse to ``IN (...)`` --
+and accounted per endpoint: executions, total/max time and the most executions
+of that fingerprint seen in a single request.  A high ``max_per_request`` is the
+signature of an N+1 loop (one query per campaign/NPC/row); requests that run a
+fingerprint ``SQL_REPEATED_QUERY_WARN`` times or more are logged.  Endpoint
+attribution comes from the request trace, so with ``TRACING_ENABLED=false``
+everything is accounted under ``background``.
+
+Statements slower than ``SQL_SLOW_QUERY_MS`` are logged with their plan
+(``EXPLAIN`` on PostgreSQL inside a savepoint, ``EXPLAIN QUERY PLAN`` on
+SQLite, at most once per fingerprint every ``EXPLAIN_INTERVAL_SECONDS``).
+``top_queries()`` / ``endpoint_summary()`` back ``GET /api/admin/db/queries``.
+"""
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+# Distinct (endpoint, fingerprint) pairs kept; later ones are folded into OTHER
+MAX_ENTRIES = 2000
+OTHER = '<other statements>'
+EXPLAIN_INTERVAL_SECONDS = 300
+_EXPLAINABLE = ('select', 'with', 'insert', 'update', 'delete')
+SORT_KEYS = ('total_ms', 'count', 'max_ms', 'mean_ms', 'max_per_request')
+
+SQL_STATS_ENABLED = os.environ.get('SQL_STATS_ENABLED', 'true').lower() == 'true'
+SQL_SLOW_QUERY_MS = float(os.environ.get('SQL_SLOW_QUERY_MS') or 200)
+SQL_EXPLAIN_SLOW = os.environ.get('SQL_EXPLAIN_SLOW', 'true').lower() == 'true'
+SQL_REPEATED_QUERY_WARN = int(os.environ.get('SQL_REPEATED_QUERY_WARN') or 25)
+
+_COMMENTS = re.compile(r'--[^\n]*|/\*.*?\*/', re.S)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+_PLACEHOLDERS = re.compile(r'%\(\w+\)s|%s|\?')
+_IN_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_VALUES_ROWS = re.compile(r'(\(\.\.\.\)|\(\s*\?\s*\))(?:\s*,\s*(?:\(\.\.\.\)|\(\s*\?\s*\)))+')
+_WHITESPACE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql: str) -> str:
+    """Statement shape with literals/placeholders replaced, e.g. ``SELECT * FROM t WHERE id = ?``"""
+    text = _COMMENTS.sub(' ', sql)
+    text = _STRINGS.sub('?', text)
+    text = _PLACEHOLDERS.sub('?', text)
+    text = _NUMBERS.sub('?', text)
+    text = _IN_LISTS.sub('(...)', text)
+    text = _VALUES_ROWS.sub(r'\1, ...', text)
+    return _WHITESPACE.sub(' ', text).strip().rstrip(';')
+
+
+class _Entry:
+    __slots__ = ('count', 'total_ms', 'max_ms', 'max_per_request', 'errors')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.max_per_request = 0
+        self.errors = 0
+
+
+class SqlStats:
+    """Thread-safe per-(endpoint, fingerprint) statement accounting"""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: Dict[Tuple[str, str], _Entry] = {}
+        self._requests: Dict[str, List[int]] = {}  # endpoint -> [requests, max statements in one]
+        self._lock = threading.Lock()
+        self.since = time.time()
+
+    def _entry(self, endpoint: str, fp: str) -> _Entry:
+        entry = self._entries.get((endpoint, fp))
+        if entry is None:
+            if len(self._entries) >= self.max_entries:
+                fp = OTHER
+                entry = self._entries.get((endpoint, fp))
+            if entry is None:
+                entry = self._entries[(endpoint, fp)] = _Entry()
+        return entry
+
+    def record(self, endpoint: str, fp: str, ms: float, failed: bool = False):
+        with self._lock:
+            entry = self._entry(endpoint, fp)
+            entry.count += 1
+            entry.total_ms += ms
+            if ms > entry.max_ms:
+                entry.max_ms = ms
+            if failed:
+                entry.errors += 1
+
+    def record_request(self, endpoint: str, queries: Dict[str, List[float]]):
+        """Fold one request's ``{fingerprint: [count, ms]}`` into the per-request maxima"""
+        statements = 0
+        with self._lock:
+            for fp, (count, _ms) in queries.items():
+                statements += count
+                entry = self._entry(endpoint, fp)
+                if count > entry.max_per_request:
+                    entry.max_per_request = int(count)
+            summary = self._requests.setdefault(endpoint, [0, 0])
+            summary[0] += 1
+            summary[1] = max(summary[1], statements)
+
+    def top(self, limit: int = 20, sort: str = 'total_ms', endpoint: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Top fingerprints across endpoints (or within ``endpoint``)"""
+        if sort not in SORT_KEYS:
+            raise ValueError(f'sort must be one of {SORT_KEYS}')
+        with self._lock:
+            items = [(key, entry.count, entry.total_ms, entry.max_ms, entry.max_per_request, entry.errors)
+                     for key, entry in self._entries.items() if endpoint is None or key[0] == endpoint]
+        merged: Dict[str, Dict[str, Any]] = {}
+        for (ep, fp), count, total_ms, max_ms, per_request, errors in items:
+            if not count:
+                continue
+            row = merged.setdefault(fp, {'fingerprint': fp, 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                                         'max_per_request': 0, 'errors': 0, 'endpoints': {}})
+            row['count'] += count
+            row['total_ms'] += total_ms
+            row['max_ms'] = max(row['max_ms'], max_ms)
+            row['max_per_request'] = max(row['max_per_request'], per_request)
+            row['errors'] += errors
+            row['endpoints'][ep] = count
+        for row in merged.values():
+            row['mean_ms'] = round(row['total_ms'] / row['count'], 3)
+            row['total_ms'] = round(row['total_ms'], 3)
+            row['max_ms'] = round(row['max_ms'], 3)
+        return sorted(merged.values(), key=lambda row: row[sort], reverse=True)[:max(0, limit)]
+
+    def endpoints(self) -> Dict[str, Dict[str, Any]]:
+        """{endpoint: {requests, statements, total_ms, max_statements_per_request}}"""
+        with self._lock:
+            result: Dict[str, Dict[str, Any]] = {}
+            for (endpoint, _fp), entry in self._entries.items():
+                summary = result.setdefault(endpoint, {'requests': 0, 'statements': 0, 'total_ms': 0.0,
+                                                       'max_statements_per_request': 0})
+                summary['statements'] += entry.count
+                summary['total_ms'] += entry.total_ms
+            for endpoint, (requests, most) in self._requests.items():
+                summary = result.setdefault(endpoint, {'requests': 0, 'statements': 0, 'total_ms': 0.0,
+                                                       'max_statements_per_request': 0})
+                summary['requests'] = requests
+                summary['max_statements_per_request'] = most
+        for summary in result.values():
+            summary['total_ms'] = round(summary['total_ms'], 3)
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+            self._requests.clear()
+            self.since = time.time()
+
+
+STATS = SqlStats()
+_last_explained: Dict[str, float] = {}
+
+
+def record_statement(sql: Any, ms: float, endpoint: str = '', queries: Optional[Dict[str, List[float]]] = None,
+                     failed: bool = False) -> Optional[str]:
+    """
+    Account one statement; ``queries`` is the current request's ``{fingerprint: [count, ms]}``.
+    Returns the fingerprint (None when accounting is off or ``sql`` is not text).
+    """
+    if not SQL_STATS_ENABLED or not isinstance(sql, str):
+        return None
+    fp = fingerprint(sql)
+    STATS.record(endpoint or 'background', fp, ms, failed)
+    if queries is not None:
+        totals = queries.get(fp)
+        if totals is None:
+            queries[fp] = [1, ms]
+        else:
+            totals[0] += 1
+            totals[1] += ms
+    return fp
+
+
+def is_slow(ms: float) -> bool:
+    return SQL_STATS_ENABLED and SQL_SLOW_QUERY_MS > 0 and ms >= SQL_SLOW_QUERY_MS
+
+
+def log_slow_statement(connection, sql: str, params: Any, ms: float, fp: str, endpoint: str = '',
+                       trace_id: str = ''):
+    """Log a slow statement, with its plan when ``SQL_EXPLAIN_SLOW`` is on (rate-limited per fingerprint)"""
+    metrics.SLOW_QUERIES.inc()
+    plan = None
+    now = time.monotonic()
+    if SQL_EXPLAIN_SLOW and now - _last_explained.get(fp, float('-inf')) >= EXPLAIN_INTERVAL_SECONDS:
+        _last_explained[fp] = now
+        try:
+            plan = explain(connection, sql, params)
+        except Exception as e:
+            plan = f'(EXPLAIN failed: {e})'
+    logger.warning(
+        f"Slow query {ms:.1f} ms in {endpoint or 'background'}"
+        f"{f' ({trace_id})' if trace_id else ''}: {fp}"
+        + (f"\n{plan}" if plan else '')
+    )
+
+
+def explain(connection, sql: str, params: Any = None) -> Optional[str]:
+    """Query plan for ``sql`` on ``connection`` (None for statements that cannot be explained)"""
+    words = sql.lstrip().split(None, 1)
+    if not words or words[0].lower() not in _EXPLAINABLE:
+        return None
+    cursor = connection.cursor()
+    try:
+        if isinstance(connection, sqlite3.Connection):
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params or ())
+            return '\n'.join(str(tuple(row)[-1]) for row in cursor.fetchall())
+        # PostgreSQL: a failing EXPLAIN must not abort the caller's transaction
+        savepoint = not getattr(connection, 'autocommit', False)
+        if savepoint:
+            cursor.execute('SAVEPOINT shadowrealms_explain')
+        try:
+            cursor.execute('EXPLAIN ' + sql, params)
+            rows = cursor.fetchall()
+        except Exception:
+            if savepoint:
+                cursor.execute('ROLLBACK TO SAVEPOINT shadowrealms_explain')
+            raise
+        finally:
+            if savepoint:
+                cursor.execute('RELEASE SAVEPOINT shadowrealms_explain')
+        return '\n'.join(str(row['QUERY PLAN'] if isinstance(row, dict) else row[0]) for row in rows)
+    finally:
+        cursor.close()
+
+
+def observe_request(endpoint: str, queries: Dict[str, List[float]], trace_id: str = ''):
+    """End-of-request: per-request maxima and the repeated-query (N+1) warning"""
+    if not SQL_STATS_ENABLED or not queries:
+        return
+    STATS.record_request(endpoint, queries)
+    if SQL_REPEATED_QUERY_WARN <= 0:
+        return
+    repeated = [(count, ms, fp) for fp, (count, ms) in queries.items() if count >= SQL_REPEATED_QUERY_WARN]
+    for count, ms, fp in sorted(repeated, reverse=True):
+        logger.warning(f"Repeated query in {endpoint} ({trace_id}): {int(count)}x, {ms:.1f} ms total: {fp}")
+
+
+def top_queries(limit: int = 20, sort: str = 'total_ms', endpoint: Optional[str] = None) -> List[Dict[str, Any]]:
+    return STATS.top(limit, sort, endpoint)
+
+
+def endpoint_summary() -> Dict[str, Dict[str, Any]]:
+    return STATS.endpoints()
+
+
+def reset():
+    STATS.reset()
+    _last_explained.clear()
+
+
+def init_app(app):
+    """Apply ``SQL_*`` settings from the Flask config"""
+    global SQL_STATS_ENABLED, SQL_SLOW_QUERY_MS, SQL_EXPLAIN_SLOW, SQL_REPEATED_QUERY_WARN
+    SQL_STATS_ENABLED = bool(app.config.get('SQL_STATS_ENABLED', SQL_STATS_ENABLED))
+    SQL_SLOW_QUERY_MS = float(app.config.get('SQL_SLOW_QUERY_MS', SQL_SLOW_QUERY_MS) or 0)
+    SQL_EXPLAIN_SLOW = bool(app.config.get('SQL_EXPLAIN_SLOW', SQL_EXPLAIN_SLOW))
+    SQL_REPEATED_QUERY_WARN = int(app.config.get('SQL_REPEATED_QUERY_WARN', SQL_REPEATED_QUERY_WARN) or 0)
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Shared sentence-packing chunker for rule books, parsed books and embeddings.
+
+Sentences are streamed from each page and packed greedily into chunks of at most
+``chunk_size`` units - characters by default, or real tokens when a tokenizer's
+length function is supplied (see ``token_length_function``).  Each sentence is
+measured once; chunk length is a running sum, and overlap is carried as the
+trailing sentences of the previous chunk that fit in ``overlap`` units, so no
+string is rebuilt while packing and the whole pass is linear in the input.
+
+A sentence longer than ``chunk_size`` is split on whitespace.  With
+``cross_pages=True`` chunks may span a page break (``page_number`` is the first
+page, ``page_end`` the last); otherwise every page is chunked on its own.
+
+Run ``python -m services.text_chunker bench`` from the backend directory for a
+throughput figure in MB/s.
+"""
+
+import hashlib
+import re
+import sys
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+CHUNKER_NAME = 'sentence-pack/2'
+
+_SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
+
+
+def iter_sentences(text: str) -> Iterator[str]:
+    """Sentences of ``text`` (split after . ! ? followed by whitespace), stripped, non-empty"""
+    start = 0
+    for match in _SENTENCE_BREAK.finditer(text):
+        sentence = text[start:match.start()].strip()
+        if sentence:
+            yield sentence
+        start = match.end()
+    sentence = text[start:].strip()
+    if sentence:
+        yield sentence
+
+
+def token_length_function(tokenizer) -> Callable[[str], int]:
+    """Length in model tokens (no special tokens) for a Hugging Face style tokenizer"""
+    def count(text: str) -> int:
+        return len(tokenizer.encode(text, add_special_tokens=False))
+    return count
+
+
+def load_token_length_function(model_name: str) -> Callable[[str], int]:
+    """Token length function for a model name; needs the ``transformers`` package"""
+    from transformers import AutoTokenizer
+    return token_length_function(AutoTokenizer.from_pretrained(model_name))
+
+
+class TextChunker:
+    """Greedy sentence packer with sentence-level overlap"""
+
+    def __init__(self, chunk_size: int = 1000, overlap: int = 200,
+                 length_function: Optional[Callable[[str], int]] = None,
+                 cross_pages: bool = False, chunk_id_length: int = 12):
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        self.chunk_size = chunk_size
+        self.overlap = max(0, min(overlap, chunk_size - 1))
+        self.length_function = length_function or len
+        # Characters count the joining space; token counts are summed per sentence
+        # (within a token or two of encoding the joined text)
+        self._separator = 1 if length_function is None else 0
+        self.unit = 'chars' if length_function is None else 'tokens'
+        self.cross_pages = cross_pages
+        self.chunk_id_length = chunk_id_length
+
+    def config(self) -> Dict[str, Any]:
+        """Settings that determine the output (stored with parsed books)"""
+        return {
+            'chunker': CHUNKER_NAME,
+            'chunk_size': self.chunk_size,
+            'overlap': self.overlap,
+            'unit': self.unit,
+            'cross_pages': self.cross_pages,
+        }
+
+    def _split_long(self, sentence: str, length: int) -> Iterator[Tuple[str, int]]:
+        """Break an over-long sentence into whitespace-delimited pieces that fit"""
+        if length <= self.chunk_size:
+            yield sentence, length
+            return
+        words: List[str] = []
+        used = 0
+        for word in sentence.split():
+            size = self.length_function(word)
+            extra = size + (self._separator if words else 0)
+            if words and used + extra > self.chunk_size:
+                yield ' '.join(words), used
+                words, used, extra = [], 0, size
+            words.append(word)
+            used += extra
+        if words:
+            yield ' '.join(words), used
+
+    def _iter_units(self, pages: Iterable[Dict[str, Any]]) -> Iterator[Tuple[str, int, int]]:
+        """(sentence, length, page_number); length -1 marks a page break"""
+        for page in pages:
+            page_number = page.get('page_number', 0)
+            for sentence in iter_sentences(page.get('text') or ''):
+                for piece, length in self._split_long(sentence, self.length_function(sentence)):
+                    yield piece, length, page_number
+            yield '', -1, page_number
+
+    def _make_chunk(self, window: List[Tuple[str, int, int]], length: int) -> Dict[str, Any]:
+        text = ' '.join(sentence for sentence, _, _ in window)
+        chunk = {
+            'text': text,
+            'page_number': window[0][2],
+            'sentence_count': len(window),
+            'word_count': len(text.split()),
+            'char_count': len(text),
+            'chunk_id': hashlib.md5(text.encode()).hexdigest()[:self.chunk_id_length]
+        }
+        if self.cross_pages:
+            chunk['page_end'] = window[-1][2]
+        if self.unit == 'tokens':
+            chunk['token_count'] = length
+        return chunk
+
+    def _overlap_tail(self, window: List[Tuple[str, int, int]]) -> Tuple[List[Tuple[str, int, int]], int]:
+        """Trailing sentences (never the whole window) that fit in the overlap budget"""
+        if not self.overlap:
+            return [], 0
+        carried = 0
+        start = len(window)
+        while start > 1:
+            size = window[start - 1][1] + (self._separator if carried else 0)
+            if carried + size > self.overlap:
+                break
+            carried += size
+            start -= 1
+        return window[start:], carried
+
+    def iter_chunks(self, pages: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Stream chunk dicts for ``pages`` ({'text', 'page_number'} dicts) in order"""
+        window: List[Tuple[str, int, int]] = []
+        length = 0
+        for sentence, size, page_number in self._iter_units(pages):
+            if size < 0:
+                if not self.cross_pages:
+                    if window:
+                        yield self._make_chunk(window, length)
+                    window, length = [], 0
+                continue
+            extra = size + (self._separator if window else 0)
+            if window and length + extra > self.chunk_size:
+                yield self._make_chunk(window, length)
+                # Every emitted chunk ends with at least one new sentence, so the
+                # carried tail can never be emitted on its own
+                window, length = self._overlap_tail(window)
+                extra = size + (self._separator if window else 0)
+                # Drop carried sentences if they leave no room for the new one
+                while window and length + extra > self.chunk_size:
+                    dropped = window.pop(0)
+                    length -= dropped[1] + (self._separator if window else 0)
+                    extra = size + (self._separator if window else 0)
+            window.append((sentence, size, page_number))
+            length += extra
+        if window:
+            yield self._make_chunk(window, length)
+
+    def chunk_pages(self, pages: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return list(self.iter_chunks(pages))
+
+    def chunk_text(self, text: str) -> List[str]:
+        """Chunk plain text; returns the chunk strings"""
+        return [chunk['text'] for chunk in self.iter_chunks([{'text': text, 'page_number': 1}])]
+
+
+def benchmark(megabytes: float = 5.0, chunk_size: int = 1000, overlap: int = 200,
+              cross_pages: bool = False) -> Dict[str, Any]:
+    """Chunk ``megabytes`` of synthetic rulebook-like prose and report throughput"""
+    sentences = [
+        "Roll Dexterity + Brawl against difficulty 6.",
+        "Each success inflicts one level of bashing damage!",
+        "A vampire may spend one blood point per turn to heal.",
+        "Frenzy checks use Self-Control; botches mean the Beast takes over?",
+        "The Storyteller decides how many successes are required for an extended action.",
+    ]
+    page_text = ' '.join(sentences * 40)
+    page_count = max(1, int(megabytes * 1024 * 1024 / len(page_text)))
+    pages = [{'text': page_text, 'page_number': n + 1} for n in range(page_count)]
+    total_bytes = len(page_text.encode()) * page_count
+
+    chunker = TextChunker(chunk_size, overlap, cross_pages=cross_pages)
+    started = time.perf_counter()
+    chunk_count = sum(1 for _ in chunker.iter_chunks(pages))
+    seconds = time.perf_counter() - started
+    return {
+        'megabytes': total_bytes / (1024 * 1024),
+        'pages': page_count,
+        'chunks': chunk_count,
+        'seconds': seconds,
+        'mb_per_second': total_bytes / (1024 * 1024) / seconds if seconds else float('inf'),
+    }
+
+
+def main() -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Text chunker utilities')
+    sub = parser.add_subparsers(dest='command')
+    bench = sub.add_parser('bench', help='Measure chunking throughput (MB/s)')
+    bench.add_argument('--mb', type=float, default=5.0, help='Megabytes of text to chunk (default: 5)')
+    bench.add_argument('--chunk-size', type=int, default=1000)
+    bench.add_argument('--overlap', type=int, default=200)
+    bench.add_argument('--cross-pages', action='store_true')
+
+    args = parser.parse_args()
+    if args.command != 'bench':
+        parser.print_help()
+        return 1
+
+    result = benchmark(args.mb, args.chunk_size, args.overlap, args.cross_pages)
+    print(f"Chunked {result['megabytes']:.1f} MB ({result['pages']} pages) into {result['chunks']} chunks "
+          f"in {result['seconds']:.2f}s: {result['mb_per_second']:.1f} MB/s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,489 @@
+#!/usr/bin/env python3
+"""
+ShadowRealms AI - Request Tracing
+Lightweight spans and per-request timing breakdowns for the hot paths.
+
+Each Flask request gets a ``Trace`` held in a context variable (``init_app``).
+Code on the hot path opens spans with ``span(name, category)``; the categories
+used by the backend are:
+
+    db              SQL statements (cursors from ``database.get_db``)
+    vector          vector-store collection calls (RAGService, ChromaDB or local)
+    embedding       embedding model calls
+    llm             LLM HTTP calls (wall time)
+    llm_prefill     prompt processing, as reported by the model server
+    llm_generation  token generation, as reported by the model server
+    queue           time between the proxy accepting the request and Flask seeing it
+                    (``X-Request-Start: t=<epoch seconds>`` set by nginx)
+
+Span time is *exclusive*: a span's children are subtracted from its own
+category, so a vector query that embeds its query text is split into
+``vector`` and ``embedding`` and the categories add up to at most the request
+time (the rest is reported as ``app``).  Server-reported prefill/generation is
+carved out of the enclosing ``llm`` span the same way.
+
+After each request the breakdown is added to the per-endpoint latency histogram
+``shadowrealms_request_duration_seconds`` (``services.metrics``, summarised by
+``latency_histograms()``), every span to ``shadowrealms_operation_duration_seconds``,
+SQL statements are also fingerprinted and accounted per endpoint by
+``services.sql_stats`` (slow-query log, N+1 detection),
+and, when ``TRACE_HEADERS`` is on, the breakdown is returned as
+``Server-Timing`` and ``X-Trace-Id`` response headers.  Requests slower than
+``TRACE_SLOW_REQUEST_MS`` are logged with their breakdown.
+
+With ``TRACING_OTEL=true`` and the ``opentelemetry-api`` package installed,
+every span is also started as an OpenTelemetry span (exported by whatever SDK
+and exporter the deployment configures).
+
+Outside a request (scripts, background threads) ``span()`` is a no-op apart
+from the optional OpenTelemetry span.
+"""
+
+import logging
+import os
+import sys
+import time
+import uuid
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from services import metrics, sql_stats
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES = ('queue', 'db', 'vector', 'embedding', 'llm', 'llm_prefill', 'llm_generation')
+# Spans kept per trace for the detail view; totals keep accumulating past this
+MAX_SPANS_PER_TRACE = 256
+
+_current_trace: ContextVar[Optional['Trace']] = ContextVar('shadowrealms_trace', default=None)
+_current_span: ContextVar[Optional['Span']] = ContextVar('shadowrealms_span', default=None)
+
+_otel_tracer = None
+
+
+def _env_flag(name: str, default: str = 'false') -> bool:
+    return os.environ.get(name, default).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+class Span:
+    """One timed operation; ``self_ms`` excludes time spent in child spans"""
+
+    __slots__ = ('name', 'category', 'attributes', 'start', 'duration_ms', 'child_ms', 'parent')
+
+    def __init__(self, name: str, category: str, attributes: Dict[str, Any], parent: Optional['Span']):
+        self.name = name
+        self.category = category
+        self.attributes = attributes
+        self.parent = parent
+        self.start = time.perf_counter()
+        self.duration_ms = 0.0
+        self.child_ms = 0.0
+
+    @property
+    def self_ms(self) -> float:
+        return max(0.0, self.duration_ms - self.child_ms)
+
+
+class Trace:
+    """Timing breakdown for one request"""
+
+    def __init__(self, trace_id: Optional[str] = None, endpoint: str = ''):
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.endpoint = endpoint
+        self.start = time.perf_counter()
+        self.duration_ms = 0.0
+        self.totals: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.spans: List[Dict[str, Any]] = []
+        self.dropped_spans = 0
+        # SQL fingerprint -> [executions, ms] (services.sql_stats)
+        self.queries: Dict[str, List[float]] = {}
+
+    def add(self, category: str, ms: float, count: int = 1):
+        self.totals[category] = self.totals.get(category, 0.0) + ms
+        self.counts[category] = self.counts.get(category, 0) + count
+
+    def record(self, span: Span):
+        self.add(span.category, span.self_ms)
+        if len(self.spans) < MAX_SPANS_PER_TRACE:
+            self.spans.append({
+                'name': span.name,
+                'category': span.category,
+                'offset_ms': round((span.start - self.start) * 1000.0, 3),
+                'duration_ms': round(span.duration_ms, 3),
+                **({'attributes': span.attributes} if span.attributes else {}),
+            })
+        else:
+            self.dropped_spans += 1
+
+    def finish(self) -> float:
+        self.duration_ms = (time.perf_counter() - self.start) * 1000.0
+        return self.duration_ms
+
+    def breakdown(self) -> Dict[str, float]:
+        """Exclusive ms per category plus ``app`` (everything else) and ``total``"""
+        total = self.duration_ms or (time.perf_counter() - self.start) * 1000.0
+        result = {category: round(ms, 3) for category, ms in self.totals.items()}
+        # Queue wait happens before the request starts, so it is not part of total
+        traced = sum(ms for category, ms in self.totals.items() if category != 'queue')
+        result['app'] = round(max(0.0, total - traced), 3)
+        result['total'] = round(total, 3)
+        return result
+
+    def server_timing(self) -> str:
+        """``Server-Timing`` header value (durations in ms)"""
+        parts = []
+        for category, ms in self.breakdown().items():
+            count = self.counts.get(category)
+            desc = f';desc="{count} calls"' if count and category not in ('queue', 'app', 'total') else ''
+            parts.append(f'{category};dur={ms:.1f}{desc}')
+        return ', '.join(parts)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def start_trace(trace_id: Optional[str] = None, endpoint: str = '') -> Tuple[Trace, Any]:
+    """Make a new trace current; returns (trace, token) for ``end_trace``"""
+    trace = Trace(trace_id, endpoint)
+    return trace, _current_trace.set(trace)
+
+
+def end_trace(token) -> Optional[Trace]:
+    trace = _current_trace.get()
+    _current_trace.reset(token)
+    _current_span.set(None)
+    if trace is not None and not trace.duration_ms:
+        trace.finish()
+    return trace
+
+
+@contextmanager
+def span(name: str, category: str, **attributes) -> Iterator[Optional[Span]]:
+    """Time the enclosed block as ``name`` in ``category`` (no-op without a current trace)"""
+    trace = _current_trace.get()
+    if trace is None and _otel_tracer is None:
+        yield None
+        return
+    otel_cm = _otel_tracer.start_as_current_span(name, attributes=_otel_attributes(category, attributes)) \
+        if _otel_tracer is not None else None
+    if otel_cm is not None:
+        otel_cm.__enter__()
+    parent = _current_span.get()
+    current = Span(name, category, attributes, parent)
+    token = _current_span.set(current)
+    try:
+        yield current
+    finally:
+        current.duration_ms = (time.perf_counter() - current.start) * 1000.0
+        _current_span.reset(token)
+        if parent is not None:
+            parent.child_ms += current.duration_ms
+        if trace is not None:
+            trace.record(current)
+            metrics.OPERATION_LATENCY.labels(category, name).observe(current.duration_ms / 1000.0)
+        if otel_cm is not None:
+            otel_cm.__exit__(*sys.exc_info())
+
+
+def record_server_timings(prefill_ms: Optional[float] = None, generation_ms: Optional[float] = None):
+    """
+    Attribute part of the current ``llm`` span to prefill/generation as reported by
+    the model server; the reported time is moved out of the enclosing span.
+    """
+    trace = _current_trace.get()
+    parent = _current_span.get()
+    for category, ms in (('llm_prefill', prefill_ms), ('llm_generation', generation_ms)):
+        if ms is None or ms < 0:
+            continue
+        if parent is not None:
+            ms = min(ms, max(0.0, parent.duration_ms or (time.perf_counter() - parent.start) * 1000.0)
+                     - parent.child_ms)
+            parent.child_ms += ms
+        if trace is not None:
+            trace.add(category, ms)
+
+
+@contextmanager
+def llm_span(provider: str, model: str = '') -> Iterator[Optional[Span]]:
+    """Span (and in-flight gauge) around one LLM generation request"""
+    with metrics.LLM_IN_FLIGHT.track_inprogress(), span(f'llm.{provider}', 'llm', model=model) as current:
+        try:
+            yield current
+        except Exception:
+            # Transport failures never reach record_llm_response
+            metrics.LLM_REQUESTS.labels(provider, 'error').inc()
+            raise
+
+
+def record_llm_response(payload: Optional[Dict[str, Any]], provider: str = 'unknown'):
+    """
+    Count one LLM generation (``payload`` None = failed) and pick token counts and
+    prefill/generation timings out of the response body when the server reports them.
+    """
+    if not isinstance(payload, dict):
+        metrics.LLM_REQUESTS.labels(provider, 'error').inc()
+        return
+    metrics.LLM_REQUESTS.labels(provider, 'success').inc()
+    usage = payload.get('usage') if isinstance(payload.get('usage'), dict) else {}
+    prompt_tokens = usage.get('prompt_tokens', payload.get('prompt_eval_count'))
+    completion_tokens = usage.get('completion_tokens', payload.get('eval_count'))
+    if prompt_tokens:
+        metrics.LLM_TOKENS.labels(provider, 'prompt').inc(prompt_tokens)
+    if completion_tokens:
+        metrics.LLM_TOKENS.labels(provider, 'completion').inc(completion_tokens)
+
+    if 'prompt_eval_duration' in payload or 'eval_duration' in payload:
+        # Ollama: nanoseconds
+        record_server_timings(
+            payload.get('prompt_eval_duration', 0) / 1e6 if payload.get('prompt_eval_duration') is not None else None,
+            payload.get('eval_duration', 0) / 1e6 if payload.get('eval_duration') is not None else None,
+        )
+    elif isinstance(payload.get('timings'), dict):
+        # llama.cpp server: milliseconds
+        timings = payload['timings']
+        record_server_timings(timings.get('prompt_ms'), timings.get('predicted_ms'))
+    elif isinstance(payload.get('stats'), dict):
+        # LM Studio REST API: seconds
+        stats = payload['stats']
+        ttft, gen = stats.get('time_to_first_token'), stats.get('generation_time')
+        record_server_timings(ttft * 1000.0 if ttft is not None else None,
+                              gen * 1000.0 if gen is not None else None)
+
+
+def _otel_attributes(category: str, attributes: Dict[str, Any]) -> Dict[str, Any]:
+    out = {'shadowrealms.category': category}
+    for key, value in attributes.items():
+        if isinstance(value, (str, bool, int, float)):
+            out[f'shadowrealms.{key}'] = value
+    return out
+
+
+def enable_opentelemetry() -> bool:
+    """Also emit spans through ``opentelemetry-api`` (True when it is installed)"""
+    global _otel_tracer
+    try:
+        from opentelemetry import trace as otel_trace
+    except ImportError:
+        logger.warning("TRACING_OTEL is set but opentelemetry-api is not installed")
+        return False
+    _otel_tracer = otel_trace.get_tracer('shadowrealms.backend')
+    return True
+
+
+# --- instrumented wrappers ------------------------------------------------------
+
+class _TracedProxy:
+    """Delegating proxy that times selected methods as spans"""
+
+    _traced_methods: Tuple[str, ...] = ()
+
+    def __init__(self, target, category: str, prefix: str, **attributes):
+        object.__setattr__(self, '_target', target)
+        object.__setattr__(self, '_category', category)
+        object.__setattr__(self, '_prefix', prefix)
+        object.__setattr__(self, '_attributes', attributes)
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        if name in self._traced_methods and callable(value):
+            def traced(*args, **kwargs):
+                with span(f'{self._prefix}.{name}', self._category, **self._attributes):
+                    return value(*args, **kwargs)
+            return traced
+        return value
+
+    def __setattr__(self, name, value):
+        setattr(self._target, name, value)
+
+    def __iter__(self):
+        return iter(self._target)
+
+    def __enter__(self):
+        self._target.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._target.__exit__(*exc)
+
+    def __repr__(self):
+        return f'<traced {self._target!r}>'
+
+
+def _run_statement(proxy: _TracedProxy, method: str, connection, args, kwargs):
+    """Run ``execute``/``executemany`` on the proxied object as a span and account it in ``sql_stats``"""
+    sql = args[0] if args else kwargs.get('sql', kwargs.get('query'))
+    started = time.perf_counter()
+    failed = True
+    try:
+        with span(f'{proxy._prefix}.{method}', proxy._category, **proxy._attributes):
+            result = getattr(proxy._target, method)(*args, **kwargs)
+        failed = False
+        return result
+    finally:
+        ms = (time.perf_counter() - started) * 1000.0
+        trace = _current_trace.get()
+        endpoint = trace.endpoint if trace is not None else ''
+        fp = sql_stats.record_statement(sql, ms, endpoint, trace.queries if trace is not None else None, failed)
+        # Only plain execute() of a statement that succeeded is explained (the transaction is still usable)
+        if fp is not None and not failed and method == 'execute' and sql_stats.is_slow(ms):
+            params = args[1] if len(args) > 1 else kwargs.get('parameters', kwargs.get('vars'))
+            sql_stats.log_slow_statement(connection, sql, params, ms, fp, endpoint,
+                                         trace.trace_id if trace is not None else '')
+
+
+class TracedCursor(_TracedProxy):
+    """Cursor whose statements are timed as ``db`` spans and accounted per fingerprint"""
+
+    _traced_methods = ('executescript', 'callproc', 'fetchone', 'fetchmany', 'fetchall')
+
+    def execute(self, *args, **kwargs):
+        return _run_statement(self, 'execute', self._target.connection, args, kwargs)
+
+    def executemany(self, *args, **kwargs):
+        return _run_statement(self, 'executemany', self._target.connection, args, kwargs)
+
+
+class TracedConnection(_TracedProxy):
+    """DB-API connection whose cursors (and sqlite ``execute`` shortcuts) are timed as ``db``"""
+
+    _traced_methods = ('executescript', 'commit', 'rollback')
+
+    def execute(self, *args, **kwargs):
+        return _run_statement(self, 'execute', self._target, args, kwargs)
+
+    def executemany(self, *args, **kwargs):
+        return _run_statement(self, 'executemany', self._target, args, kwargs)
+
+    def cursor(self, *args, **kwargs):
+        return TracedCursor(self._target.cursor(*args, **kwargs), 'db', 'sql')
+
+    def close(self):
+        self._finalizer()
+        return self._target.close()
+
+
+class TracedCollection(_TracedProxy):
+    """Vector-store collection whose data calls are timed as ``vector``"""
+
+    _traced_methods = ('add', 'upsert', 'update', 'delete', 'get', 'peek', 'query', 'count')
+
+
+def trace_connection(conn):
+    """Wrap a DB connection for tracing / SQL accounting (unchanged when both are disabled)"""
+    if not (TRACING_ENABLED or sql_stats.SQL_STATS_ENABLED) or conn is None or isinstance(conn, TracedConnection):
+        return conn
+    traced = TracedConnection(conn, 'db', 'sql')
+    metrics.DB_CONNECTIONS_OPENED.inc()
+    metrics.DB_CONNECTIONS_OPEN.inc()
+    # Connections dropped without close() still leave the open gauge when collected
+    object.__setattr__(traced, '_finalizer', weakref.finalize(traced, metrics.DB_CONNECTIONS_OPEN.dec))
+    return traced
+
+
+def trace_collection(collection):
+    """Wrap a vector-store collection for tracing (unchanged when tracing is disabled)"""
+    if not TRACING_ENABLED or collection is None or isinstance(collection, TracedCollection):
+        return collection
+    return TracedCollection(collection, 'vector', 'vector', collection=getattr(collection, 'name', ''))
+
+
+# --- per-endpoint histograms ----------------------------------------------------
+
+def observe_trace(trace: Trace):
+    """Add a finished trace to the latency histograms for its endpoint (total and each category)"""
+    for category, ms in trace.breakdown().items():
+        if category != 'app':
+            metrics.REQUEST_LATENCY.labels(trace.endpoint, category).observe(ms / 1000.0)
+
+
+def latency_histograms() -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """{endpoint: {category|'total': {'count', 'sum_ms', 'buckets': [[le_ms, cumulative count], ...]}}}"""
+    result: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for (endpoint, category), child in sorted(metrics.REQUEST_LATENCY.children()):
+        cumulative, total, count = child.snapshot()
+        result.setdefault(endpoint, {})[category] = {
+            'count': count,
+            'sum_ms': round(total * 1000.0, 3),
+            'buckets': [['+Inf' if bound == float('inf') else round(bound * 1000.0, 3), running]
+                        for bound, running in cumulative],
+        }
+    return result
+
+
+def reset_histograms():
+    metrics.REQUEST_LATENCY.clear()
+
+
+# --- Flask integration ----------------------------------------------------------
+
+TRACING_ENABLED = _env_flag('TRACING_ENABLED', 'true')
+
+
+def _queue_wait_ms(header: Optional[str]) -> Optional[float]:
+    """Milliseconds since ``X-Request-Start`` (``t=<seconds>`` or ``t=<microseconds>``)"""
+    if not header:
+        return None
+    value = header.strip()
+    if value.startswith('t='):
+        value = value[2:]
+    try:
+        started = float(value)
+    except ValueError:
+        return None
+    if started > 1e14:  # microseconds
+        started /= 1e6
+    elif started > 1e11:  # milliseconds
+        started /= 1e3
+    wait = (time.time() - started) * 1000.0
+    return wait if 0 <= wait < 3_600_000 else None
+
+
+def init_app(app):
+    """Register request hooks that trace every request"""
+    from flask import g, request
+
+    global TRACING_ENABLED
+    TRACING_ENABLED = bool(app.config.get('TRACING_ENABLED', TRACING_ENABLED))
+    if not TRACING_ENABLED:
+        return
+    headers_enabled = bool(app.config.get('TRACE_HEADERS', False))
+    slow_ms = float(app.config.get('TRACE_SLOW_REQUEST_MS') or 0)
+    if app.config.get('TRACING_OTEL'):
+        enable_opentelemetry()
+
+    @app.before_request
+    def _start_request_trace():
+        endpoint = f"{request.method} {request.url_rule.rule if request.url_rule else request.endpoint or 'unmatched'}"
+        trace, token = start_trace(request.headers.get('X-Request-Id'), endpoint)
+        g._trace_token = token
+        queue_ms = _queue_wait_ms(request.headers.get('X-Request-Start'))
+        if queue_ms is not None:
+            trace.add('queue', queue_ms)
+
+    @app.after_request
+    def _finish_request_trace(response):
+        trace = current_trace()
+        if trace is None:
+            return response
+        trace.finish()
+        if headers_enabled:
+            response.headers['X-Trace-Id'] = trace.trace_id
+            response.headers['Server-Timing'] = trace.server_timing()
+        return response
+
+    @app.teardown_request
+    def _end_request_trace(exc):
+        token = g.pop('_trace_token', None)
+        if token is None:
+            return
+        trace = end_trace(token)
+        if trace is None:
+            return
+        observe_trace(trace)
+        sql_stats.observe_request(trace.endpoint, trace.queries, trace.trace_id)
+        if slow_ms and trace.duration_ms >= slow_ms:
+            logger.warning(f"Slow request {trace.endpoint} ({trace.trace_id}): {trace.breakdown()}")
@@ -0,0 +1,637 @@
+"""
+Embedded, persistent vector store exposing the subset of the ChromaDB client API
+that RAGService and the book importers use (``get_or_create_collection``,
+``add``/``upsert``/``update``/``get``/``query``/``delete``/``count``).
+
+Each collection lives in ``<root>/<name>/``:
+
+    collection.json        name, metadata, vector dimension, current snapshot generation
+    snapshot-<gen>.npy     (rows, dim) float32 matrix, memory-mapped on open
+    snapshot-<gen>.json    ids, documents and metadatas for those rows
+    log.jsonl              writes since the snapshot (upserts carry base64 float32 vectors)
+
+Writes append one line to the log; after ``COMPACT_AFTER_OPS`` log entries (or on
+``persist()``) the live rows are written to a new snapshot generation and the log
+is truncated.  Replaying the log is idempotent, so a crash between switching
+snapshots and truncating the log loses nothing.
+
+Search is exact (flat) over the rows that pass the ``where`` filter, scored in
+blocks with a running top k (``embedding_matrix.blocked_top_k``).  Equality
+filters on ``INDEXED_FIELDS`` (campaign_id, location_id) are answered from
+in-memory postings before any other condition is checked, so a campaign-scoped
+query only scores that campaign's rows.  Distances follow Chroma's
+``hnsw:space`` collection setting (``l2`` by default, ``cosine`` or ``ip``).
+
+Collections are shared by every client in the process that opens the same
+directory.  The store is meant for single-node and test deployments: only one
+process should write to a given directory.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set
+
+import numpy as np
+
+from services import metrics
+from services.embedding_matrix import BLOCK_ROWS, blocked_top_k
+from services.tracing import span
+
+logger = logging.getLogger(__name__)
+
+INDEXED_FIELDS = ("campaign_id", "location_id")
+COMPACT_AFTER_OPS = 2000
+COLLECTION_FILE = "collection.json"
+LOG_FILE = "log.jsonl"
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+_INCLUDE_QUERY = ("documents", "metadatas", "distances")
+_INCLUDE_GET = ("documents", "metadatas")
+
+_collection_cache: Dict[str, "LocalCollection"] = {}
+_collection_cache_lock = threading.Lock()
+
+
+class _SentenceTransformerEmbedding:
+    """all-MiniLM-L6-v2 via sentence-transformers (same model as Chroma's default)"""
+
+    def __init__(self, model_name: str = DEFAULT_EMBEDDING_MODEL):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name)
+
+    def __call__(self, input: Sequence[str]) -> List[List[float]]:
+        return self.model.encode(list(input), normalize_embeddings=True).tolist()
+
+
+class OpenAIEmbeddingFunction:
+    """Embeddings from an OpenAI-compatible ``/v1/embeddings`` endpoint (e.g. LM Studio)"""
+
+    def __init__(self, base_url: str, model: str, timeout: float = 30):
+        import requests
+
+        self.url = base_url.rstrip("/") + "/v1/embeddings"
+        self.model = model
+        self.timeout = timeout
+        self._session = requests.Session()
+
+    def __call__(self, input: Sequence[str]) -> List[List[float]]:
+        response = self._session.post(self.url, json={"model": self.model, "input": list(input)},
+                                      timeout=self.timeout)
+        response.raise_for_status()
+        rows = sorted(response.json()["data"], key=lambda row: row.get("index", 0))
+        return [row["embedding"] for row in rows]
+
+
+def default_embedding_function() -> Callable[[Sequence[str]], Any]:
+    """Chroma's client-side default embedding function, or the same model via sentence-transformers"""
+    try:
+        from chromadb.utils import embedding_functions
+
+        return embedding_functions.DefaultEmbeddingFunction()
+    except ImportError:
+        return _SentenceTransformerEmbedding()
+
+
+def _encode_vectors(vectors: np.ndarray) -> str:
+    return base64.b64encode(np.ascontiguousarray(vectors, dtype="<f4").tobytes()).decode("ascii")
+
+
+def _decode_vectors(data: str, dim: int) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(data), dtype="<f4").reshape(-1, dim)
+
+
+def _compare(value: Any, condition: Any) -> bool:
+    if not isinstance(condition, dict):
+        return value == condition
+    for op, operand in condition.items():
+        if op == "$eq":
+            ok = value == operand
+        elif op == "$ne":
+            ok = value != operand
+        elif op == "$in":
+            ok = value in operand
+        elif op == "$nin":
+            ok = value not in operand
+        elif value is None:
+            ok = False
+        elif op == "$gt":
+            ok = value > operand
+        elif op == "$gte":
+            ok = value >= operand
+        elif op == "$lt":
+            ok = value < operand
+        elif op == "$lte":
+            ok = value <= operand
+        else:
+            raise ValueError(f"Unsupported where operator: {op}")
+        if not ok:
+            return False
+    return True
+
+
+def match_where(where: Optional[Dict[str, Any]], metadata: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate a Chroma-style ``where`` filter ($and/$or, $eq/$ne/$in/$nin/$gt/$gte/$lt/$lte)"""
+    if not where:
+        return True
+    metadata = metadata or {}
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(match_where(clause, metadata) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(match_where(clause, metadata) for clause in condition):
+                return False
+        elif not _compare(metadata.get(key), condition):
+            return False
+    return True
+
+
+def _match_document(where_document: Optional[Dict[str, Any]], document: Optional[str]) -> bool:
+    if not where_document:
+        return True
+    document = document or ""
+    for op, operand in where_document.items():
+        if op == "$contains":
+            ok = operand in document
+        elif op == "$not_contains":
+            ok = operand not in document
+        elif op == "$and":
+            ok = all(_match_document(clause, document) for clause in operand)
+        elif op == "$or":
+            ok = any(_match_document(clause, document) for clause in operand)
+        else:
+            raise ValueError(f"Unsupported where_document operator: {op}")
+        if not ok:
+            return False
+    return True
+
+
+def _indexed_terms(where: Optional[Dict[str, Any]]) -> List[tuple]:
+    """(field, allowed values) pairs that every match must satisfy, for the postings lookup"""
+    terms = []
+    for key, condition in (where or {}).items():
+        if key == "$and":
+            for clause in condition:
+                terms.extend(_indexed_terms(clause))
+        elif key in INDEXED_FIELDS:
+            if not isinstance(condition, dict):
+                terms.append((key, (condition,)))
+            elif set(condition) == {"$eq"}:
+                terms.append((key, (condition["$eq"],)))
+            elif set(condition) == {"$in"}:
+                terms.append((key, tuple(condition["$in"])))
+    return terms
+
+
+class LocalCollection:
+    """One persisted collection: flat float32 matrix plus ids, documents and metadatas"""
+
+    def __init__(self, path: Path, name: str, metadata: Optional[Dict[str, Any]] = None,
+                 embedding_function: Optional[Callable] = None):
+        self.path = path
+        self.name = name
+        self.metadata = metadata or {}
+        self._embedding_function = embedding_function
+        self._lock = threading.RLock()
+        self._generation = 0
+        self._log_ops = 0
+        self._dim: Optional[int] = None
+        self._ids: List[str] = []
+        self._documents: List[Optional[str]] = []
+        self._metadatas: List[Optional[Dict[str, Any]]] = []
+        self._rows: Dict[str, int] = {}
+        self._vectors: Optional[np.ndarray] = None  # capacity rows; may be a read-only memmap
+        self._sq_norms = np.zeros(0, dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._size = 0
+        self._postings: Dict[str, Dict[Any, Set[int]]] = {field: {} for field in INDEXED_FIELDS}
+        self._load()
+
+    # ------------------------------------------------------------------ storage
+
+    @property
+    def space(self) -> str:
+        return (self.metadata or {}).get("hnsw:space", "l2")
+
+    def _write_header(self):
+        header = {"name": self.name, "metadata": self.metadata, "dim": self._dim,
+                  "generation": self._generation}
+        tmp = self.path / (COLLECTION_FILE + ".tmp")
+        tmp.write_text(json.dumps(header), encoding="utf-8")
+        os.replace(tmp, self.path / COLLECTION_FILE)
+
+    def _load(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+        header_path = self.path / COLLECTION_FILE
+        if not header_path.exists():
+            self._write_header()
+            return
+        header = json.loads(header_path.read_text(encoding="utf-8"))
+        self.metadata = header.get("metadata") or self.metadata
+        self._dim = header.get("dim")
+        self._generation = header.get("generation", 0)
+        if self._generation:
+            records = json.loads((self.path / f"snapshot-{self._generation}.json").read_text(encoding="utf-8"))
+            vectors = np.load(self.path / f"snapshot-{self._generation}.npy", mmap_mode="r")
+            self._ids = records["ids"]
+            self._documents = records["documents"]
+            self._metadatas = records["metadatas"]
+            self._size = len(self._ids)
+            self._rows = {doc_id: row for row, doc_id in enumerate(self._ids)}
+            self._vectors = vectors
+            self._sq_norms = np.einsum("ij,ij->i", vectors, vectors).astype(np.float32)
+            self._alive = np.ones(self._size, dtype=bool)
+            for row, metadata in enumerate(self._metadatas):
+                self._index_row(row, metadata)
+        log_path = self.path / LOG_FILE
+        if log_path.exists():
+            with open(log_path, encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        logger.warning(f"Ignoring torn log entry in {log_path}")
+                        break
+                    self._replay(entry)
+                    self._log_ops += 1
+
+    def _replay(self, entry: Dict[str, Any]):
+        if entry["op"] == "upsert":
+            vectors = _decode_vectors(entry["embeddings"], entry["dim"])
+            self._apply_upsert(entry["ids"], vectors, entry["documents"], entry["metadatas"])
+        elif entry["op"] == "delete":
+            self._apply_delete(entry["ids"])
+
+    def _append_log(self, entry: Dict[str, Any]):
+        with open(self.path / LOG_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        self._log_ops += 1
+        if self._log_ops >= COMPACT_AFTER_OPS:
+            self._compact()
+
+    def _compact(self):
+        rows = np.flatnonzero(self._alive[:self._size])
+        generation = self._generation + 1
+        vectors = (self._vectors[rows] if self._vectors is not None
+                   else np.zeros((0, self._dim or 0), dtype=np.float32))
+        records = {
+            "ids": [self._ids[row] for row in rows],
+            "documents": [self._documents[row] for row in rows],
+            "metadatas": [self._metadatas[row] for row in rows],
+        }
+        npy_tmp = self.path / f"snapshot-{generation}.npy.tmp"
+        with open(npy_tmp, "wb") as f:
+            np.save(f, np.ascontiguousarray(vectors, dtype=np.float32))
+        os.replace(npy_tmp, self.path / f"snapshot-{generation}.npy")
+        json_tmp = self.path / f"snapshot-{generation}.json.tmp"
+        json_tmp.write_text(json.dumps(records), encoding="utf-8")
+        os.replace(json_tmp, self.path / f"snapshot-{generation}.json")
+
+        previous = self._generation
+        self._generation = generation
+        self._write_header()
+        open(self.path / LOG_FILE, "w").close()
+        self._log_ops = 0
+        if previous:
+            for suffix in (".npy", ".json"):
+                try:
+                    (self.path / f"snapshot-{previous}{suffix}").unlink()
+                except FileNotFoundError:
+                    pass
+
+        # Continue from the compacted arrays (rows renumbered, tombstones dropped)
+        vectors = np.array(vectors, dtype=np.float32)
+        self._ids, self._documents, self._metadatas = records["ids"], records["documents"], records["metadatas"]
+        self._size = len(self._ids)
+        self._rows = {doc_id: row for row, doc_id in enumerate(self._ids)}
+        self._vectors = vectors
+        self._sq_norms = self._sq_norms[rows].copy()
+        self._alive = np.ones(self._size, dtype=bool)
+        self._postings = {field: {} for field in INDEXED_FIELDS}
+        for row, metadata in enumerate(self._metadatas):
+            self._index_row(row, metadata)
+
+    def persist(self):
+        """Write a snapshot now (also happens automatically every COMPACT_AFTER_OPS writes)"""
+        with self._lock:
+            if self._log_ops:
+                self._compact()
+
+    # ------------------------------------------------------------------ rows
+
+    def _index_row(self, row: int, metadata: Optional[Dict[str, Any]]):
+        for field in INDEXED_FIELDS:
+            if metadata and field in metadata:
+                self._postings[field].setdefault(metadata[field], set()).add(row)
+
+    def _unindex_row(self, row: int):
+        metadata = self._metadatas[row]
+        for field in INDEXED_FIELDS:
+            if metadata and field in metadata:
+                rows = self._postings[field].get(metadata[field])
+                if rows:
+                    rows.discard(row)
+
+    def _reserve(self, extra: int):
+        """Make the vector matrix writable with room for ``extra`` more rows"""
+        needed = self._size + extra
+        current = self._vectors
+        writable = isinstance(current, np.ndarray) and not isinstance(current, np.memmap)
+        if current is not None and writable and current.shape[0] >= needed:
+            return
+        capacity = max(needed, 2 * (current.shape[0] if current is not None else 0), 64)
+        vectors = np.zeros((capacity, self._dim), dtype=np.float32)
+        norms = np.zeros(capacity, dtype=np.float32)
+        alive = np.zeros(capacity, dtype=bool)
+        if current is not None and self._size:
+            vectors[:self._size] = current[:self._size]
+            norms[:self._size] = self._sq_norms[:self._size]
+            alive[:self._size] = self._alive[:self._size]
+        self._vectors, self._sq_norms, self._alive = vectors, norms, alive
+
+    def _apply_upsert(self, ids: Sequence[str], vectors: np.ndarray, documents: Sequence[Optional[str]],
+                      metadatas: Sequence[Optional[Dict[str, Any]]]):
+        if self._dim is None:
+            self._dim = int(vectors.shape[1])
+            self._write_header()
+        elif vectors.shape[1] != self._dim:
+            raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match collection dimension {self._dim}")
+        self._reserve(len(ids))
+        for doc_id, vector, document, metadata in zip(ids, vectors, documents, metadatas):
+            row = self._rows.get(doc_id)
+            if row is None:
+                row = self._size
+                self._size += 1
+                self._rows[doc_id] = row
+                self._ids.append(doc_id)
+                self._documents.append(document)
+                self._metadatas.append(metadata)
+            else:
+                self._unindex_row(row)
+                self._documents[row] = document
+                self._metadatas[row] = metadata
+            self._vectors[row] = vector
+            self._sq_norms[row] = float(np.dot(vector, vector))
+            self._alive[row] = True
+            self._index_row(row, metadata)
+
+    def _apply_delete(self, ids: Iterable[str]):
+        for doc_id in ids:
+            row = self._rows.pop(doc_id, None)
+            if row is None:
+                continue
+            self._unindex_row(row)
+            self._alive[row] = False
+
+    def _embed(self, documents: Sequence[str], is_query: bool = False) -> np.ndarray:
+        if self._embedding_function is None:
+            self._embedding_function = default_embedding_function()
+        embed = self._embedding_function
+        metrics.EMBEDDED_TEXTS.labels("vector_store").inc(len(documents))
+        with span("embedding.query" if is_query else "embedding.documents", "embedding", count=len(documents)):
+            if is_query and hasattr(embed, "embed_query"):
+                return np.asarray(embed.embed_query(input=list(documents)), dtype=np.float32)
+            return np.asarray(embed(list(documents)), dtype=np.float32)
+
+    def _prepare(self, ids, embeddings, documents, metadatas):
+        ids = [ids] if isinstance(ids, str) else list(ids)
+        documents = list(documents) if documents is not None else [None] * len(ids)
+        metadatas = list(metadatas) if metadatas is not None else [None] * len(ids)
+        if embeddings is None:
+            if any(doc is None for doc in documents):
+                raise ValueError("documents or embeddings are required")
+            vectors = self._embed(documents)
+        else:
+            vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim != 2 or not (len(ids) == len(vectors) == len(documents) == len(metadatas)):
+            raise ValueError("ids, embeddings, documents and metadatas must have the same length")
+        # Last write wins for ids repeated within one call
+        last = {doc_id: i for i, doc_id in enumerate(ids)}
+        if len(last) != len(ids):
+            keep = sorted(last.values())
+            ids = [ids[i] for i in keep]
+            documents = [documents[i] for i in keep]
+            metadatas = [metadatas[i] for i in keep]
+            vectors = vectors[keep]
+        return ids, vectors, documents, metadatas
+
+    def _write(self, ids, vectors, documents, metadatas):
+        if not ids:
+            return
+        self._apply_upsert(ids, vectors, documents, metadatas)
+        self._append_log({
+            "op": "upsert", "ids": ids, "documents": documents, "metadatas": metadatas,
+            "dim": int(vectors.shape[1]), "embeddings": _encode_vectors(vectors),
+        })
+
+    def _select(self, ids=None, where=None, where_document=None) -> np.ndarray:
+        """Live rows (in insertion order) matching the id list and filters"""
+        if ids is not None:
+            ids = [ids] if isinstance(ids, str) else ids
+            rows = np.array([self._rows[doc_id] for doc_id in ids if doc_id in self._rows], dtype=np.int64)
+        else:
+            rows = None
+            for field, values in _indexed_terms(where):
+                postings = self._postings[field]
+                matched: Set[int] = set()
+                for value in values:
+                    matched |= postings.get(value, set())
+                rows = matched if rows is None else rows & matched
+            if rows is None:
+                rows = np.flatnonzero(self._alive[:self._size])
+            else:
+                rows = np.array(sorted(rows), dtype=np.int64)
+        rows = rows[self._alive[rows]] if len(rows) else rows
+        if where or where_document:
+            rows = np.array([
+                row for row in rows
+                if match_where(where, self._metadatas[row]) and _match_document(where_document, self._documents[row])
+            ], dtype=np.int64)
+        return rows
+
+    def _distances(self, queries: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        vectors = self._vectors[rows]
+        dots = queries @ vectors.T
+        if self.space == "cosine":
+            query_norms = np.linalg.norm(queries, axis=1, keepdims=True)
+            row_norms = np.sqrt(self._sq_norms[rows])[None, :]
+            return 1.0 - dots / np.maximum(query_norms * row_norms, 1e-12)
+        if self.space == "ip":
+            return 1.0 - dots
+        query_sq = np.einsum("ij,ij->i", queries, queries)[:, None]
+        return np.maximum(query_sq - 2.0 * dots + self._sq_norms[rows][None, :], 0.0)
+
+    # ------------------------------------------------------------------ Chroma API
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._rows)
+
+    def add(self, ids, embeddings=None, metadatas=None, documents=None, **_ignored):
+        """Insert new ids; ids that already exist are left untouched (as Chroma does)"""
+        with self._lock:
+            ids, vectors, documents, metadatas = self._prepare(ids, embeddings, documents, metadatas)
+            fresh = [i for i, doc_id in enumerate(ids) if doc_id not in self._rows]
+            if len(fresh) != len(ids):
+                logger.warning(f"{self.name}: ignoring {len(ids) - len(fresh)} existing ids in add()")
+            self._write([ids[i] for i in fresh], vectors[fresh],
+                        [documents[i] for i in fresh], [metadatas[i] for i in fresh])
+
+    def upsert(self, ids, embeddings=None, metadatas=None, documents=None, **_ignored):
+        with self._lock:
+            self._write(*self._prepare(ids, embeddings, documents, metadatas))
+
+    def update(self, ids, embeddings=None, metadatas=None, documents=None, **_ignored):
+        """Update existing ids; fields left as None keep their stored values"""
+        with self._lock:
+            ids = [ids] if isinstance(ids, str) else list(ids)
+            rows = [self._rows.get(doc_id) for doc_id in ids]
+            if any(row is None for row in rows):
+                raise ValueError(f"{self.name}: update() of ids that do not exist")
+            documents = list(documents) if documents is not None else [self._documents[row] for row in rows]
+            metadatas = list(metadatas) if metadatas is not None else [self._metadatas[row] for row in rows]
+            if embeddings is None and any(doc != self._documents[row] for doc, row in zip(documents, rows)):
+                embeddings = self._embed(documents)
+            if embeddings is None:
+                embeddings = np.array(self._vectors[rows])
+            self._write(*self._prepare(ids, embeddings, documents, metadatas))
+
+    def delete(self, ids=None, where=None, where_document=None):
+        with self._lock:
+            if ids is None and not where and not where_document:
+                raise ValueError("delete() needs ids, where or where_document")
+            rows = self._select(ids, where, where_document)
+            doomed = [self._ids[row] for row in rows]
+            if doomed:
+                self._apply_delete(doomed)
+                self._append_log({"op": "delete", "ids": doomed})
+
+    def get(self, ids=None, where=None, limit=None, offset=None, where_document=None,
+            include=_INCLUDE_GET) -> Dict[str, Any]:
+        with self._lock:
+            rows = self._select(ids, where, where_document)
+            start = offset or 0
+            rows = rows[start:start + limit] if limit is not None else rows[start:]
+            return {
+                "ids": [self._ids[row] for row in rows],
+                "documents": [self._documents[row] for row in rows] if "documents" in include else None,
+                "metadatas": [self._metadatas[row] for row in rows] if "metadatas" in include else None,
+                "embeddings": self._vectors[rows].tolist() if "embeddings" in include and len(rows) else
+                              ([] if "embeddings" in include else None),
+                "included": list(include),
+            }
+
+    def peek(self, limit: int = 10) -> Dict[str, Any]:
+        return self.get(limit=limit)
+
+    def query(self, query_texts=None, query_embeddings=None, n_results: int = 10, where=None,
+              where_document=None, include=_INCLUDE_QUERY) -> Dict[str, Any]:
+        """Exact nearest neighbours per query among the rows passing the filters"""
+        if query_embeddings is None:
+            if query_texts is None:
+                raise ValueError("query_texts or query_embeddings is required")
+            queries = self._embed([query_texts] if isinstance(query_texts, str) else query_texts, is_query=True)
+        else:
+            queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        result = {key: [] for key in ("ids", "documents", "metadatas", "distances", "embeddings")}
+        with self._lock:
+            rows = self._select(None, where, where_document)
+            # Scored BLOCK_ROWS rows at a time: no (queries x rows) distance matrix, no full row copy
+            best, scores = blocked_top_k(
+                lambda start, stop: -self._distances(queries, rows[start:stop]),
+                len(queries), len(rows), n_results, BLOCK_ROWS,
+            )
+            for q in range(len(queries)):
+                hit_rows = rows[best[q]]
+                result["ids"].append([self._ids[row] for row in hit_rows])
+                result["documents"].append([self._documents[row] for row in hit_rows])
+                result["metadatas"].append([self._metadatas[row] for row in hit_rows])
+                result["distances"].append((-scores[q]).tolist())
+                result["embeddings"].append(self._vectors[hit_rows].tolist() if len(hit_rows) else [])
+        for key in ("documents", "metadatas", "distances", "embeddings"):
+            if key not in include:
+                result[key] = None
+        result["included"] = list(include)
+        return result
+
+
+class LocalVectorClient:
+    """In-process stand-in for ``chromadb.HttpClient`` backed by ``LocalCollection`` directories"""
+
+    def __init__(self, path, embedding_function: Optional[Callable] = None):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.embedding_function = embedding_function
+
+    def heartbeat(self) -> int:
+        return time.time_ns()
+
+    def _collection_dir(self, name: str) -> Path:
+        if not name or "/" in name or "\\" in name or name.startswith("."):
+            raise ValueError(f"Invalid collection name: {name!r}")
+        return self.path / name
+
+    def _open(self, name: str, metadata=None, embedding_function=None) -> LocalCollection:
+        key = str(self._collection_dir(name).resolve())
+        with _collection_cache_lock:
+            collection = _collection_cache.get(key)
+            if collection is None:
+                collection = LocalCollection(self._collection_dir(name), name, metadata,
+                                             embedding_function or self.embedding_function)
+                _collection_cache[key] = collection
+            elif embedding_function is not None:
+                collection._embedding_function = embedding_function
+            return collection
+
+    def _exists(self, name: str) -> bool:
+        return (self._collection_dir(name) / COLLECTION_FILE).exists()
+
+    def list_collections(self) -> List[LocalCollection]:
+        return [self._open(entry.name) for entry in sorted(self.path.iterdir())
+                if (entry / COLLECTION_FILE).exists()]
+
+    def get_collection(self, name: str, embedding_function: Optional[Callable] = None) -> LocalCollection:
+        if not self._exists(name):
+            raise ValueError(f"Collection {name} does not exist.")
+        return self._open(name, embedding_function=embedding_function)
+
+    def create_collection(self, name: str, metadata: Optional[Dict[str, Any]] = None,
+                          embedding_function: Optional[Callable] = None,
+                          get_or_create: bool = False) -> LocalCollection:
+        if self._exists(name) and not get_or_create:
+            raise ValueError(f"Collection {name} already exists.")
+        return self._open(name, metadata, embedding_function)
+
+    def get_or_create_collection(self, name: str, metadata: Optional[Dict[str, Any]] = None,
+                                 embedding_function: Optional[Callable] = None) -> LocalCollection:
+        return self.create_collection(name, metadata, embedding_function, get_or_create=True)
+
+    def delete_collection(self, name: str):
+        directory = self._collection_dir(name)
+        if not (directory / COLLECTION_FILE).exists():
+            raise ValueError(f"Collection {name} does not exist.")
+        with _collection_cache_lock:
+            collection = _collection_cache.pop(str(directory.resolve()), None)
+        lock = collection._lock if collection else threading.RLock()
+        with lock:
+            for entry in directory.iterdir():
+                entry.unlink()
+            directory.rmdir()
+
+    def persist(self):
+        """Snapshot every open collection under this client's directory"""
+        prefix = str(self.path.resolve()) + os.sep
+        with _collection_cache_lock:
+            collections = [c for key, c in _collection_cache.items() if key.startswith(prefix)]
+        for collection in collections:
+            collection.persist()
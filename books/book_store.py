@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Compact on-disk storage for parsed books
+
+A parsed book is stored as two files next to each other:
+
+    <name>.jsonl     line 1: header {"format", "metadata", "processing_info", "embeddings"}
+                     line 2+: one chunk per line (text + chunk metadata, no embedding)
+    <name>.emb.npy   optional (n_chunks, dim) float16/float32 matrix; row i = chunk i
+
+The header's ``embeddings`` entry (rows, dim, sha256 of the matrix) pins the
+sidecar it was written with: the two files cannot be replaced in one step, and
+a sidecar left over from an earlier parse is ignored instead of being paired
+with the wrong chunks.
+
+The header can be read without touching the chunks, chunks are streamed line by
+line, and the embedding matrix is memory-mapped, so importers never hold a whole
+book in memory.  Legacy pretty-printed ``<name>.json`` files (chunks with inline
+embedding lists) are still readable and can be converted with:
+
+    python book_store.py convert parsed/ [--dtype float32] [--remove-json]
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+FORMAT = 'sr-book/2'
+# Before the header fingerprinted the sidecar; only its row count can be checked
+FORMAT_V1 = 'sr-book/1'
+CHUNKS_SUFFIX = '.jsonl'
+EMBEDDINGS_SUFFIX = '.emb.npy'
+LEGACY_SUFFIX = '.json'
+DEFAULT_EMBEDDING_DTYPE = 'float16'
+# Written next to the books but not books: <name>.diff.json (parse_manifest);
+# dotfiles such as .parse_manifest.json and .import_state.json are skipped too
+NON_BOOK_SUFFIXES = ('.diff.json',)
+
+
+def book_paths(path: Path) -> Tuple[Path, Path]:
+    """Return (chunks .jsonl, embeddings .emb.npy) for a book path with any suffix"""
+    path = Path(path)
+    stem = path.name
+    for suffix in (EMBEDDINGS_SUFFIX, CHUNKS_SUFFIX, LEGACY_SUFFIX):
+        if stem.endswith(suffix):
+            stem = stem[:-len(suffix)]
+            break
+    return path.with_name(stem + CHUNKS_SUFFIX), path.with_name(stem + EMBEDDINGS_SUFFIX)
+
+
+def is_book_file(path: Path) -> bool:
+    """False for the manifest, import state and chunk diff files kept beside parsed books"""
+    name = Path(path).name
+    return not name.startswith('.') and not name.endswith(NON_BOOK_SUFFIXES)
+
+
+def _matrix_digest(matrix) -> str:
+    return hashlib.sha256(np.ascontiguousarray(matrix)).hexdigest()
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("numpy is required for book embeddings (pip install numpy)")
+
+
+def write_book(path: Path, data: Dict[str, Any], embeddings=None,
+               dtype: str = DEFAULT_EMBEDDING_DTYPE) -> Path:
+    """
+    Write a parsed book ({'metadata', 'processing_info', 'chunks'}) in the compact format.
+
+    Embeddings come from ``embeddings`` (array-like, one row per chunk) or, if None,
+    from each chunk's legacy ``'embedding'`` list.  Each file is replaced atomically,
+    the .jsonl first; its header fingerprints the sidecar, so a crash between the two
+    replaces leaves a book whose stale embeddings are ignored.  Returns the .jsonl path.
+    """
+    chunks_path, emb_path = book_paths(path)
+    chunks = data.get('chunks', [])
+
+    if embeddings is None and chunks and 'embedding' in chunks[0]:
+        embeddings = [chunk['embedding'] for chunk in chunks]
+
+    matrix = None
+    header = {
+        'format': FORMAT,
+        'metadata': data.get('metadata', {}),
+        'processing_info': data.get('processing_info', {}),
+    }
+    if embeddings is not None and len(embeddings):
+        _require_numpy()
+        matrix = np.ascontiguousarray(np.asarray(embeddings, dtype=dtype))
+        if matrix.ndim != 2 or matrix.shape[0] != len(chunks):
+            raise ValueError(f"{matrix.shape[0]} embeddings for {len(chunks)} chunks")
+        header['embeddings'] = {
+            'rows': int(matrix.shape[0]),
+            'dim': int(matrix.shape[1]),
+            'dtype': str(matrix.dtype),
+            'sha256': _matrix_digest(matrix),
+        }
+
+    tmp = chunks_path.with_name(chunks_path.name + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(header, ensure_ascii=False, separators=(',', ':')) + '\n')
+        for chunk in chunks:
+            row = {k: v for k, v in chunk.items() if k != 'embedding'}
+            f.write(json.dumps(row, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+    if matrix is not None:
+        emb_tmp = emb_path.with_name(emb_path.name + '.tmp.npy')
+        np.save(emb_tmp, matrix)
+        os.replace(tmp, chunks_path)
+        os.replace(emb_tmp, emb_path)
+    else:
+        os.replace(tmp, chunks_path)
+        if emb_path.exists():
+            emb_path.unlink()
+    return chunks_path
+
+
+class BookReader:
+    """Streaming reader for compact (.jsonl + .emb.npy) and legacy (.json) parsed books"""
+
+    def __init__(self, path: Path):
+        path = Path(path)
+        chunks_path, emb_path = book_paths(path)
+        if chunks_path.exists():
+            self.path = chunks_path
+            self.embeddings_path = emb_path
+            self.legacy = False
+        elif path.suffix == LEGACY_SUFFIX and path.exists():
+            self.path = path
+            self.embeddings_path = None
+            self.legacy = True
+        else:
+            raise FileNotFoundError(f"Parsed book not found: {path}")
+        self._legacy_data: Optional[Dict[str, Any]] = None
+        self._header: Optional[Dict[str, Any]] = None
+        self._matrix = None
+        self._matrix_checked = False
+
+    def _load_legacy(self) -> Dict[str, Any]:
+        if self._legacy_data is None:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._legacy_data = json.load(f)
+        return self._legacy_data
+
+    @property
+    def header(self) -> Dict[str, Any]:
+        if self._header is None:
+            if self.legacy:
+                data = self._load_legacy()
+                self._header = {
+                    'format': 'legacy-json',
+                    'metadata': data.get('metadata', {}),
+                    'processing_info': data.get('processing_info', {}),
+                }
+            else:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._header = json.loads(f.readline())
+        return self._header
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return self.header.get('metadata', {})
+
+    @property
+    def processing_info(self) -> Dict[str, Any]:
+        return self.header.get('processing_info', {})
+
+    @property
+    def has_embeddings(self) -> bool:
+        if self.legacy:
+            return bool(self.processing_info.get('embeddings_generated'))
+        return self._sidecar() is not None
+
+    def _sidecar(self):
+        """The memory-mapped sidecar if it is the one this header was written with, else None"""
+        if self._matrix_checked:
+            return self._matrix
+        self._matrix_checked = True
+        if not self.embeddings_path.exists():
+            return None
+        expected = self.header.get('embeddings')
+        if expected is None and self.header.get('format') != FORMAT_V1:
+            logger.warning(f"{self.embeddings_path.name}: book was written without embeddings, ignoring sidecar")
+            return None
+        _require_numpy()
+        matrix = np.load(self.embeddings_path, mmap_mode='r')
+        if expected is None:
+            stale = matrix.shape[0] != len(self)
+        else:
+            stale = (tuple(matrix.shape) != (expected.get('rows'), expected.get('dim'))
+                     or _matrix_digest(matrix) != expected.get('sha256'))
+        if stale:
+            logger.warning(f"{self.embeddings_path.name} does not match {self.path.name}, ignoring stale embeddings")
+            return None
+        self._matrix = matrix
+        return matrix
+
+    def __len__(self) -> int:
+        return int(self.processing_info.get('total_chunks', 0))
+
+    def iter_chunks(self) -> Iterator[Dict[str, Any]]:
+        """Yield chunk dicts (without embeddings) in file order"""
+        if self.legacy:
+            for chunk in self._load_legacy().get('chunks', []):
+                yield {k: v for k, v in chunk.items() if k != 'embedding'}
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            f.readline()
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def embeddings(self):
+        """(n_chunks, dim) array memory-mapped from disk, or None when the book has none"""
+        if not self.has_embeddings:
+            return None
+        _require_numpy()
+        if self.legacy:
+            chunks = self._load_legacy().get('chunks', [])
+            return np.asarray([c['embedding'] for c in chunks], dtype=np.float32)
+        return self._sidecar()
+
+    def iter_batches(self, batch_size: int = 100) -> Iterator[Tuple[int, List[Dict[str, Any]], Any]]:
+        """Yield (start_index, chunks, embeddings_slice_or_None) batches"""
+        matrix = self.embeddings()
+        batch: List[Dict[str, Any]] = []
+        start = 0
+        for chunk in self.iter_chunks():
+            batch.append(chunk)
+            if len(batch) >= batch_size:
+                yield start, batch, None if matrix is None else matrix[start:start + len(batch)]
+                start += len(batch)
+                batch = []
+        if batch:
+            yield start, batch, None if matrix is None else matrix[start:start + len(batch)]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Materialise the whole book (legacy layout without inline embeddings)"""
+        return {
+            'metadata': self.metadata,
+            'processing_info': self.processing_info,
+            'chunks': list(self.iter_chunks()),
+        }
+
+
+def find_books(parsed_dir: Path) -> List[Path]:
+    """Parsed books in a directory; a legacy .json is skipped once its .jsonl exists"""
+    parsed_dir = Path(parsed_dir)
+    found = {p.name[:-len(CHUNKS_SUFFIX)]: p for p in parsed_dir.glob('*' + CHUNKS_SUFFIX) if is_book_file(p)}
+    for p in parsed_dir.glob('*' + LEGACY_SUFFIX):
+        if is_book_file(p):
+            found.setdefault(p.name[:-len(LEGACY_SUFFIX)], p)
+    return [found[k] for k in sorted(found)]
+
+
+def convert_json(json_path: Path, dtype: str = DEFAULT_EMBEDDING_DTYPE,
+                 remove_json: bool = False) -> Path:
+    """Convert one legacy parsed .json file to the compact format"""
+    json_path = Path(json_path)
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    out = write_book(json_path, data, dtype=dtype)
+    if remove_json:
+        json_path.unlink()
+    return out
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Parsed book storage utilities')
+    sub = parser.add_subparsers(dest='command')
+
+    conv = sub.add_parser('convert', help='Convert legacy parsed .json files to .jsonl + .emb.npy')
+    conv.add_argument('paths', nargs='+', help='Parsed .json files or directories containing them')
+    conv.add_argument('--dtype', choices=['float16', 'float32'], default=DEFAULT_EMBEDDING_DTYPE,
+                      help=f'Embedding storage precision (default: {DEFAULT_EMBEDDING_DTYPE})')
+    conv.add_argument('--remove-json', action='store_true', help='Delete each .json after converting it')
+
+    args = parser.parse_args()
+    if args.command != 'convert':
+        parser.print_help()
+        return 1
+
+    files: List[Path] = []
+    for p in map(Path, args.paths):
+        files.extend(sorted(f for f in p.glob('*' + LEGACY_SUFFIX) if is_book_file(f)) if p.is_dir() else [p])
+
+    failed = 0
+    for json_path in files:
+        try:
+            before = json_path.stat().st_size
+            out = convert_json(json_path, dtype=args.dtype, remove_json=args.remove_json)
+            _, emb_path = book_paths(out)
+            after = out.stat().st_size + (emb_path.stat().st_size if emb_path.exists() else 0)
+            print(f"✅ {json_path.name}: {before / 1e6:.1f} MB → {after / 1e6:.1f} MB")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {json_path.name}: {e}")
+    print(f"\nConverted {len(files) - failed}/{len(files)} files")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
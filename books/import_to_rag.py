@@ -5,11 +5,16 @@ Manages selective book imports based on campaign needs
 """
 
 import json
+import os
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any
-import chromadb
-from chromadb.config import Settings
+from typing import List, Dict, Any, Optional, Tuple
+
+from book_store import BookReader, book_paths, find_books
+from parse_manifest import load_diff, text_hash
 
 # Book set configurations for different campaign types
 CAMPAIGN_BOOK_SETS = {
@@ -52,138 +57,300 @@ CAMPAIGN_BOOK_SETS = {
 }
 
 
+IMPORT_STATE_NAME = '.import_state.json'
+DEFAULT_BATCH_SIZE = 256
+# Upsert batches allowed in flight at once across all books
+DEFAULT_MAX_IN_FLIGHT = 8
+# Books imported concurrently by import_book_set
+DEFAULT_BOOK_WORKERS = 3
+
+
+def chunk_doc_id(book_id: str, campaign_id: int, chunk_hash: str) -> str:
+    """Content-addressed ChromaDB id: stable across re-chunking, unique per book and campaign"""
+    return f"{book_id}_{campaign_id}_{chunk_hash[:20]}"
+
+
+def scope_ids(collection, where: Dict[str, Any], batch_size: int = DEFAULT_BATCH_SIZE) -> List[str]:
+    """Every id matching ``where``, fetched ``batch_size`` per request"""
+    ids: List[str] = []
+    while True:
+        page = collection.get(where=where, limit=batch_size, offset=len(ids), include=[])['ids']
+        ids.extend(page)
+        if len(page) < batch_size:
+            return ids
+
+
+def delete_ids(collection, ids: List[str], where: Dict[str, Any],
+               batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Delete ``ids`` (restricted to ``where``) ``batch_size`` per request; returns the count"""
+    for start in range(0, len(ids), batch_size):
+        collection.delete(ids=ids[start:start + batch_size], where=where)
+    return len(ids)
+
+
+class ImportCheckpoint:
+    """
+    Per-book import progress in ``parsed/.import_state.json``, keyed by
+    collection, campaign and book id:
+
+        version         processed_at of the parsed output being imported
+        mode            'full' or 'diff'
+        status          'partial' until every batch is upserted and stale chunks pruned
+        batches_done    leading batches known to be upserted (resume point)
+        chunks          chunks in the book when it completed
+        imported_at     completion time
+    """
+
+    def __init__(self, parsed_dir: Path):
+        self.path = Path(parsed_dir) / IMPORT_STATE_NAME
+        self._lock = threading.Lock()
+        self.books: Dict[str, Dict[str, Any]] = {}
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.books = json.load(f).get('books', {})
+            except (OSError, ValueError):
+                self.books = {}
+
+    @staticmethod
+    def key(collection: str, book_id: str, campaign_id: int) -> str:
+        return f"{collection}:{campaign_id}:{book_id}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self.books.get(key)
+            return dict(entry) if entry else None
+
+    def update(self, key: str, **fields):
+        with self._lock:
+            self.books.setdefault(key, {}).update(fields)
+            tmp = self.path.with_name(self.path.name + '.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'books': self.books}, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+
+
 class SmartBookImporter:
     """Manages intelligent book imports to vector database"""
     
-    def __init__(self, parsed_dir: Path, chromadb_host='localhost', chromadb_port=8000):
+    def __init__(self, parsed_dir: Path, chromadb_host='localhost', chromadb_port=8000,
+                 max_in_flight: int = DEFAULT_MAX_IN_FLIGHT, book_workers: int = DEFAULT_BOOK_WORKERS,
+                 batch_size: int = DEFAULT_BATCH_SIZE, client=None):
         self.parsed_dir = parsed_dir
-        self.client = chromadb.HttpClient(
-            host=chromadb_host,
-            port=chromadb_port,
-            settings=Settings(allow_reset=True)
-        )
+        if client is None:
+            import chromadb
+            from chromadb.config import Settings
+            client = chromadb.HttpClient(
+                host=chromadb_host,
+                port=chromadb_port,
+                settings=Settings(allow_reset=True)
+            )
+        self.client = client
         self.collection_name = 'rule_books'
+        self.checkpoint = ImportCheckpoint(parsed_dir)
+        self.book_workers = max(1, book_workers)
+        self.batch_size = batch_size
+        
+        # Shared upsert pool; the semaphore bounds queued + running batches so
+        # readers never get far ahead of ChromaDB
+        self.max_in_flight = max(1, max_in_flight)
+        self._upserts = ThreadPoolExecutor(max_workers=self.max_in_flight)
+        self._in_flight = threading.BoundedSemaphore(self.max_in_flight)
+        self._collection = None
+        self._collection_lock = threading.Lock()
         
     def list_available_books(self) -> List[Dict[str, Any]]:
         """List all parsed books available for import"""
         books = []
         
-        for json_file in self.parsed_dir.glob('*.json'):
+        for book_file in find_books(self.parsed_dir):
             try:
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    
+                # Only the header line is read for compact books
+                reader = BookReader(book_file)
+                metadata = reader.metadata
+                info = reader.processing_info
+                
                 books.append({
-                    'file': json_file.name,
-                    'filename': data['metadata']['filename'],
-                    'system': data['metadata']['system'],
-                    'category': data['metadata']['category'],
-                    'pages': data['processing_info']['total_pages'],
-                    'chunks': data['processing_info']['total_chunks'],
-                    'has_embeddings': data['processing_info'].get('embeddings_generated', False),
-                    'path': str(json_file)
+                    'file': book_file.name,
+                    'filename': metadata['filename'],
+                    'system': metadata['system'],
+                    'category': metadata['category'],
+                    'pages': info['total_pages'],
+                    'chunks': info['total_chunks'],
+                    'has_embeddings': reader.has_embeddings,
+                    'path': str(book_file)
                 })
             except Exception as e:
-                print(f"Error reading {json_file}: {e}")
+                print(f"Error reading {book_file}: {e}")
                 
         return sorted(books, key=lambda x: (x['system'], x['filename']))
     
+    def get_collection(self):
+        """Get or create the rule-book collection (once per importer)"""
+        with self._collection_lock:
+            if self._collection is None:
+                try:
+                    self._collection = self.client.get_collection(self.collection_name)
+                except Exception:
+                    self._collection = self.client.create_collection(
+                        name=self.collection_name,
+                        metadata={"description": "World of Darkness rule books"}
+                    )
+            return self._collection
+    
+    def _submit_upsert(self, collection, ids, docs, metas, embeddings):
+        """Queue one upsert batch, blocking while max_in_flight batches are pending"""
+        self._in_flight.acquire()
+        try:
+            kwargs = {'ids': ids, 'documents': docs, 'metadatas': metas}
+            if embeddings is not None:
+                kwargs['embeddings'] = embeddings
+            future = self._upserts.submit(collection.upsert, **kwargs)
+        except Exception:
+            self._in_flight.release()
+            raise
+        future.add_done_callback(lambda _: self._in_flight.release())
+        return future
+    
     def import_book(self, json_path: Path, book_id: str, campaign_id: int = 0,
-                    batch_size: int = 100) -> bool:
+                    batch_size: Optional[int] = None, force: bool = False) -> bool:
         """
-        Import a single book to ChromaDB
+        Import a single book to ChromaDB (idempotent and resumable)
+        
+        Chunks get content-hash ids and are upserted, so reruns never duplicate.
+        When the book was fully imported from the output its ``<name>.diff.json``
+        starts from, only the diff is applied; otherwise every chunk is upserted
+        and chunks of this book/campaign that are no longer in the output are
+        removed with one filtered delete.  An interrupted import resumes after
+        the last batch known to be written.
         
         Args:
-            json_path: Path to parsed JSON file
+            json_path: Path to parsed .jsonl (or legacy .json) file
             book_id: Unique identifier for this book
             campaign_id: 0 for global, >0 for campaign-specific
-            batch_size: Number of chunks to insert at once
+            batch_size: Number of chunks per upsert (default: the importer's)
+            force: Re-upsert everything even if the checkpoint says it is current
         """
+        batch_size = batch_size or self.batch_size
         try:
-            print(f"\n📚 Importing book: {json_path.name}")
+            # Open parsed data (chunks are streamed, embeddings memory-mapped)
+            reader = BookReader(json_path)
+            metadata = reader.metadata
+            total_chunks = len(reader)
+            version = reader.processing_info.get('processed_at') or str(reader.path.stat().st_mtime_ns)
+            key = self.checkpoint.key(self.collection_name, book_id, campaign_id)
+            state = self.checkpoint.get(key) or {}
             
-            # Load parsed data
-            with open(json_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            if not force and state.get('status') == 'complete' and state.get('version') == version:
+                print(f"⏭️  {json_path.name}: already imported ({state.get('chunks', total_chunks)} chunks)")
+                return True
             
-            metadata = data['metadata']
-            chunks = data['chunks']
-            has_embeddings = data['processing_info'].get('embeddings_generated', False)
+            # Apply the parse diff when it starts exactly where the last import ended
+            diff = load_diff(reader.path)
+            use_diff = bool(
+                not force and diff
+                and state.get('status') == 'complete'
+                and diff.get('previous_processed_at') == state.get('version')
+                and diff.get('processed_at') == version
+            )
+            wanted = set(diff['upsert']) if use_diff else None
+            mode = 'diff' if use_diff else 'full'
             
-            print(f"   System: {metadata['system']}")
-            print(f"   Chunks: {len(chunks)}")
-            print(f"   Embeddings: {'✓' if has_embeddings else '✗'}")
+            resume_from = 0
+            if not force and state.get('status') == 'partial' and state.get('version') == version \
+                    and state.get('mode') == mode and state.get('batch_size') == batch_size:
+                resume_from = state.get('batches_done', 0)
             
-            # Get or create collection
-            try:
-                collection = self.client.get_collection(self.collection_name)
-            except:
-                collection = self.client.create_collection(
-                    name=self.collection_name,
-                    metadata={"description": "World of Darkness rule books"}
-                )
+            print(f"\n📚 Importing book: {json_path.name} "
+                  f"({metadata['system']}, {total_chunks} chunks, "
+                  f"embeddings {'✓' if reader.has_embeddings else '✗'}, {mode}"
+                  f"{f', resuming at batch {resume_from}' if resume_from else ''})")
             
-            # Prepare data for batch insert
-            ids = []
-            documents = []
-            metadatas = []
-            embeddings = [] if has_embeddings else None
+            collection = self.get_collection()
+            self.checkpoint.update(key, version=version, mode=mode, status='partial',
+                                   batch_size=batch_size, batches_done=resume_from)
             
-            for i, chunk in enumerate(chunks):
-                # Use index to ensure uniqueness even if chunk_id has duplicates
-                chunk_id = f"{book_id}_{campaign_id}_{i}_{chunk['chunk_id']}"
-                ids.append(chunk_id)
-                documents.append(chunk['text'])
-                
-                chunk_metadata = {
-                    'book_id': book_id,
-                    'campaign_id': campaign_id,
-                    'filename': metadata['filename'],
-                    'system': metadata['system'],
-                    'category': metadata['category'],
-                    'page_number': chunk['page_number'],
-                    'chunk_id': chunk['chunk_id'],
-                    'word_count': chunk['word_count']
-                }
-                metadatas.append(chunk_metadata)
-                
-                if has_embeddings:
-                    embeddings.append(chunk['embedding'])
+            scope = {'$and': [{'book_id': book_id}, {'campaign_id': campaign_id}]}
+            current_ids = set()
+            pending: Dict[Any, Tuple[int, int]] = {}
+            finished = set()
+            done_through = resume_from
+            upserted = 0
             
-            # Insert in batches
-            total_inserted = 0
-            for i in range(0, len(ids), batch_size):
-                batch_ids = ids[i:i+batch_size]
-                batch_docs = documents[i:i+batch_size]
-                batch_meta = metadatas[i:i+batch_size]
+            def collect(block: bool):
+                nonlocal done_through, upserted
+                ready = [f for f in pending if block or f.done()]
+                for future in ready:
+                    batch_index, batch_len = pending.pop(future)
+                    future.result()
+                    finished.add(batch_index)
+                    upserted += batch_len
+                advanced = done_through
+                while advanced in finished:
+                    advanced += 1
+                if advanced != done_through:
+                    done_through = advanced
+                    self.checkpoint.update(key, batches_done=done_through)
+            
+            for batch_index, (start, chunks, batch_emb) in enumerate(reader.iter_batches(batch_size)):
+                batch_ids, batch_docs, batch_meta, rows = [], [], [], []
+                for offset, chunk in enumerate(chunks):
+                    chunk_hash = chunk.get('text_hash') or text_hash(chunk['text'])
+                    doc_id = chunk_doc_id(book_id, campaign_id, chunk_hash)
+                    # Repeated text (e.g. boilerplate) is stored once
+                    if doc_id in current_ids:
+                        continue
+                    current_ids.add(doc_id)
+                    if batch_index < resume_from or (wanted is not None and chunk_hash not in wanted):
+                        continue
+                    batch_ids.append(doc_id)
+                    batch_docs.append(chunk['text'])
+                    batch_meta.append({
+                        'book_id': book_id,
+                        'campaign_id': campaign_id,
+                        'filename': metadata['filename'],
+                        'system': metadata['system'],
+                        'category': metadata['category'],
+                        'page_number': chunk['page_number'],
+                        'chunk_id': chunk['chunk_id'],
+                        'word_count': chunk['word_count'],
+                        'text_hash': chunk_hash
+                    })
+                    rows.append(offset)
                 
-                if has_embeddings:
-                    batch_emb = embeddings[i:i+batch_size]
-                    collection.add(
-                        ids=batch_ids,
-                        documents=batch_docs,
-                        metadatas=batch_meta,
-                        embeddings=batch_emb
-                    )
-                else:
-                    collection.add(
-                        ids=batch_ids,
-                        documents=batch_docs,
-                        metadatas=batch_meta
-                    )
+                if not batch_ids:
+                    finished.add(batch_index)
+                    continue
                 
-                total_inserted += len(batch_ids)
-                print(f"   Inserted {total_inserted}/{len(ids)} chunks", end='\r')
+                embeddings = None
+                if batch_emb is not None:
+                    # float32 array straight from the memory-mapped matrix (no Python float lists)
+                    embeddings = batch_emb[rows].astype('float32', copy=False)
+                future = self._submit_upsert(collection, batch_ids, batch_docs, batch_meta, embeddings)
+                pending[future] = (batch_index, len(batch_ids))
+                collect(block=False)
+            
+            collect(block=True)
+            
+            # Prune chunks of this book that the current output no longer has
+            if use_diff:
+                stale = [chunk_doc_id(book_id, campaign_id, h) for h in diff['delete']]
+            else:
+                existing = scope_ids(collection, scope, batch_size)
+                stale = [doc_id for doc_id in existing if doc_id not in current_ids]
+            delete_ids(collection, stale, scope, batch_size)
             
-            print(f"\n   ✓ Successfully imported {total_inserted} chunks")
+            self.checkpoint.update(key, status='complete', chunks=len(current_ids),
+                                   imported_at=datetime.now().isoformat())
+            print(f"   ✓ {json_path.name}: upserted {upserted} chunks, pruned {len(stale)} stale")
             return True
             
         except Exception as e:
-            print(f"   ✗ Error importing book: {e}")
+            print(f"   ✗ Error importing book {json_path.name}: {e}")
             return False
     
-    def import_book_set(self, set_name: str, campaign_id: int = 0) -> Dict[str, Any]:
-        """Import a predefined set of books for a campaign type"""
+    def import_book_set(self, set_name: str, campaign_id: int = 0, force: bool = False) -> Dict[str, Any]:
+        """Import a predefined set of books for a campaign type (several books at once)"""
         if set_name not in CAMPAIGN_BOOK_SETS:
             print(f"❌ Unknown book set: {set_name}")
             print(f"Available sets: {', '.join(CAMPAIGN_BOOK_SETS.keys())}")
@@ -200,6 +367,7 @@ class SmartBookImporter:
         imported_count = 0
         failed_count = 0
         
+        jobs = []
         for book_pattern in book_set['books']:
             # Find matching books
             matches = [b for b in available_books 
@@ -212,17 +380,19 @@ class SmartBookImporter:
                 continue
             
             # Use first match (could be improved with better matching)
-            book = matches[0]
-            success = self.import_book(
-                Path(book['path']),
-                book_id=book_pattern,
-                campaign_id=campaign_id
-            )
-            
-            if success:
-                imported_count += 1
-            else:
-                failed_count += 1
+            jobs.append((Path(matches[0]['path']), book_pattern))
+        
+        with ThreadPoolExecutor(max_workers=self.book_workers) as books_pool:
+            futures = [
+                books_pool.submit(self.import_book, path, book_id=book_id,
+                                  campaign_id=campaign_id, force=force)
+                for path, book_id in jobs
+            ]
+            for future in futures:
+                if future.result():
+                    imported_count += 1
+                else:
+                    failed_count += 1
         
         print(f"\n{'='*80}")
         print(f"Import Complete!")
@@ -295,6 +465,10 @@ Examples:
   
   # List books for a specific campaign
   python import_to_rag.py --list-imported --campaign-id 1
+  
+  # Re-run after a crash or a re-parse: finished books are skipped, partial
+  # books resume, re-parsed books only apply their .diff.json
+  python import_to_rag.py --import-set vampire_full --campaign-id 1
         """
     )
     
@@ -316,7 +490,7 @@ Examples:
     parser.add_argument(
         '--import-file',
         type=str,
-        help='Import a specific JSON file (e.g., "Vampire - the Masquerade - Revised.json")'
+        help='Import a specific parsed file (e.g., "Vampire - the Masquerade - Revised.jsonl")'
     )
     parser.add_argument(
         '--campaign-id',
@@ -333,7 +507,42 @@ Examples:
         '--parsed-dir',
         type=str,
         default=None,
-        help='Directory with parsed JSON files'
+        help='Directory with parsed .jsonl/.json files'
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Re-upsert whole books even if the import checkpoint says they are current'
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f'Chunks per upsert (default: {DEFAULT_BATCH_SIZE})'
+    )
+    parser.add_argument(
+        '--max-in-flight',
+        type=int,
+        default=DEFAULT_MAX_IN_FLIGHT,
+        help=f'Upsert batches in flight at once (default: {DEFAULT_MAX_IN_FLIGHT})'
+    )
+    parser.add_argument(
+        '--book-workers',
+        type=int,
+        default=DEFAULT_BOOK_WORKERS,
+        help=f'Books imported concurrently by --import-set (default: {DEFAULT_BOOK_WORKERS})'
+    )
+    parser.add_argument(
+        '--vector-store',
+        choices=['chromadb', 'local'],
+        default=os.environ.get('VECTOR_STORE') or 'chromadb',
+        help='ChromaDB server, or the embedded store used by the backend with VECTOR_STORE=local'
+    )
+    parser.add_argument(
+        '--vector-store-dir',
+        type=str,
+        default=os.environ.get('VECTOR_STORE_DIR'),
+        help='Embedded store directory (default: processed/vectors next to this script)'
     )
     
     args = parser.parse_args()
@@ -349,8 +558,23 @@ Examples:
         print("   Run parse_books.py first to generate parsed books")
         sys.exit(1)
     
+    client = None
+    if args.vector_store == 'local':
+        # Same store implementation the backend's RAGService opens
+        backend_dir = Path(__file__).resolve().parent.parent / 'backend'
+        if str(backend_dir) not in sys.path:
+            sys.path.insert(0, str(backend_dir))
+        from services.vector_store import LocalVectorClient
+        client = LocalVectorClient(args.vector_store_dir or Path(__file__).parent / 'processed' / 'vectors')
+    
     # Create importer
-    importer = SmartBookImporter(parsed_dir)
+    importer = SmartBookImporter(
+        parsed_dir,
+        max_in_flight=args.max_in_flight,
+        book_workers=args.book_workers,
+        batch_size=args.batch_size,
+        client=client
+    )
     
     # Handle commands
     if args.list:
@@ -381,19 +605,20 @@ Examples:
             print(f"  Books: {', '.join(set_info['books'])}")
     
     elif args.import_set:
-        importer.import_book_set(args.import_set, args.campaign_id)
+        importer.import_book_set(args.import_set, args.campaign_id, force=args.force)
     
     elif args.import_file:
         # Import specific file
         json_path = parsed_dir / args.import_file
-        if not json_path.exists():
+        if not json_path.exists() and not book_paths(json_path)[0].exists():
             print(f"❌ File not found: {json_path}")
             sys.exit(1)
         
         # Generate book_id from filename
-        book_id = args.import_file.replace('.json', '').replace(' ', '_').replace('-', '_').lower()
+        stem = book_paths(json_path)[0].name[:-len('.jsonl')]
+        book_id = stem.replace(' ', '_').replace('-', '_').lower()
         
-        success = importer.import_book(json_path, book_id, args.campaign_id)
+        success = importer.import_book(json_path, book_id, args.campaign_id, force=args.force)
         if success:
             print(f"\n✅ Successfully imported to campaign {args.campaign_id}")
         else:
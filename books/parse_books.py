@@ -1,27 +1,39 @@
 #!/usr/bin/env python3
 """
 PDF Book Parser for RAG/Vector Database
-Batch processes all PDFs in the books directory and outputs structured JSON
+Batch processes all PDFs in the books directory and outputs compact JSONL
+(plus a memory-mappable .emb.npy embedding matrix, see book_store.py)
 Optimized for multi-core processing and high performance
 """
 
 import os
 import sys
-import json
-import hashlib
 import re
+import time
+import queue
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
 from typing import List, Dict, Any, Tuple, Optional
 from datetime import datetime
 from tqdm import tqdm
-import pdfplumber
-from multiprocessing import Pool, cpu_count, Manager
+from multiprocessing import Pool, cpu_count
 import multiprocessing
-from functools import partial
 import gc
 
+from book_store import BookReader, write_book
+
+# PDF extraction backends are shared with the backend's rule-book service
+_BACKEND_DIR = Path(__file__).resolve().parent.parent / 'backend'
+if _BACKEND_DIR.is_dir() and str(_BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(_BACKEND_DIR))
+from services.pdf_extractor import EXTRACTORS, get_extractor, page_range
+from services.text_chunker import TextChunker, load_token_length_function, token_length_function
+from parse_manifest import ParseManifest, chunk_diff, text_hash, write_diff
+
 # Optional GPU support for embeddings
 try:
+    import numpy as np
     import torch
     from sentence_transformers import SentenceTransformer
     GPU_AVAILABLE = torch.cuda.is_available()
@@ -31,59 +43,138 @@ except ImportError:
     SentenceTransformer = None
 
 
-def _process_single_pdf_worker(pdf_path: Path, books_dir: Path, output_dir: Path,
-                                chunk_size: int, overlap: int, 
-                                generate_embeddings: bool = False,
-                                embedding_model_name: str = None) -> Dict[str, Any]:
+DEFAULT_EMBEDDING_MODEL = 'sentence-transformers/all-MiniLM-L6-v2'
+CHUNK_UNITS = ('chars', 'tokens')
+
+# Books longer than this are split into page ranges of this size
+DEFAULT_PAGES_PER_TASK = 32
+# Finished books waiting for chunking/embedding before extraction results are held back
+MAX_PENDING_BOOKS = 4
+# Page-range tasks submitted to the pool per worker; completed results beyond
+# these are never produced until the parent has consumed earlier ones
+TASKS_PER_WORKER = 2
+
+# pdfplumber settings, wherever pdfplumber is used (including as the 'auto'
+# fallback for layout-sensitive pages)
+PDFPLUMBER_OPTIONS = {'x_tolerance': 3, 'y_tolerance': 3, 'layout': True}
+
+_worker_extractor = None
+
+
+def make_extractor(extractor_name: Optional[str] = None):
+    """Text extraction backend (see backend/services/pdf_extractor.py)"""
+    return get_extractor(extractor_name, **PDFPLUMBER_OPTIONS)
+
+
+def clean_text(text: str) -> str:
+    """Clean and normalize extracted text"""
+    # Remove excessive whitespace
+    text = re.sub(r'\s+', ' ', text)
+    
+    # Remove page numbers and headers/footers (standalone numbers)
+    text = re.sub(r'^\d+\s*$', '', text, flags=re.MULTILINE)
+    
+    # Clean up common PDF artifacts while preserving punctuation
+    text = re.sub(r'[^\w\s\.\,\!\?\;\:\-\(\)\[\]\{\}\"\'\/\&\#\@\$\%\+\=\*]', '', text)
+    
+    return text.strip()
+
+
+def extract_pages(extractor, pdf_path: Path, first_page: int = 0,
+                  last_page: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Cleaned, non-empty pages [first_page, last_page) of a PDF with page information"""
+    pages_data = []
+    
+    try:
+        if first_page == 0 and last_page is None:
+            pages = None
+        else:
+            pages = page_range(first_page, last_page,
+                               extractor.page_count(pdf_path) if last_page is None else None)
+        
+        for page_num, text in extractor.iter_pages(pdf_path, pages):
+            if not text or not text.strip():
+                continue
+            
+            # Clean and process text
+            cleaned_text = clean_text(text)
+            
+            if not cleaned_text:
+                continue
+            
+            # Extract page metadata
+            page_info = {
+                'page_number': page_num + 1,
+                'text': cleaned_text,
+                'word_count': len(cleaned_text.split()),
+                'char_count': len(cleaned_text)
+            }
+            
+            pages_data.append(page_info)
+            
+            # Memory cleanup for large PDFs
+            if page_num % 50 == 0 and page_num > 0:
+                gc.collect()
+                
+    except Exception as e:
+        raise Exception(f"Error extracting text: {e}")
+    
+    return pages_data
+
+
+def _init_extract_worker(extractor_name: Optional[str] = None) -> None:
+    """Pool initializer: one extractor per worker process (no parser, manifest or model)"""
+    global _worker_extractor
+    _worker_extractor = make_extractor(extractor_name)
+
+
+def _extract_pages_worker(job: Tuple[Path, int, Optional[int]]) -> Dict[str, Any]:
     """
-    Worker function for multiprocessing - processes a single PDF
+    Worker function for multiprocessing - extracts one page range of a PDF
     Must be a module-level function for pickling
+
+    ``job`` is (pdf_path, first_page, last_page); last_page None means to the end.
+    Chunking and embedding happen in the parent so they overlap with extraction.
     """
+    pdf_path, first_page, last_page = job
+    started = time.perf_counter()
     result = {
-        'filename': pdf_path.name,
-        'success': False,
-        'pages': 0,
-        'chunks': 0,
-        'embeddings_generated': False,
+        'pdf_path': pdf_path,
+        'first_page': first_page,
+        'pages_data': [],
+        'pages_scanned': 0,
+        'worker': os.getpid(),
+        'seconds': 0.0,
         'error': None
     }
     
     try:
-        # Create a temporary parser instance for this worker
-        parser = BookParser(
-            books_dir, 
-            output_dir,
-            generate_embeddings=generate_embeddings,
-            embedding_model_name=embedding_model_name
+        result['pages_data'] = extract_pages(
+            _worker_extractor, pdf_path, first_page=first_page, last_page=last_page
         )
-        
-        # Process the PDF
-        data = parser.process_pdf(pdf_path, chunk_size, overlap)
-        
-        # Save the result
-        parser.save_processed_data(pdf_path, data)
-        
-        # Update result
-        result['success'] = True
-        result['pages'] = data['processing_info']['total_pages']
-        result['chunks'] = data['processing_info']['total_chunks']
-        result['embeddings_generated'] = data['processing_info'].get('embeddings_generated', False)
-        
-        # Clean up memory
-        del parser
-        gc.collect()
-        
+        result['pages_scanned'] = (last_page - first_page) if last_page is not None \
+            else max((p['page_number'] for p in result['pages_data']), default=0) - first_page
     except Exception as e:
         result['error'] = str(e)
     
+    result['seconds'] = time.perf_counter() - started
     return result
 
 
+def plan_page_ranges(page_count: int, pages_per_task: int) -> List[Tuple[int, Optional[int]]]:
+    """Split a book into [first, last) page ranges; unknown or small books stay whole"""
+    if page_count <= pages_per_task:
+        return [(0, None)]
+    return [(start, min(start + pages_per_task, page_count))
+            for start in range(0, page_count, pages_per_task)]
+
+
 class BookParser:
     """Parses PDF books and chunks them for RAG/Vector database ingestion"""
     
     def __init__(self, books_dir, output_dir=None, generate_embeddings=False, 
-                 embedding_model_name=None):
+                 embedding_model_name=None, extractor_name=None,
+                 chunk_unit='chars', cross_pages=False):
         self.books_dir = Path(books_dir)
         self.output_dir = Path(output_dir) if output_dir else self.books_dir / 'parsed'
         self.output_dir.mkdir(parents=True, exist_ok=True)
@@ -104,12 +195,25 @@ class BookParser:
             
             # Load embedding model
             if self.embedding_model_name is None:
-                self.embedding_model_name = 'sentence-transformers/all-MiniLM-L6-v2'  # Fast, good quality
+                self.embedding_model_name = DEFAULT_EMBEDDING_MODEL  # Fast, good quality
             
             print(f"📊 Loading embedding model: {self.embedding_model_name}")
             self.embedding_model = SentenceTransformer(self.embedding_model_name, device=self.device)
             print(f"   Model loaded on: {self.device}")
         
+        # Text extraction backend (see backend/services/pdf_extractor.py)
+        self.extractor_name = extractor_name
+        self.extractor = make_extractor(extractor_name)
+        
+        # Chunking (see backend/services/text_chunker.py); token budgets use the
+        # embedding model's tokenizer, loaded on first use
+        self.chunk_unit = chunk_unit
+        self.cross_pages = cross_pages
+        self._token_length = None
+        
+        # Content-hash manifest (see parse_manifest.py)
+        self.manifest = ParseManifest(self.output_dir)
+        
         # Processing statistics
         self.stats = {
             'total_pdfs': 0,
@@ -118,8 +222,12 @@ class BookParser:
             'failed': 0,
             'total_pages': 0,
             'total_chunks': 0,
-            'total_embeddings': 0
+            'total_embeddings': 0,
+            'pages_reused': 0,
+            'embeddings_reused': 0
         }
+        # Extraction throughput per worker pid: {'tasks', 'pages', 'seconds'}
+        self.worker_stats = defaultdict(lambda: {'tasks': 0, 'pages': 0, 'seconds': 0.0})
     
     def find_all_pdfs(self) -> List[Path]:
         """Find all PDF files in the books directory"""
@@ -130,156 +238,88 @@ class BookParser:
         return pdfs
     
     def get_output_path(self, pdf_path: Path) -> Path:
-        """Get the output JSON path for a PDF"""
+        """Get the output .jsonl path for a PDF (embeddings go to a .emb.npy sidecar)"""
         # Create a unique identifier from the relative path
         relative_path = pdf_path.relative_to(self.books_dir)
         # Replace path separators with underscores and change extension
         output_name = str(relative_path).replace('/', '_').replace('\\', '_')
-        output_name = output_name.replace('.pdf', '.json')
+        output_name = output_name.replace('.pdf', '.jsonl')
         return self.output_dir / output_name
     
-    def is_already_processed(self, pdf_path: Path) -> bool:
-        """Check if PDF has already been processed"""
-        output_path = self.get_output_path(pdf_path)
-        if not output_path.exists():
-            return False
-        
-        # Check if the PDF has been modified since processing
-        try:
-            with open(output_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                processed_time = datetime.fromisoformat(data.get('processed_at', '2000-01-01'))
-                pdf_modified = datetime.fromtimestamp(pdf_path.stat().st_mtime)
-                return processed_time > pdf_modified
-        except:
+    def manifest_key(self, pdf_path: Path) -> str:
+        """Manifest key: PDF path relative to the books directory"""
+        return pdf_path.relative_to(self.books_dir).as_posix()
+    
+    def is_already_processed(self, pdf_path: Path, chunk_size: int = 1000, overlap: int = 200,
+                             pdf_sha256: Optional[str] = None) -> bool:
+        """Check the manifest: same PDF content, chunker settings and embedding model"""
+        if not self.get_output_path(pdf_path).exists():
             return False
+        key = self.manifest_key(pdf_path)
+        if pdf_sha256 is None:
+            pdf_sha256 = self.manifest.current_sha256(key, pdf_path)
+        return self.manifest.is_current(
+            key, pdf_sha256,
+            self.chunker_config(chunk_size, overlap),
+            self.embedding_model_name if self.generate_embeddings else None
+        )
     
-    def extract_text_from_pdf(self, pdf_path: Path, use_ocr: bool = False) -> List[Dict[str, Any]]:
-        """Extract text from PDF with page information (optimized)"""
-        pages_data = []
-        
+    def build_manifest_entry(self, pdf_path: Path, data: Dict[str, Any]) -> Dict[str, Any]:
+        info = data['processing_info']
+        st = pdf_path.stat()
+        return {
+            'pdf_sha256': info['pdf_sha256'],
+            'pdf_size': st.st_size,
+            'pdf_mtime': st.st_mtime,
+            'chunker': info['chunker'],
+            'embedding_model': info['embedding_model'],
+            'pages': data['page_hashes'],
+            'output': self.get_output_path(pdf_path).name,
+            'processed_at': info['processed_at']
+        }
+    
+    def count_pages(self, pdf_path: Path) -> int:
+        """Number of pages, or 0 if the PDF cannot be opened (it is then parsed whole)"""
         try:
-            # Open PDF with optimized settings
-            with pdfplumber.open(pdf_path) as pdf:
-                total_pages = len(pdf.pages)
-                
-                for page_num, page in enumerate(pdf.pages):
-                    try:
-                        # Extract text with optimized settings
-                        text = page.extract_text(
-                            x_tolerance=3,
-                            y_tolerance=3,
-                            layout=True
-                        )
-                        
-                        if not text or not text.strip():
-                            continue
-                        
-                        # Clean and process text
-                        cleaned_text = self._clean_text(text)
-                        
-                        if not cleaned_text:
-                            continue
-                        
-                        # Extract page metadata
-                        page_info = {
-                            'page_number': page_num + 1,
-                            'text': cleaned_text,
-                            'word_count': len(cleaned_text.split()),
-                            'char_count': len(cleaned_text)
-                        }
-                        
-                        pages_data.append(page_info)
-                        
-                    except Exception as page_error:
-                        # Skip problematic pages but continue processing
-                        continue
-                    
-                    # Memory cleanup for large PDFs
-                    if page_num % 50 == 0 and page_num > 0:
-                        gc.collect()
-                        
-        except Exception as e:
-            raise Exception(f"Error extracting text: {e}")
-        
-        return pages_data
+            return self.extractor.page_count(pdf_path)
+        except Exception:
+            return 0
+    
+    def extract_text_from_pdf(self, pdf_path: Path, use_ocr: bool = False,
+                              first_page: int = 0, last_page: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Extract text from PDF with page information (optimized); pages [first_page, last_page)"""
+        return extract_pages(self.extractor, pdf_path, first_page, last_page)
     
     def _clean_text(self, text: str) -> str:
         """Clean and normalize extracted text"""
-        # Remove excessive whitespace
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Remove page numbers and headers/footers (standalone numbers)
-        text = re.sub(r'^\d+\s*$', '', text, flags=re.MULTILINE)
-        
-        # Clean up common PDF artifacts while preserving punctuation
-        text = re.sub(r'[^\w\s\.\,\!\?\;\:\-\(\)\[\]\{\}\"\'\/\&\#\@\$\%\+\=\*]', '', text)
-        
-        return text.strip()
+        return clean_text(text)
+    
+    def make_chunker(self, chunk_size: int = 1000, overlap: int = 200) -> TextChunker:
+        """Chunker for the configured unit (characters or embedding-model tokens)"""
+        length_function = None
+        if self.chunk_unit == 'tokens':
+            if self._token_length is None:
+                if self.embedding_model is not None:
+                    self._token_length = token_length_function(self.embedding_model.tokenizer)
+                else:
+                    self._token_length = load_token_length_function(
+                        self.embedding_model_name or DEFAULT_EMBEDDING_MODEL)
+            length_function = self._token_length
+        return TextChunker(chunk_size, overlap, length_function=length_function,
+                           cross_pages=self.cross_pages)
+    
+    def chunker_config(self, chunk_size: int = 1000, overlap: int = 200) -> Dict[str, Any]:
+        """Chunker identity stored in the manifest; token counts depend on the tokenizer"""
+        config = TextChunker(chunk_size, overlap, cross_pages=self.cross_pages).config()
+        if self.chunk_unit == 'tokens':
+            config['unit'] = 'tokens'
+            config['tokenizer'] = self.embedding_model_name or DEFAULT_EMBEDDING_MODEL
+        return config
     
     def chunk_text(self, pages_data: List[Dict[str, Any]], 
                    chunk_size: int = 1000, overlap: int = 200) -> List[Dict[str, Any]]:
-        """Chunk text into manageable pieces for RAG (optimized)"""
-        chunks = []
-        
-        # Pre-compile regex for better performance
-        sentence_pattern = re.compile(r'(?<=[.!?])\s+')
-        
-        for page_data in pages_data:
-            text = page_data['text']
-            page_num = page_data['page_number']
-            
-            # Split into sentences (optimized)
-            sentences = [s.strip() for s in sentence_pattern.split(text) if s.strip()]
-            
-            if not sentences:
-                continue
-            
-            # Create chunks
-            current_chunk = ""
-            current_sentences = []
-            
-            for sentence in sentences:
-                # Check if adding this sentence would exceed chunk size
-                test_chunk = current_chunk + ' ' + sentence if current_chunk else sentence
-                
-                if len(test_chunk) > chunk_size and current_chunk:
-                    # Save current chunk
-                    chunk_text = current_chunk.strip()
-                    chunks.append({
-                        'text': chunk_text,
-                        'page_number': page_num,
-                        'sentence_count': len(current_sentences),
-                        'word_count': len(chunk_text.split()),
-                        'char_count': len(chunk_text),
-                        'chunk_id': hashlib.md5(chunk_text.encode()).hexdigest()[:12]
-                    })
-                    
-                    # Start new chunk with overlap
-                    if overlap > 0 and len(current_sentences) >= 2:
-                        overlap_sentences = current_sentences[-2:]
-                        current_chunk = ' '.join(overlap_sentences) + ' ' + sentence
-                        current_sentences = overlap_sentences + [sentence]
-                    else:
-                        current_chunk = sentence
-                        current_sentences = [sentence]
-                else:
-                    current_chunk = test_chunk
-                    current_sentences.append(sentence)
-            
-            # Add final chunk if it has content
-            if current_chunk.strip():
-                chunk_text = current_chunk.strip()
-                chunks.append({
-                    'text': chunk_text,
-                    'page_number': page_num,
-                    'sentence_count': len(current_sentences),
-                    'word_count': len(chunk_text.split()),
-                    'char_count': len(chunk_text),
-                    'chunk_id': hashlib.md5(chunk_text.encode()).hexdigest()[:12]
-                })
-        
-        return chunks
+        """Chunk text into manageable pieces for RAG (see services/text_chunker.py)"""
+        return self.make_chunker(chunk_size, overlap).chunk_pages(pages_data)
     
     def generate_embeddings_for_chunks(self, chunks: List[Dict[str, Any]], 
                                        batch_size: int = 32) -> List[Dict[str, Any]]:
@@ -290,22 +330,25 @@ class BookParser:
         # Extract texts for batch processing
         texts = [chunk['text'] for chunk in chunks]
         
-        # Generate embeddings in batches (more efficient for GPU)
-        all_embeddings = []
+        # Generate embeddings in batches (more efficient for GPU); rows stay
+        # float32 numpy views until write_book packs them into the .emb.npy
+        batches = []
         for i in range(0, len(texts), batch_size):
             batch_texts = texts[i:i+batch_size]
             # Encode with show_progress_bar=False to avoid nested progress bars
-            batch_embeddings = self.embedding_model.encode(
+            batches.append(self.embedding_model.encode(
                 batch_texts,
                 show_progress_bar=False,
                 convert_to_numpy=True
-            )
-            all_embeddings.extend(batch_embeddings.tolist())
+            ))
+        if not batches:
+            return chunks
+        all_embeddings = np.concatenate(batches).astype(np.float32, copy=False)
         
         # Add embeddings to chunks
         for chunk, embedding in zip(chunks, all_embeddings):
             chunk['embedding'] = embedding
-            chunk['embedding_dim'] = len(embedding)
+            chunk['embedding_dim'] = int(embedding.shape[0])
         
         return chunks
     
@@ -327,57 +370,159 @@ class BookParser:
             'file_modified': datetime.fromtimestamp(pdf_path.stat().st_mtime).isoformat()
         }
     
+    def _load_previous_output(self, pdf_path: Path) -> Optional[BookReader]:
+        output_path = self.get_output_path(pdf_path)
+        try:
+            return BookReader(output_path if output_path.exists() else output_path.with_suffix('.json'))
+        except FileNotFoundError:
+            return None
+    
     def process_pdf(self, pdf_path: Path, chunk_size: int = 1000, 
-                    overlap: int = 200) -> Dict[str, Any]:
-        """Process a single PDF file"""
+                    overlap: int = 200, previous: Optional[Dict[str, Any]] = None,
+                    pdf_sha256: Optional[str] = None) -> Dict[str, Any]:
+        """Process a single PDF file in this process (see build_book_data)"""
         # Extract text from PDF
         pages_data = self.extract_text_from_pdf(pdf_path)
+        return self.build_book_data(pdf_path, pages_data, chunk_size, overlap, previous, pdf_sha256)
+    
+    def build_book_data(self, pdf_path: Path, pages_data: List[Dict[str, Any]],
+                        chunk_size: int = 1000, overlap: int = 200,
+                        previous: Optional[Dict[str, Any]] = None,
+                        pdf_sha256: Optional[str] = None,
+                        embedding_batch_size: int = 32) -> Dict[str, Any]:
+        """
+        Chunk and embed extracted pages (in page order) into the parsed-book payload.
+
+        With a ``previous`` manifest entry, pages whose text hash is unchanged keep
+        their old chunks (when the chunker settings match) and chunks whose text
+        hash is unchanged keep their old embedding (when the model matches).  An
+        empty entry (output predates the manifest) still allows embedding reuse;
+        None reparses from scratch.  The chunk diff is always taken against the
+        previous output so importers can delete stale chunks.
+        """
+        pages_data = sorted(pages_data, key=lambda page: page['page_number'])
         
         if not pages_data:
             raise Exception("No text could be extracted from PDF")
         
-        # Chunk the text
-        chunks = self.chunk_text(pages_data, chunk_size, overlap)
+        for page in pages_data:
+            page['text_hash'] = text_hash(page['text'])
+        
+        chunker = self.chunker_config(chunk_size, overlap)
+        embedding_model = self.embedding_model_name if self.generate_embeddings else None
+        old_book = self._load_previous_output(pdf_path)
+        old_chunks = list(old_book.iter_chunks()) if old_book else []
+        for chunk in old_chunks:
+            chunk.setdefault('text_hash', text_hash(chunk['text']))
+        
+        # Re-chunk only pages whose text changed
+        reusable_pages = set()
+        # (pages are chunked independently unless chunks may cross page breaks)
+        if previous and previous.get('chunker') == chunker and not self.cross_pages:
+            old_pages = previous.get('pages', {})
+            reusable_pages = {
+                page['page_number'] for page in pages_data
+                if old_pages.get(str(page['page_number'])) == page['text_hash']
+            }
+        old_by_page: Dict[int, List[Dict[str, Any]]] = {}
+        for chunk in old_chunks:
+            old_by_page.setdefault(chunk['page_number'], []).append(chunk)
+        reusable_pages &= set(old_by_page)
+        
+        new_by_page: Dict[int, List[Dict[str, Any]]] = {}
+        changed_pages = [page for page in pages_data if page['page_number'] not in reusable_pages]
+        for chunk in self.chunk_text(changed_pages, chunk_size, overlap):
+            chunk['text_hash'] = text_hash(chunk['text'])
+            new_by_page.setdefault(chunk['page_number'], []).append(chunk)
+        
+        chunks = []
+        for page in pages_data:
+            source = old_by_page if page['page_number'] in reusable_pages else new_by_page
+            chunks.extend(source.get(page['page_number'], []))
         
-        # Generate embeddings if requested
+        # Re-embed only chunks whose text changed
         embeddings_generated = False
+        embeddings_reused = 0
         if self.generate_embeddings:
-            chunks = self.generate_embeddings_for_chunks(chunks)
+            old_rows = {}
+            if previous is not None and old_book and old_book.has_embeddings and \
+                    old_book.processing_info.get('embedding_model') == embedding_model:
+                matrix = old_book.embeddings()
+                old_rows = {chunk['text_hash']: matrix[i] for i, chunk in enumerate(old_chunks)}
+            missing = [chunk for chunk in chunks if chunk['text_hash'] not in old_rows]
+            self.generate_embeddings_for_chunks(missing, batch_size=embedding_batch_size)
+            for chunk in chunks:
+                if 'embedding' not in chunk:
+                    chunk['embedding'] = old_rows[chunk['text_hash']]
+                    chunk['embedding_dim'] = len(chunk['embedding'])
+                    embeddings_reused += 1
             embeddings_generated = True
         
         # Get metadata
         metadata = self.get_book_metadata(pdf_path)
+        processed_at = datetime.now().isoformat()
         
         # Create result
         result = {
             'metadata': metadata,
             'processing_info': {
-                'processed_at': datetime.now().isoformat(),
+                'processed_at': processed_at,
                 'chunk_size': chunk_size,
                 'overlap': overlap,
+                'chunker': chunker,
+                'pdf_sha256': pdf_sha256,
                 'total_pages': len(pages_data),
                 'total_chunks': len(chunks),
                 'total_words': sum(page['word_count'] for page in pages_data),
                 'total_chars': sum(page['char_count'] for page in pages_data),
                 'embeddings_generated': embeddings_generated,
-                'embedding_model': self.embedding_model_name if embeddings_generated else None,
-                'embedding_device': self.device if embeddings_generated else None
+                'embedding_model': embedding_model,
+                'embedding_device': self.device if embeddings_generated else None,
+                'incremental': {
+                    'pages_reused': len(reusable_pages),
+                    'pages_rechunked': len(changed_pages),
+                    'embeddings_reused': embeddings_reused
+                }
             },
-            'chunks': chunks
+            'chunks': chunks,
+            # Not written to the .jsonl: page hashes feed the manifest, the diff goes to <name>.diff.json
+            'page_hashes': {str(page['page_number']): page['text_hash'] for page in pages_data},
+            'chunk_diff': dict(
+                chunk_diff(
+                    (chunk['text_hash'] for chunk in old_chunks),
+                    (chunk['text_hash'] for chunk in chunks)
+                ),
+                # Lets import_to_rag.py check the diff starts from what it last imported
+                previous_processed_at=old_book.processing_info.get('processed_at') if old_book else None,
+                processed_at=processed_at
+            )
         }
         
         return result
     
     def save_processed_data(self, pdf_path: Path, data: Dict[str, Any]):
-        """Save processed data to JSON"""
+        """Save processed data as compact .jsonl chunks plus a .emb.npy embedding matrix"""
         output_path = self.get_output_path(pdf_path)
-        
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        write_book(output_path, data)
+        if data.get('chunk_diff') is not None:
+            write_diff(output_path, pdf_path.name, data['chunk_diff'])
+        
+        # Drop the pre-compact JSON so importers don't see the book twice
+        legacy_path = output_path.with_suffix('.json')
+        if legacy_path.exists():
+            legacy_path.unlink()
     
     def process_all(self, chunk_size: int = 1000, overlap: int = 200, 
-                    force: bool = False, workers: Optional[int] = None):
-        """Process all PDFs in the books directory (optimized with multiprocessing)"""
+                    force: bool = False, workers: Optional[int] = None,
+                    pages_per_task: int = DEFAULT_PAGES_PER_TASK,
+                    embedding_batch_size: int = 32):
+        """
+        Process all PDFs in the books directory (optimized with multiprocessing)
+
+        Text extraction is scheduled as page-range tasks across the pool so one
+        huge book no longer pins a single worker; each book is chunked, embedded
+        and saved in the parent as soon as its last range comes back.
+        """
         pdfs = self.find_all_pdfs()
         self.stats['total_pdfs'] = len(pdfs)
         
@@ -393,66 +538,179 @@ class BookParser:
         print(f"   Output directory: {self.output_dir}")
         print(f"   Chunk size: {chunk_size} chars, Overlap: {overlap} chars")
         print(f"   Workers: {workers} parallel processes")
+        print(f"   PDF extractor: {self.extractor.name}")
         print()
         
-        # Filter PDFs that need processing
+        # Filter PDFs whose content, chunker settings or embedding model changed
+        pdfs_to_process = []
+        for pdf_path in pdfs:
+            key = self.manifest_key(pdf_path)
+            pdf_sha256 = self.manifest.current_sha256(key, pdf_path)
+            if not force and self.is_already_processed(pdf_path, chunk_size, overlap, pdf_sha256):
+                self.stats['skipped'] += 1
+                continue
+            # --force re-parses from scratch; otherwise unchanged pages/chunks are reused
+            previous = None if force else (self.manifest.get(key) or {})
+            pdfs_to_process.append((pdf_path, pdf_sha256, previous))
+        
         if not force:
-            pdfs_to_process = []
-            for pdf_path in pdfs:
-                if not self.is_already_processed(pdf_path):
-                    pdfs_to_process.append(pdf_path)
-                else:
-                    self.stats['skipped'] += 1
-            
-            print(f"   Found {self.stats['skipped']} already processed (skipping)")
+            print(f"   Found {self.stats['skipped']} unchanged (skipping)")
             print(f"   Will process {len(pdfs_to_process)} PDFs\n")
-        else:
-            pdfs_to_process = pdfs
         
         if not pdfs_to_process:
             print("All PDFs already processed. Use --force to reprocess.")
             return
         
-        # Create worker function with bound parameters
-        worker_func = partial(
-            _process_single_pdf_worker,
-            books_dir=self.books_dir,
-            output_dir=self.output_dir,
-            chunk_size=chunk_size,
-            overlap=overlap,
-            generate_embeddings=self.generate_embeddings,
-            embedding_model_name=self.embedding_model_name if self.generate_embeddings else None
-        )
-        
-        # Process PDFs in parallel
-        results = []
-        with Pool(processes=workers) as pool:
-            # Use imap_unordered for better performance
-            for result in tqdm(
-                pool.imap_unordered(worker_func, pdfs_to_process),
-                total=len(pdfs_to_process),
-                desc="Processing PDFs",
-                unit="file"
-            ):
-                results.append(result)
+        # Plan page-range tasks: big books are split so idle workers pull ranges
+        # from the shared queue instead of waiting on one long book at the tail.
+        # Largest books go first so their ranges are spread over the whole pool.
+        books: Dict[Path, Dict[str, Any]] = {}
+        tasks: List[Tuple[Path, int, Optional[int]]] = []
+        planned = []
+        for pdf_path, pdf_sha256, previous in pdfs_to_process:
+            page_count = self.count_pages(pdf_path)
+            ranges = plan_page_ranges(page_count, pages_per_task)
+            books[pdf_path] = {
+                'pdf_sha256': pdf_sha256,
+                'previous': previous,
+                'remaining': len(ranges),
+                'pages_data': [],
+                'error': None
+            }
+            planned.append((page_count, pdf_path, ranges))
+        for _, pdf_path, ranges in sorted(planned, key=lambda p: p[0], reverse=True):
+            tasks.extend((pdf_path, first, last) for first, last in ranges)
+        
+        print(f"   Page-range tasks: {len(tasks)} ({pages_per_task} pages per task for large PDFs)\n")
+        
+        # Extraction runs in the pool; chunking + embedding of finished books runs in
+        # one parent thread (the only copy of the embedding model) while the pool
+        # keeps extracting. Ranges are submitted through a window of
+        # TASKS_PER_WORKER per worker, refilled only as results are consumed, so
+        # while the finisher is behind the pool idles instead of buffering pages.
+        finished = 0
+        pending = set()
+        results: queue.Queue = queue.Queue()
+        window = max(1, workers) * TASKS_PER_WORKER
+        submitted = in_flight = 0
+        with Pool(processes=workers, initializer=_init_extract_worker,
+                  initargs=(self.extractor.name,)) as pool, \
+                ThreadPoolExecutor(max_workers=1) as finisher, \
+                tqdm(total=len(tasks), desc="Extracting pages", unit="range") as progress:
+            while submitted < len(tasks) or in_flight:
+                while submitted < len(tasks) and in_flight < window:
+                    pool.apply_async(_extract_pages_worker, (tasks[submitted],),
+                                     callback=results.put, error_callback=results.put)
+                    submitted += 1
+                    in_flight += 1
+                part = results.get()
+                in_flight -= 1
+                if isinstance(part, BaseException):
+                    raise part
+                progress.update(1)
                 
-                # Update statistics
-                if result['success']:
-                    self.stats['processed'] += 1
-                    self.stats['total_pages'] += result['pages']
-                    self.stats['total_chunks'] += result['chunks']
-                    if result['embeddings_generated']:
-                        self.stats['total_embeddings'] += result['chunks']
-                    
-                    emb_str = " (with embeddings)" if result['embeddings_generated'] else ""
-                    tqdm.write(f"✅ {result['filename']}: {result['pages']} pages, {result['chunks']} chunks{emb_str}")
-                else:
-                    self.stats['failed'] += 1
-                    tqdm.write(f"❌ Failed: {result['filename']} - {result['error']}")
+                wstats = self.worker_stats[part['worker']]
+                wstats['tasks'] += 1
+                wstats['pages'] += part['pages_scanned']
+                wstats['seconds'] += part['seconds']
+                
+                book = books[part['pdf_path']]
+                if part['error'] and not book['error']:
+                    book['error'] = part['error']
+                book['pages_data'].extend(part['pages_data'])
+                book['remaining'] -= 1
+                if book['remaining']:
+                    continue
                 
-                # Periodic garbage collection
-                if len(results) % 10 == 0:
-                    gc.collect()
+                pending.add(finisher.submit(
+                    self._finish_book, part['pdf_path'], books.pop(part['pdf_path']),
+                    chunk_size, overlap, embedding_batch_size
+                ))
+                # Bound the number of extracted books held in memory
+                while len(pending) > MAX_PENDING_BOOKS:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    finished += self._record_results(done, finished)
+                done = {f for f in pending if f.done()}
+                pending -= done
+                finished += self._record_results(done, finished)
+            
+            done, _ = wait(pending)
+            self._record_results(done, finished)
+        
+        self.manifest.save()
+    
+    def _finish_book(self, pdf_path: Path, book: Dict[str, Any], chunk_size: int,
+                     overlap: int, embedding_batch_size: int) -> Dict[str, Any]:
+        """Chunk, embed and save one fully extracted book (runs in the finisher thread)"""
+        result = {
+            'filename': pdf_path.name,
+            'success': False,
+            'pages': 0,
+            'chunks': 0,
+            'embeddings_generated': False,
+            'pages_reused': 0,
+            'embeddings_reused': 0,
+            'manifest_key': None,
+            'manifest_entry': None,
+            'error': None
+        }
+        
+        try:
+            if book['error']:
+                raise Exception(book['error'])
+            
+            data = self.build_book_data(
+                pdf_path, book['pages_data'], chunk_size, overlap,
+                previous=book['previous'], pdf_sha256=book['pdf_sha256'],
+                embedding_batch_size=embedding_batch_size
+            )
+            self.save_processed_data(pdf_path, data)
+            
+            info = data['processing_info']
+            result['success'] = True
+            result['pages'] = info['total_pages']
+            result['chunks'] = info['total_chunks']
+            result['embeddings_generated'] = info.get('embeddings_generated', False)
+            result['pages_reused'] = info['incremental']['pages_reused']
+            result['embeddings_reused'] = info['incremental']['embeddings_reused']
+            result['manifest_key'] = self.manifest_key(pdf_path)
+            result['manifest_entry'] = self.build_manifest_entry(pdf_path, data)
+            
+        except Exception as e:
+            result['error'] = str(e)
+        
+        return result
+    
+    def _record_results(self, futures, finished_before: int) -> int:
+        """Fold finished books into stats and the manifest (main thread only)"""
+        count = 0
+        for future in futures:
+            result = future.result()
+            count += 1
+            
+            # Update statistics
+            if result['success']:
+                self.stats['processed'] += 1
+                self.stats['total_pages'] += result['pages']
+                self.stats['total_chunks'] += result['chunks']
+                self.stats['pages_reused'] += result['pages_reused']
+                self.stats['embeddings_reused'] += result['embeddings_reused']
+                if result['embeddings_generated']:
+                    self.stats['total_embeddings'] += result['chunks'] - result['embeddings_reused']
+                self.manifest.set(result['manifest_key'], result['manifest_entry'])
+                
+                emb_str = " (with embeddings)" if result['embeddings_generated'] else ""
+                reuse_str = f", {result['pages_reused']} pages reused" if result['pages_reused'] else ""
+                tqdm.write(f"✅ {result['filename']}: {result['pages']} pages, {result['chunks']} chunks{emb_str}{reuse_str}")
+            else:
+                self.stats['failed'] += 1
+                tqdm.write(f"❌ Failed: {result['filename']} - {result['error']}")
+            
+            # Periodic garbage collection and manifest checkpoint
+            if (finished_before + count) % 10 == 0:
+                self.manifest.save()
+                gc.collect()
+        return count
     
     def print_summary(self):
         """Print processing summary"""
@@ -461,13 +719,20 @@ class BookParser:
         print("=" * 80)
         print(f"Total PDFs found:    {self.stats['total_pdfs']}")
         print(f"Newly processed:     {self.stats['processed']}")
-        print(f"Skipped (cached):    {self.stats['skipped']}")
+        print(f"Skipped (unchanged): {self.stats['skipped']}")
         print(f"Failed:              {self.stats['failed']}")
         print(f"Total pages:         {self.stats['total_pages']}")
         print(f"Total chunks:        {self.stats['total_chunks']}")
+        print(f"Pages reused:        {self.stats['pages_reused']}")
         if self.generate_embeddings:
             print(f"Total embeddings:    {self.stats['total_embeddings']}")
+            print(f"Embeddings reused:   {self.stats['embeddings_reused']}")
             print(f"Embedding device:    {self.device}")
+        if self.worker_stats:
+            print("\nExtraction throughput per worker:")
+            for pid, ws in sorted(self.worker_stats.items()):
+                rate = ws['pages'] / ws['seconds'] if ws['seconds'] else 0.0
+                print(f"   pid {pid}: {ws['tasks']} ranges, {ws['pages']} pages, {rate:.1f} pages/s")
         print(f"\nOutput directory:    {self.output_dir}")
         print("=" * 80)
 
@@ -516,19 +781,30 @@ GPU Support:
         '--output-dir',
         type=str,
         default=None,
-        help='Output directory for parsed JSON files (default: books-dir/parsed)'
+        help='Output directory for parsed .jsonl/.emb.npy files (default: books-dir/parsed)'
     )
     parser.add_argument(
         '--chunk-size',
         type=int,
         default=1000,
-        help='Maximum characters per chunk (default: 1000)'
+        help='Maximum characters (or tokens, see --chunk-unit) per chunk (default: 1000)'
     )
     parser.add_argument(
         '--overlap',
         type=int,
         default=200,
-        help='Characters overlap between chunks (default: 200)'
+        help='Overlap between chunks in whole sentences, up to this many characters/tokens (default: 200)'
+    )
+    parser.add_argument(
+        '--chunk-unit',
+        choices=CHUNK_UNITS,
+        default='chars',
+        help='Measure --chunk-size/--overlap in characters or embedding-model tokens (default: chars)'
+    )
+    parser.add_argument(
+        '--cross-pages',
+        action='store_true',
+        help='Let chunks span page breaks (disables per-page chunk reuse)'
     )
     parser.add_argument(
         '--workers',
@@ -536,10 +812,22 @@ GPU Support:
         default=None,
         help=f'Number of parallel workers (default: {max(1, cpu_count() - 1)})'
     )
+    parser.add_argument(
+        '--extractor',
+        choices=list(EXTRACTORS),
+        default=None,
+        help='PDF text backend (default: $PDF_EXTRACTOR or auto = fast backend, pdfplumber for layout-heavy pages)'
+    )
+    parser.add_argument(
+        '--pages-per-task',
+        type=int,
+        default=DEFAULT_PAGES_PER_TASK,
+        help=f'Split PDFs longer than this into page-range tasks (default: {DEFAULT_PAGES_PER_TASK})'
+    )
     parser.add_argument(
         '--force',
         action='store_true',
-        help='Reprocess all PDFs even if already processed'
+        help='Reparse all PDFs from scratch, ignoring the content-hash manifest'
     )
     parser.add_argument(
         '--embeddings',
@@ -549,7 +837,7 @@ GPU Support:
     parser.add_argument(
         '--embedding-model',
         type=str,
-        default='sentence-transformers/all-MiniLM-L6-v2',
+        default=DEFAULT_EMBEDDING_MODEL,
         help='Embedding model to use (default: all-MiniLM-L6-v2, fast and good quality)'
     )
     parser.add_argument(
@@ -580,7 +868,10 @@ GPU Support:
         books_dir, 
         args.output_dir,
         generate_embeddings=args.embeddings,
-        embedding_model_name=args.embedding_model if args.embeddings else None
+        embedding_model_name=args.embedding_model if args.embeddings or args.chunk_unit == 'tokens' else None,
+        extractor_name=args.extractor,
+        chunk_unit=args.chunk_unit,
+        cross_pages=args.cross_pages
     )
     
     print("=" * 80)
@@ -599,7 +890,9 @@ GPU Support:
             chunk_size=args.chunk_size,
             overlap=args.overlap,
             force=args.force,
-            workers=args.workers
+            workers=args.workers,
+            pages_per_task=args.pages_per_task,
+            embedding_batch_size=args.embedding_batch_size
         )
         
         # Print summary
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Parse manifest for incremental book parsing
+
+``parsed/.parse_manifest.json`` records, per PDF (keyed by path relative to the
+books directory):
+
+    pdf_sha256, pdf_size, pdf_mtime    content hash plus the stat it was taken at
+    chunker                            chunker settings (TextChunker.config())
+    embedding_model                    model used for the .emb.npy sidecar (or None)
+    pages                              {page_number: sha1 of cleaned page text}
+    output                             parsed .jsonl file name
+
+parse_books.py uses it to skip unchanged books, re-chunk only pages whose text
+hash changed and re-embed only chunks whose text hash changed.  Every re-parse
+also writes ``<name>.diff.json`` listing chunk text hashes to upsert and delete,
+which import_to_rag.py applies to ChromaDB.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+MANIFEST_NAME = '.parse_manifest.json'
+DIFF_SUFFIX = '.diff.json'
+MANIFEST_VERSION = 1
+
+
+def file_sha256(path: Path, block_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a file, read in 1 MB blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def text_hash(text: str) -> str:
+    """Stable hash of page or chunk text"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def chunk_diff(old_hashes: Iterable[str], new_hashes: Iterable[str]) -> Dict[str, list]:
+    """Upsert/delete sets between two versions of a book's chunk hashes (order kept)"""
+    old = list(dict.fromkeys(old_hashes))
+    new = list(dict.fromkeys(new_hashes))
+    old_set, new_set = set(old), set(new)
+    return {
+        'upsert': [h for h in new if h not in old_set],
+        'delete': [h for h in old if h not in new_set],
+        'unchanged': len(new_set & old_set),
+    }
+
+
+def diff_path(output_path: Path) -> Path:
+    name = output_path.name
+    for suffix in ('.jsonl', '.json'):
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+            break
+    return output_path.with_name(name + DIFF_SUFFIX)
+
+
+def write_diff(output_path: Path, book: str, diff: Dict[str, Any]) -> Path:
+    path = diff_path(output_path)
+    payload = dict(diff, book=book, generated_at=datetime.now().isoformat())
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False)
+    os.replace(tmp, path)
+    return path
+
+
+def load_diff(output_path: Path) -> Optional[Dict[str, Any]]:
+    path = diff_path(output_path)
+    if not path.exists():
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class ParseManifest:
+    """Content-hash manifest of parsed books, written only by the parent process"""
+
+    def __init__(self, output_dir: Path):
+        self.path = Path(output_dir) / MANIFEST_NAME
+        self.books: Dict[str, Dict[str, Any]] = {}
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == MANIFEST_VERSION:
+                    self.books = data.get('books', {})
+            except (OSError, ValueError):
+                self.books = {}
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.books.get(key)
+
+    def set(self, key: str, entry: Dict[str, Any]):
+        self.books[key] = entry
+
+    def save(self):
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'books': self.books}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def current_sha256(self, key: str, pdf_path: Path) -> str:
+        """PDF hash, reusing the recorded one while size and mtime are unchanged"""
+        st = pdf_path.stat()
+        entry = self.books.get(key)
+        if entry and entry.get('pdf_size') == st.st_size and entry.get('pdf_mtime') == st.st_mtime:
+            return entry['pdf_sha256']
+        return file_sha256(pdf_path)
+
+    def is_current(self, key: str, pdf_sha256: str, chunker: Dict[str, Any],
+                   embedding_model: Optional[str]) -> bool:
+        entry = self.books.get(key)
+        return bool(
+            entry
+            and entry.get('pdf_sha256') == pdf_sha256
+            and entry.get('chunker') == chunker
+            and entry.get('embedding_model') == embedding_model
+        )
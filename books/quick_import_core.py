@@ -4,12 +4,13 @@ Quick Import Script for Core WoD Books
 Imports the three core Revised books into ChromaDB
 """
 
-import json
 import sys
 from pathlib import Path
 import chromadb
 from chromadb.config import Settings
 
+from book_store import BookReader
+
 def main():
     print("🚀 ShadowRealms AI - Core Books Import")
     print("=" * 60)
@@ -59,32 +60,28 @@ def main():
     total_imported = 0
     for book_path in core_books:
         path = Path(book_path)
-        if not path.exists():
+        try:
+            # Compact .jsonl if present, else the legacy .json
+            reader = BookReader(path)
+        except FileNotFoundError:
             print(f"⚠️  {path.name} not found, skipping")
             continue
         
         print(f"\n📖 Processing: {path.name}")
         
         try:
-            # Load parsed book data
-            with open(path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            metadata = data['metadata']
-            chunks = data['chunks']
+            metadata = reader.metadata
+            total_chunks = len(reader)
             
             print(f"   System: {metadata['system']}")
-            print(f"   Chunks: {len(chunks)}")
+            print(f"   Chunks: {total_chunks}")
             print(f"   Processing...")
             
-            # Prepare batch data (ChromaDB has max batch size)
+            # Stream batches (ChromaDB has max batch size)
             batch_size = 500
             imported = 0
             
-            for batch_start in range(0, len(chunks), batch_size):
-                batch_end = min(batch_start + batch_size, len(chunks))
-                batch_chunks = chunks[batch_start:batch_end]
-                
+            for batch_start, batch_chunks, _ in reader.iter_batches(batch_size):
                 ids = []
                 documents = []
                 metadatas = []
@@ -104,6 +101,9 @@ def main():
                         'chunk_id': chunk['chunk_id'],
                         'word_count': chunk['word_count']
                     }
+                    # Lets the backend's keyword index notice re-imports under the same ids
+                    if chunk.get('text_hash'):
+                        chunk_metadata['text_hash'] = chunk['text_hash']
                     metadatas.append(chunk_metadata)
                 
                 # Import batch
@@ -114,7 +114,7 @@ def main():
                         metadatas=metadatas
                     )
                     imported += len(batch_chunks)
-                    print(f"   Progress: {imported}/{len(chunks)} chunks", end='\r')
+                    print(f"   Progress: {imported}/{total_chunks} chunks", end='\r')
                 except Exception as e:
                     print(f"\n   ⚠️  Batch error (might already exist): {str(e)[:100]}")
                     continue
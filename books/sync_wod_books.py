@@ -16,28 +16,171 @@ import re
 import urllib3
 import hashlib
 import json
+import threading
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait
 from dotenv import load_dotenv
 
 # Disable SSL warnings for sites with expired certificates
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+DEFAULT_WORKERS = 4
+DEFAULT_PER_HOST = 2
+MANIFEST_NAME = '.download_manifest.json'
+PART_SUFFIX = '.part'
+DOWNLOAD_BLOCK = 1024 * 1024
+# Bytes hashed from each end of a file before committing to a full hash
+EDGE_BLOCK = 64 * 1024
+
+
+class DownloadManifest:
+    """
+    Checksum manifest of downloaded files (``.download_manifest.json``), keyed by
+    path relative to the sync directory:
+
+        files     {size, sha256, etag, last_modified, url, downloaded_at}
+        partials  {etag, last_modified} of the response a ``.part`` file came from,
+                  sent back as If-Range so a changed file restarts instead of
+                  being stitched together
+    """
+
+    def __init__(self, path, save_every=25):
+        self.path = Path(path)
+        self.save_every = save_every
+        self._lock = threading.Lock()
+        self._dirty = 0
+        self.files = {}
+        self.partials = {}
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.files = data.get('files', {})
+                self.partials = data.get('partials', {})
+            except Exception as e:
+                print(f"Warning: Could not load download manifest: {e}")
+
+    def get(self, relative):
+        with self._lock:
+            return self.files.get(relative)
+
+    def get_partial(self, relative):
+        with self._lock:
+            return self.partials.get(relative)
+
+    def set(self, relative, entry):
+        with self._lock:
+            self.files[relative] = entry
+            self.partials.pop(relative, None)
+            self._touch()
+
+    def update(self, relative, **fields):
+        with self._lock:
+            if relative in self.files:
+                self.files[relative].update(fields)
+                self._touch()
+    
+    def set_partial(self, relative, validators):
+        # Saved immediately: a crash must not lose which response a .part belongs to
+        with self._lock:
+            self.partials[relative] = validators
+            self._save()
+
+    def clear_partial(self, relative):
+        with self._lock:
+            if self.partials.pop(relative, None) is not None:
+                self._touch()
+
+    def save(self):
+        with self._lock:
+            self._save()
+
+    def _touch(self):
+        self._dirty += 1
+        if self._dirty >= self.save_every:
+            self._save()
+
+    def _save(self):
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'files': self.files, 'partials': self.partials}, f, indent=1)
+        os.replace(tmp, self.path)
+        self._dirty = 0
+
+
+def file_digest(path, algorithm='sha256', block_size=DOWNLOAD_BLOCK):
+    """Hex digest of a whole file, read in 1 MB blocks"""
+    digest = hashlib.new(algorithm)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def edge_digest(path, size, block_size=EDGE_BLOCK):
+    """Cheap fingerprint: MD5 of the first and last ``block_size`` bytes"""
+    md5 = hashlib.md5()
+    with open(path, 'rb') as f:
+        md5.update(f.read(block_size))
+        if size > block_size:
+            f.seek(max(block_size, size - block_size))
+            md5.update(f.read(block_size))
+    return md5.hexdigest()
+
 
 class WoDBookSyncer:
-    def __init__(self, base_url, local_base_dir):
+    def __init__(self, base_url, local_base_dir, workers=DEFAULT_WORKERS, per_host=DEFAULT_PER_HOST):
         self.base_url = base_url.rstrip('/') + '/'
         self.local_base_dir = Path(local_base_dir)
         self.local_base_dir.mkdir(parents=True, exist_ok=True)
         self.choices_file = self.local_base_dir / '.duplicate_choices.json'
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36'
-        })
-        # Disable SSL verification for sites with expired certificates
-        self.session.verify = False
+        self.manifest = DownloadManifest(self.local_base_dir / MANIFEST_NAME)
+        
+        # Download engine: bounded worker pool, at most per_host requests per host
+        self.workers = max(1, workers)
+        self.per_host = max(1, per_host)
+        self._host_slots = {}
+        self._host_slots_lock = threading.Lock()
+        self._thread_state = threading.local()
+        self._pool = None
+        self._pending = []
+        
+        # Main-thread session for directory listings
+        self.session = self._new_session()
         self.downloaded_files = []
         self.skipped_files = []
         self.failed_files = []
+        self.bytes_downloaded = 0
+        self._stats_lock = threading.Lock()
+    
+    def _new_session(self):
+        session = requests.Session()
+        session.headers.update({
+            'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36'
+        })
+        # Disable SSL verification for sites with expired certificates
+        session.verify = False
+        return session
+    
+    def _worker_session(self):
+        """requests.Session is not thread-safe; each download thread gets its own"""
+        session = getattr(self._thread_state, 'session', None)
+        if session is None:
+            session = self._thread_state.session = self._new_session()
+        return session
+    
+    def _host_slot(self, url):
+        host = urlparse(url).netloc
+        with self._host_slots_lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            return slot
+    
+    def _record(self, bucket, relative, nbytes=0):
+        with self._stats_lock:
+            getattr(self, bucket).append(relative)
+            self.bytes_downloaded += nbytes
         
     def parse_directory_listing(self, url):
         """Parse an Apache/nginx directory listing and extract links"""
@@ -76,10 +219,19 @@ class WoDBookSyncer:
     
     def get_remote_file_size(self, url):
         """Get the size of a remote file without downloading it"""
+        info = self.get_remote_file_info(url)
+        return info['size'] if info else None
+    
+    def get_remote_file_info(self, url, session=None):
+        """Size and validators (ETag / Last-Modified) of a remote file, via HEAD"""
         try:
-            response = self.session.head(url, timeout=10, allow_redirects=True)
+            response = (session or self.session).head(url, timeout=10, allow_redirects=True)
             if response.status_code == 200:
-                return int(response.headers.get('content-length', 0))
+                return {
+                    'size': int(response.headers.get('content-length', 0)) or None,
+                    'etag': response.headers.get('etag'),
+                    'last_modified': response.headers.get('last-modified')
+                }
         except:
             pass
         return None
@@ -95,105 +247,174 @@ class WoDBookSyncer:
         
         return self.local_base_dir / relative_path
     
+    def _is_current(self, local_path, entry, remote):
+        """Local file matches its manifest entry and the remote has not changed"""
+        # local_size differs from size only for HTML rewritten after download
+        if not entry or local_path.stat().st_size != entry.get('local_size', entry['size']):
+            return False
+        if not remote:
+            return True
+        if remote['size'] and remote['size'] != entry['size']:
+            return False
+        if remote['etag'] and entry.get('etag'):
+            return remote['etag'] == entry['etag']
+        if remote['last_modified'] and entry.get('last_modified'):
+            return remote['last_modified'] == entry['last_modified']
+        return True
+    
     def download_file(self, url, local_path, resume=True, max_retries=3):
-        """Download a file with resume support, progress bar, and retry logic"""
+        """
+        Download a file with HTTP Range resume, progress bar, retry logic and a
+        checksum manifest entry
+        
+        Data goes to ``<name>.part`` and is renamed into place only once complete,
+        so a file that exists with a manifest entry is always whole.  Safe to call
+        from several threads; at most ``per_host`` calls talk to one host at once.
+        """
         local_path = Path(local_path)
         local_path.parent.mkdir(parents=True, exist_ok=True)
+        relative = str(local_path.relative_to(self.local_base_dir))
+        part_path = local_path.with_name(local_path.name + PART_SUFFIX)
+        session = self._worker_session()
         
-        # Check if file exists and get its size
-        existing_size = 0
-        if local_path.exists() and resume:
-            existing_size = local_path.stat().st_size
-        
-        # Get remote file size
-        remote_size = self.get_remote_file_size(url)
-        
-        # Skip if file exists and sizes match
-        if existing_size > 0 and remote_size and existing_size == remote_size:
-            self.skipped_files.append(str(local_path.relative_to(self.local_base_dir)))
-            return True
-        
-        # Retry loop with exponential backoff
-        for attempt in range(max_retries):
-            try:
-                # Prepare headers for resume
-                headers = {}
-                mode = 'wb'
-                if local_path.exists() and resume:
-                    existing_size = local_path.stat().st_size
-                    if existing_size > 0:
-                        headers['Range'] = f'bytes={existing_size}-'
-                        mode = 'ab'
-                
-                response = self.session.get(url, headers=headers, stream=True, timeout=30)
-                
-                # Check if resume is supported
-                if existing_size > 0 and response.status_code == 416:
-                    # Range not satisfiable - file is already complete
-                    self.skipped_files.append(str(local_path.relative_to(self.local_base_dir)))
+        with self._host_slot(url):
+            remote = self.get_remote_file_info(url, session)
+            entry = self.manifest.get(relative)
+            
+            if local_path.exists():
+                local_size = local_path.stat().st_size
+                if self._is_current(local_path, entry, remote):
+                    self._record('skipped_files', relative)
                     return True
-                
-                if response.status_code not in [200, 206]:
+                if entry is None and remote and remote['size']:
+                    if local_size == remote['size']:
+                        # Complete file from before the manifest existed: just checksum it
+                        self.manifest.set(relative, self._manifest_entry(
+                            url, local_size, file_digest(local_path), remote))
+                        self._record('skipped_files', relative)
+                        return True
+                    if resume and 0 < local_size < remote['size'] and not part_path.exists():
+                        # Partial file left by the old in-place downloader: continue it
+                        local_path.replace(part_path)
+            
+            # Retry loop with exponential backoff
+            for attempt in range(max_retries):
+                try:
+                    return self._fetch(session, url, local_path, part_path, relative, remote, resume)
+                except Exception as e:
                     if attempt < max_retries - 1:
-                        retry_delay = 2 ** attempt  # 1s, 2s, 4s
+                        # Exponential backoff: 2s, 4s, 8s (the .part is kept, so retries resume)
+                        retry_delay = 2 ** (attempt + 1)
+                        print(f"Retry {attempt + 1}/{max_retries} after {retry_delay}s: {local_path.name} ({e})")
                         time.sleep(retry_delay)
-                        continue
-                    print(f"Failed to download {url}: HTTP {response.status_code}")
-                    self.failed_files.append(str(local_path.relative_to(self.local_base_dir)))
-                    return False
-                
-                # Get total size
-                total_size = existing_size
-                if response.status_code == 206:
-                    # Partial content
-                    content_range = response.headers.get('content-range', '')
-                    if content_range:
-                        total_size = int(content_range.split('/')[-1])
-                else:
-                    total_size = int(response.headers.get('content-length', 0))
-                
-                # Create progress bar
-                filename = local_path.name
-                if len(filename) > 40:
-                    filename = filename[:37] + '...'
-                
-                progress_bar = tqdm(
-                    total=total_size,
-                    initial=existing_size,
-                    unit='B',
-                    unit_scale=True,
-                    unit_divisor=1024,
-                    desc=filename,
-                    leave=False
-                )
-                
-                # Download and write file
-                with open(local_path, mode) as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
-                            progress_bar.update(len(chunk))
-                
-                progress_bar.close()
-                self.downloaded_files.append(str(local_path.relative_to(self.local_base_dir)))
-                
-                # Small delay between successful downloads to be nice to the server
-                time.sleep(1)
-                return True
-                
-            except Exception as e:
-                if attempt < max_retries - 1:
-                    # Exponential backoff: 2s, 4s, 8s
-                    retry_delay = 2 ** (attempt + 1)
-                    print(f"Retry {attempt + 1}/{max_retries} after {retry_delay}s: {local_path.name}")
-                    time.sleep(retry_delay)
-                else:
-                    print(f"Error downloading {url}: {e}")
-                    self.failed_files.append(str(local_path.relative_to(self.local_base_dir)))
-                    return False
+                    else:
+                        print(f"Error downloading {url}: {e}")
+                        self._record('failed_files', relative)
+                        return False
         
         return False
     
+    def _manifest_entry(self, url, size, sha256, remote):
+        return {
+            'size': size,
+            'sha256': sha256,
+            'etag': remote.get('etag') if remote else None,
+            'last_modified': remote.get('last_modified') if remote else None,
+            'url': url,
+            'downloaded_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+        }
+    
+    def _fetch(self, session, url, local_path, part_path, relative, remote, resume):
+        """One download attempt into the .part file; raises to trigger a retry"""
+        headers = {}
+        existing_size = part_path.stat().st_size if resume and part_path.exists() else 0
+        partial = self.manifest.get_partial(relative) or {}
+        validator = partial.get('etag') or partial.get('last_modified')
+        if existing_size > 0:
+            headers['Range'] = f'bytes={existing_size}-'
+            if validator:
+                # Server sends the whole file (200) instead of a range if it changed
+                headers['If-Range'] = validator
+        
+        response = session.get(url, headers=headers, stream=True, timeout=30)
+        
+        if existing_size > 0 and response.status_code == 416:
+            # Range not satisfiable - the .part is already complete
+            response.close()
+            return self._finish_part(url, local_path, part_path, relative, remote, file_digest(part_path))
+        
+        if response.status_code not in [200, 206]:
+            response.close()
+            raise IOError(f"HTTP {response.status_code}")
+        
+        digest = hashlib.sha256()
+        if response.status_code == 206:
+            # Resuming: the checksum has to cover the bytes already on disk
+            with open(part_path, 'rb') as f:
+                for block in iter(lambda: f.read(DOWNLOAD_BLOCK), b''):
+                    digest.update(block)
+            mode = 'ab'
+            content_range = response.headers.get('content-range', '')
+            total_size = int(content_range.split('/')[-1]) if '/' in content_range else None
+        else:
+            # Full body (no range sent, range ignored, or file changed since the .part)
+            existing_size = 0
+            mode = 'wb'
+            total_size = int(response.headers.get('content-length', 0)) or None
+            self.manifest.set_partial(relative, {
+                'etag': response.headers.get('etag'),
+                'last_modified': response.headers.get('last-modified')
+            })
+        
+        # Create progress bar
+        filename = local_path.name
+        if len(filename) > 40:
+            filename = filename[:37] + '...'
+        
+        progress_bar = tqdm(
+            total=total_size,
+            initial=existing_size,
+            unit='B',
+            unit_scale=True,
+            unit_divisor=1024,
+            desc=filename,
+            leave=False
+        )
+        
+        received = 0
+        try:
+            with open(part_path, mode) as f:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_BLOCK):
+                    if chunk:
+                        f.write(chunk)
+                        digest.update(chunk)
+                        received += len(chunk)
+                        progress_bar.update(len(chunk))
+        finally:
+            progress_bar.close()
+            response.close()
+        
+        size = part_path.stat().st_size
+        if total_size and size != total_size:
+            raise IOError(f"incomplete download ({size}/{total_size} bytes)")
+        
+        return self._finish_part(url, local_path, part_path, relative, remote,
+                                 digest.hexdigest(), received)
+    
+    def _finish_part(self, url, local_path, part_path, relative, remote, sha256, received=0):
+        os.replace(part_path, local_path)
+        self.manifest.set(relative, self._manifest_entry(
+            url, local_path.stat().st_size, sha256, remote))
+        self._record('downloaded_files', relative, received)
+        return True
+    
+    def _download_task(self, url, local_path):
+        if self.download_file(url, local_path) and local_path.suffix.lower() in ['.html', '.htm']:
+            # Rewrite HTML files
+            self.rewrite_html_file(local_path)
+            self.manifest.update(str(local_path.relative_to(self.local_base_dir)),
+                                 local_size=local_path.stat().st_size)
+    
     def rewrite_html_file(self, html_path):
         """Rewrite HTML file to use local paths"""
         try:
@@ -231,16 +452,16 @@ class WoDBookSyncer:
         
         items = self.parse_directory_listing(url)
         
-        # Download files in this directory
+        # Queue files in this directory (downloaded by the worker pool while
+        # the walk continues)
         if items['files']:
             print(f"{indent}   Found {len(items['files'])} files")
             for file_url in items['files']:
                 local_path = self.get_local_path(file_url)
-                self.download_file(file_url, local_path)
-                
-                # Rewrite HTML files
-                if local_path.suffix.lower() in ['.html', '.htm']:
-                    self.rewrite_html_file(local_path)
+                if self._pool is None:
+                    self._download_task(file_url, local_path)
+                else:
+                    self._pending.append(self._pool.submit(self._download_task, file_url, local_path))
         
         # Recursively process subdirectories
         if items['dirs']:
@@ -318,8 +539,16 @@ class WoDBookSyncer:
             print(f"Error hashing {file_path}: {e}")
             return None
     
-    def find_duplicates(self):
-        """Find duplicate PDF files based on filename and hash"""
+    def find_duplicates(self, hash_workers=DEFAULT_WORKERS):
+        """
+        Find duplicate PDF files based on filename and content
+        
+        Same-name files are compared in stages so identical-looking files cost
+        almost no I/O: different sizes are different content (stat only), then
+        the first/last 64 KB are compared, and only files still tied get a full
+        MD5, computed in parallel.  ``hash`` stays None for files told apart
+        early; ``content_key`` groups identical files either way.
+        """
         print("\n🔍 Checking for duplicate files...")
         
         # Find all PDFs
@@ -332,45 +561,77 @@ class WoDBookSyncer:
             filename = pdf_path.name.lower()
             by_filename[filename].append(pdf_path)
         
-        # Find potential duplicates (same name, different locations)
-        print(f"   Calculating hashes for potential duplicates...")
-        duplicates = {}
-        
+        # Stage 1: stat same-name files and split them by size
+        groups = {}
         for filename, paths in by_filename.items():
-            if len(paths) > 1:
-                # Get file info including hash
-                file_info = []
-                for path in paths:
+            if len(paths) < 2:
+                continue
+            file_info = []
+            for path in paths:
+                try:
+                    size = path.stat().st_size
+                    file_info.append({
+                        'path': path,
+                        'relative': str(path.relative_to(self.local_base_dir)),
+                        'size': size,
+                        'size_mb': size / (1024 * 1024),
+                        'hash': None,
+                        'content_key': f"size:{size}"
+                    })
+                except Exception as e:
+                    print(f"Error checking {path}: {e}")
+            if len(file_info) > 1:
+                groups[filename] = file_info
+        
+        # Stage 2: head/tail fingerprint for files whose size is shared
+        to_hash = []
+        for file_info in groups.values():
+            by_size = defaultdict(list)
+            for info in file_info:
+                by_size[info['size']].append(info)
+            for same_size in by_size.values():
+                if len(same_size) < 2:
+                    continue
+                by_edges = defaultdict(list)
+                for info in same_size:
                     try:
-                        size = path.stat().st_size
-                        relative = path.relative_to(self.local_base_dir)
-                        file_hash = self.get_file_hash(path)
-                        
-                        if file_hash:
-                            file_info.append({
-                                'path': path,
-                                'relative': str(relative),
-                                'size': size,
-                                'size_mb': size / (1024 * 1024),
-                                'hash': file_hash
-                            })
+                        info['content_key'] = f"edges:{edge_digest(info['path'], info['size'])}"
                     except Exception as e:
-                        print(f"Error checking {path}: {e}")
-                
-                if len(file_info) > 1:
-                    # Group by hash to identify truly identical files
-                    by_hash = defaultdict(list)
-                    for info in file_info:
-                        by_hash[info['hash']].append(info)
-                    
-                    # Store duplicates grouped by hash
-                    duplicates[filename] = {
-                        'all_files': file_info,
-                        'by_hash': dict(by_hash)
-                    }
+                        print(f"Error reading {info['relative']}: {e}")
+                        continue
+                    by_edges[info['content_key']].append(info)
+                for candidates in by_edges.values():
+                    if len(candidates) > 1:
+                        to_hash.extend(candidates)
+        
+        # Stage 3: full hashes, in parallel, only for the remaining candidates
+        print(f"   Full-hashing {len(to_hash)} candidate files...")
+        with ThreadPoolExecutor(max_workers=max(1, hash_workers)) as pool:
+            for info, file_hash in zip(to_hash, pool.map(lambda i: self.get_file_hash(i['path']), to_hash)):
+                if file_hash:
+                    info['hash'] = info['content_key'] = file_hash
+        
+        duplicates = {}
+        for filename, file_info in groups.items():
+            # Group by content to identify truly identical files
+            by_hash = defaultdict(list)
+            for info in file_info:
+                by_hash[info['content_key']].append(info)
+            
+            # Store duplicates grouped by content
+            duplicates[filename] = {
+                'all_files': file_info,
+                'by_hash': dict(by_hash)
+            }
         
         return duplicates
     
+    def ensure_hash(self, file_info):
+        """Full MD5 for a file the staged finder told apart without hashing"""
+        if file_info['hash'] is None:
+            file_info['hash'] = self.get_file_hash(Path(file_info['path']))
+        return file_info['hash']
+    
     def handle_duplicates_interactive(self):
         """Interactively handle duplicate files with persistent choices"""
         duplicates = self.find_duplicates()
@@ -419,7 +680,7 @@ class WoDBookSyncer:
                         if file_info['relative'] in keep_paths:
                             # Check if hash matches what was saved
                             saved_hash = saved_choice.get('hash')
-                            if saved_hash and saved_hash != file_info['hash']:
+                            if saved_hash and saved_hash != self.ensure_hash(file_info):
                                 valid_choice = False
                                 break
                     
@@ -446,7 +707,10 @@ class WoDBookSyncer:
                 for i, file_info in enumerate(all_files, 1):
                     print(f"   [{i}] {file_info['relative']}")
                     print(f"       Size: {file_info['size_mb']:.2f} MB ({file_info['size']:,} bytes)")
-                    print(f"       Hash: {file_info['hash'][:16]}...")
+                    if file_info['hash']:
+                        print(f"       Hash: {file_info['hash'][:16]}...")
+                    else:
+                        print(f"       Content: unique ({file_info['content_key'].split(':')[0]} differs)")
                 
                 # Check if files are truly identical
                 if len(by_hash) == 1:
@@ -454,7 +718,7 @@ class WoDBookSyncer:
                 else:
                     print(f"\n   ⚠️  Files have different content ({len(by_hash)} unique versions):")
                     for hash_val, files in by_hash.items():
-                        print(f"      - {hash_val[:16]}... ({len(files)} file{'s' if len(files) > 1 else ''})")
+                        print(f"      - {hash_val[:22]}... ({len(files)} file{'s' if len(files) > 1 else ''})")
                 
                 # Ask user what to do
                 print(f"\n   Options:")
@@ -504,7 +768,7 @@ class WoDBookSyncer:
                             saved_choices[filename] = {
                                 'action': 'keep_one',
                                 'keep_paths': [keep_file['relative']],
-                                'hash': keep_file['hash'],
+                                'hash': self.ensure_hash(keep_file),
                                 'timestamp': time.time()
                             }
                             break
@@ -538,8 +802,20 @@ class WoDBookSyncer:
         start_time = time.time()
         
         try:
-            # Start recursive sync
-            self.sync_directory(self.base_url)
+            # Start recursive sync; listings are walked here, files download in the pool
+            print(f"Downloading with {self.workers} workers, max {self.per_host} per host\n")
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                self._pool = pool
+                try:
+                    self.sync_directory(self.base_url)
+                    wait(self._pending)
+                finally:
+                    # On Ctrl-C don't start the queued downloads; running ones keep their .part
+                    for future in self._pending:
+                        future.cancel()
+                    self._pool = None
+                    self._pending = []
+                    self.manifest.save()
             
             # Generate book list
             self.generate_book_list()
@@ -555,6 +831,8 @@ class WoDBookSyncer:
             print(f"Downloaded:  {len(self.downloaded_files)} files")
             print(f"Skipped:     {len(self.skipped_files)} files (already up to date)")
             print(f"Failed:      {len(self.failed_files)} files")
+            print(f"Transferred: {self.bytes_downloaded / (1024 * 1024):.1f} MB "
+                  f"({self.bytes_downloaded / (1024 * 1024) / max(elapsed, 1e-9):.1f} MB/s)")
             print(f"Total time:  {elapsed:.1f} seconds")
             
             if self.failed_files:
@@ -589,7 +867,12 @@ def main():
     LOCAL_DIR = script_dir
     
     # Create syncer and run
-    syncer = WoDBookSyncer(BASE_URL, LOCAL_DIR)
+    syncer = WoDBookSyncer(
+        BASE_URL,
+        LOCAL_DIR,
+        workers=int(os.getenv('BOOK_SYNC_WORKERS') or DEFAULT_WORKERS),
+        per_host=int(os.getenv('BOOK_SYNC_PER_HOST') or DEFAULT_PER_HOST)
+    )
     syncer.run()
 
 
@@ -22,10 +22,34 @@ except ImportError as e:
     print(f"Warning: Could not import NVIDIA monitoring libraries: {e}")
     print("Install with: pip install nvidia-ml-py pynvml")
 
+try:
+    import prometheus_client
+    from prometheus_client import Counter, Gauge, Histogram
+    prometheus_available = True
+except ImportError:
+    prometheus_available = False
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Prometheus metrics served on /metrics (see record_metrics)
+if prometheus_available:
+    CPU_USAGE = Gauge('shadowrealms_monitor_cpu_usage_percent', 'Host CPU usage')
+    MEMORY_USAGE = Gauge('shadowrealms_monitor_memory_usage_percent', 'Host memory usage')
+    DISK_USAGE = Gauge('shadowrealms_monitor_disk_usage_percent', 'Root filesystem usage')
+    GPU_UTILIZATION = Gauge('shadowrealms_monitor_gpu_utilization_percent', 'GPU utilization', ['gpu'])
+    GPU_MEMORY_USED = Gauge('shadowrealms_monitor_gpu_memory_used_bytes', 'GPU memory in use', ['gpu'])
+    GPU_MEMORY_TOTAL = Gauge('shadowrealms_monitor_gpu_memory_total_bytes', 'GPU memory size', ['gpu'])
+    GPU_TEMPERATURE = Gauge('shadowrealms_monitor_gpu_temperature_celsius', 'GPU temperature', ['gpu'])
+    GPU_POWER = Gauge('shadowrealms_monitor_gpu_power_watts', 'GPU power draw', ['gpu'])
+    PERFORMANCE_MODE = Gauge('shadowrealms_monitor_performance_mode',
+                             'Overall AI performance mode (1 for the active mode)', ['mode'])
+    SAMPLES = Counter('shadowrealms_monitor_samples', 'Resource samples taken')
+    SAMPLE_DURATION = Histogram('shadowrealms_monitor_sample_duration_seconds',
+                                'Time to sample system and GPU status',
+                                buckets=(0.1, 0.5, 1, 1.5, 2, 3, 5, 10))
+
 class PerformanceMode(Enum):
     """AI Performance modes based on resource usage"""
     FAST = "fast"      # Full performance, complex responses
@@ -242,6 +266,25 @@ class GPUResourceMonitor:
         logger.info(f"AI Response Guidelines: {guidelines['description']}")
         logger.info("=" * 40)
 
+def record_metrics(status: SystemStatus, duration: float):
+    """Update the Prometheus gauges from a status sample"""
+    if not prometheus_available:
+        return
+    CPU_USAGE.set(status.cpu_usage)
+    MEMORY_USAGE.set(status.memory_usage)
+    DISK_USAGE.set(status.disk_usage)
+    for gpu in status.gpu_status:
+        gpu_id = str(gpu.gpu_id)
+        GPU_UTILIZATION.labels(gpu_id).set(gpu.utilization)
+        GPU_MEMORY_USED.labels(gpu_id).set(gpu.memory_used * 1024**3)
+        GPU_MEMORY_TOTAL.labels(gpu_id).set(gpu.memory_total * 1024**3)
+        GPU_TEMPERATURE.labels(gpu_id).set(gpu.temperature)
+        GPU_POWER.labels(gpu_id).set(gpu.power_draw)
+    for mode in PerformanceMode:
+        PERFORMANCE_MODE.labels(mode.value).set(1 if mode == status.overall_performance_mode else 0)
+    SAMPLES.inc()
+    SAMPLE_DURATION.observe(duration)
+
 def test_monitoring_service():
     """Standalone test function for Monitoring Service"""
     print("🧪 Testing Monitoring Service...")
@@ -305,7 +348,9 @@ def main():
     try:
         while True:
             # Get current system status
+            started = time.perf_counter()
             status = monitor.get_system_status()
+            record_metrics(status, time.perf_counter() - started)
             
             # Log status
             monitor.log_status(status)
@@ -383,6 +428,13 @@ def start_http_server(monitor, port=8000):
                     self.send_header('Content-type', 'application/json')
                     self.end_headers()
                     self.wfile.write(json.dumps({'error': str(e)}).encode())
+            elif self.path == '/metrics' and prometheus_available:
+                # Gauges are refreshed by the main loop every MONITORING_INTERVAL
+                output = prometheus_client.generate_latest()
+                self.send_response(200)
+                self.send_header('Content-type', prometheus_client.CONTENT_TYPE_LATEST)
+                self.end_headers()
+                self.wfile.write(output)
             else:
                 self.send_response(404)
                 self.end_headers()
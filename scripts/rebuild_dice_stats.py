@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Rebuild dice_roll_stats (rollups behind GET /api/campaigns/<id>/roll/stats) from dice_rolls.
+
+Needed once for rolls made before the rollup table existed, and after rows are
+deleted from dice_rolls directly (e.g. scripts/cleanup_integration_test_data.py).
+
+Run from repo root with DATABASE_TYPE / DATABASE_* (or POSTGRES_*) set.
+
+  All campaigns:  python3 scripts/rebuild_dice_stats.py
+  One campaign:   python3 scripts/rebuild_dice_stats.py --campaign-id 12
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+# Load .env before importing backend (which reads Config)
+try:
+    from dotenv import load_dotenv
+
+    load_dotenv(os.path.join(ROOT, ".env"))
+except ImportError:
+    pass
+
+os.environ.setdefault("DATABASE_TYPE", "postgresql")
+
+from database import get_db  # noqa: E402
+from services import dice_stats  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--campaign-id", type=int, default=None, help="Only rebuild this campaign")
+    args = parser.parse_args()
+
+    conn = get_db()
+    try:
+        cursor = conn.cursor()
+        dice_stats.ensure_dice_stats_table(cursor)
+        cursor.close()
+        counted = dice_stats.rebuild(conn, campaign_id=args.campaign_id)
+    finally:
+        conn.close()
+    scope = f"campaign {args.campaign_id}" if args.campaign_id is not None else "all campaigns"
+    print(f"Rebuilt dice_roll_stats for {scope} from {counted} rolls.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Reconcile campaign_stats (materialised counters behind GET /api/campaigns/<id>/stats).
+
+Triggers keep the counters current; this recounts story / OOC messages, story
+locations, active characters and active players from the source tables and
+reports any campaign whose stored values had drifted. Safe to run from cron.
+
+Run from repo root with DATABASE_TYPE=postgresql and DATABASE_* (or POSTGRES_*) set.
+
+  All campaigns:  python3 scripts/reconcile_campaign_stats.py
+  One campaign:   python3 scripts/reconcile_campaign_stats.py --campaign-id 12
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+# Load .env before importing backend (which reads Config)
+try:
+    from dotenv import load_dotenv
+
+    load_dotenv(os.path.join(ROOT, ".env"))
+except ImportError:
+    pass
+
+os.environ.setdefault("DATABASE_TYPE", "postgresql")
+
+from database import get_db  # noqa: E402
+from services import campaign_stats  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--campaign-id", type=int, default=None, help="Only reconcile this campaign")
+    args = parser.parse_args()
+
+    conn = get_db()
+    try:
+        cursor = conn.cursor()
+        campaign_stats.ensure_campaign_stats(cursor)
+        drift = campaign_stats.reconcile(cursor, campaign_id=args.campaign_id)
+        conn.commit()
+        cursor.close()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    for entry in drift:
+        print(f"campaign {entry['campaign_id']}: {entry['before']} -> {entry['after']}")
+    print(f"Reconciled campaign_stats; {len(drift)} campaign(s) had drifted.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Latency recording, percentile summaries and baseline comparison for the benchmarks.
+
+A result file is JSON:
+
+    {"suite": "chat_pipeline", "meta": {...},
+     "phases": {"<phase>": {"count", "mean_ms", "p50_ms", "p90_ms", "p95_ms", "p99_ms", "max_ms"}}}
+
+``compare`` flags a phase as regressed when its p50 or p95 is slower than the
+baseline by more than ``tolerance`` (a fraction) *and* by more than
+``min_delta_ms``, so sub-millisecond noise on fast phases is not reported.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+PERCENTILES = (50, 90, 95, 99)
+COMPARED_STATS = ("p50_ms", "p95_ms")
+DEFAULT_TOLERANCE = 0.20
+DEFAULT_MIN_DELTA_MS = 1.0
+
+
+def percentile(sorted_values: Sequence[float], pct: float) -> float:
+    """Linear-interpolated percentile of already sorted values"""
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100.0
+    low = math.floor(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def summarize(samples_ms: Sequence[float]) -> Dict[str, float]:
+    values = sorted(samples_ms)
+    summary = {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values), 3) if values else 0.0,
+        "max_ms": round(values[-1], 3) if values else 0.0,
+    }
+    for pct in PERCENTILES:
+        summary[f"p{pct}_ms"] = round(percentile(values, pct), 3)
+    return summary
+
+
+class LatencyRecorder:
+    """Collects wall-clock samples per phase"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    @contextmanager
+    def measure(self, phase: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.errors[phase] = self.errors.get(phase, 0) + 1
+            raise
+        finally:
+            self.samples.setdefault(phase, []).append((time.perf_counter() - started) * 1000.0)
+
+    def run(self, phase: str, fn: Callable[[int], Any], iterations: int, warmup: int = 0):
+        """Call ``fn(i)`` ``warmup`` times unmeasured, then ``iterations`` times measured"""
+        for i in range(warmup):
+            fn(-1 - i)
+        for i in range(iterations):
+            with self.measure(phase):
+                fn(i)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        phases = {}
+        for phase, samples in self.samples.items():
+            phases[phase] = summarize(samples)
+            if self.errors.get(phase):
+                phases[phase]["errors"] = self.errors[phase]
+        return phases
+
+
+def write_results(path: Path, suite: str, phases: Dict[str, Dict[str, float]],
+                  meta: Optional[Dict[str, Any]] = None) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps({"suite": suite, "meta": meta or {}, "phases": phases}, indent=2) + "\n",
+                   encoding="utf-8")
+    os.replace(tmp, path)
+    return path
+
+
+def load_results(path: Path) -> Dict[str, Any]:
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = DEFAULT_TOLERANCE,
+            min_delta_ms: float = DEFAULT_MIN_DELTA_MS) -> List[Dict[str, Any]]:
+    """Per-phase/stat comparison rows; ``regressed`` marks the ones over both thresholds"""
+    rows = []
+    for phase, stats in sorted(current.get("phases", {}).items()):
+        base = baseline.get("phases", {}).get(phase)
+        if not base:
+            continue
+        for stat in COMPARED_STATS:
+            now, before = stats.get(stat), base.get(stat)
+            if now is None or before is None:
+                continue
+            delta = now - before
+            ratio = now / before if before else float("inf") if now else 1.0
+            rows.append({
+                "phase": phase, "stat": stat, "baseline": before, "current": now,
+                "delta_ms": round(delta, 3), "ratio": round(ratio, 3),
+                "regressed": delta > min_delta_ms and ratio > 1.0 + tolerance,
+            })
+    return rows
+
+
+def format_table(phases: Dict[str, Dict[str, float]]) -> str:
+    header = f"{'phase':<16}{'n':>6}{'mean':>10}{'p50':>10}{'p90':>10}{'p95':>10}{'p99':>10}{'max':>10}"
+    lines = [header, "-" * len(header)]
+    for phase, s in phases.items():
+        lines.append(
+            f"{phase:<16}{s['count']:>6}{s['mean_ms']:>10.2f}{s['p50_ms']:>10.2f}{s['p90_ms']:>10.2f}"
+            f"{s['p95_ms']:>10.2f}{s['p99_ms']:>10.2f}{s['max_ms']:>10.2f}"
+        )
+    return "\n".join(lines)
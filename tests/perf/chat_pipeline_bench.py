@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Repeatable latency benchmark for the chat pipeline.
+
+Everything outside PostgreSQL is local and deterministic:
+
+* LM Studio / Ollama are replaced by ``StubLLMServer`` (fixed-latency completions
+  and hashed bag-of-words embeddings);
+* the vector store is the embedded one (``VECTOR_STORE=local``) in a temp directory,
+  embedding queries through the stub;
+* a synthetic campaign is seeded with ``--locations`` locations, ``--npcs`` NPCs and
+  ``--messages`` messages (default 100k), generated from ``--seed``.
+
+Measured phases (milliseconds, per call):
+
+    context_build   AIContextManager.build_context (balanced mode)
+    retrieval       semantic message history (query embedding + vector search)
+    message_post    POST /api/campaigns/<c>/locations/<l>
+    poll            GET  /api/campaigns/<c>/locations/<l>?since_id=...
+    chat            POST /api/ai/chat (stubbed completion)
+
+Results are written as JSON (see ``benchlib``).  ``--save-baseline`` stores them as
+the reference; ``--baseline`` compares a run against it and exits 1 on a regression.
+
+Requires DATABASE_TYPE=postgresql and DATABASE_* / POSTGRES_PASSWORD (a scratch
+database: the seeded rows are left in place, tagged with a run suffix).
+
+    python tests/perf/chat_pipeline_bench.py --save-baseline
+    python tests/perf/chat_pipeline_bench.py --baseline tests/perf/results/baseline.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+PERF_DIR = Path(__file__).resolve().parent
+BACKEND_ROOT = PERF_DIR.parent.parent / "backend"
+RESULTS_DIR = PERF_DIR / "results"
+DEFAULT_BASELINE = RESULTS_DIR / "baseline.json"
+
+sys.path.insert(0, str(PERF_DIR))
+sys.path.insert(0, str(BACKEND_ROOT))
+
+import benchlib  # noqa: E402
+from stub_servers import StubLLMServer, stub_embedding  # noqa: E402
+
+SUITE = "chat_pipeline"
+PASSWORD = "BenchPass123!"
+
+_SUBJECTS = ["the Prince", "a Nosferatu informant", "the Sheriff", "a Tremere regent", "the Anarch baron",
+             "a hungry neonate", "the ghoul driver", "a Giovanni mortician", "the Malkavian seer"]
+_VERBS = ["watches", "threatens", "bargains with", "follows", "ignores", "warns", "feeds on", "lies to"]
+_OBJECTS = ["the coterie", "a mortal witness", "the Elysium guards", "an old rival", "the blood doll",
+            "a Sabbat scout", "the harpy", "the city council"]
+_PLACES = ["in the Elysium", "near the docks", "under the bridge", "at the haven", "inside the club",
+           "on the rooftop", "in the sewers", "at the cathedral"]
+
+
+def synthetic_line(rng: random.Random) -> str:
+    return (f"{rng.choice(_SUBJECTS).capitalize()} {rng.choice(_VERBS)} {rng.choice(_OBJECTS)} "
+            f"{rng.choice(_PLACES)}.")
+
+
+def pg_configured() -> bool:
+    if os.getenv("DATABASE_TYPE", "").lower() != "postgresql":
+        return False
+    return bool((os.getenv("DATABASE_PASSWORD") or os.getenv("POSTGRES_PASSWORD") or "").strip())
+
+
+def configure_environment(stub_url: str, store_dir: str):
+    """Point the backend at the stubs; must run before ``main`` / ``config`` are imported"""
+    os.environ.setdefault("LOG_FILE", os.path.join(tempfile.gettempdir(), "sr_chat_pipeline_bench.log"))
+    os.environ["LOG_LEVEL"] = os.environ.get("BENCH_LOG_LEVEL", "WARNING")
+    os.environ["VECTOR_STORE"] = "local"
+    os.environ["VECTOR_STORE_DIR"] = store_dir
+    os.environ["VECTOR_STORE_EMBEDDING_URL"] = stub_url
+    os.environ["LM_STUDIO_URL"] = stub_url
+    os.environ["OLLAMA_URL"] = stub_url
+
+
+class ChatPipelineBench:
+    """Seeds one synthetic campaign and times the chat pipeline against it"""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.suffix = uuid.uuid4().hex[:8]
+
+    # --- setup -----------------------------------------------------------------
+
+    def create_app(self):
+        from main import create_app
+
+        self.app = create_app()
+        self.app.config["TESTING"] = True
+        self.client = self.app.test_client()
+
+    def register_user(self) -> str:
+        username = f"bench_{self.suffix}"
+        with patch("routes.auth.validate_invite_code", return_value="admin"), \
+                patch("routes.auth.use_invite_code"), \
+                patch("services.mail_service.send_welcome_registration"):
+            r = self.client.post("/api/auth/register", json={
+                "username": username, "email": f"{username}@bench.local",
+                "password": PASSWORD, "invite_code": "BENCH",
+            })
+        if r.status_code not in (200, 201):
+            raise RuntimeError(f"Register failed: {r.status_code} {r.data!r}")
+        r = self.client.post("/api/auth/login", json={"username": username, "password": PASSWORD})
+        if r.status_code != 200:
+            raise RuntimeError(f"Login failed: {r.status_code} {r.data!r}")
+        body = json.loads(r.data)
+        self.user_id = int(body["user"]["id"]) if "user" in body else None
+        self.headers = {"Authorization": f"Bearer {body['access_token']}", "Content-Type": "application/json"}
+        return username
+
+    def create_campaign(self):
+        rag = MagicMock()
+        rag.store_campaign_data.return_value = 1
+        rag.store_world_data.return_value = 1
+        with patch("routes.campaigns.get_rag_service", return_value=rag):
+            r = self.client.post("/api/campaigns/", headers=self.headers, json={
+                "name": f"Bench Chronicle {self.suffix}",
+                "description": "Synthetic campaign for the chat pipeline benchmark",
+                "game_system": "vampire",
+            })
+        if r.status_code != 201:
+            raise RuntimeError(f"Campaign creation failed: {r.status_code} {r.data!r}")
+        self.campaign_id = int(json.loads(r.data)["campaign_id"])
+
+    def seed_rows(self):
+        """Locations, NPCs and messages in bulk (one statement per table)"""
+        from psycopg2.extras import execute_values
+        from database import get_db
+
+        args = self.args
+        conn = get_db()
+        try:
+            cur = conn.cursor()
+            if self.user_id is None:
+                cur.execute("SELECT id FROM users WHERE username = %s", (f"bench_{self.suffix}",))
+                self.user_id = int(cur.fetchone()["id"])
+
+            rows = execute_values(cur, """
+                INSERT INTO locations (campaign_id, name, type, description, created_by, is_open)
+                VALUES %s RETURNING id
+            """, [
+                (self.campaign_id, f"Bench Location {n}", "custom", synthetic_line(self.rng), self.user_id, True)
+                for n in range(args.locations)
+            ], fetch=True)
+            self.location_ids = [int(row["id"]) for row in rows]
+
+            execute_values(cur, """
+                INSERT INTO npcs (campaign_id, location_id, name, type, description, personality, created_by, is_active)
+                VALUES %s
+            """, [
+                (self.campaign_id, self.location_ids[n % len(self.location_ids)], f"Bench NPC {n}", "npc",
+                 synthetic_line(self.rng), "Calculating", self.user_id, True)
+                for n in range(args.npcs)
+            ])
+
+            self.messages = []
+            started = time.time() - args.messages
+            batch = []
+            for n in range(args.messages):
+                location_id = self.location_ids[n % len(self.location_ids)]
+                content = synthetic_line(self.rng)
+                role = "assistant" if n % 4 == 3 else "user"
+                batch.append((self.campaign_id, location_id, self.user_id, "ic", content, role,
+                              time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(started + n))))
+                if len(batch) == 5000 or n == args.messages - 1:
+                    rows = execute_values(cur, """
+                        INSERT INTO messages (campaign_id, location_id, user_id, message_type, content, role, created_at)
+                        VALUES %s RETURNING id, location_id, content, role
+                    """, batch, page_size=len(batch), fetch=True)
+                    self.messages.extend(rows)
+                    batch = []
+            conn.commit()
+        finally:
+            conn.close()
+
+    def seed_vectors(self):
+        """Message embeddings straight into the local store (same ids/metadata as the live path)"""
+        from services.rag_service import get_rag_service
+
+        with self.app.app_context():
+            rag = get_rag_service()
+        rag.collections["messages"] = "message_memory"
+        collection = rag.client.get_or_create_collection(name="message_memory")
+        for start in range(0, len(self.messages), 5000):
+            rows = self.messages[start:start + 5000]
+            collection.upsert(
+                ids=[f"msg_{row['id']}_{self.campaign_id}" for row in rows],
+                documents=[row["content"] for row in rows],
+                embeddings=[stub_embedding(row["content"]) for row in rows],
+                metadatas=[{
+                    "campaign_id": self.campaign_id, "location_id": int(row["location_id"]),
+                    "user_id": self.user_id, "message_id": int(row["id"]), "role": row["role"],
+                } for row in rows],
+            )
+
+    def setup(self):
+        started = time.perf_counter()
+        self.create_app()
+        self.register_user()
+        self.create_campaign()
+        self.seed_rows()
+        self.seed_vectors()
+        self.seed_seconds = time.perf_counter() - started
+
+    # --- phases ----------------------------------------------------------------
+
+    def pick_location(self, i: int) -> int:
+        return self.location_ids[i % len(self.location_ids)]
+
+    def run(self, recorder: benchlib.LatencyRecorder):
+        import routes.ai as ai
+
+        args = self.args
+        queries = [synthetic_line(random.Random(args.seed + q)) for q in range(args.iterations + args.warmup)]
+        manager = ai.get_context_manager()
+
+        def context_build(i):
+            with self.app.app_context():
+                manager.build_context(queries[i], self.campaign_id, self.pick_location(i), self.user_id, "balanced")
+
+        def retrieval(i):
+            with self.app.app_context():
+                ai.get_semantic_message_history(queries[i], self.campaign_id, self.pick_location(i), limit=3)
+
+        def check(response, phase):
+            if response.status_code >= 400:
+                raise RuntimeError(f"{phase}: HTTP {response.status_code} {response.data[:200]!r}")
+
+        def message_post(i):
+            location_id = self.pick_location(i)
+            check(self.client.post(f"/api/campaigns/{self.campaign_id}/locations/{location_id}",
+                                   headers=self.headers, json={"content": queries[i], "message_type": "ic"}),
+                  "message_post")
+
+        # Clients poll from the newest message they already have
+        last_ids = {}
+        for row in self.messages:
+            last_ids[int(row["location_id"])] = max(last_ids.get(int(row["location_id"]), 0), int(row["id"]))
+
+        def poll(i):
+            location_id = self.pick_location(i)
+            since = last_ids.get(location_id, 0)
+            r = self.client.get(f"/api/campaigns/{self.campaign_id}/locations/{location_id}?since_id={since}",
+                                headers=self.headers)
+            check(r, "poll")
+            messages = json.loads(r.data) or []
+            if messages:
+                last_ids[location_id] = max(int(m["id"]) for m in messages)
+
+        def chat(i):
+            check(self.client.post("/api/ai/chat", headers=self.headers, json={
+                "message": queries[i], "campaign_id": self.campaign_id, "location": self.pick_location(i),
+            }), "chat")
+
+        phases = {
+            "context_build": context_build,
+            "retrieval": retrieval,
+            "message_post": message_post,
+            "poll": poll,
+            "chat": chat,
+        }
+        for name in args.phases:
+            recorder.run(name, phases[name], args.iterations, args.warmup)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Chat pipeline latency benchmark (stub LLM, local vector store)")
+    parser.add_argument("--messages", type=int, default=100_000, help="Seeded messages (default: 100000)")
+    parser.add_argument("--locations", type=int, default=20)
+    parser.add_argument("--npcs", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=1337, help="RNG seed for the synthetic campaign")
+    parser.add_argument("--iterations", type=int, default=200, help="Measured calls per phase")
+    parser.add_argument("--warmup", type=int, default=10, help="Unmeasured calls per phase")
+    parser.add_argument("--phases", nargs="+", default=["context_build", "retrieval", "message_post", "poll", "chat"],
+                        choices=["context_build", "retrieval", "message_post", "poll", "chat"])
+    parser.add_argument("--completion-ms", type=float, default=0.0, help="Stub completion latency")
+    parser.add_argument("--embedding-ms", type=float, default=0.0, help="Stub embedding latency")
+    parser.add_argument("--output", type=Path, default=RESULTS_DIR / "latest.json")
+    parser.add_argument("--baseline", type=Path, help="Compare against this result file")
+    parser.add_argument("--save-baseline", action="store_true", help=f"Also write the result to {DEFAULT_BASELINE}")
+    parser.add_argument("--tolerance", type=float, default=benchlib.DEFAULT_TOLERANCE,
+                        help="Allowed p50/p95 slowdown as a fraction (default: 0.20)")
+    parser.add_argument("--min-delta-ms", type=float, default=benchlib.DEFAULT_MIN_DELTA_MS,
+                        help="Ignore slowdowns smaller than this (default: 1.0)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if not pg_configured():
+        print("Set DATABASE_TYPE=postgresql and DATABASE_* / POSTGRES_PASSWORD (use a scratch database)")
+        return 2
+
+    with StubLLMServer(completion_ms=args.completion_ms, embedding_ms=args.embedding_ms) as stub, \
+            tempfile.TemporaryDirectory(prefix="sr-bench-vectors-") as store_dir:
+        configure_environment(stub.url, store_dir)
+        bench = ChatPipelineBench(args)
+        print(f"Seeding {args.messages} messages, {args.locations} locations, {args.npcs} NPCs ...")
+        bench.setup()
+        print(f"Seeded in {bench.seed_seconds:.1f}s; measuring {args.iterations} calls per phase")
+
+        recorder = benchlib.LatencyRecorder()
+        bench.run(recorder)
+        phases = recorder.summary()
+        stub_requests = dict(stub.requests)
+
+    meta = {
+        "messages": args.messages, "locations": args.locations, "npcs": args.npcs, "seed": args.seed,
+        "iterations": args.iterations, "warmup": args.warmup,
+        "completion_ms": args.completion_ms, "embedding_ms": args.embedding_ms,
+        "python": platform.python_version(), "machine": platform.machine(), "host": platform.node(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "stub_requests": stub_requests,
+    }
+    print(benchlib.format_table(phases))
+    benchlib.write_results(args.output, SUITE, phases, meta)
+    print(f"Results written to {args.output}")
+    if args.save_baseline:
+        benchlib.write_results(DEFAULT_BASELINE, SUITE, phases, meta)
+        print(f"Baseline written to {DEFAULT_BASELINE}")
+
+    if args.baseline:
+        rows = benchlib.compare({"phases": phases}, benchlib.load_results(args.baseline),
+                                args.tolerance, args.min_delta_ms)
+        regressions = [row for row in rows if row["regressed"]]
+        for row in rows:
+            flag = "REGRESSION" if row["regressed"] else "ok"
+            print(f"{row['phase']:<16}{row['stat']:<8}{row['baseline']:>10.2f} -> {row['current']:>10.2f} ms "
+                  f"(x{row['ratio']:.2f}) {flag}")
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%} / {args.min_delta_ms} ms")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
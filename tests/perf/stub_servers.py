@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Local stand-ins for LM Studio / Ollama used by the performance benchmarks.
+
+``StubLLMServer`` serves the OpenAI-compatible endpoints the backend calls
+(``/v1/models``, ``/api/v1/models``, ``/v1/chat/completions``, ``/v1/embeddings``)
+plus Ollama's ``/api/tags``, from a ThreadingHTTPServer on a free localhost port.
+Replies are deterministic and take a fixed, configurable time, so latency
+numbers measure the backend rather than a model.
+
+Run standalone to point a dev backend at it:
+
+    python tests/perf/stub_servers.py --port 1234 --completion-ms 50
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+STUB_MODEL_ID = "stub-storyteller"
+STUB_EMBEDDING_MODEL_ID = "stub-embed"
+EMBEDDING_DIM = 384
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def stub_embedding(text: str, dim: int = EMBEDDING_DIM) -> List[float]:
+    """Unit-length hashed bag-of-words vector: texts sharing words land close together"""
+    vector = [0.0] * dim
+    for word in _WORD_RE.findall((text or "").lower()):
+        slot = int.from_bytes(hashlib.blake2b(word.encode(), digest_size=4).digest(), "little")
+        vector[slot % dim] += 1.0 if slot & 0x80000000 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector))
+    return [v / norm for v in vector] if norm else vector
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_StubHTTPServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):  # noqa: A002 - BaseHTTPRequestHandler signature
+        pass
+
+    def _send(self, payload: Dict[str, Any], status: int = 200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        stub = self.server.stub
+        stub.count(self.path)
+        if self.path == "/v1/models":
+            self._send({"object": "list", "data": [
+                {"id": STUB_MODEL_ID, "object": "model"},
+                {"id": STUB_EMBEDDING_MODEL_ID, "object": "model"},
+            ]})
+        elif self.path == "/api/v1/models":
+            self._send({"models": [
+                {"key": STUB_MODEL_ID, "type": "llm", "loaded_instances": [{"id": STUB_MODEL_ID}]},
+            ]})
+        elif self.path == "/api/tags":
+            self._send({"models": [{"name": "stub-ollama"}]})
+        else:
+            self._send({"error": "not found"}, 404)
+
+    def do_POST(self):
+        stub = self.server.stub
+        stub.count(self.path)
+        payload = self._read_json()
+        if self.path == "/v1/chat/completions":
+            time.sleep(stub.completion_seconds)
+            prompt = " ".join(str(m.get("content", "")) for m in payload.get("messages", []))
+            self._send({
+                "id": "chatcmpl-stub",
+                "object": "chat.completion",
+                "model": payload.get("model") or STUB_MODEL_ID,
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {
+                    "role": "assistant",
+                    "content": stub.reply_text,
+                }}],
+                "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(stub.reply_text) // 4},
+            })
+        elif self.path == "/v1/embeddings":
+            time.sleep(stub.embedding_seconds)
+            texts = payload.get("input")
+            texts = [texts] if isinstance(texts, str) else list(texts or [])
+            self._send({"object": "list", "model": payload.get("model") or STUB_EMBEDDING_MODEL_ID, "data": [
+                {"object": "embedding", "index": i, "embedding": stub_embedding(text)}
+                for i, text in enumerate(texts)
+            ]})
+        else:
+            self._send({"error": "not found"}, 404)
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    stub: "StubLLMServer"
+
+
+class StubLLMServer:
+    """Deterministic OpenAI-compatible LLM + embedding server on a background thread"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, completion_ms: float = 0.0,
+                 embedding_ms: float = 0.0,
+                 reply_text: str = "The Storyteller nods. The night is young and the city hungers."):
+        self.completion_seconds = completion_ms / 1000.0
+        self.embedding_seconds = embedding_ms / 1000.0
+        self.reply_text = reply_text
+        self.requests: Counter = Counter()
+        self._lock = threading.Lock()
+        self._server = _StubHTTPServer((host, port), _Handler)
+        self._server.stub = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, path: str):
+        with self._lock:
+            self.requests[path] += 1
+
+    def start(self) -> "StubLLMServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main() -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Stub LM Studio / Ollama server for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1234)
+    parser.add_argument("--completion-ms", type=float, default=0.0, help="Simulated completion time")
+    parser.add_argument("--embedding-ms", type=float, default=0.0, help="Simulated embedding time")
+    args = parser.parse_args()
+
+    server = StubLLMServer(args.host, args.port, args.completion_ms, args.embedding_ms)
+    print(f"Stub LLM server on {server.url} (Ctrl+C to stop)")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""App settings snapshot (backend/services/ai_runtime_settings.py): memory reads, versioned invalidation (SQLite)."""
+
+from __future__ import annotations
+
+import importlib.util
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+os.environ.setdefault("LOG_FILE", os.path.join(tempfile.gettempdir(), "sr_app_settings_test.log"))
+
+_BACKEND_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if _BACKEND_ROOT not in sys.path:
+    sys.path.insert(0, _BACKEND_ROOT)
+
+HAS_PSYCOPG2 = importlib.util.find_spec("psycopg2") is not None
+
+
+@unittest.skipUnless(HAS_PSYCOPG2, "psycopg2 not installed (database module)")
+class TestAppSettingsCache(unittest.TestCase):
+    def setUp(self):
+        from config import Config
+        from services import ai_runtime_settings
+
+        self.settings = ai_runtime_settings
+        self.tmp = tempfile.TemporaryDirectory()
+        patches = [
+            mock.patch.dict(os.environ, {"DATABASE_TYPE": "sqlite"}),
+            mock.patch.object(Config, "DATABASE", os.path.join(self.tmp.name, "settings.db")),
+            mock.patch.object(ai_runtime_settings, "SETTINGS_POLL_SECONDS", 60.0),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+        self.addCleanup(ai_runtime_settings.invalidate_app_settings_cache)
+
+        from database import get_db
+
+        self.get_db = get_db
+        conn = get_db()
+        ai_runtime_settings.ensure_app_settings_table(conn.cursor())
+        conn.commit()
+        conn.close()
+        ai_runtime_settings.invalidate_app_settings_cache()
+
+    def test_reads_come_from_memory_until_the_version_changes(self):
+        self.settings.set_app_setting("ai_master_system_prompt", "Speak in riddles.")
+        self.assertEqual(self.settings.get_app_setting("ai_master_system_prompt"), "Speak in riddles.")
+
+        with mock.patch.object(self.settings, "get_db", side_effect=AssertionError("DB hit")):
+            for _ in range(3):
+                self.assertEqual(self.settings.get_app_setting("ai_master_system_prompt"), "Speak in riddles.")
+            self.assertEqual(self.settings.get_app_setting("missing", "dflt"), "dflt")
+            self.assertIsNone(self.settings.get_app_setting(self.settings.SETTINGS_VERSION_KEY))
+
+    def test_other_workers_see_writes_after_the_poll_interval(self):
+        self.settings.set_app_setting("lm_studio_model", "model-a")
+        self.assertEqual(self.settings.get_app_setting("lm_studio_model"), "model-a")
+
+        # Another worker: same statements, but this process's snapshot is not invalidated
+        conn = self.get_db()
+        cursor = conn.cursor()
+        cursor.execute("UPDATE app_settings SET value = 'model-b' WHERE key = 'lm_studio_model'")
+        self.settings._bump_settings_version(cursor, "sqlite")
+        conn.commit()
+        conn.close()
+
+        self.assertEqual(self.settings.get_app_setting("lm_studio_model"), "model-a")
+        self.settings._snapshot.checked_at = 0.0
+        self.assertEqual(self.settings.get_app_setting("lm_studio_model"), "model-b")
+
+    def test_delete_and_version_row(self):
+        self.settings.set_app_setting("lm_studio_model", "model-a")
+        self.settings.set_app_setting("lm_studio_model", "")
+        self.assertIsNone(self.settings.get_app_setting("lm_studio_model"))
+        self.assertEqual(self.settings._snapshot.version, "2")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""Unit tests for the compact parsed-book storage in books/book_store.py."""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+_BOOKS_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "books"))
+if _BOOKS_ROOT not in sys.path:
+    sys.path.insert(0, _BOOKS_ROOT)
+
+import book_store  # noqa: E402
+from book_store import BookReader, book_paths, convert_json, find_books, write_book  # noqa: E402
+
+
+def _book(n_chunks: int = 5, with_embeddings: bool = False) -> dict:
+    chunks = []
+    for i in range(n_chunks):
+        chunk = {"text": f"Chunk {i} about Frenzy.", "page_number": i + 1, "chunk_id": f"c{i}", "word_count": 4}
+        if with_embeddings:
+            chunk["embedding"] = [float(i), 0.5, -1.0]
+        chunks.append(chunk)
+    return {
+        "metadata": {"filename": "Vampire.pdf", "system": "oWoD", "category": "vampire"},
+        "processing_info": {"total_chunks": n_chunks, "total_pages": n_chunks, "embeddings_generated": with_embeddings},
+        "chunks": chunks,
+    }
+
+
+class TestBookStore(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_book_paths_strip_any_suffix(self):
+        for name in ("Book.json", "Book.jsonl", "Book.emb.npy"):
+            jsonl, npy = book_paths(self.dir / name)
+            self.assertEqual((jsonl.name, npy.name), ("Book.jsonl", "Book.emb.npy"))
+
+    def test_round_trip_without_embeddings(self):
+        data = _book()
+        write_book(self.dir / "Book.jsonl", data)
+        reader = BookReader(self.dir / "Book.jsonl")
+        self.assertFalse(reader.legacy)
+        self.assertFalse(reader.has_embeddings)
+        self.assertEqual(reader.metadata, data["metadata"])
+        self.assertEqual(list(reader.iter_chunks()), data["chunks"])
+        batches = list(reader.iter_batches(2))
+        self.assertEqual([start for start, _, _ in batches], [0, 2, 4])
+        self.assertTrue(all(emb is None for _, _, emb in batches))
+
+    def test_legacy_json_is_read_and_listed_once(self):
+        legacy = self.dir / "Book.json"
+        legacy.write_text(json.dumps(_book(3), indent=2), encoding="utf-8")
+        reader = BookReader(legacy)
+        self.assertTrue(reader.legacy)
+        self.assertEqual(len(list(reader.iter_chunks())), 3)
+        self.assertEqual(find_books(self.dir), [legacy])
+
+        write_book(legacy, _book(3))
+        self.assertEqual(find_books(self.dir), [self.dir / "Book.jsonl"])
+        self.assertFalse(BookReader(legacy).legacy)
+
+    @unittest.skipIf(book_store.np is None, "numpy not installed")
+    def test_embeddings_go_to_memory_mapped_sidecar(self):
+        legacy = self.dir / "Book.json"
+        legacy.write_text(json.dumps(_book(4, with_embeddings=True)), encoding="utf-8")
+        out = convert_json(legacy, remove_json=True)
+        self.assertFalse(legacy.exists())
+        reader = BookReader(out)
+        self.assertTrue(reader.has_embeddings)
+        self.assertNotIn("embedding", next(reader.iter_chunks()))
+        matrix = reader.embeddings()
+        self.assertEqual(matrix.shape, (4, 3))
+        self.assertEqual(str(matrix.dtype), "float16")
+        _, _, first = next(reader.iter_batches(2))
+        self.assertEqual(first[1].tolist(), [1.0, 0.5, -1.0])
+
+    def test_manifest_state_and_diff_files_are_not_books(self):
+        write_book(self.dir / "Book.jsonl", _book(2))
+        (self.dir / "Old.json").write_text(json.dumps(_book(1)), encoding="utf-8")
+        for name in (".parse_manifest.json", ".import_state.json", "Book.diff.json", "Old.diff.json"):
+            (self.dir / name).write_text("{}", encoding="utf-8")
+        self.assertEqual(find_books(self.dir), [self.dir / "Book.jsonl", self.dir / "Old.json"])
+
+    @unittest.skipIf(book_store.np is None, "numpy not installed")
+    def test_sidecar_from_an_interrupted_rewrite_is_ignored(self):
+        path = self.dir / "Book.jsonl"
+        write_book(path, _book(4, with_embeddings=True))
+        _, emb_path = book_paths(path)
+        previous = emb_path.read_bytes()
+
+        # Same chunk count, new vectors: the .jsonl was replaced, the crash hit before the .npy
+        rewritten = _book(4)
+        write_book(path, rewritten, embeddings=[[9.0, 9.0, 9.0]] * 4)
+        self.assertTrue(BookReader(path).has_embeddings)
+        emb_path.write_bytes(previous)
+        reader = BookReader(path)
+        self.assertFalse(reader.has_embeddings)
+        self.assertIsNone(reader.embeddings())
+
+        # Re-parsed without embeddings, crash before the old sidecar was removed
+        write_book(path, rewritten)
+        emb_path.write_bytes(previous)
+        self.assertFalse(BookReader(path).has_embeddings)
+
+    @unittest.skipIf(book_store.np is None, "numpy not installed")
+    def test_v1_books_keep_their_sidecar_when_row_count_matches(self):
+        path = self.dir / "Book.jsonl"
+        write_book(path, _book(4, with_embeddings=True))
+        lines = path.read_text(encoding="utf-8").splitlines()
+        header = json.loads(lines[0])
+        header["format"] = book_store.FORMAT_V1
+        del header["embeddings"]
+        path.write_text("\n".join([json.dumps(header)] + lines[1:]) + "\n", encoding="utf-8")
+        self.assertEqual(BookReader(path).embeddings().shape, (4, 3))
+
+        header["processing_info"]["total_chunks"] = 5
+        path.write_text("\n".join([json.dumps(header)] + lines[1:]) + "\n", encoding="utf-8")
+        self.assertFalse(BookReader(path).has_embeddings)
+
+
+if __name__ == "__main__":
+    unittest.main()
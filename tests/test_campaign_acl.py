@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Campaign ACL cache (backend/services/campaign_acl.py): one-query load, cached checks, invalidation (offline, SQLite)."""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import sys
+import unittest
+from unittest import mock
+
+_BACKEND_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if _BACKEND_ROOT not in sys.path:
+    sys.path.insert(0, _BACKEND_ROOT)
+
+from services import campaign_acl  # noqa: E402
+
+
+class _CountingCursor:
+    """sqlite3 cursor taking the routes' %s placeholders and returning dict rows"""
+
+    def __init__(self, conn):
+        self._cursor = conn.cursor()
+        self.statements = 0
+
+    def execute(self, sql, params=()):
+        self.statements += 1
+        self._cursor.execute(sql.replace("%s", "?"), params)
+        return self
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        return dict(row) if row is not None else None
+
+    def fetchall(self):
+        return [dict(row) for row in self._cursor.fetchall()]
+
+
+class TestCampaignAcl(unittest.TestCase):
+    def setUp(self):
+        campaign_acl.clear()
+        self.addCleanup(campaign_acl.clear)
+        conn = sqlite3.connect(":memory:")
+        conn.row_factory = sqlite3.Row
+        conn.executescript(
+            """
+            CREATE TABLE users (id INTEGER PRIMARY KEY, role TEXT, active_character_id INTEGER);
+            CREATE TABLE campaigns (id INTEGER PRIMARY KEY, created_by INTEGER, is_active BOOLEAN);
+            CREATE TABLE campaign_players (campaign_id INTEGER, user_id INTEGER, role TEXT,
+                                           active_character_id INTEGER, UNIQUE (campaign_id, user_id));
+            CREATE TABLE characters (id INTEGER PRIMARY KEY, user_id INTEGER, campaign_id INTEGER,
+                                     is_active BOOLEAN);
+            INSERT INTO users VALUES (1, 'player', NULL), (2, 'player', NULL), (3, 'admin', NULL),
+                                     (4, 'helper', NULL);
+            INSERT INTO campaigns VALUES (10, 1, 1), (11, 1, 0);
+            INSERT INTO campaign_players VALUES (10, 1, 'owner', NULL), (10, 2, 'player', NULL);
+            INSERT INTO characters VALUES (100, 2, 10, 1);
+            """
+        )
+        self.conn = conn
+        self.cursor = _CountingCursor(conn)
+
+    def access(self, user_id, campaign_id):
+        return campaign_acl.get_campaign_access(self.cursor, user_id, campaign_id)
+
+    def test_roles_and_membership(self):
+        owner, member, admin, helper = (self.access(u, 10) for u in (1, 2, 3, 4))
+        self.assertTrue(owner.is_storyteller and owner.can_view and owner.can_bypass_closed_location)
+        self.assertTrue(member.can_view and member.is_member)
+        self.assertFalse(member.is_storyteller_or_staff or member.can_bypass_closed_location)
+        self.assertTrue(admin.can_view and admin.is_site_admin)
+        self.assertFalse(helper.can_view)
+        self.assertTrue(helper.can_bypass_closed_location and helper.is_storyteller_or_staff)
+        self.assertFalse(self.access(2, 99).can_view)
+        self.assertFalse(self.access(1, 11).can_view_active)
+        self.assertTrue(self.access(1, 10).can_view_active)
+
+    def test_steady_state_uses_no_queries(self):
+        self.access(2, 10)
+        self.assertEqual(self.cursor.statements, 1)
+        for _ in range(5):
+            self.assertTrue(self.access(2, 10).can_view)
+        self.assertEqual(self.cursor.statements, 1)
+
+    def test_invalidation_and_expiry(self):
+        self.assertTrue(self.access(2, 10).can_view)
+        self.conn.execute("DELETE FROM campaign_players WHERE user_id = 2")
+        self.assertTrue(self.access(2, 10).can_view)  # cached
+        campaign_acl.invalidate_user(2)
+        self.assertFalse(self.access(2, 10).can_view)
+
+        self.conn.execute("INSERT INTO campaign_players VALUES (10, 2, 'player', NULL)")
+        with mock.patch.object(campaign_acl.time, "monotonic", return_value=campaign_acl.time.monotonic() + 3600):
+            self.assertTrue(self.access(2, 10).can_view)
+
+        self.conn.execute("UPDATE campaigns SET created_by = 2 WHERE id = 10")
+        campaign_acl.invalidate_campaign(10)
+        self.assertTrue(self.access(2, 10).is_storyteller)
+
+    def test_playing_character_is_cached(self):
+        self.assertEqual(campaign_acl.get_playing_character_id(self.cursor, 2, 10), 100)
+        statements = self.cursor.statements
+        self.assertEqual(campaign_acl.get_playing_character_id(self.cursor, 2, 10), 100)
+        self.assertEqual(self.cursor.statements, statements)
+        campaign_acl.invalidate(2, 10)
+        campaign_acl.get_playing_character_id(self.cursor, 2, 10)
+        self.assertGreater(self.cursor.statements, statements)
+
+
+if __name__ == "__main__":
+    unittest.main()
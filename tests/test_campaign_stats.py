@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Materialised campaign counters (backend/services/campaign_stats.py): triggers, dirty
+recount, reconciliation. Needs PostgreSQL: runs when DATABASE_TYPE=postgresql and
+DATABASE_* point at a server; works in a throwaway schema that is dropped afterwards.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import os
+import sys
+import unittest
+
+_BACKEND_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if _BACKEND_ROOT not in sys.path:
+    sys.path.insert(0, _BACKEND_ROOT)
+
+HAS_POSTGRES = (
+    os.getenv("DATABASE_TYPE", "").lower() == "postgresql"
+    and importlib.util.find_spec("psycopg2") is not None
+)
+
+SCHEMA = f"campaign_stats_test_{os.getpid()}"
+
+
+@unittest.skipUnless(HAS_POSTGRES, "needs DATABASE_TYPE=postgresql and a reachable server")
+class TestCampaignStats(unittest.TestCase):
+    def setUp(self):
+        from database import get_db
+        from services import campaign_stats
+
+        self.campaign_stats = campaign_stats
+        self.conn = get_db()
+        self.cursor = self.conn.cursor()
+        self.cursor.execute(f"CREATE SCHEMA {SCHEMA}")
+        self.cursor.execute(f"SET search_path TO {SCHEMA}")
+        self.cursor.execute(
+            """
+            CREATE TABLE users (id SERIAL PRIMARY KEY, is_active BOOLEAN DEFAULT TRUE);
+            CREATE TABLE campaigns (id SERIAL PRIMARY KEY, created_by INTEGER REFERENCES users(id));
+            CREATE TABLE locations (
+                id SERIAL PRIMARY KEY, campaign_id INTEGER REFERENCES campaigns(id) ON DELETE CASCADE,
+                name TEXT, "type" VARCHAR(50), is_active BOOLEAN DEFAULT TRUE
+            );
+            CREATE TABLE characters (
+                id SERIAL PRIMARY KEY, campaign_id INTEGER REFERENCES campaigns(id) ON DELETE CASCADE,
+                is_active BOOLEAN DEFAULT TRUE
+            );
+            CREATE TABLE campaign_players (
+                campaign_id INTEGER REFERENCES campaigns(id) ON DELETE CASCADE,
+                user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+                PRIMARY KEY (campaign_id, user_id)
+            );
+            CREATE TABLE messages (
+                id SERIAL PRIMARY KEY, campaign_id INTEGER REFERENCES campaigns(id) ON DELETE CASCADE,
+                location_id INTEGER REFERENCES locations(id) ON DELETE CASCADE,
+                message_type TEXT DEFAULT 'ic'
+            );
+            INSERT INTO users DEFAULT VALUES;
+            INSERT INTO users DEFAULT VALUES;
+            INSERT INTO campaigns (created_by) VALUES (1);
+            INSERT INTO locations (campaign_id, name, "type") VALUES
+                (1, 'Out of Character Lobby', 'ooc'), (1, 'Tavern', 'tavern'), (1, 'Docks', 'docks');
+            INSERT INTO messages (campaign_id, location_id, message_type) VALUES
+                (1, 1, 'ic'), (1, 2, 'ic'), (1, 2, 'OOC '), (1, 3, 'ic');
+            """
+        )
+        campaign_stats.ensure_campaign_stats(self.cursor)
+
+    def tearDown(self):
+        self.conn.rollback()
+        self.cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        self.conn.commit()
+        self.conn.close()
+
+    def stats(self):
+        return self.campaign_stats.get_campaign_stats(self.cursor, 1)
+
+    def test_triggers_keep_counters_current(self):
+        # Pre-existing campaign: backfilled as dirty, counted on first read
+        self.assertEqual(self.stats(), {
+            "story_messages": 2, "ooc_messages": 2, "locations": 2, "characters": 0, "active_players": 1,
+        })
+        self.cursor.execute("INSERT INTO campaign_players VALUES (1, 2)")
+        self.cursor.execute("INSERT INTO characters (campaign_id) VALUES (1), (1)")
+        self.cursor.execute("UPDATE characters SET is_active = FALSE WHERE id = 2")
+        self.cursor.execute("INSERT INTO messages (campaign_id, location_id) SELECT 1, 2 FROM generate_series(1, 50)")
+        self.cursor.execute("DELETE FROM messages WHERE id = 2")
+        stats = self.stats()
+        self.assertEqual((stats["story_messages"], stats["characters"], stats["active_players"]), (51, 1, 2))
+        self.cursor.execute("UPDATE users SET is_active = FALSE WHERE id = 2")
+        self.assertEqual(self.stats()["active_players"], 1)
+
+        # Docks becomes an OOC room: flagged dirty, recounted on read
+        self.cursor.execute("UPDATE locations SET name = 'OOC chat' WHERE id = 3")
+        self.assertEqual(self.stats(), {
+            "story_messages": 50, "ooc_messages": 3, "locations": 1, "characters": 1, "active_players": 1,
+        })
+        self.cursor.execute("DELETE FROM locations WHERE id = 2")
+        self.assertEqual((self.stats()["story_messages"], self.stats()["locations"]), (0, 0))
+        self.assertEqual(self.campaign_stats.reconcile(self.cursor), [])
+
+        self.cursor.execute("INSERT INTO campaigns (created_by) VALUES (1) RETURNING id")
+        new_id = self.cursor.fetchone()["id"]
+        self.assertEqual(self.campaign_stats.get_campaign_stats(self.cursor, new_id)["active_players"], 1)
+        self.cursor.execute("DELETE FROM campaigns WHERE id = 1")
+        self.assertIsNone(self.stats())
+
+    def test_one_counter_write_per_statement(self):
+        self.stats()
+        self.cursor.execute(
+            """
+            CREATE TABLE stats_writes (n SERIAL);
+            CREATE FUNCTION log_stats_write() RETURNS TRIGGER LANGUAGE plpgsql AS $$
+            BEGIN INSERT INTO stats_writes DEFAULT VALUES; RETURN NULL; END $$;
+            CREATE TRIGGER log_stats_write AFTER UPDATE ON campaign_stats
+                FOR EACH ROW EXECUTE FUNCTION log_stats_write();
+            """
+        )
+
+        def writes():
+            self.cursor.execute("SELECT COUNT(*) AS n FROM stats_writes")
+            return self.cursor.fetchone()["n"]
+
+        self.cursor.execute(
+            "INSERT INTO messages (campaign_id, location_id) SELECT 1, 1 + i % 2 FROM generate_series(1, 40) i"
+        )
+        self.assertEqual(writes(), 1)
+        self.cursor.execute("DELETE FROM messages WHERE id IN (SELECT id FROM messages ORDER BY id LIMIT 30)")
+        self.assertEqual(writes(), 2)
+        # Moving Tavern messages into the lobby reclassifies them; a no-op update writes nothing
+        self.cursor.execute("UPDATE messages SET location_id = 1 WHERE location_id = 2")
+        self.cursor.execute("UPDATE messages SET message_type = message_type")
+        self.assertEqual(writes(), 3)
+        self.assertEqual(self.stats(), {
+            "story_messages": 0, "ooc_messages": 14, "locations": 2, "characters": 0, "active_players": 1,
+        })
+        self.assertEqual(self.campaign_stats.reconcile(self.cursor), [])
+
+    def test_reconcile_reports_drift(self):
+        self.stats()
+        self.cursor.execute("UPDATE campaign_stats SET story_messages = 999")
+        drift = self.campaign_stats.reconcile(self.cursor, campaign_id=1)
+        self.assertEqual(drift[0]["before"]["story_messages"], 999)
+        self.assertEqual(drift[0]["after"]["story_messages"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
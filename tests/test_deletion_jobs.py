@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""Background location / campaign deletion (backend/services/deletion_jobs.py): batched vector purge, chunked SQL cleanup, progress, claiming (offline, SQLite)."""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import sys
+import unittest
+from unittest import mock
+
+_BACKEND_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if _BACKEND_ROOT not in sys.path:
+    sys.path.insert(0, _BACKEND_ROOT)
+
+from services import deletion_jobs  # noqa: E402
+
+
+class _FakeCollection:
+    """Chroma collection subset: get(where, limit) / delete(ids), equality and $and filters"""
+
+    def __init__(self, metadatas):
+        self.items = dict(metadatas)
+        self.get_calls = 0
+        self.largest_delete = 0
+
+    def _matches(self, meta, where):
+        if "$and" in where:
+            return all(self._matches(meta, clause) for clause in where["$and"])
+        return all(meta.get(key) == value for key, value in where.items())
+
+    def get(self, where, limit, include):
+        self.get_calls += 1
+        ids = [doc_id for doc_id, meta in sorted(self.items.items()) if self._matches(meta, where)]
+        return {"ids": ids[:limit]}
+
+    def delete(self, ids):
+        self.largest_delete = max(self.largest_delete, len(ids))
+        for doc_id in ids:
+            self.items.pop(doc_id, None)
+
+
+class TestDeletionJobs(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(os.environ, {"DATABASE_TYPE": "sqlite"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        conn = sqlite3.connect(":memory:")
+        conn.row_factory = sqlite3.Row
+        conn.executescript(
+            """
+            CREATE TABLE campaigns (id INTEGER PRIMARY KEY);
+            CREATE TABLE locations (id INTEGER PRIMARY KEY, campaign_id INTEGER);
+            CREATE TABLE messages (id INTEGER PRIMARY KEY, campaign_id INTEGER, location_id INTEGER);
+            CREATE TABLE dice_rolls (id INTEGER PRIMARY KEY, campaign_id INTEGER);
+            INSERT INTO campaigns VALUES (1), (2);
+            INSERT INTO locations VALUES (10, 1), (11, 1), (20, 2);
+            """
+        )
+        rows = [(10 if i % 3 else 11) for i in range(1, 31)]
+        conn.executemany("INSERT INTO messages (campaign_id, location_id) VALUES (1, ?)", [(lid,) for lid in rows])
+        conn.executemany("INSERT INTO messages (campaign_id, location_id) VALUES (2, 20)", [()] * 5)
+        conn.executemany("INSERT INTO dice_rolls (campaign_id) VALUES (?)", [(1,)] * 7 + [(2,)] * 2)
+        deletion_jobs.ensure_deletion_jobs_table(conn.cursor())
+        conn.commit()
+        self.conn = conn
+        self.collection = _FakeCollection(
+            {f"msg_{row['id']}_{row['campaign_id']}": {"campaign_id": row["campaign_id"], "location_id": row["location_id"]}
+             for row in conn.execute("SELECT * FROM messages")}
+        )
+
+    def count(self, sql):
+        return self.conn.execute(sql).fetchone()[0]
+
+    def run_job(self, kind, campaign_id, location_id=None, factory=None):
+        job_id = deletion_jobs.create_job(self.conn.cursor(), kind, campaign_id, location_id, 5)
+        self.conn.commit()
+        return deletion_jobs.run_job(
+            job_id, conn=self.conn, collection_factory=factory or (lambda: self.collection), batch_size=4,
+        )
+
+    def test_purge_vectors_in_bounded_batches(self):
+        purged = deletion_jobs.purge_vectors(self.collection, {"campaign_id": 1}, batch_size=7)
+        self.assertEqual(purged, 30)
+        self.assertEqual(self.collection.largest_delete, 7)
+        self.assertEqual(len(self.collection.items), 5)
+
+    def test_location_job(self):
+        job = self.run_job("location", 1, 10)
+        self.assertEqual((job["status"], job["phase"]), ("done", "finished"))
+        self.assertEqual(job["progress"]["messages_deleted"], 20)
+        self.assertEqual(job["progress"]["vectors_purged"], 20)
+        self.assertIsNotNone(job["finished_at"])
+        self.assertEqual(self.count("SELECT COUNT(*) FROM messages WHERE location_id = 10"), 0)
+        self.assertEqual(self.count("SELECT COUNT(*) FROM messages"), 15)
+        self.assertEqual(len(self.collection.items), 15)
+        self.assertEqual(self.count("SELECT COUNT(*) FROM locations"), 3)  # soft-deleted row stays
+
+    def test_campaign_job(self):
+        job = self.run_job("campaign", 1)
+        self.assertEqual(job["status"], "done")
+        self.assertEqual((job["progress"]["messages_deleted"], job["progress"]["dice_rolls_deleted"]), (30, 7))
+        self.assertEqual(self.count("SELECT COUNT(*) FROM campaigns WHERE id = 1"), 0)
+        self.assertEqual(self.count("SELECT COUNT(*) FROM messages"), 5)
+        self.assertEqual(sorted({meta["campaign_id"] for meta in self.collection.items.values()}), [2])
+
+    def test_missing_vector_store_is_skipped(self):
+        def unavailable():
+            raise RuntimeError("chromadb not reachable")
+
+        job = self.run_job("location", 1, 11, factory=unavailable)
+        self.assertEqual(job["status"], "done")
+        self.assertIn("chromadb", job["progress"]["vectors_skipped"])
+        self.assertEqual(job["progress"]["messages_deleted"], 10)
+
+    def test_failure_is_recorded_and_job_not_rerun(self):
+        class Broken(_FakeCollection):
+            def delete(self, ids):
+                raise RuntimeError("payload too large")
+
+        job = self.run_job("location", 1, 10, factory=lambda: Broken(self.collection.items))
+        self.assertEqual((job["status"], job["phase"]), ("failed", "vectors"))
+        self.assertIn("payload too large", job["error"])
+        self.assertIsNone(deletion_jobs.run_job(job["id"], conn=self.conn))
+
+    def test_failed_job_is_retried_once(self):
+        class Broken(_FakeCollection):
+            def delete(self, ids):
+                raise RuntimeError("chromadb timed out")
+
+        failed = self.run_job("campaign", 1, factory=lambda: Broken(self.collection.items))
+        self.assertEqual(failed["status"], "failed")
+        self.assertIsNone(deletion_jobs.retry_failed(self.conn.cursor(), "campaign", 2))
+        self.assertEqual(deletion_jobs.retry_failed(self.conn.cursor(), "campaign", 1), failed["id"])
+        self.assertIsNone(deletion_jobs.retry_failed(self.conn.cursor(), "campaign", 1))  # already queued
+        self.conn.commit()
+        job = deletion_jobs.run_job(failed["id"], conn=self.conn, collection_factory=lambda: self.collection,
+                                    batch_size=4)
+        self.assertEqual((job["status"], job["error"]), ("done", None))
+        self.assertEqual(self.count("SELECT COUNT(*) FROM campaigns WHERE id = 1"), 0)
+
+    def test_only_stale_running_jobs_are_reclaimed(self):
+        job_id = deletion_jobs.create_job(self.conn.cursor(), "location", 1, 10, 5)
+        self.conn.execute(
+            "UPDATE deletion_jobs SET status = 'running', heartbeat_at = CURRENT_TIMESTAMP WHERE id = ?", (job_id,)
+        )
+        self.conn.commit()
+        self.assertIsNone(deletion_jobs.run_job(job_id, conn=self.conn, collection_factory=lambda: self.collection))
+        self.conn.execute(
+            "UPDATE deletion_jobs SET heartbeat_at = datetime('now', '-1 hour') WHERE id = ?", (job_id,)
+        )
+        self.conn.commit()
+        job = deletion_jobs.run_job(job_id, conn=self.conn, collection_factory=lambda: self.collection)
+        self.assertEqual(job["status"], "done")
+
+    def test_unknown_kind(self):
+        with self.assertRaises(ValueError):
+            deletion_jobs.create_job(self.conn.cursor(), "user", 1, None, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
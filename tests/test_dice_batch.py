@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Vectorised dice (backend/services/dice_batch.py): scoring, leniency, seeding, odds, contested/extended (offline)."""
+
+from __future__ import annotations
+
+import importlib.util
+import os
+import sys
+import unittest
+
+_BACKEND_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if _BACKEND_ROOT not in sys.path:
+    sys.path.insert(0, _BACKEND_ROOT)
+
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+
+
+def _score(dice, difficulty, specialty):
+    """Reference scoring, die by die as in DiceService.roll_d10_pool"""
+    successes = ones = 0
+    for die in dice:
+        if die == 1:
+            ones += 1
+            successes -= 1
+        elif die >= difficulty:
+            successes += 2 if die == 10 and specialty else 1
+    return max(0, successes), successes < 0 or (successes == 0 and ones > 0), ones
+
+
+@unittest.skipUnless(HAS_NUMPY, "numpy not installed")
+class TestRollPools(unittest.TestCase):
+    def setUp(self):
+        import numpy as np
+
+        from services import dice_batch, dice_odds
+        from services.dice_service import DiceService
+
+        self.np = np
+        self.dice_batch = dice_batch
+        self.dice_odds = dice_odds
+        self.DiceService = DiceService
+
+    def test_scoring_matches_reference(self):
+        rng = self.np.random.default_rng(7)
+        pools = [int(p) for p in rng.integers(1, 51, size=300)]
+        difficulties = [int(d) for d in rng.integers(2, 11, size=300)]
+        specialties = [bool(s) for s in rng.integers(0, 2, size=300)]
+        rolls = self.dice_batch.roll_pools(pools, difficulties, specialties, rng=rng)
+        for pool, difficulty, specialty, roll in zip(pools, difficulties, specialties, rolls):
+            self.assertEqual(len(roll["results"]), pool)
+            self.assertTrue(all(1 <= die <= 10 for die in roll["results"]))
+            successes, botch, ones = _score(roll["results"], difficulty, specialty)
+            self.assertEqual((roll["successes"], roll["is_botch"], roll["ones_count"]), (successes, botch, ones))
+            self.assertEqual(roll["is_critical"], successes >= 5 and not botch)
+
+    def test_seeded_and_leniency(self):
+        first = self.dice_batch.roll_pools([5, 8], 6, rng=self.np.random.default_rng(3))
+        again = self.dice_batch.roll_pools([5, 8], 6, rng=self.np.random.default_rng(3))
+        self.assertEqual(first, again)
+        rolls = self.dice_batch.roll_pools([1, 4, 6] * 200, 6, leniency_floor=[9, 7, None] * 200)
+        for n, roll in enumerate(rolls):
+            if n % 3 == 2:
+                self.assertIsNone(roll["leniency_floor"])
+                continue
+            floor = 9 if n % 3 == 0 else 7
+            self.assertEqual(roll["leniency_floor"], floor)
+            self.assertNotIn(1, roll["results"])
+            self.assertGreaterEqual(max(roll["results"]), floor)
+        empty = self.dice_batch.roll_pools([0], 6)[0]
+        self.assertEqual((empty["results"], empty["message"]), ([], "No dice to roll"))
+        with self.assertRaises(ValueError):
+            self.dice_batch.roll_pools([51], 6)
+        with self.assertRaises(ValueError):
+            self.dice_batch.roll_pools([3, 3], [6])
+
+    def test_frequencies_follow_exact_odds(self):
+        rolls = self.dice_batch.roll_pools([5] * 20000, 6, rng=self.np.random.default_rng(11))
+        odds = self.dice_odds.pool_odds(5, 6)
+        botch_rate = sum(roll["is_botch"] for roll in rolls) / len(rolls)
+        success_rate = sum(roll["successes"] > 0 for roll in rolls) / len(rolls)
+        self.assertAlmostEqual(botch_rate, odds.botch, delta=0.015)
+        self.assertAlmostEqual(success_rate, odds.success, delta=0.015)
+
+    def test_contested_and_extended(self):
+        contested = self.DiceService.roll_contested(6, 3)
+        self.assertEqual(len(contested["attacker_roll"]["results"]), 6)
+        self.assertIn(contested["winner"], ("attacker", "defender", "tie"))
+        extended = self.DiceService.roll_extended(8, 4, 6, max_rolls=5)
+        self.assertLessEqual(extended["roll_count"], 5)
+        self.assertEqual(len(extended["rolls"]), extended["roll_count"])
+        botch = {"results": [1], "successes": 0, "is_botch": True}
+        hit = {"results": [9], "successes": 3, "is_botch": False}
+        outcome = self.DiceService.extended_outcome([hit, hit, botch, hit], 10)
+        self.assertEqual((outcome["botched"], outcome["roll_count"], outcome["total_successes"]), (True, 3, 6))
+        text = self.DiceService.format_batch_for_chat(
+            [{"type": "extended", "action_description": "Research", **outcome}]
+        )
+        self.assertIn("**Research**", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
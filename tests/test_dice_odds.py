@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Exact dice odds (backend/services/dice_odds.py) against brute-force enumeration of small pools (offline)."""
+
+from __future__ import annotations
+
+import itertools
+import os
+import sys
+import unittest
+
+_BACKEND_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if _BACKEND_ROOT not in sys.path:
+    sys.path.insert(0, _BACKEND_ROOT)
+
+from services import dice_odds  # noqa: E402
+from services.dice_service import DiceService  # noqa: E402
+
+
+def _enumerate(pool, difficulty, specialty, floor):
+    """Outcome frequencies over every possible roll, scored like DiceService.roll_d10_pool"""
+    if floor is None:
+        faces = [range(1, 11)] * pool
+    else:
+        faces = [range(floor, 11)] + [range(2, 11)] * (pool - 1)
+    outcomes, total = {}, 0
+    for dice in itertools.product(*faces):
+        total += 1
+        score = sum(-1 if d == 1 else (2 if specialty and d == 10 else 1) if d >= difficulty else 0 for d in dice)
+        ones = dice.count(1)
+        key = "botch" if score <= 0 and ones else "failure" if score <= 0 else score
+        outcomes[key] = outcomes.get(key, 0) + 1
+    return {key: count / total for key, count in outcomes.items()}
+
+
+class TestPoolOdds(unittest.TestCase):
+    def test_matches_enumeration(self):
+        for pool, difficulty, specialty, floor in itertools.product(
+            (1, 2, 3, 4), (2, 6, 9, 10), (False, True), (None, 2, 7, 10)
+        ):
+            odds = dice_odds.pool_odds(pool, difficulty, specialty, floor)
+            exact = _enumerate(pool, difficulty, specialty, floor)
+            label = (pool, difficulty, specialty, floor)
+            self.assertAlmostEqual(odds.botch, exact.get("botch", 0.0), places=12, msg=label)
+            self.assertAlmostEqual(odds.failure, exact.get("failure", 0.0), places=12, msg=label)
+            for k in range(1, 2 * pool + 1):
+                p = odds.successes[k - 1] if k <= len(odds.successes) else 0.0
+                self.assertAlmostEqual(p, exact.get(k, 0.0), places=12, msg=label)
+
+    def test_known_values_and_large_pools(self):
+        single = dice_odds.pool_odds(1, 6)
+        self.assertAlmostEqual(single.botch, 0.1)
+        self.assertAlmostEqual(single.success, 0.5)
+        self.assertAlmostEqual(single.expected_successes, 0.5)
+        for pool in (10, 30, 50):
+            odds = dice_odds.pool_odds(pool, 8, True, None)
+            self.assertAlmostEqual(odds.botch + odds.failure + sum(odds.successes), 1.0, places=9)
+        lenient = dice_odds.pool_odds(5, 6, leniency_floor=7)
+        self.assertEqual((lenient.botch, lenient.success), (0.0, 1.0))
+        self.assertIsNone(dice_odds.pool_odds(3, 6, leniency_floor=11).leniency_floor)
+        with self.assertRaises(ValueError):
+            dice_odds.pool_odds(51, 6)
+        with self.assertRaises(ValueError):
+            dice_odds.pool_odds(5, 1)
+
+    def test_inverse_lookups(self):
+        difficulty = dice_odds.difficulty_for_chance(5, 0.5)
+        self.assertGreaterEqual(dice_odds.pool_odds(5, difficulty).success, 0.5)
+        self.assertLess(dice_odds.pool_odds(5, difficulty + 1).success, 0.5)
+        pool = dice_odds.pool_for_chance(8, 0.75, min_successes=2)
+        self.assertGreaterEqual(dice_odds.pool_odds(pool, 8).at_least(2), 0.75)
+        self.assertLess(dice_odds.pool_odds(pool - 1, 8).at_least(2), 0.75)
+        pool_size, tn = DiceService.ai_determine_pool("npc_attack", {"target_chance": 0.9})
+        self.assertGreaterEqual(dice_odds.pool_odds(pool_size, tn).success, 0.9 if tn > 2 else 0.0)
+
+
+class TestAiDeterminePool(unittest.TestCase):
+    def test_event_labels_keep_fixed_difficulties(self):
+        for label, difficulty in (("unlikely", 8), ("moderate", 6), ("likely", 4), ("unknown", 6)):
+            pool_size, tn = DiceService.ai_determine_pool("event", {"probability": label})
+            self.assertEqual(tn, difficulty, label)
+            self.assertTrue(4 <= pool_size <= 8)
+
+    def test_target_chance_is_validated(self):
+        pool_size, tn = DiceService.ai_determine_pool("event", {"target_chance": "0.5", "min_successes": "2"})
+        self.assertGreaterEqual(dice_odds.pool_odds(pool_size, tn).at_least(2), 0.5 if tn > 2 else 0.0)
+        for context in (
+            {"target_chance": "likely"},
+            {"target_chance": 0},
+            {"target_chance": 1.5},
+            {"target_chance": float("nan")},
+            {"target_chance": 0.5, "min_successes": 0},
+            {"target_chance": 0.5, "min_successes": "two"},
+        ):
+            with self.assertRaises(ValueError, msg=context):
+                DiceService.ai_determine_pool("event", context)
+
+if __name__ == "__main__":
+    unittest.main()
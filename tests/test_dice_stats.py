@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Dice rollups (backend/services/dice_stats.py): incremental upserts, grouped aggregates, rebuild from dice_rolls (offline, SQLite)."""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+_BACKEND_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if _BACKEND_ROOT not in sys.path:
+    sys.path.insert(0, _BACKEND_ROOT)
+
+from services import dice_odds, dice_stats  # noqa: E402
+
+
+def _roll(results, difficulty, successes, botch=False, critical=False, specialty=False):
+    return {"results": results, "difficulty": difficulty, "successes": successes,
+            "is_botch": botch, "is_critical": critical, "specialty": specialty, "leniency_floor": None}
+
+
+ROLLS = [
+    (3, 7, _roll([1, 2, 9], 6, 0, botch=True)),
+    (3, 7, _roll([6, 8, 10, 4], 6, 3)),
+    (3, None, _roll([5, 5], 8, 0)),
+    (None, 7, _roll([10, 10, 9, 9, 8, 8], 7, 8, critical=True, specialty=True)),
+]
+
+
+class TestDiceStats(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(os.environ, {"DATABASE_TYPE": "sqlite"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.row_factory = sqlite3.Row
+        self.cursor = self.conn.cursor()
+        dice_stats.ensure_dice_stats_table(self.cursor)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_incremental_rollups(self):
+        dice_stats.record_rolls(self.cursor, 1, ROLLS[:2])
+        dice_stats.record_rolls(self.cursor, 1, ROLLS[2:])
+        dice_stats.record_rolls(self.cursor, 2, ROLLS[:1])
+        self.cursor.execute("SELECT COUNT(*) FROM dice_roll_stats")
+        self.assertEqual(self.cursor.fetchone()[0], 4)
+
+        totals = dice_stats.get_stats(self.cursor, 1)["totals"]
+        self.assertEqual((totals["rolls"], totals["dice"], totals["successes"]), (4, 15, 11))
+        self.assertEqual((totals["botches"], totals["failures"], totals["criticals"]), (1, 1, 1))
+        self.assertEqual(totals["faces"]["10"], 3)
+        self.assertEqual(totals["success_rate"], 0.5)
+        expected = sum(
+            dice_odds.pool_odds(len(r["results"]), r["difficulty"], r["specialty"]).expected_successes
+            for _, _, r in ROLLS
+        )
+        self.assertAlmostEqual(totals["luck"], round(11 - expected, 3), places=3)
+
+        character = dice_stats.get_stats(self.cursor, 1, character_id=7, group_by="difficulty")
+        self.assertEqual([g["difficulty"] for g in character["groups"]], [6, 7])
+        self.assertEqual(character["totals"]["rolls"], 3)
+        by_location = dice_stats.get_stats(self.cursor, 1, group_by="location")["groups"]
+        self.assertEqual([(g["location"], g["rolls"]) for g in by_location], [(None, 1), (3, 3)])
+        self.assertEqual(dice_stats.get_stats(self.cursor, 3)["totals"]["rolls"], 0)
+        with self.assertRaises(ValueError):
+            dice_stats.get_stats(self.cursor, 1, group_by="user")
+
+    def test_rebuild_matches_incremental(self):
+        self.cursor.execute(
+            """
+            CREATE TABLE dice_rolls (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, campaign_id INTEGER, location_id INTEGER,
+                character_id INTEGER, difficulty INTEGER, results TEXT, successes INTEGER,
+                is_botch INTEGER, is_critical INTEGER, modifiers TEXT
+            )
+            """
+        )
+        for location_id, character_id, roll in ROLLS:
+            self.cursor.execute(
+                "INSERT INTO dice_rolls (campaign_id, location_id, character_id, difficulty, results,"
+                " successes, is_botch, is_critical, modifiers) VALUES (1, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (location_id, character_id, roll["difficulty"], json.dumps(roll["results"]), roll["successes"],
+                 int(roll["is_botch"]), int(roll["is_critical"]), json.dumps({"specialty": roll["specialty"]})),
+            )
+        dice_stats.record_rolls(self.cursor, 1, ROLLS)
+        incremental = dice_stats.get_stats(self.cursor, 1, group_by="character")
+        dice_stats.record_rolls(self.cursor, 1, ROLLS)  # drift that rebuild must discard
+        self.assertEqual(dice_stats.rebuild(self.conn, campaign_id=1, batch_size=3), 4)
+        self.assertEqual(dice_stats.get_stats(self.cursor, 1, group_by="character"), incremental)
+
+    def test_rebuild_blocks_concurrent_rollup_writes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "dice.db")
+            conn = sqlite3.connect(path)
+            conn.row_factory = sqlite3.Row
+            dice_stats.ensure_dice_stats_table(conn.cursor())
+            conn.execute(
+                "CREATE TABLE dice_rolls (campaign_id INTEGER, location_id INTEGER, character_id INTEGER,"
+                " difficulty INTEGER, results TEXT, successes INTEGER, is_botch INTEGER, is_critical INTEGER,"
+                " modifiers TEXT)"
+            )
+            conn.execute("INSERT INTO dice_rolls VALUES (1, 3, 7, 6, '[6, 8, 10]', 3, 0, 0, '{}')")
+            conn.commit()
+            writer = sqlite3.connect(path, timeout=0.05)
+            blocked = []
+            real_add_roll = dice_stats._add_roll
+
+            def add_roll(*args):
+                # A roll recorded between the snapshot and the DELETE would be lost
+                real_add_roll(*args)
+                if blocked:
+                    return
+                blocked.append(None)
+                try:
+                    dice_stats.record_rolls(writer.cursor(), 1, ROLLS[:1])
+                except sqlite3.OperationalError as e:
+                    blocked[0] = str(e)
+
+            with mock.patch.object(dice_stats, "_add_roll", side_effect=add_roll):
+                self.assertEqual(dice_stats.rebuild(conn, campaign_id=1), 1)
+            self.assertEqual(len(blocked), 1)
+            self.assertIn("locked", blocked[0])
+            dice_stats.record_rolls(writer.cursor(), 1, ROLLS[:1])  # goes through once the rebuild committed
+            writer.commit()
+            self.assertEqual(dice_stats.get_stats(conn.cursor(), 1)["totals"]["rolls"], 2)
+            writer.close()
+            conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
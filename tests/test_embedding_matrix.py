@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Quantised embedding matrix (backend/services/embedding_matrix.py): accuracy, top-k and storage."""
+
+from __future__ import annotations
+
+import importlib.util
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+from pathlib import Path
+
+_BACKEND_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if _BACKEND_ROOT not in sys.path:
+    sys.path.insert(0, _BACKEND_ROOT)
+
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+
+
+@unittest.skipUnless(HAS_NUMPY, "numpy not installed")
+class TestEmbeddingMatrix(unittest.TestCase):
+    def setUp(self):
+        import numpy as np
+
+        self.np = np
+        rng = np.random.default_rng(7)
+        self.vectors = rng.normal(size=(3000, 384)).astype(np.float32)
+        self.queries = rng.normal(size=(4, 384)).astype(np.float32)
+        unit = self.vectors / np.linalg.norm(self.vectors, axis=1, keepdims=True)
+        q = self.queries / np.linalg.norm(self.queries, axis=1, keepdims=True)
+        self.exact = q @ unit.T
+
+    def test_quantised_scores_track_float32(self):
+        from services.embedding_matrix import EmbeddingMatrix
+
+        for dtype, tolerance, bytes_per_dim in (("float32", 1e-5, 4), ("float16", 2e-3, 2), ("int8", 2e-2, 1)):
+            matrix = EmbeddingMatrix.from_vectors(self.vectors, dtype=dtype)
+            scores = matrix.scores(self.queries, block_rows=500)
+            self.assertLess(float(self.np.abs(scores - self.exact).max()), tolerance, dtype)
+            self.assertLessEqual(matrix.nbytes, len(self.vectors) * (384 * bytes_per_dim + 4))
+
+    def test_top_k_matches_full_sort(self):
+        from services.embedding_matrix import EmbeddingMatrix
+
+        matrix = EmbeddingMatrix.from_vectors(self.vectors, dtype="float32")
+        indices, scores = matrix.top_k(self.queries, k=10)
+        expected = self.np.argsort(-self.exact, axis=1)[:, :10]
+        self.assertEqual(indices.tolist(), expected.tolist())
+        self.assertTrue((self.np.diff(scores, axis=1) <= 0).all())
+
+        # Block by block, never through the full (n_queries, n_rows) score matrix
+        with mock.patch.object(EmbeddingMatrix, "scores", side_effect=AssertionError("full score matrix")):
+            blocked, blocked_scores = matrix.top_k(self.queries, k=10, block_rows=7)
+        self.assertEqual(blocked.tolist(), expected.tolist())
+        self.assertTrue(self.np.allclose(blocked_scores, scores, atol=1e-6))
+
+        single, _ = matrix.top_k(self.vectors[42], k=1)
+        self.assertEqual(single.tolist(), [[42]])
+        small, _ = EmbeddingMatrix.from_vectors(self.vectors[:3]).top_k(self.queries[0], k=10)
+        self.assertEqual(small.shape, (1, 3))
+
+    def test_int8_round_trip_on_disk_is_memory_mapped(self):
+        from services.embedding_matrix import EmbeddingMatrix
+
+        matrix = EmbeddingMatrix.from_vectors(self.vectors[:100], dtype="int8")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = matrix.save(Path(tmp) / "book.emb.npy")
+            loaded = EmbeddingMatrix.load(path)
+            self.assertIsInstance(loaded.data, self.np.memmap)
+            self.assertEqual(loaded.dtype, "int8")
+            self.assertTrue(self.np.allclose(loaded.vectors([0, 5]), matrix.vectors([0, 5])))
+            del loaded
+
+    def test_zero_vectors_and_similarity_helper(self):
+        from services.embedding_matrix import EmbeddingMatrix, cosine_similarity
+
+        matrix = EmbeddingMatrix.from_vectors([[0.0, 0.0], [3.0, 4.0]], dtype="int8")
+        self.assertEqual(matrix.scores([[0.6, 0.8]]).round(2).tolist(), [[0.0, 1.0]])
+        self.assertEqual(cosine_similarity([1, 0], [0, 0]), 0.0)
+        self.assertAlmostEqual(cosine_similarity([1, 1], [2, 2]), 1.0, places=6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Idempotent / incremental book import (books/import_to_rag.py) against an in-process ChromaDB."""
+
+from __future__ import annotations
+
+import importlib.util
+import os
+import sys
+import tempfile
+import unittest
+import uuid
+from pathlib import Path
+
+_BOOKS_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "books"))
+if _BOOKS_ROOT not in sys.path:
+    sys.path.insert(0, _BOOKS_ROOT)
+
+HAS_CHROMADB = importlib.util.find_spec("chromadb") is not None
+
+
+def _book(texts, processed_at):
+    from parse_manifest import text_hash
+
+    return {
+        "metadata": {"filename": "Vampire.pdf", "system": "oWoD", "category": "vampire"},
+        "processing_info": {"processed_at": processed_at, "total_chunks": len(texts), "total_pages": 1},
+        "chunks": [
+            {"text": t, "page_number": 1, "chunk_id": f"c{i}", "word_count": 2, "text_hash": text_hash(t),
+             "embedding": [float(len(t)), float(i), 1.0]}
+            for i, t in enumerate(texts)
+        ],
+    }
+
+
+@unittest.skipUnless(HAS_CHROMADB, "chromadb not installed")
+class TestImportToRag(unittest.TestCase):
+    def setUp(self):
+        import chromadb
+        import import_to_rag
+
+        self._tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self._tmp.name)
+        self.importer = import_to_rag.SmartBookImporter(
+            self.dir, client=chromadb.EphemeralClient(), batch_size=4, max_in_flight=2
+        )
+        self.importer.collection_name = f"rule_books_{uuid.uuid4().hex[:8]}"
+        self.texts = [f"Discipline number {i}" for i in range(10)]
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _ids(self):
+        return set(self.importer.get_collection().get(include=[])["ids"])
+
+    def test_reimport_is_idempotent_and_prunes_stale_ids(self):
+        from book_store import write_book
+
+        write_book(self.dir / "Vampire.jsonl", _book(self.texts, "v1"))
+        collection = self.importer.get_collection()
+        collection.upsert(ids=["vamp_0_legacy"], documents=["old"], embeddings=[[0.0, 0.0, 1.0]],
+                          metadatas=[{"book_id": "vamp", "campaign_id": 0}])
+
+        self.assertTrue(self.importer.import_book(self.dir / "Vampire.jsonl", "vamp"))
+        first = self._ids()
+        self.assertEqual(len(first), 10)
+        self.assertNotIn("vamp_0_legacy", first)
+
+        self.assertTrue(self.importer.import_book(self.dir / "Vampire.jsonl", "vamp", force=True))
+        self.assertEqual(self._ids(), first)
+
+    def test_parse_diff_is_applied(self):
+        from book_store import write_book
+        from parse_manifest import chunk_diff, text_hash, write_diff
+
+        write_book(self.dir / "Vampire.jsonl", _book(self.texts, "v1"))
+        self.assertTrue(self.importer.import_book(self.dir / "Vampire.jsonl", "vamp"))
+
+        new_texts = self.texts[:8] + ["Frenzy rules"]
+        write_book(self.dir / "Vampire.jsonl", _book(new_texts, "v2"))
+        diff = chunk_diff(map(text_hash, self.texts), map(text_hash, new_texts))
+        write_diff(self.dir / "Vampire.jsonl", "Vampire.pdf",
+                   dict(diff, previous_processed_at="v1", processed_at="v2"))
+
+        self.assertTrue(self.importer.import_book(self.dir / "Vampire.jsonl", "vamp"))
+        docs = self.importer.get_collection().get()["documents"]
+        self.assertEqual(sorted(docs), sorted(new_texts))
+        state = self.importer.checkpoint.get(
+            self.importer.checkpoint.key(self.importer.collection_name, "vamp", 0))
+        self.assertEqual((state["mode"], state["status"], state["version"]), ("diff", "complete", "v2"))
+
+    def test_full_prune_pages_and_deletes_in_batches(self):
+        from unittest import mock
+
+        from book_store import write_book
+        from import_to_rag import chunk_doc_id
+        from parse_manifest import text_hash
+
+        write_book(self.dir / "Vampire.jsonl", _book(self.texts, "v1"))
+        self.assertTrue(self.importer.import_book(self.dir / "Vampire.jsonl", "vamp"))
+
+        collection = self.importer.get_collection()
+        calls = {"get": [], "delete": []}
+        real_get, real_delete = collection.get, collection.delete
+
+        def get(**kwargs):
+            page = real_get(**kwargs)
+            calls["get"].append(len(page["ids"]))
+            return page
+
+        def delete(ids=None, **kwargs):
+            calls["delete"].append(len(ids))
+            return real_delete(ids=ids, **kwargs)
+
+        write_book(self.dir / "Vampire.jsonl", _book(self.texts[:1], "v2"))
+        with mock.patch.object(self.importer, "get_collection", return_value=collection), \
+                mock.patch.object(collection, "get", side_effect=get), \
+                mock.patch.object(collection, "delete", side_effect=delete):
+            self.assertTrue(self.importer.import_book(self.dir / "Vampire.jsonl", "vamp", force=True))
+        self.assertEqual(calls["get"], [4, 4, 2])
+        self.assertEqual(calls["delete"], [4, 4, 1])
+        self.assertEqual(self._ids(), {chunk_doc_id("vamp", 0, text_hash(self.texts[0]))})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Metrics registry (backend/services/metrics.py): exposition format, histogram buckets, labels, threads (offline)."""
+
+from __future__ import annotations
+
+import importlib.util
+import os
+import sys
+import threading
+import unittest
+
+_BACKEND_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if _BACKEND_ROOT not in sys.path:
+    sys.path.insert(0, _BACKEND_ROOT)
+
+from services import metrics, tracing  # noqa: E402
+
+HAS_FLASK = importlib.util.find_spec("flask") is not None
+
+
+class TestRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = metrics.Registry()
+
+    def test_counter_and_gauge_exposition(self):
+        requests = self.registry.counter("test_requests_total", "Requests", ("route", "status"))
+        requests.labels("/a", "200").inc()
+        requests.labels(route="/a", status="200").inc(2)
+        requests.labels('/q"x', "500").inc()
+        in_flight = self.registry.gauge("test_in_flight", "In flight")
+        in_flight.inc(3)
+        in_flight.dec()
+        text = self.registry.render()
+        self.assertIn("# TYPE test_requests_total counter", text)
+        self.assertIn('test_requests_total{route="/a",status="200"} 3', text)
+        self.assertIn('test_requests_total{route="/q\\"x",status="500"} 1', text)
+        self.assertIn("test_in_flight 2", text)
+        self.assertTrue(text.endswith("\n"))
+
+    def test_histogram_buckets_are_cumulative(self):
+        latency = self.registry.histogram("test_seconds", "Latency", buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 5.0):
+            latency.observe(value)
+        text = self.registry.render()
+        self.assertIn('test_seconds_bucket{le="0.1"} 2', text)
+        self.assertIn('test_seconds_bucket{le="1"} 3', text)
+        self.assertIn('test_seconds_bucket{le="+Inf"} 4', text)
+        self.assertIn("test_seconds_sum 5.65", text)
+        self.assertIn("test_seconds_count 4", text)
+
+    def test_label_mistakes_and_reregistration(self):
+        labelled = self.registry.counter("test_labelled_total", "Labelled", ("kind",))
+        with self.assertRaises(ValueError):
+            labelled.inc()
+        with self.assertRaises(ValueError):
+            labelled.labels("a", "b")
+        self.assertIs(self.registry.counter("test_labelled_total", "Labelled", ("kind",)), labelled)
+        with self.assertRaises(ValueError):
+            self.registry.gauge("test_labelled_total", "Clash")
+
+    def test_callback_gauge(self):
+        self.registry.gauge_callback("test_queue_length", "Queue", lambda: [(("a",), 2), (("b",), 0)], ("queue",))
+        text = self.registry.render()
+        self.assertIn('test_queue_length{queue="a"} 2', text)
+        self.assertIn('test_queue_length{queue="b"} 0', text)
+
+    def test_concurrent_updates_are_not_lost(self):
+        hits = self.registry.counter("test_hits_total", "Hits", ("worker",))
+        latency = self.registry.histogram("test_work_seconds", "Work")
+
+        def work(worker):
+            for _ in range(2000):
+                hits.labels(str(worker % 4)).inc()
+                latency.observe(0.01)
+
+        threads = [threading.Thread(target=work, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sum(child.value for _, child in hits.children()), 16000)
+        self.assertEqual(latency.labels().snapshot()[2], 16000)
+
+
+class TestBackendMetrics(unittest.TestCase):
+    def test_llm_response_counts_tokens(self):
+        tokens = metrics.LLM_TOKENS.labels("test_provider", "prompt")
+        before = tokens.value
+        tracing.record_llm_response({"usage": {"prompt_tokens": 12, "completion_tokens": 5}}, "test_provider")
+        tracing.record_llm_response(None, "test_provider")
+        self.assertEqual(tokens.value - before, 12)
+        self.assertEqual(metrics.LLM_TOKENS.labels("test_provider", "completion").value, 5)
+        self.assertEqual(metrics.LLM_REQUESTS.labels("test_provider", "error").value, 1)
+        self.assertIn("shadowrealms_llm_tokens_total", metrics.REGISTRY.render())
+
+    @unittest.skipUnless(HAS_FLASK, "flask not installed")
+    def test_metrics_endpoint(self):
+        from flask import Flask
+
+        app = Flask(__name__)
+        app.config.update(METRICS_ENABLED=True)
+        metrics.init_app(app)
+
+        @app.route("/ping")
+        def ping():
+            return "pong"
+
+        client = app.test_client()
+        client.get("/ping")
+        response = client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("text/plain", response.headers["Content-Type"])
+        self.assertIn('shadowrealms_http_requests_total{endpoint="GET /ping",status="200"} 1',
+                      response.get_data(as_text=True))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Unit tests for the incremental-parse manifest in books/parse_manifest.py."""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+_BOOKS_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "books"))
+if _BOOKS_ROOT not in sys.path:
+    sys.path.insert(0, _BOOKS_ROOT)
+
+from parse_manifest import ParseManifest, chunk_diff, diff_path, file_sha256, load_diff, write_diff  # noqa: E402
+
+
+class TestParseManifest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self._tmp.name)
+        self.pdf = self.dir / "Book.pdf"
+        self.pdf.write_bytes(b"%PDF-1.4 fake")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_chunk_diff(self):
+        diff = chunk_diff(["a", "b", "c"], ["b", "c", "d", "d"])
+        self.assertEqual(diff, {"upsert": ["d"], "delete": ["a"], "unchanged": 2})
+
+    def test_is_current_tracks_hash_chunker_and_model(self):
+        manifest = ParseManifest(self.dir)
+        sha = file_sha256(self.pdf)
+        chunker = {"chunk_size": 1000, "overlap": 200}
+        st = self.pdf.stat()
+        manifest.set("Book.pdf", {
+            "pdf_sha256": sha, "pdf_size": st.st_size, "pdf_mtime": st.st_mtime,
+            "chunker": chunker, "embedding_model": None, "pages": {"1": "h"},
+        })
+        manifest.save()
+
+        reloaded = ParseManifest(self.dir)
+        self.assertEqual(reloaded.current_sha256("Book.pdf", self.pdf), sha)
+        self.assertTrue(reloaded.is_current("Book.pdf", sha, chunker, None))
+        self.assertFalse(reloaded.is_current("Book.pdf", sha, {"chunk_size": 800, "overlap": 200}, None))
+        self.assertFalse(reloaded.is_current("Book.pdf", sha, chunker, "all-MiniLM-L6-v2"))
+        self.assertFalse(reloaded.is_current("Other.pdf", sha, chunker, None))
+
+    def test_changed_file_is_rehashed(self):
+        manifest = ParseManifest(self.dir)
+        manifest.set("Book.pdf", {"pdf_sha256": "stale", "pdf_size": -1, "pdf_mtime": 0})
+        self.assertEqual(manifest.current_sha256("Book.pdf", self.pdf), file_sha256(self.pdf))
+
+    def test_diff_file_round_trip(self):
+        output = self.dir / "Book.jsonl"
+        write_diff(output, "Book.pdf", chunk_diff(["a"], ["b"]))
+        self.assertEqual(diff_path(output).name, "Book.diff.json")
+        diff = load_diff(output)
+        self.assertEqual((diff["upsert"], diff["delete"], diff["book"]), (["b"], ["a"], "Book.pdf"))
+
+
+if __name__ == "__main__":
+    unittest.main()
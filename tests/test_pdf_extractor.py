@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Unit tests for the pluggable PDF extractors (in-memory backends, no PDF libraries needed)."""
+
+from __future__ import annotations
+
+import os
+import sys
+import unittest
+
+_BACKEND_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if _BACKEND_ROOT not in sys.path:
+    sys.path.insert(0, _BACKEND_ROOT)
+
+from services.pdf_extractor import (  # noqa: E402
+    AutoExtractor,
+    PdfExtractor,
+    get_extractor,
+    needs_layout,
+    page_range,
+    parity_report,
+)
+
+PROSE = "Frenzy is the Beast taking over. Roll Self-Control at difficulty 8. The Storyteller decides."
+TABLE = "\n".join(["Str", "3", "Dex", "2"] * 10)
+
+
+class _MemoryExtractor(PdfExtractor):
+    """Serves fixed page texts; records which pages were requested."""
+
+    def __init__(self, name, pages):
+        self.name = name
+        self.pages = pages
+        self.requested = []
+
+    def page_count(self, pdf_path):
+        return len(self.pages)
+
+    def iter_pages(self, pdf_path, pages=None):
+        indices = range(len(self.pages)) if pages is None else sorted(set(pages))
+        self.requested.append(list(indices))
+        for i in indices:
+            yield i, self.pages[i]
+
+
+class TestNeedsLayout(unittest.TestCase):
+    def test_plain_prose_and_empty_pages_stay_on_fast_backend(self):
+        self.assertFalse(needs_layout(PROSE))
+        self.assertFalse(needs_layout("   "))
+
+    def test_broken_glyphs_run_together_words_and_tables_fall_back(self):
+        self.assertTrue(needs_layout("(cid:12)(cid:34) Frenzy"))
+        self.assertTrue(needs_layout("Frenzyisthebeasttakingover rollselfcontrolatdifficulty"))
+        self.assertTrue(needs_layout(TABLE))
+
+
+class TestAutoExtractor(unittest.TestCase):
+    def test_only_layout_pages_are_re_extracted(self):
+        fast = _MemoryExtractor("fast", [PROSE, TABLE, PROSE])
+        slow = _MemoryExtractor("slow", ["p0", "Str 3 Dex 2", "p2"])
+        auto = AutoExtractor(fast=fast, fallback=slow)
+        self.assertEqual([t for _, t in auto.iter_pages("book.pdf")], [PROSE, "Str 3 Dex 2", PROSE])
+        self.assertEqual(slow.requested, [[1]])
+        self.assertEqual(auto.fallback_pages, 1)
+
+    def test_extract_pages_uses_half_open_ranges(self):
+        fast = _MemoryExtractor("fast", [PROSE] * 5)
+        auto = AutoExtractor(fast=fast, fallback=_MemoryExtractor("slow", []))
+        self.assertEqual([i for i, _ in auto.extract_pages("book.pdf", 3)], [3, 4])
+        self.assertEqual([i for i, _ in auto.extract_pages("book.pdf", 1, 3)], [1, 2])
+        self.assertEqual(list(page_range(2, 10, 4)), [2, 3])
+
+    def test_unknown_backend_is_rejected(self):
+        with self.assertRaises(ValueError):
+            get_extractor("ghostscript")
+
+
+class TestParityReport(unittest.TestCase):
+    def test_identical_backends_agree(self):
+        ref = _MemoryExtractor("ref", [PROSE, PROSE.upper()])
+        report = parity_report("book.pdf", ref, _MemoryExtractor("cand", [PROSE, PROSE]))
+        self.assertEqual(report["mean_similarity"], 1.0)
+        self.assertEqual(report["chunk_boundary_agreement"], 1.0)
+        self.assertEqual(report["divergent_pages"], [])
+
+    def test_divergent_pages_are_listed(self):
+        ref = _MemoryExtractor("ref", [PROSE, PROSE])
+        cand = _MemoryExtractor("cand", [PROSE, "Gnosis measures the connection to the Umbra."])
+        report = parity_report("book.pdf", ref, cand)
+        self.assertEqual([p["page"] for p in report["divergent_pages"]], [2])
+        self.assertLess(report["chunk_boundary_agreement"], 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Benchmark harness (tests/perf): percentiles, baseline comparison and the stub LLM server (offline)."""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+import urllib.request
+from pathlib import Path
+
+_PERF_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "perf"))
+if _PERF_ROOT not in sys.path:
+    sys.path.insert(0, _PERF_ROOT)
+
+import benchlib  # noqa: E402
+from stub_servers import EMBEDDING_DIM, StubLLMServer, stub_embedding  # noqa: E402
+
+
+class TestBenchlib(unittest.TestCase):
+    def test_summary_percentiles(self):
+        stats = benchlib.summarize([float(n) for n in range(1, 101)])
+        self.assertEqual(stats["count"], 100)
+        self.assertEqual(stats["mean_ms"], 50.5)
+        self.assertEqual(stats["p50_ms"], 50.5)
+        self.assertEqual(stats["p99_ms"], 99.01)
+        self.assertEqual(stats["max_ms"], 100.0)
+        self.assertEqual(benchlib.summarize([])["p95_ms"], 0.0)
+
+    def test_recorder_counts_errors_and_skips_warmup(self):
+        recorder = benchlib.LatencyRecorder()
+        calls = []
+        recorder.run("phase", calls.append, iterations=3, warmup=2)
+        self.assertEqual(calls, [-1, -2, 0, 1, 2])
+        with self.assertRaises(ValueError):
+            with recorder.measure("broken"):
+                raise ValueError("boom")
+        summary = recorder.summary()
+        self.assertEqual(summary["phase"]["count"], 3)
+        self.assertEqual(summary["broken"]["errors"], 1)
+
+    def test_compare_flags_only_real_regressions(self):
+        baseline = {"phases": {
+            "poll": {"p50_ms": 10.0, "p95_ms": 20.0},
+            "retrieval": {"p50_ms": 0.2, "p95_ms": 0.4},
+        }}
+        current = {"phases": {
+            "poll": {"p50_ms": 11.0, "p95_ms": 30.0},        # p95 +50%
+            "retrieval": {"p50_ms": 0.5, "p95_ms": 0.9},     # x2 but under the 1 ms floor
+            "chat": {"p50_ms": 5.0, "p95_ms": 6.0},          # no baseline
+        }}
+        rows = benchlib.compare(current, baseline, tolerance=0.2, min_delta_ms=1.0)
+        regressed = [(row["phase"], row["stat"]) for row in rows if row["regressed"]]
+        self.assertEqual(regressed, [("poll", "p95_ms")])
+        self.assertEqual({row["phase"] for row in rows}, {"poll", "retrieval"})
+
+    def test_results_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = benchlib.write_results(Path(tmp) / "nested" / "run.json", "suite",
+                                          {"poll": benchlib.summarize([1.0, 2.0])}, {"seed": 1})
+            data = benchlib.load_results(path)
+        self.assertEqual(data["suite"], "suite")
+        self.assertEqual(data["meta"], {"seed": 1})
+        self.assertEqual(data["phases"]["poll"]["count"], 2)
+
+
+class TestStubLLMServer(unittest.TestCase):
+    def _post(self, url, payload):
+        request = urllib.request.Request(url, data=json.dumps(payload).encode(),
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return json.loads(response.read())
+
+    def test_embeddings_and_completions(self):
+        with StubLLMServer(reply_text="Blood calls.") as stub:
+            embedded = self._post(f"{stub.url}/v1/embeddings", {"input": ["the Prince waits", "docks"]})
+            chat = self._post(f"{stub.url}/v1/chat/completions",
+                              {"messages": [{"role": "user", "content": "Hello"}]})
+            with urllib.request.urlopen(f"{stub.url}/v1/models", timeout=5) as response:
+                models = json.loads(response.read())
+
+        vectors = [row["embedding"] for row in sorted(embedded["data"], key=lambda row: row["index"])]
+        self.assertEqual(len(vectors), 2)
+        self.assertEqual(len(vectors[0]), EMBEDDING_DIM)
+        self.assertEqual(vectors[0], stub_embedding("the Prince waits"))
+        self.assertAlmostEqual(sum(v * v for v in vectors[0]), 1.0, places=6)
+        self.assertEqual(chat["choices"][0]["message"]["content"], "Blood calls.")
+        self.assertTrue(models["data"])
+        self.assertEqual(stub.requests["/v1/embeddings"], 1)
+        self.assertEqual(stub.requests["/v1/chat/completions"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Set-based playing character resolution (services/playing_character.effective_playing_characters) vs the per-campaign resolver (offline, SQLite)."""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import sys
+import unittest
+
+_BACKEND_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if _BACKEND_ROOT not in sys.path:
+    sys.path.insert(0, _BACKEND_ROOT)
+
+from services.playing_character import (  # noqa: E402
+    effective_playing_character_id,
+    effective_playing_characters,
+)
+
+
+class _CountingCursor:
+    """sqlite3 cursor taking the routes' %s placeholders and returning dict rows"""
+
+    def __init__(self, conn):
+        self._cursor = conn.cursor()
+        self.statements = 0
+
+    def execute(self, sql, params=()):
+        self.statements += 1
+        self._cursor.execute(sql.replace("%s", "?"), params)
+        return self
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        return dict(row) if row is not None else None
+
+    def fetchall(self):
+        return [dict(row) for row in self._cursor.fetchall()]
+
+
+# campaign -> (roster pick, characters as (id, is_active)); user 1 picked 104 globally
+_SCENARIOS = {
+    10: (None, [(100, 1)]),                       # lone character, no roster pick yet
+    11: (111, [(110, 1), (111, 1), (112, 1)]),    # valid roster pick
+    12: (120, [(120, 0), (121, 1)]),              # roster pick inactive, lone active one
+    13: (None, [(103, 1), (104, 1)]),             # users.active_character_id wins
+    14: (None, [(141, 1), (140, 1)]),             # lowest id
+    15: (None, [(150, 0)]),                       # nothing active
+    16: (None, []),                               # no characters
+}
+
+
+class TestEffectivePlayingCharacters(unittest.TestCase):
+    def setUp(self):
+        os.environ.pop("DATABASE_TYPE", None)
+        conn = sqlite3.connect(":memory:")
+        conn.row_factory = sqlite3.Row
+        conn.executescript(
+            """
+            CREATE TABLE users (id INTEGER PRIMARY KEY, active_character_id INTEGER);
+            CREATE TABLE campaign_players (campaign_id INTEGER, user_id INTEGER,
+                                           active_character_id INTEGER, UNIQUE (campaign_id, user_id));
+            CREATE TABLE characters (id INTEGER PRIMARY KEY, user_id INTEGER, campaign_id INTEGER,
+                                     name TEXT, portrait_url TEXT, is_active INTEGER);
+            INSERT INTO users VALUES (1, 104), (2, NULL);
+            """
+        )
+        for campaign_id, (pick, characters) in _SCENARIOS.items():
+            conn.execute("INSERT INTO campaign_players VALUES (?, 1, ?)", (campaign_id, pick))
+            for character_id, active in characters:
+                conn.execute(
+                    "INSERT INTO characters VALUES (?, 1, ?, ?, ?, ?)",
+                    (character_id, campaign_id, f"PC {character_id}", f"/p/{character_id}.png", active),
+                )
+        # another player's character and a campaign user 1 only has a character in
+        conn.execute("INSERT INTO characters VALUES (900, 2, 11, 'Other', NULL, 1)")
+        conn.execute("INSERT INTO characters VALUES (170, 1, 17, 'Off roster', NULL, 1)")
+        self.conn = conn
+        self.cursor = _CountingCursor(conn)
+
+    def roster_picks(self):
+        rows = self.conn.execute("SELECT campaign_id, active_character_id FROM campaign_players ORDER BY campaign_id")
+        return {row[0]: row[1] for row in rows}
+
+    def test_matches_single_campaign_resolver(self):
+        batch = effective_playing_characters(self.cursor, 1, backfill=False)
+        for campaign_id in list(_SCENARIOS) + [17, 99]:
+            expected = effective_playing_character_id(self.cursor, 1, campaign_id)
+            got = batch.get(campaign_id, {}).get("id")
+            self.assertEqual(got, expected, f"campaign {campaign_id}")
+        self.assertEqual(batch[11], {"id": 111, "name": "PC 111", "portrait_url": "/p/111.png"})
+
+    def test_one_select_and_one_backfill(self):
+        before = self.roster_picks()
+        out = effective_playing_characters(self.cursor, 1)
+        self.assertEqual(self.cursor.statements, 2)
+        self.assertEqual(sorted(out), [10, 11, 12, 13, 14, 17])
+        after = self.roster_picks()
+        self.assertEqual(after[10], 100)
+        self.assertEqual(after[12], 120)  # existing (stale) pick is not overwritten
+        self.assertEqual({k: v for k, v in after.items() if k != 10}, {k: v for k, v in before.items() if k != 10})
+
+        self.cursor.statements = 0
+        effective_playing_characters(self.cursor, 1)
+        self.assertEqual(self.cursor.statements, 1)  # nothing left to backfill
+
+    def test_campaign_filter(self):
+        out = effective_playing_characters(self.cursor, 1, [13, 15, 99], backfill=False)
+        self.assertEqual(list(out), [13])
+        self.assertEqual(out[13]["id"], 104)
+        self.cursor.statements = 0
+        self.assertEqual(effective_playing_characters(self.cursor, 1, []), {})
+        self.assertEqual(self.cursor.statements, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
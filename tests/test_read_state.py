@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Read state (backend/services/read_state.py): buffered read markers (offline) and the
+campaign unread summary / batched marker upsert. The SQL tests need PostgreSQL: they
+run when DATABASE_TYPE=postgresql and DATABASE_* point at a server, in a throwaway
+schema that is dropped afterwards.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import os
+import sys
+import unittest
+from unittest import mock
+
+_BACKEND_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if _BACKEND_ROOT not in sys.path:
+    sys.path.insert(0, _BACKEND_ROOT)
+
+HAS_POSTGRES = (
+    os.getenv("DATABASE_TYPE", "").lower() == "postgresql"
+    and importlib.util.find_spec("psycopg2") is not None
+)
+
+SCHEMA = f"read_state_test_{os.getpid()}"
+
+
+class _FakeConn:
+    def __init__(self):
+        self.commits = self.rollbacks = 0
+
+    def cursor(self):
+        return object()
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class TestReadMarkerBuffer(unittest.TestCase):
+    def setUp(self):
+        from services import read_state
+
+        self.read_state = read_state
+        self.buffer = read_state.ReadMarkerBuffer(flush_seconds=60)
+        self.buffer._ensure_flusher = lambda: None
+
+    def test_markers_only_move_forward(self):
+        self.buffer.record(7, 1, 10, "t10")
+        self.buffer.record(7, 1, 8, "t8")
+        self.assertEqual(self.buffer.pending(7, 1), (10, "t10"))
+        self.buffer.record(7, 1, 12, "t12")
+        self.buffer.record(7, 2, 3, "t3")
+        self.buffer.record(9, 1, 5, "t5")
+        self.assertEqual(self.buffer.pending_for(7), {1: (12, "t12"), 2: (3, "t3")})
+        self.assertEqual(len(self.buffer), 3)
+
+    def test_flush_writes_latest_markers_once(self):
+        for message_id in range(1, 50):
+            self.buffer.record(7, 1, message_id, f"t{message_id}")
+        self.buffer.record(8, 1, 4, "t4")
+        conn = _FakeConn()
+        with mock.patch.object(self.read_state, "write_markers", side_effect=lambda c, rows: len(rows)) as write:
+            self.assertEqual(self.buffer.flush(conn), 2)
+            self.assertEqual(self.buffer.flush(conn), 0)
+        write.assert_called_once()
+        self.assertEqual(write.call_args[0][1], [(7, 1, 49, "t49"), (8, 1, 4, "t4")])
+        self.assertEqual((conn.commits, len(self.buffer)), (1, 0))
+
+    def test_failed_flush_keeps_markers(self):
+        self.buffer.record(7, 1, 10, "t10")
+        conn = _FakeConn()
+        with mock.patch.object(self.read_state, "write_markers", side_effect=RuntimeError("db down")):
+            with self.assertRaises(RuntimeError):
+                self.buffer.flush(conn)
+        self.assertEqual(conn.rollbacks, 1)
+        self.assertEqual(self.buffer.pending(7, 1), (10, "t10"))
+
+    def test_pending_gauge_renders(self):
+        from services import metrics
+
+        with mock.patch.object(self.read_state.markers, "_ensure_flusher"):
+            self.read_state.markers.record(7, 1, 10, "t10")
+        self.addCleanup(self.read_state.markers._dirty.clear)
+        self.assertIn("shadowrealms_read_markers_pending 1", metrics.REGISTRY.render())
+
+    def test_merge_marker(self):
+        merge = self.read_state.merge_marker
+        self.assertEqual(merge((None, None), None), (None, None))
+        self.assertEqual(merge((5, "a"), (7, "b")), (7, "b"))
+        self.assertEqual(merge((9, "a"), (7, "b")), (9, "a"))
+        self.assertEqual(merge(None, (7, "b")), (7, "b"))
+
+
+@unittest.skipUnless(HAS_POSTGRES, "needs DATABASE_TYPE=postgresql and a reachable server")
+class TestUnreadSummary(unittest.TestCase):
+    def setUp(self):
+        from database import get_db
+        from services import read_state
+
+        self.read_state = read_state
+        self.conn = get_db()
+        self.cursor = self.conn.cursor()
+        self.cursor.execute(f"CREATE SCHEMA {SCHEMA}")
+        self.cursor.execute(f"SET search_path TO {SCHEMA}")
+        self.cursor.execute(
+            """
+            CREATE TABLE locations (
+                id INTEGER PRIMARY KEY, campaign_id INTEGER, is_active BOOLEAN DEFAULT TRUE,
+                is_open BOOLEAN NOT NULL DEFAULT TRUE
+            );
+            CREATE TABLE messages (
+                id SERIAL PRIMARY KEY, campaign_id INTEGER, location_id INTEGER,
+                ai_message_kind TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+            CREATE TABLE characters (id INTEGER PRIMARY KEY);
+            CREATE TABLE location_reads (
+                character_id INTEGER, location_id INTEGER, last_read_message_id INTEGER,
+                last_read_at TIMESTAMP, updated_at TIMESTAMP, UNIQUE (character_id, location_id)
+            );
+            INSERT INTO characters VALUES (7), (8);
+            INSERT INTO locations (id, campaign_id, is_active, is_open) VALUES
+                (1, 1, TRUE, TRUE), (2, 1, TRUE, TRUE), (3, 1, TRUE, FALSE), (4, 1, FALSE, TRUE),
+                (5, 2, TRUE, TRUE);
+            INSERT INTO messages (campaign_id, location_id, ai_message_kind) VALUES
+                (1, 1, NULL), (1, 1, NULL), (1, 1, 'dice_animation'), (1, 1, NULL),
+                (1, 2, NULL), (1, 3, NULL), (2, 5, NULL);
+            INSERT INTO location_reads VALUES (7, 1, 1, NULL, NULL), (8, 1, 4, NULL, NULL);
+            """
+        )
+        read_state.ensure_read_state_indexes(self.cursor)
+
+    def tearDown(self):
+        self.conn.rollback()
+        self.cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        self.conn.commit()
+        self.conn.close()
+
+    def summary(self, character_id, **kwargs):
+        rows = self.read_state.unread_summary(self.cursor, 1, character_id, **kwargs)
+        return {row["location_id"]: row for row in rows}
+
+    def test_counts_and_first_unread_per_room(self):
+        rooms = self.summary(7)
+        self.assertEqual(sorted(rooms), [1, 2])
+        tavern = rooms[1]
+        self.assertEqual((tavern["last_read_message_id"], tavern["first_unread_message_id"]), (1, 2))
+        self.assertEqual((tavern["unread_count"], tavern["last_message_id"]), (2, 4))
+        self.assertFalse(tavern["unread_count_capped"])
+        self.assertIsNotNone(tavern["first_unread_at"])
+        never_read = rooms[2]
+        self.assertEqual((never_read["first_unread_message_id"], never_read["unread_count"]), (5, 1))
+
+        caught_up = self.summary(8)[1]
+        self.assertIsNone(caught_up["first_unread_message_id"])
+        self.assertEqual(caught_up["unread_count"], 0)
+
+    def test_closed_rooms_only_on_request(self):
+        rooms = self.summary(7, include_closed=True)
+        self.assertEqual(sorted(rooms), [1, 2, 3])
+        self.assertFalse(rooms[3]["is_open"])
+
+    def test_count_is_capped(self):
+        self.cursor.execute("INSERT INTO messages (campaign_id, location_id) SELECT 1, 2 FROM generate_series(1, 6)")
+        with mock.patch.object(self.read_state, "UNREAD_COUNT_CAP", 5):
+            room = self.summary(7)[2]
+        self.assertEqual(room["unread_count"], 5)
+        self.assertTrue(room["unread_count_capped"])
+
+    def test_pending_markers_overlay_stored_ones(self):
+        room = self.summary(7, pending={1: (2, "pending")})[1]
+        self.assertEqual((room["last_read_message_id"], room["last_read_at"]), (2, "pending"))
+        self.assertEqual((room["first_unread_message_id"], room["unread_count"]), (4, 1))
+
+    def test_write_markers_is_monotonic(self):
+        self.cursor.execute("SELECT id, created_at FROM messages ORDER BY id")
+        at = {row["id"]: row["created_at"] for row in self.cursor.fetchall()}
+        self.read_state.write_markers(self.cursor, [
+            (7, 1, 4, at[4]),   # forward
+            (8, 1, 2, at[2]),   # backwards: ignored
+            (7, 2, 5, at[5]),   # new row
+            (99, 2, 5, at[5]),  # character deleted meanwhile: skipped
+        ])
+        self.cursor.execute("SELECT character_id, location_id, last_read_message_id FROM location_reads ORDER BY 1, 2")
+        rows = [tuple(row.values()) for row in self.cursor.fetchall()]
+        self.assertEqual(rows, [(7, 1, 4), (7, 2, 5), (8, 1, 4)])
+
+
+if __name__ == "__main__":
+    unittest.main()
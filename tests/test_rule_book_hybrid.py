@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Hybrid rule-book retrieval (RAGService.get_rule_book_context) on the embedded vector store: BM25 + vector fusion, per-campaign index refresh."""
+
+from __future__ import annotations
+
+import importlib.util
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+_BACKEND_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if _BACKEND_ROOT not in sys.path:
+    sys.path.insert(0, _BACKEND_ROOT)
+
+HAS_RAG_DEPS = importlib.util.find_spec("numpy") is not None and importlib.util.find_spec("requests") is not None
+
+WORDS = ["frenzy", "blood", "rage", "gnosis", "umbra", "willpower"]
+THAUMATURGY = "Thaumaturgy paths: blood blood rage rage frenzy frenzy willpower"
+NECROMANCY = "Necromancy paths: blood blood rage rage frenzy frenzy willpower"
+
+
+class WordEmbedding:
+    """Bag-of-words over a few rule terms: anything else (e.g. disciplines) is invisible to vectors."""
+
+    def __call__(self, input):
+        return [[float(text.lower().count(word)) for word in WORDS] + [0.01] for text in input]
+
+    def embed_query(self, input):
+        return self(input)
+
+    def name(self):
+        return "word-embedding"
+
+
+def _wait_for_index():
+    for thread in threading.enumerate():
+        if thread.name.startswith("rule-book-index-"):
+            thread.join(timeout=10)
+
+
+@unittest.skipUnless(HAS_RAG_DEPS, "RAG service dependencies not installed")
+class TestHybridRuleBookContext(unittest.TestCase):
+    def setUp(self):
+        from services import rag_service
+        from services.vector_store import LocalVectorClient
+
+        self._tmp = tempfile.TemporaryDirectory()
+        tmp = self._tmp.name
+        client = LocalVectorClient(os.path.join(tmp, "vectors"), embedding_function=WordEmbedding())
+        self.rag_module = rag_service
+        self.rag = rag_service.RAGService(
+            {"VECTOR_STORE": "local", "RULE_BOOK_INDEX_DIR": os.path.join(tmp, "index")}, client=client
+        )
+        self.collection = self.rag._get_collection("rule_books")
+        # The discipline chunk is the vectors' worst match for a discipline-name query
+        texts = [f"Frenzy rule {i}" for i in range(10)] + [THAUMATURGY]
+        self.collection.add(
+            ids=[f"c1_{i}" for i in range(len(texts))],
+            documents=texts,
+            metadatas=[{"campaign_id": 1, "text_hash": f"h{i}"} for i in range(len(texts))],
+        )
+        self.collection.add(
+            ids=["c2_0"], documents=["Thaumaturgy in another chronicle"],
+            metadatas=[{"campaign_id": 2, "text_hash": "x0"}],
+        )
+
+    def tearDown(self):
+        _wait_for_index()
+        self._tmp.cleanup()
+
+    def context(self, query, campaign_id=1, **kwargs):
+        chunks = self.rag.get_rule_book_context(query, campaign_id, n_results=2, **kwargs)
+        return {chunk["content"]: chunk for chunk in chunks}
+
+    def test_keyword_hits_are_fused_into_vector_results(self):
+        self.assertNotIn(THAUMATURGY, self.context("thaumaturgy", hybrid=False))
+        self.context("thaumaturgy")  # first query builds the index in the background
+        _wait_for_index()
+        chunk = self.context("thaumaturgy")[THAUMATURGY]
+        self.assertEqual(chunk["retrieval"], "keyword")
+        self.assertEqual(chunk["metadata"]["campaign_id"], 1)
+        self.assertGreater(chunk["fusion_score"], 0)
+        self.assertEqual(len(self.context("thaumaturgy")), 2)
+
+    def test_index_follows_its_own_campaign_scope(self):
+        self.context("thaumaturgy")
+        _wait_for_index()
+        name = self.rag._rule_book_segment_name(1)
+        version = self.rag.rule_book_index.segment_meta(name)["scope_version"]
+
+        with mock.patch.object(self.rag_module, "RULE_BOOK_INDEX_REFRESH_SECONDS", 0), \
+                mock.patch.object(self.rag.rule_book_index, "add_segment",
+                                  wraps=self.rag.rule_book_index.add_segment) as rebuilt:
+            # Another campaign's import leaves this scope's segment alone
+            self.collection.add(ids=["c2_1"], documents=["Gnosis"], metadatas=[{"campaign_id": 2}])
+            self.context("thaumaturgy")
+            _wait_for_index()
+            rebuilt.assert_not_called()
+
+            # Same ids, same count, new text: the content marker changes the version
+            self.collection.upsert(
+                ids=["c1_10"], documents=[NECROMANCY],
+                metadatas=[{"campaign_id": 1, "text_hash": "h10b"}],
+            )
+            self.context("necromancy")
+            _wait_for_index()
+            rebuilt.assert_called_once()
+        self.assertNotEqual(self.rag.rule_book_index.segment_meta(name)["scope_version"], version)
+        self.assertEqual(self.context("necromancy")[NECROMANCY]["retrieval"], "keyword")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Unit tests for the BM25 rule-book index (no ChromaDB / LM Studio needed)."""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+_BACKEND_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if _BACKEND_ROOT not in sys.path:
+    sys.path.insert(0, _BACKEND_ROOT)
+
+from services.rule_book_index import RuleBookIndex, reciprocal_rank_fusion, tokenize  # noqa: E402
+
+
+class TestRuleBookIndex(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.index = RuleBookIndex(Path(self._tmp.name))
+        self.index.add_segment(
+            "vampire_core",
+            [
+                ("0", "Frenzy is the Beast taking over. Roll Self-Control at difficulty 8."),
+                ("1", "Disciplines such as Celerity and Potence grant vampiric powers."),
+                ("2", "Blood pool and generation limit how much blood a vampire can spend."),
+            ],
+        )
+        self.index.add_segment(
+            "werewolf_core",
+            [
+                ("0", "Rage lets a Garou take extra actions; too much Rage risks frenzy."),
+                ("1", "Gnosis measures the spiritual connection to the Umbra."),
+            ],
+        )
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_tokenize_keeps_numbers(self):
+        self.assertEqual(tokenize("Difficulty 8, Self-Control!"), ["difficulty", "8", "self", "control"])
+
+    def test_search_ranks_exact_terms(self):
+        hits = self.index.search("frenzy difficulty 8")
+        self.assertEqual(hits[0][:2], ("vampire_core", "0"))
+        self.assertIn(("werewolf_core", "0"), [h[:2] for h in hits])
+
+    def test_search_filters_segments(self):
+        hits = self.index.search("frenzy", segments=["werewolf_core"])
+        self.assertEqual([h[:2] for h in hits], [("werewolf_core", "0")])
+
+    def test_unknown_terms_return_nothing(self):
+        self.assertEqual(self.index.search("thaumaturgy"), [])
+
+    def test_reindexing_one_segment_replaces_it(self):
+        self.index.add_segment("werewolf_core", [("0", "Thaumaturgy is not a Garou gift.")])
+        self.assertEqual([h[:2] for h in self.index.search("thaumaturgy")], [("werewolf_core", "0")])
+        self.assertEqual([h[:2] for h in self.index.search("rage")], [])
+        self.assertTrue(self.index.search("celerity"))
+
+    def test_remove_segment(self):
+        self.index.remove_segment("vampire_core")
+        self.assertEqual(self.index.segment_names(), ["werewolf_core"])
+        self.assertEqual(self.index.search("celerity"), [])
+
+    def test_names_that_sanitise_alike_get_separate_segments(self):
+        self.index.add_segment("Vampire: Core", [("a", "frenzy")])
+        self.index.add_segment("Vampire? Core", [("b", "vitae")])
+        self.assertNotEqual(self.index.segment_path("Vampire: Core"), self.index.segment_path("Vampire? Core"))
+        self.assertEqual([h[:2] for h in self.index.search("frenzy", segments=["Vampire: Core"])], [("Vampire: Core", "a")])
+        self.assertEqual([h[:2] for h in self.index.search("vitae")], [("Vampire? Core", "b")])
+        self.assertEqual(self.index.segment_names(), ["Vampire: Core", "Vampire? Core", "vampire_core", "werewolf_core"])
+
+    def test_segment_meta_round_trip(self):
+        self.index.add_segment("scope", [("a", "frenzy")], meta={"collection_count": 7})
+        self.assertEqual(self.index.segment_meta("scope"), {"collection_count": 7})
+        self.assertIsNone(self.index.segment_meta("missing"))
+
+
+class TestReciprocalRankFusion(unittest.TestCase):
+    def test_items_in_both_rankings_win(self):
+        fused = reciprocal_rank_fusion([["v1", "both", "v3"], ["k1", "both"]])
+        self.assertEqual(fused[0][0], "both")
+        self.assertEqual({doc_id for doc_id, _ in fused}, {"v1", "both", "v3", "k1"})
+
+    def test_empty_ranking_keeps_other_order(self):
+        fused = reciprocal_rank_fusion([["a", "b", "c"], []])
+        self.assertEqual([doc_id for doc_id, _ in fused], ["a", "b", "c"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""SQL accounting (backend/services/sql_stats.py): fingerprints, per-endpoint stats, slow-query EXPLAIN, N+1 log (offline)."""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import sys
+import unittest
+from unittest import mock
+
+_BACKEND_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if _BACKEND_ROOT not in sys.path:
+    sys.path.insert(0, _BACKEND_ROOT)
+
+from services import sql_stats, tracing  # noqa: E402
+
+
+class TestFingerprint(unittest.TestCase):
+    def test_literals_and_placeholders_collapse(self):
+        self.assertEqual(
+            sql_stats.fingerprint("SELECT * FROM characters  WHERE id = %s AND name = 'Bob' -- note\n LIMIT 10;"),
+            "SELECT * FROM characters WHERE id = ? AND name = ? LIMIT ?",
+        )
+        self.assertEqual(
+            sql_stats.fingerprint("SELECT id FROM t2 WHERE id IN (1, 2, 3)"),
+            sql_stats.fingerprint("SELECT id FROM t2 WHERE id IN (?, ?)"),
+        )
+        self.assertEqual(
+            sql_stats.fingerprint("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s), (%s, %s)"),
+            "INSERT INTO t (a, b) VALUES (...), ...",
+        )
+
+
+class TestSqlAccounting(unittest.TestCase):
+    def setUp(self):
+        sql_stats.reset()
+        self.conn = tracing.trace_connection(sqlite3.connect(":memory:"))
+        self.conn.execute("CREATE TABLE npcs (id INTEGER PRIMARY KEY, campaign_id INTEGER, name TEXT)")
+        self.conn.executemany("INSERT INTO npcs (campaign_id, name) VALUES (?, ?)",
+                              [(1, f"npc {n}") for n in range(30)])
+        sql_stats.reset()
+        self.trace, self.token = tracing.start_trace(endpoint="GET /api/campaigns")
+
+    def tearDown(self):
+        if self.token is not None:
+            tracing.end_trace(self.token)
+        self.conn.close()
+        sql_stats.reset()
+
+    def finish_request(self):
+        trace = tracing.end_trace(self.token)
+        self.token = None
+        sql_stats.observe_request(trace.endpoint, trace.queries, trace.trace_id)
+        return trace
+
+    def test_n_plus_one_is_counted_per_request(self):
+        cursor = self.conn.cursor()
+        for npc_id in range(1, 31):
+            cursor.execute("SELECT name FROM npcs WHERE id = ?", (npc_id,))
+            cursor.fetchone()
+        with self.assertRaises(sqlite3.OperationalError):
+            cursor.execute("SELECT nope FROM npcs")
+        with self.assertLogs("services.sql_stats", "WARNING") as logs:
+            trace = self.finish_request()
+
+        self.assertEqual(trace.queries["SELECT name FROM npcs WHERE id = ?"][0], 30)
+        self.assertIn("30x", logs.output[0])
+        top = sql_stats.top_queries(limit=1, sort="count")[0]
+        self.assertEqual(top["fingerprint"], "SELECT name FROM npcs WHERE id = ?")
+        self.assertEqual(top["max_per_request"], 30)
+        self.assertEqual(top["endpoints"], {"GET /api/campaigns": 30})
+        failing = sql_stats.top_queries(sort="count", endpoint="GET /api/campaigns")[1]
+        self.assertEqual(failing["errors"], 1)
+        summary = sql_stats.endpoint_summary()["GET /api/campaigns"]
+        self.assertEqual((summary["requests"], summary["statements"]), (1, 31))
+        self.assertEqual(summary["max_statements_per_request"], 31)
+
+    def test_slow_query_is_logged_with_plan(self):
+        with mock.patch.object(sql_stats, "SQL_SLOW_QUERY_MS", 0.0001):
+            with self.assertLogs("services.sql_stats", "WARNING") as logs:
+                self.conn.cursor().execute("SELECT name FROM npcs WHERE campaign_id = ?", (1,))
+        self.assertIn("SELECT name FROM npcs WHERE campaign_id = ?", logs.output[0])
+        self.assertIn("SCAN", logs.output[0])
+
+    def test_explain_skips_non_dml(self):
+        self.assertIsNone(sql_stats.explain(sqlite3.connect(":memory:"), "PRAGMA foreign_keys = ON"))
+
+    def test_bounded_entries(self):
+        stats = sql_stats.SqlStats(max_entries=2)
+        for n in range(5):
+            stats.record("GET /x", f"SELECT {n}", 1.0)
+        self.assertEqual({row["fingerprint"] for row in stats.top()}, {"SELECT 0", "SELECT 1", sql_stats.OTHER})
+        with self.assertRaises(ValueError):
+            stats.top(sort="rows")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Staged duplicate finder and download manifest in books/sync_wod_books.py (offline)."""
+
+from __future__ import annotations
+
+import importlib.util
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+_BOOKS_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "books"))
+if _BOOKS_ROOT not in sys.path:
+    sys.path.insert(0, _BOOKS_ROOT)
+
+HAS_SYNC_DEPS = all(importlib.util.find_spec(m) for m in ("requests", "bs4", "dotenv", "tqdm"))
+
+
+@unittest.skipUnless(HAS_SYNC_DEPS, "sync script dependencies not installed")
+class TestSyncWodBooks(unittest.TestCase):
+    def setUp(self):
+        import sync_wod_books
+
+        self.mod = sync_wod_books
+        self._tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self._tmp.name)
+        self.syncer = sync_wod_books.WoDBookSyncer("http://books.invalid/", self.dir)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _write(self, relative, data):
+        path = self.dir / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+    def test_only_files_tied_on_size_and_edges_are_fully_hashed(self):
+        body = os.urandom(300_000)
+        self._write("a/Vampire.pdf", body)
+        self._write("b/Vampire.pdf", body)
+        self._write("c/vampire.pdf", body[:150_000] + b"x" + body[150_001:])  # differs mid-file
+        self._write("a/Mage.pdf", b"1" * 10)
+        self._write("b/Mage.pdf", b"1" * 11)
+
+        dups = self.syncer.find_duplicates()
+
+        mage = dups["mage.pdf"]
+        self.assertTrue(all(info["hash"] is None for info in mage["all_files"]))
+        self.assertEqual(len(mage["by_hash"]), 2)
+
+        vampire = dups["vampire.pdf"]
+        self.assertEqual(len(vampire["by_hash"]), 2)
+        hashed = sorted(info["relative"] for info in vampire["all_files"] if info["hash"])
+        self.assertEqual(hashed, ["a/Vampire.pdf", "b/Vampire.pdf", "c/vampire.pdf"])
+
+    def test_manifest_round_trip_and_current_check(self):
+        self._write("Book.pdf", b"%PDF-1.4 data")
+        manifest = self.mod.DownloadManifest(self.dir / self.mod.MANIFEST_NAME)
+        entry = self.syncer._manifest_entry("http://books.invalid/Book.pdf", 13, "abc", {"etag": '"e1"'})
+        manifest.set("Book.pdf", entry)
+        manifest.save()
+
+        reloaded = self.mod.DownloadManifest(self.dir / self.mod.MANIFEST_NAME)
+        self.assertEqual(reloaded.get("Book.pdf")["etag"], '"e1"')
+        path = self.dir / "Book.pdf"
+        same = {"size": 13, "etag": '"e1"', "last_modified": None}
+        changed = {"size": 13, "etag": '"e2"', "last_modified": None}
+        self.assertTrue(self.syncer._is_current(path, entry, same))
+        self.assertFalse(self.syncer._is_current(path, entry, changed))
+
+
+if __name__ == "__main__":
+    unittest.main()
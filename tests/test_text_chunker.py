@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Unit tests for the shared sentence-packing chunker (backend/services/text_chunker.py)."""
+
+from __future__ import annotations
+
+import os
+import sys
+import unittest
+
+_BACKEND_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if _BACKEND_ROOT not in sys.path:
+    sys.path.insert(0, _BACKEND_ROOT)
+
+from services.text_chunker import TextChunker, benchmark, iter_sentences  # noqa: E402
+
+PAGES = [
+    {"page_number": 1, "text": "One two. Three four five! Six seven eight nine? Ten. "
+                               "Eleven twelve thirteen fourteen fifteen sixteen."},
+    {"page_number": 2, "text": "Next page here. More."},
+]
+
+
+class TestTextChunker(unittest.TestCase):
+    def test_golden_chunks_with_sentence_overlap(self):
+        chunks = TextChunker(60, 25).chunk_pages(PAGES)
+        self.assertEqual([c["text"] for c in chunks], [
+            "One two. Three four five! Six seven eight nine? Ten.",
+            "Ten. Eleven twelve thirteen fourteen fifteen sixteen.",
+            "Next page here. More.",
+        ])
+        self.assertEqual([c["page_number"] for c in chunks], [1, 1, 2])
+        first = chunks[0]
+        self.assertEqual((first["sentence_count"], first["word_count"], first["char_count"]), (4, 10, 52))
+        self.assertEqual(len(first["chunk_id"]), 12)
+        self.assertNotIn("page_end", first)
+
+    def test_chunks_never_exceed_size_and_long_sentences_split(self):
+        self.assertEqual(TextChunker(20, 0).chunk_text("a " * 30), ["a a a a a a a a a a"] * 3)
+        text = " ".join(f"word{i}" for i in range(200)) + ". Short tail."
+        for chunk in TextChunker(50, 20).chunk_text(text):
+            self.assertLessEqual(len(chunk), 50)
+
+    def test_cross_pages_spans_page_breaks(self):
+        chunks = TextChunker(200, 0, cross_pages=True).chunk_pages(PAGES)
+        self.assertEqual(len(chunks), 1)
+        self.assertEqual((chunks[0]["page_number"], chunks[0]["page_end"]), (1, 2))
+
+    def test_token_length_function_sets_budget_and_config(self):
+        words = lambda text: len(text.split())  # noqa: E731 - one "token" per word
+        chunker = TextChunker(6, 2, length_function=words)
+        chunks = chunker.chunk_pages(PAGES[:1])
+        self.assertTrue(all(c["token_count"] <= 6 for c in chunks))
+        self.assertEqual(chunks[0]["text"], "One two. Three four five!")
+        self.assertEqual(chunker.config()["unit"], "tokens")
+        self.assertNotEqual(chunker.config(), TextChunker(6, 2).config())
+
+    def test_sentence_split_and_benchmark(self):
+        self.assertEqual(list(iter_sentences("  A b.  C d?\nE  ")), ["A b.", "C d?", "E"])
+        result = benchmark(0.2)
+        self.assertGreater(result["chunks"], 0)
+        self.assertGreater(result["mb_per_second"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
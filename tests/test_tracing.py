@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Request tracing (backend/services/tracing.py): exclusive span time, DB/vector wrappers, histograms (offline)."""
+
+from __future__ import annotations
+
+import importlib.util
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import unittest
+
+_BACKEND_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if _BACKEND_ROOT not in sys.path:
+    sys.path.insert(0, _BACKEND_ROOT)
+
+from services import tracing  # noqa: E402
+
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+HAS_FLASK = importlib.util.find_spec("flask") is not None
+
+
+class TestTracing(unittest.TestCase):
+    def setUp(self):
+        tracing.reset_histograms()
+        self.trace, self.token = tracing.start_trace(endpoint="POST /api/ai/chat")
+
+    def tearDown(self):
+        if self.token is not None:
+            tracing.end_trace(self.token)
+
+    def finish(self):
+        trace = tracing.end_trace(self.token)
+        self.token = None
+        return trace
+
+    def test_child_time_is_not_counted_twice(self):
+        with tracing.span("vector.query", "vector"):
+            time.sleep(0.01)
+            with tracing.span("embedding.query", "embedding"):
+                time.sleep(0.02)
+        breakdown = self.finish().breakdown()
+        self.assertGreaterEqual(breakdown["embedding"], 20)
+        self.assertGreaterEqual(breakdown["vector"], 10)
+        self.assertLess(breakdown["vector"], 20)
+        self.assertLessEqual(breakdown["vector"] + breakdown["embedding"], breakdown["total"])
+        self.assertEqual([s["name"] for s in self.trace.spans], ["embedding.query", "vector.query"])
+
+    def test_server_reported_llm_timings_split_the_llm_span(self):
+        with tracing.span("llm.ollama", "llm"):
+            time.sleep(0.03)
+            tracing.record_llm_response({"response": "ok", "prompt_eval_duration": 10_000_000,
+                                         "eval_duration": 15_000_000})
+        breakdown = self.finish().breakdown()
+        self.assertAlmostEqual(breakdown["llm_prefill"], 10.0, places=3)
+        self.assertAlmostEqual(breakdown["llm_generation"], 15.0, places=3)
+        self.assertLess(breakdown["llm"], 30 - 20)
+
+    def test_sqlite_connection_is_traced(self):
+        conn = tracing.trace_connection(sqlite3.connect(":memory:"))
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute("CREATE TABLE t (x INTEGER)")
+        cursor.executemany("INSERT INTO t VALUES (?)", [(1,), (2,)])
+        cursor.execute("SELECT x FROM t ORDER BY x")
+        self.assertEqual([row["x"] for row in cursor.fetchall()], [1, 2])
+        self.assertEqual(cursor.rowcount, -1)
+        conn.close()
+        trace = self.finish()
+        self.assertEqual(trace.counts["db"], 4)
+        self.assertIn("db", trace.server_timing())
+
+    @unittest.skipUnless(HAS_NUMPY, "numpy not installed")
+    def test_vector_collection_calls_are_traced(self):
+        from services.vector_store import LocalVectorClient
+
+        with tempfile.TemporaryDirectory() as tmp:
+            client = LocalVectorClient(tmp, embedding_function=lambda texts: [[1.0, float(len(t))] for t in texts])
+            collection = tracing.trace_collection(client.get_or_create_collection("trace_test"))
+            collection.add(ids=["a"], documents=["Prince"], metadatas=[{"campaign_id": 1}])
+            self.assertEqual(collection.count(), 1)
+            trace = self.finish()
+        self.assertEqual(trace.counts["vector"], 2)
+        self.assertEqual(trace.counts["embedding"], 1)
+
+    def test_histograms_and_queue_header(self):
+        self.trace.add("queue", tracing._queue_wait_ms(f"t={time.time() - 0.05:.3f}"))
+        tracing.observe_trace(self.finish())
+        endpoint = tracing.latency_histograms()["POST /api/ai/chat"]
+        self.assertEqual(endpoint["total"]["count"], 1)
+        self.assertEqual(endpoint["total"]["buckets"][-1], ["+Inf", 1])
+        self.assertGreaterEqual(endpoint["queue"]["sum_ms"], 40)
+        self.assertIsNone(tracing._queue_wait_ms("garbage"))
+
+    def test_spans_outside_a_request_are_noops(self):
+        tracing.end_trace(self.token)
+        self.token = None
+        with tracing.span("sql.execute", "db") as current:
+            self.assertIsNone(current)
+
+
+@unittest.skipUnless(HAS_FLASK, "flask not installed")
+class TestTracingFlask(unittest.TestCase):
+    def test_server_timing_header(self):
+        from flask import Flask
+
+        app = Flask(__name__)
+        app.config.update(TRACING_ENABLED=True, TRACE_HEADERS=True, TRACE_SLOW_REQUEST_MS=0)
+        tracing.init_app(app)
+
+        @app.route("/ping")
+        def ping():
+            with tracing.span("sql.execute", "db"):
+                pass
+            return "pong"
+
+        tracing.reset_histograms()
+        response = app.test_client().get("/ping", headers={"X-Request-Id": "abc123"})
+        self.assertEqual(response.headers["X-Trace-Id"], "abc123")
+        self.assertIn("db;dur=", response.headers["Server-Timing"])
+        self.assertEqual(tracing.latency_histograms()["GET /ping"]["total"]["count"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
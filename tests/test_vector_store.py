@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""Collection contract shared by the embedded vector store and ChromaDB (run against both)."""
+
+from __future__ import annotations
+
+import hashlib
+import importlib.util
+import os
+import sys
+import tempfile
+import unittest
+import uuid
+
+_BACKEND_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if _BACKEND_ROOT not in sys.path:
+    sys.path.insert(0, _BACKEND_ROOT)
+
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+HAS_CHROMADB = importlib.util.find_spec("chromadb") is not None
+HAS_RAG_DEPS = HAS_NUMPY and importlib.util.find_spec("requests") is not None
+
+WORDS = ["frenzy", "blood", "gnosis", "rage", "willpower", "umbra", "discipline", "humanity"]
+
+
+class WordEmbedding:
+    """Deterministic bag-of-words embedding so both backends see identical vectors."""
+
+    def __call__(self, input):
+        vectors = []
+        for text in input:
+            vector = [float(text.lower().count(word)) for word in WORDS]
+            vector.append(int(hashlib.md5(text.encode()).hexdigest()[:4], 16) / 65535 / 100)
+            vectors.append(vector)
+        return vectors
+
+    def embed_query(self, input):
+        return self(input)
+
+    def name(self):
+        return "word-embedding"
+
+
+class CollectionContract:
+    """Mixed into one TestCase per backend; ``make_client`` returns a fresh client."""
+
+    def make_client(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.client = self.make_client()
+        self.collection = self.client.get_or_create_collection(
+            f"contract_{uuid.uuid4().hex[:8]}", embedding_function=WordEmbedding()
+        )
+        self.collection.add(
+            ids=["a", "b", "c", "d"],
+            documents=["Frenzy and rage", "Blood and frenzy frenzy", "Gnosis in the umbra", "Willpower"],
+            metadatas=[
+                {"campaign_id": 1, "location_id": 10},
+                {"campaign_id": 1, "location_id": 11},
+                {"campaign_id": 2, "location_id": 20},
+                {"campaign_id": 0},
+            ],
+        )
+
+    def test_query_filters_by_campaign_and_location(self):
+        result = self.collection.query(query_texts=["frenzy"], n_results=5, where={"campaign_id": 1})
+        self.assertEqual(result["ids"][0], ["a", "b"])
+        self.assertEqual(len(result["distances"][0]), 2)
+        self.assertLessEqual(result["distances"][0][0], result["distances"][0][1])
+
+        scoped = self.collection.query(
+            query_texts=["frenzy"], n_results=5,
+            where={"$and": [{"campaign_id": 1}, {"location_id": 10}]},
+        )
+        self.assertEqual(scoped["ids"][0], ["a"])
+        self.assertEqual(scoped["metadatas"][0][0]["location_id"], 10)
+
+        either = self.collection.query(query_texts=["gnosis"], n_results=1, where={"campaign_id": {"$in": [0, 2]}})
+        self.assertEqual(either["ids"][0], ["c"])
+
+    def test_get_upsert_delete_and_count(self):
+        self.assertEqual(self.collection.count(), 4)
+        self.collection.add(ids=["a"], documents=["ignored duplicate"], metadatas=[{"campaign_id": 9}])
+        self.assertEqual(self.collection.get(ids=["a"])["documents"], ["Frenzy and rage"])
+
+        self.collection.upsert(ids=["a", "e"], documents=["Humanity", "Discipline"],
+                               metadatas=[{"campaign_id": 1}, {"campaign_id": 3}])
+        self.assertEqual(self.collection.count(), 5)
+        self.assertEqual(self.collection.get(ids=["a"])["documents"], ["Humanity"])
+
+        page = self.collection.get(where={"campaign_id": 1}, include=["documents"])
+        self.assertEqual(sorted(page["ids"]), ["a", "b"])
+
+        self.collection.delete(where={"campaign_id": 1})
+        self.collection.delete(ids=["e"])
+        self.assertEqual(sorted(self.collection.get(include=[])["ids"]), ["c", "d"])
+        self.assertEqual(self.collection.query(query_texts=["frenzy"], n_results=3, where={"campaign_id": 1})["ids"], [[]])
+
+    def test_missing_collection_raises(self):
+        with self.assertRaises(Exception):
+            self.client.get_collection(f"missing_{uuid.uuid4().hex[:8]}")
+
+
+@unittest.skipUnless(HAS_NUMPY, "numpy not installed")
+class TestLocalVectorStore(CollectionContract, unittest.TestCase):
+    def make_client(self):
+        from services.vector_store import LocalVectorClient
+
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        return LocalVectorClient(self._tmp.name)
+
+    def _reopen(self):
+        from services import vector_store
+
+        vector_store._collection_cache.clear()
+        return vector_store.LocalVectorClient(self._tmp.name).get_collection(
+            self.collection.name, embedding_function=WordEmbedding())
+
+    def test_persists_through_log_and_snapshot(self):
+        self.collection.delete(ids=["d"])
+        reopened = self._reopen()
+        self.assertEqual(sorted(reopened.get(include=[])["ids"]), ["a", "b", "c"])
+
+        reopened.persist()
+        reopened.upsert(ids=["f"], documents=["Rage"], metadatas=[{"campaign_id": 1}])
+        again = self._reopen()
+        self.assertEqual(again.count(), 4)
+        self.assertEqual(again.query(query_texts=["rage"], n_results=1, where={"campaign_id": 1})["ids"], [["f"]])
+
+
+    def test_query_is_scored_in_blocks(self):
+        from unittest import mock
+
+        import numpy as np
+
+        from services import vector_store
+
+        rng = np.random.default_rng(3)
+        vectors = rng.normal(size=(50, 8)).astype(np.float32)
+        vectors[8] = vectors[30]  # a tie: the earlier row comes first
+        collection = self.client.get_or_create_collection("blocked", metadata={"hnsw:space": "cosine"})
+        collection.add(ids=[f"r{i}" for i in range(50)], embeddings=vectors,
+                       metadatas=[{"campaign_id": i % 2} for i in range(50)])
+        queries = np.vstack([vectors[30], rng.normal(size=8)]).astype(np.float32)
+        with mock.patch.object(vector_store, "BLOCK_ROWS", 4):
+            result = collection.query(query_embeddings=queries, n_results=6, where={"campaign_id": 0})
+
+        rows = np.arange(0, 50, 2)
+        unit = vectors[rows] / np.linalg.norm(vectors[rows], axis=1, keepdims=True)
+        for q, query in enumerate(queries):
+            distances = 1.0 - unit @ (query / np.linalg.norm(query))
+            expected = rows[np.argsort(distances, kind="stable")[:6]]
+            self.assertEqual(result["ids"][q], [f"r{row}" for row in expected])
+            np.testing.assert_allclose(result["distances"][q], np.sort(distances)[:6], atol=1e-5)
+        self.assertEqual(result["ids"][0][:2], ["r8", "r30"])
+
+
+@unittest.skipUnless(HAS_CHROMADB, "chromadb not installed")
+class TestChromaDBContract(CollectionContract, unittest.TestCase):
+    def make_client(self):
+        import chromadb
+
+        return chromadb.EphemeralClient()
+
+
+@unittest.skipUnless(HAS_RAG_DEPS, "RAG service dependencies not installed")
+class TestRAGServiceLocalBackend(unittest.TestCase):
+    def test_memories_round_trip_without_a_server(self):
+        from services.rag_service import RAGService
+        from services.vector_store import LocalVectorClient
+
+        with tempfile.TemporaryDirectory() as tmp:
+            client = LocalVectorClient(os.path.join(tmp, "vectors"), embedding_function=WordEmbedding())
+            rag = RAGService({"VECTOR_STORE": "local", "RULE_BOOK_INDEX_DIR": os.path.join(tmp, "index")},
+                             client=client)
+            rag.store_memory("Frenzy rules for Brujah", "rules", {"campaign_id": 7})
+            rag.store_memory("Gnosis and the umbra", "rules", {"campaign_id": 8})
+            memories = rag.retrieve_memories("frenzy", "rules", campaign_id=7)
+            self.assertEqual([m["content"] for m in memories], ["Frenzy rules for Brujah"])
+            status = rag.get_system_status()
+            self.assertEqual(status["vector_store"], "local")
+            self.assertEqual(status["collections"]["rules"]["count"], 2)
+
+    def test_shared_service_fails_fast_after_a_failed_connect(self):
+        from unittest import mock
+
+        from services import rag_service
+
+        attempts = []
+
+        def unreachable(config):
+            attempts.append(config["CHROMADB_CONNECT_RETRIES"])
+            raise RuntimeError("Could not connect to ChromaDB")
+
+        with mock.patch.object(rag_service, "_rag_service", None), \
+                mock.patch.object(rag_service, "_rag_service_failure", None), \
+                mock.patch.object(rag_service, "create_rag_service", side_effect=unreachable):
+            for _ in range(3):
+                with self.assertRaises(RuntimeError):
+                    rag_service.get_rag_service()
+            self.assertEqual(attempts, [1])  # one single-attempt connect, then the cached failure
+            with mock.patch.object(rag_service, "RAG_SERVICE_RETRY_SECONDS", 0):
+                with self.assertRaises(RuntimeError):
+                    rag_service.get_rag_service()
+            self.assertEqual(attempts, [1, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()